@@ -4,12 +4,17 @@ BEGIN;
 SET search_path TO public;
 
 CREATE EXTENSION IF NOT EXISTS pgcrypto;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 ------------------------------------------------------------
 -- 1) RESET (DEV)
 ------------------------------------------------------------
 DROP VIEW IF EXISTS vw_resumen_submodulo_ies CASCADE;
 
+DROP VIEW IF EXISTS vw_resumen_rollup_live CASCADE;
+DROP TABLE IF EXISTS resumen_rollup CASCADE;
+
 DROP TABLE IF EXISTS evidencia_adjunto CASCADE;
 DROP TABLE IF EXISTS evidencia_registro CASCADE;
 DROP TABLE IF EXISTS evidencia_item CASCADE;
@@ -65,16 +70,30 @@ CREATE TABLE submodulos (
 
 CREATE INDEX idx_submodulos_subprograma_id ON submodulos(subprograma_id);
 
+-- Búsqueda (GET /buscar): español sin tildes. unaccent() es STABLE;
+-- f_unaccent fija el diccionario y queda IMMUTABLE (usable en índices).
+CREATE OR REPLACE FUNCTION f_unaccent(text)
+RETURNS text AS $$
+  SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+DROP TEXT SEARCH CONFIGURATION IF EXISTS es_unaccent;
+CREATE TEXT SEARCH CONFIGURATION es_unaccent (COPY = spanish);
+ALTER TEXT SEARCH CONFIGURATION es_unaccent
+  ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+
 CREATE TABLE evidencia_item (
   id           BIGSERIAL PRIMARY KEY,
   submodulo_id INTEGER NOT NULL REFERENCES submodulos(id) ON DELETE CASCADE,
   orden        INTEGER NOT NULL,
   titulo       TEXT    NOT NULL,
+  titulo_tsv   tsvector GENERATED ALWAYS AS (to_tsvector('public.es_unaccent', titulo)) STORED,
   created_at   TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
   UNIQUE (submodulo_id, orden)
 );
 
 CREATE INDEX idx_evidencia_item_submodulo_id ON evidencia_item(submodulo_id);
+CREATE INDEX idx_evidencia_item_titulo_tsv ON evidencia_item USING gin (titulo_tsv);
 
 ------------------------------------------------------------
 -- 3.1) FORM CONFIG (por submódulo, versionado)
@@ -96,9 +115,11 @@ CREATE INDEX idx_form_config_active ON submodulo_form_config(submodulo_id, is_ac
 ------------------------------------------------------------
 -- 4) OPERACIÓN (LO QUE LLENA EL CLIENTE)
 -- ✅ OPCIÓN B: evidencia_registro tiene submodulo_id directo
+-- Particionada por HASH (ies_id): cada IES trae el catálogo completo,
+-- todas las queries filtran por ies_id (ver migración 004).
 ------------------------------------------------------------
 CREATE TABLE evidencia_registro (
-  id              BIGSERIAL PRIMARY KEY,
+  id              BIGSERIAL,
   ies_id          INTEGER NOT NULL REFERENCES ies(id) ON DELETE CASCADE,
 
   -- ✅ NUEVO: submódulo directo para filtrar sin líos
@@ -122,29 +143,49 @@ CREATE TABLE evidencia_registro (
   created_at      TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
   updated_at      TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
 
+  -- La clave de partición tiene que estar en PK / unique
+  PRIMARY KEY (ies_id, id),
   CONSTRAINT ux_registro_ies_evidencia UNIQUE (ies_id, evidencia_id),
   CONSTRAINT ck_valoracion_0_100 CHECK (valoracion BETWEEN 0 AND 100),
   CONSTRAINT ck_avance_0_100 CHECK (avance_pct BETWEEN 0 AND 100),
   CONSTRAINT ck_fechas_ok CHECK (
     fecha_inicio IS NULL OR fecha_fin IS NULL OR fecha_inicio <= fecha_fin
   )
-);
+) PARTITION BY HASH (ies_id);
+
+DO $$
+BEGIN
+  FOR i IN 0 .. 15 LOOP
+    EXECUTE format(
+      'CREATE TABLE %I PARTITION OF evidencia_registro FOR VALUES WITH (MODULUS 16, REMAINDER %s)',
+      'evidencia_registro_p' || lpad(i::text, 2, '0'), i
+    );
+  END LOOP;
+END $$;
 
-CREATE INDEX idx_registro_ies_id ON evidencia_registro(ies_id);
 CREATE INDEX idx_registro_submodulo_id ON evidencia_registro(submodulo_id);
 CREATE INDEX idx_registro_evidencia_id ON evidencia_registro(evidencia_id);
+-- Par (IES, submódulo): refresh del rollup y detalle del resumen (por partición)
+CREATE INDEX idx_registro_ies_submodulo ON evidencia_registro(ies_id, submodulo_id);
+-- Búsqueda aproximada de responsables (pg_trgm, sin tildes / mayúsculas)
+CREATE INDEX idx_registro_responsable_trgm
+  ON evidencia_registro USING gin (f_unaccent(lower(responsable)) gin_trgm_ops);
 
 ------------------------------------------------------------
 -- 4.1) ADJUNTOS (por evidencia_registro)
 ------------------------------------------------------------
 CREATE TABLE evidencia_adjunto (
   id          BIGSERIAL PRIMARY KEY,
-  registro_id BIGINT NOT NULL REFERENCES evidencia_registro(id) ON DELETE CASCADE,
+  ies_id      INTEGER NOT NULL,
+  registro_id BIGINT NOT NULL,
   url         TEXT NOT NULL,
   nombre      TEXT,
   mime_type   VARCHAR(120),
   size_bytes  BIGINT,
-  created_at  TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW()
+  created_at  TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+
+  CONSTRAINT evidencia_adjunto_registro_fkey FOREIGN KEY (ies_id, registro_id)
+    REFERENCES evidencia_registro(ies_id, id) ON DELETE CASCADE
 );
 
 CREATE INDEX idx_evidencia_adjunto_registro_id ON evidencia_adjunto(registro_id);
@@ -199,6 +240,286 @@ ON evidencia_registro
 FOR EACH ROW
 EXECUTE FUNCTION set_submodulo_id_from_evidencia();
 
+------------------------------------------------------------
+-- 4.4) ✅ ROLLUP RESUMEN por (IES, submódulo)
+-- Se recalculan SOLO los pares tocados en cada INSERT/UPDATE/DELETE
+-- de evidencia_registro (una vez por sentencia, set-based).
+-- Mismas reglas que _run_resumen:
+-- - categoria_si_no usa presenta como proxy si viene NULL
+-- - buckets de avance 0_24 / 25_49 / 50_74 / 75_100
+-- - responsable_mas_reciente = no vacío con updated_at más reciente
+------------------------------------------------------------
+CREATE TABLE resumen_rollup (
+  ies_id                   INTEGER NOT NULL REFERENCES ies(id) ON DELETE CASCADE,
+  submodulo_id             INTEGER NOT NULL REFERENCES submodulos(id) ON DELETE CASCADE,
+
+  evidencias_total         INTEGER NOT NULL DEFAULT 0,
+  avance_promedio          DOUBLE PRECISION,
+  valoracion_promedio      DOUBLE PRECISION,
+  fecha_inicio_min         DATE,
+  fecha_fin_max            DATE,
+  ultima_actualizacion     TIMESTAMP WITHOUT TIME ZONE,
+
+  presenta_si              INTEGER NOT NULL DEFAULT 0,
+  presenta_no              INTEGER NOT NULL DEFAULT 0,
+  presenta_sin_dato        INTEGER NOT NULL DEFAULT 0,
+
+  cat_si                   INTEGER NOT NULL DEFAULT 0,
+  cat_no                   INTEGER NOT NULL DEFAULT 0,
+  cat_sin_dato             INTEGER NOT NULL DEFAULT 0,
+
+  av_0_24                  INTEGER NOT NULL DEFAULT 0,
+  av_25_49                 INTEGER NOT NULL DEFAULT 0,
+  av_50_74                 INTEGER NOT NULL DEFAULT 0,
+  av_75_100                INTEGER NOT NULL DEFAULT 0,
+  av_mas_100               INTEGER NOT NULL DEFAULT 0,
+  av_sin_dato              INTEGER NOT NULL DEFAULT 0,
+
+  responsable_mas_reciente VARCHAR(255),
+
+  refreshed_at             TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+
+  PRIMARY KEY (ies_id, submodulo_id)
+);
+
+-- Cálculo "en vivo" por pares (misma definición que usan el rebuild y el refresh)
+-- p_ies / p_submodulo: arrays paralelos de pares (ies_id, submodulo_id).
+-- NULL = todos los pares. Cada rama del UNION ALL lleva un filtro constante,
+-- así el plan solo ejecuta una: con pares va por índice, sin pares hace el
+-- agregado completo.
+CREATE OR REPLACE FUNCTION resumen_rollup_calc(p_ies INTEGER[], p_submodulo INTEGER[])
+RETURNS TABLE (
+  ies_id                   INTEGER,
+  submodulo_id             INTEGER,
+  evidencias_total         INTEGER,
+  avance_promedio          DOUBLE PRECISION,
+  valoracion_promedio      DOUBLE PRECISION,
+  fecha_inicio_min         DATE,
+  fecha_fin_max            DATE,
+  ultima_actualizacion     TIMESTAMP WITHOUT TIME ZONE,
+  presenta_si              INTEGER,
+  presenta_no              INTEGER,
+  presenta_sin_dato        INTEGER,
+  cat_si                   INTEGER,
+  cat_no                   INTEGER,
+  cat_sin_dato             INTEGER,
+  av_0_24                  INTEGER,
+  av_25_49                 INTEGER,
+  av_50_74                 INTEGER,
+  av_75_100                INTEGER,
+  av_mas_100               INTEGER,
+  av_sin_dato              INTEGER,
+  responsable_mas_reciente TEXT
+) AS $$
+  SELECT
+    er.ies_id,
+    ei.submodulo_id,
+    COUNT(er.id)::int                                                            AS evidencias_total,
+    AVG(er.avance_pct)::float                                                    AS avance_promedio,
+    AVG(er.valoracion)::float                                                    AS valoracion_promedio,
+    MIN(er.fecha_inicio)                                                         AS fecha_inicio_min,
+    MAX(er.fecha_fin)                                                            AS fecha_fin_max,
+    MAX(er.updated_at)                                                           AS ultima_actualizacion,
+    (COUNT(er.id) FILTER (WHERE er.presenta IS TRUE))::int                       AS presenta_si,
+    (COUNT(er.id) FILTER (WHERE er.presenta IS FALSE))::int                      AS presenta_no,
+    (COUNT(er.id) FILTER (WHERE er.presenta IS NULL))::int                       AS presenta_sin_dato,
+    (COUNT(er.id) FILTER (WHERE COALESCE(er.categoria_si_no, er.presenta) IS TRUE))::int  AS cat_si,
+    (COUNT(er.id) FILTER (WHERE COALESCE(er.categoria_si_no, er.presenta) IS FALSE))::int AS cat_no,
+    (COUNT(er.id) FILTER (WHERE COALESCE(er.categoria_si_no, er.presenta) IS NULL))::int  AS cat_sin_dato,
+    (COUNT(er.id) FILTER (WHERE er.avance_pct < 25))::int                        AS av_0_24,
+    (COUNT(er.id) FILTER (WHERE er.avance_pct >= 25 AND er.avance_pct < 50))::int  AS av_25_49,
+    (COUNT(er.id) FILTER (WHERE er.avance_pct >= 50 AND er.avance_pct < 75))::int  AS av_50_74,
+    (COUNT(er.id) FILTER (WHERE er.avance_pct >= 75 AND er.avance_pct <= 100))::int AS av_75_100,
+    (COUNT(er.id) FILTER (WHERE er.avance_pct > 100))::int                       AS av_mas_100,
+    (COUNT(er.id) FILTER (WHERE er.avance_pct IS NULL))::int                     AS av_sin_dato,
+    (ARRAY_AGG(btrim(er.responsable) ORDER BY er.updated_at DESC, ei.orden ASC, er.id ASC)
+      FILTER (WHERE btrim(er.responsable) <> ''))[1]                             AS responsable_mas_reciente
+  FROM (
+    SELECT r.* FROM evidencia_registro r
+    WHERE p_ies IS NULL
+    UNION ALL
+    SELECT r.*
+    FROM (SELECT DISTINCT k.ies_id, k.submodulo_id
+          FROM unnest(p_ies, p_submodulo) AS k(ies_id, submodulo_id)) k
+    JOIN evidencia_registro r ON r.ies_id = k.ies_id AND r.submodulo_id = k.submodulo_id
+    WHERE p_ies IS NOT NULL
+      AND r.ies_id = ANY(p_ies)  -- redundante: poda de particiones al planificar
+  ) er
+  JOIN evidencia_item ei ON ei.id = er.evidencia_id
+  GROUP BY er.ies_id, ei.submodulo_id;
+$$ LANGUAGE sql STABLE;
+
+CREATE VIEW vw_resumen_rollup_live AS
+SELECT * FROM resumen_rollup_calc(NULL, NULL);
+
+-- Refresh set-based de varios pares (trigger por sentencia, import masivo)
+CREATE OR REPLACE FUNCTION resumen_rollup_refresh_pares(p_ies INTEGER[], p_submodulo INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+  -- Sin pares no hay nada que hacer (¡NULL en calc = todos los pares!)
+  IF p_ies IS NULL OR cardinality(p_ies) = 0 THEN
+    RETURN;
+  END IF;
+
+  -- Pares que quedaron sin registros
+  DELETE FROM resumen_rollup rr
+  USING unnest(p_ies, p_submodulo) AS k(ies_id, submodulo_id)
+  WHERE rr.ies_id = k.ies_id
+    AND rr.submodulo_id = k.submodulo_id
+    AND NOT EXISTS (
+      SELECT 1 FROM evidencia_registro er
+      WHERE er.ies_id = k.ies_id AND er.submodulo_id = k.submodulo_id
+        AND er.ies_id = ANY(p_ies)
+    );
+
+  -- Lock de fila por par: serializa escritores concurrentes del mismo par
+  -- (el UPDATE de abajo toma su snapshot DESPUÉS del commit del otro).
+  -- Orden fijo (ies_id, submodulo_id) para no cruzar locks entre lotes.
+  INSERT INTO resumen_rollup (ies_id, submodulo_id)
+  SELECT k.ies_id, k.submodulo_id
+  FROM (SELECT DISTINCT k.ies_id, k.submodulo_id
+        FROM unnest(p_ies, p_submodulo) AS k(ies_id, submodulo_id)) k
+  WHERE EXISTS (
+    SELECT 1 FROM evidencia_registro er
+    WHERE er.ies_id = k.ies_id AND er.submodulo_id = k.submodulo_id
+      AND er.ies_id = ANY(p_ies)
+  )
+  ORDER BY k.ies_id, k.submodulo_id
+  ON CONFLICT (ies_id, submodulo_id) DO NOTHING;
+
+  PERFORM 1
+  FROM resumen_rollup rr
+  JOIN (SELECT DISTINCT k.ies_id, k.submodulo_id
+        FROM unnest(p_ies, p_submodulo) AS k(ies_id, submodulo_id)) k
+    ON rr.ies_id = k.ies_id AND rr.submodulo_id = k.submodulo_id
+  ORDER BY rr.ies_id, rr.submodulo_id
+  FOR UPDATE OF rr;
+
+  UPDATE resumen_rollup rr SET
+    evidencias_total         = v.evidencias_total,
+    avance_promedio          = v.avance_promedio,
+    valoracion_promedio      = v.valoracion_promedio,
+    fecha_inicio_min         = v.fecha_inicio_min,
+    fecha_fin_max            = v.fecha_fin_max,
+    ultima_actualizacion     = v.ultima_actualizacion,
+    presenta_si              = v.presenta_si,
+    presenta_no              = v.presenta_no,
+    presenta_sin_dato        = v.presenta_sin_dato,
+    cat_si                   = v.cat_si,
+    cat_no                   = v.cat_no,
+    cat_sin_dato             = v.cat_sin_dato,
+    av_0_24                  = v.av_0_24,
+    av_25_49                 = v.av_25_49,
+    av_50_74                 = v.av_50_74,
+    av_75_100                = v.av_75_100,
+    av_mas_100               = v.av_mas_100,
+    av_sin_dato              = v.av_sin_dato,
+    responsable_mas_reciente = v.responsable_mas_reciente,
+    refreshed_at             = NOW()
+  FROM resumen_rollup_calc(p_ies, p_submodulo) v
+  WHERE rr.ies_id = v.ies_id
+    AND rr.submodulo_id = v.submodulo_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Un solo par (compatibilidad)
+CREATE OR REPLACE FUNCTION resumen_rollup_refresh(p_ies_id INTEGER, p_submodulo_id INTEGER)
+RETURNS VOID AS $$
+BEGIN
+  PERFORM resumen_rollup_refresh_pares(ARRAY[p_ies_id], ARRAY[p_submodulo_id]);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger por SENTENCIA (transition tables): un INSERT masivo
+-- (crear_ies / seed operativo / import) recalcula todos sus pares
+-- en un solo refresh set-based.
+CREATE OR REPLACE FUNCTION resumen_rollup_on_registro()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_ies INTEGER[];
+  v_sm  INTEGER[];
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    SELECT array_agg(k.ies_id), array_agg(k.submodulo_id) INTO v_ies, v_sm
+    FROM (SELECT DISTINCT ies_id, submodulo_id FROM new_rows) k;
+  ELSIF TG_OP = 'UPDATE' THEN
+    SELECT array_agg(k.ies_id), array_agg(k.submodulo_id) INTO v_ies, v_sm
+    FROM (
+      SELECT ies_id, submodulo_id FROM new_rows
+      UNION
+      SELECT ies_id, submodulo_id FROM old_rows
+    ) k;
+  ELSE
+    SELECT array_agg(k.ies_id), array_agg(k.submodulo_id) INTO v_ies, v_sm
+    FROM (SELECT DISTINCT ies_id, submodulo_id FROM old_rows) k;
+  END IF;
+
+  PERFORM resumen_rollup_refresh_pares(v_ies, v_sm);
+
+  -- Aviso a GET /api/resumen/stream (LISTEN resumen_rollup): un mensaje
+  -- por IES con sus submódulos tocados. Postgres lo entrega al COMMIT y,
+  -- como va después del refresh, el rollup ya está al día al leerlo.
+  PERFORM pg_notify('resumen_rollup', json_build_object(
+            'ies_id', k.ies_id,
+            'submodulos', array_agg(DISTINCT k.submodulo_id ORDER BY k.submodulo_id)
+          )::text)
+  FROM unnest(v_ies, v_sm) AS k(ies_id, submodulo_id)
+  GROUP BY k.ies_id;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_resumen_rollup_ins
+AFTER INSERT ON evidencia_registro
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION resumen_rollup_on_registro();
+
+CREATE TRIGGER trg_resumen_rollup_upd
+AFTER UPDATE ON evidencia_registro
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION resumen_rollup_on_registro();
+
+CREATE TRIGGER trg_resumen_rollup_del
+AFTER DELETE ON evidencia_registro
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION resumen_rollup_on_registro();
+
+-- Reconstrucción completa (rollup_resumen.py rebuild)
+CREATE OR REPLACE FUNCTION resumen_rollup_rebuild()
+RETURNS INTEGER AS $$
+DECLARE
+  n INTEGER := 0;
+BEGIN
+  -- Bloquea escrituras en evidencia_registro mientras se reconstruye
+  LOCK TABLE evidencia_registro IN SHARE MODE;
+
+  DELETE FROM resumen_rollup;
+
+  INSERT INTO resumen_rollup (
+    ies_id, submodulo_id,
+    evidencias_total, avance_promedio, valoracion_promedio,
+    fecha_inicio_min, fecha_fin_max, ultima_actualizacion,
+    presenta_si, presenta_no, presenta_sin_dato,
+    cat_si, cat_no, cat_sin_dato,
+    av_0_24, av_25_49, av_50_74, av_75_100, av_mas_100, av_sin_dato,
+    responsable_mas_reciente
+  )
+  SELECT
+    v.ies_id, v.submodulo_id,
+    v.evidencias_total, v.avance_promedio, v.valoracion_promedio,
+    v.fecha_inicio_min, v.fecha_fin_max, v.ultima_actualizacion,
+    v.presenta_si, v.presenta_no, v.presenta_sin_dato,
+    v.cat_si, v.cat_no, v.cat_sin_dato,
+    v.av_0_24, v.av_25_49, v.av_50_74, v.av_75_100, v.av_mas_100, v.av_sin_dato,
+    v.responsable_mas_reciente
+  FROM vw_resumen_rollup_live v;
+
+  GET DIAGNOSTICS n = ROW_COUNT;
+  RETURN n;
+END;
+$$ LANGUAGE plpgsql;
+
 ------------------------------------------------------------
 -- 5) SEED: SUBPROGRAMAS
 ------------------------------------------------------------
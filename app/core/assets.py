@@ -0,0 +1,202 @@
+# app/core/assets.py
+import hashlib
+import json
+import logging
+import mimetypes
+import re
+from html import escape
+from pathlib import Path
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.staticfiles import StaticFiles
+
+# ============================================================
+# Assets optimizados (build_assets.py -> app/static/dist)
+#
+# - /static/dist/*: nombres con hash de contenido -> cache inmutable;
+#   JS/CSS con hermanos .br / .gz precomprimidos (Accept-Encoding).
+# - manifest.json: original (img/astra.png) -> variantes AVIF/WebP por
+#   ancho + PNG de respaldo; bundle (app.js) -> archivo + fuentes.
+#   Si un original cambió y no se corrió el build (hash distinto), se
+#   sirve el original (nunca un asset viejo).
+# - Las páginas HTML reciben window.ASTRA_IMG con src/srcset/sizes por
+#   URL original; el formato (avif/webp) se negocia con Accept. Los
+#   <script>/<link> de un bundle se reemplazan por el bundle.
+# ============================================================
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = Path(__file__).resolve().parents[1] / "static"
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST_PATH = DIST_DIR / "manifest.json"
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+_RE_PRELOAD_IMG = re.compile(r'<link rel="preload" as="image" href="(/static/[^"]+)">')
+_RE_SCRIPT = re.compile(r'[ \t]*<script src="(/static/[^"?]+)(?:\?[^"]*)?"(?: defer)?></script>\n?')
+_RE_STYLESHEET = re.compile(r'[ \t]*<link rel="stylesheet" href="(/static/[^"?]+)(?:\?[^"]*)?">\n?')
+
+_PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    StaticFiles para archivos con hash en el nombre (no cambian nunca).
+    Si existe x.br / x.gz y el cliente lo acepta, sirve ese.
+    """
+
+    async def get_response(self, path: str, scope):
+        accept = Headers(scope=scope).get("accept-encoding", "")
+        for encoding, ext in _PRECOMPRESSED:
+            if encoding not in accept:
+                continue
+            try:
+                response = await super().get_response(path + ext, scope)
+            except HTTPException:
+                continue
+            response.headers["Content-Encoding"] = encoding
+            response.headers["Content-Type"] = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            response.headers["Vary"] = "Accept-Encoding"
+            return response
+
+        response = await super().get_response(path, scope)
+        if path.endswith((".js", ".css")):
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE
+        return response
+
+
+def _sha256(rel: str) -> str | None:
+    try:
+        return hashlib.sha256((STATIC_DIR / rel).read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def _load_manifest() -> tuple[dict, dict]:
+    try:
+        manifest = json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}, {}
+    except Exception as e:
+        logger.warning("manifest de assets ilegible: %r", e)
+        return {}, {}
+
+    images = {}
+    for logical, entry in (manifest.get("images") or {}).items():
+        if _sha256(logical) != entry.get("source_sha256"):
+            logger.warning("%s cambió desde el último build (python build_assets.py); se sirve el original", logical)
+            continue
+        images[f"/static/{logical}"] = entry
+
+    # URL original -> (bundle, url del bundle); solo bundles al día
+    bundles = {}
+    for name, entry in (manifest.get("bundles") or {}).items():
+        stale = [rel for rel, sha in entry["sources"].items() if _sha256(rel) != sha]
+        if stale:
+            logger.warning("bundle %s desactualizado (%s); se sirven los originales", name, ", ".join(stale))
+            continue
+        for rel in entry["sources"]:
+            bundles[f"/static/{rel}"] = (name, entry["url"])
+
+    return images, bundles
+
+
+def _manifest_mtime() -> int | None:
+    try:
+        return MANIFEST_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+_manifest_mtime_ns = _manifest_mtime()
+_images, _bundles = _load_manifest()
+
+
+def manifest_version() -> int | None:
+    """
+    Versión (mtime) del manifest. Si build_assets.py lo reescribió desde la
+    última carga, lo recarga: los HTML que se rendericen después apuntan a
+    los nuevos archivos con hash.
+    """
+    global _images, _bundles, _manifest_mtime_ns
+    mtime = _manifest_mtime()
+    if mtime != _manifest_mtime_ns:
+        _images, _bundles = _load_manifest()
+        _manifest_mtime_ns = mtime
+    return mtime
+
+
+def pick_image_format(accept: str | None) -> str:
+    """AVIF si el navegador lo anuncia; si no WebP (soporte universal)."""
+    return "avif" if "image/avif" in (accept or "") else "webp"
+
+
+def image_variant(url: str, fmt: str = "webp") -> dict | None:
+    """src/srcset/sizes (+ PNG de respaldo) para una URL original (/static/img/...) o None."""
+    entry = _images.get(url)
+    if not entry:
+        return None
+    variants = entry["variants"][fmt]
+    return {
+        "src": variants[-1][1],
+        "fallback": entry["fallback"],
+        "srcset": ", ".join(f"{u} {w}w" for w, u in variants),
+        "sizes": entry["sizes"],
+        "width": entry["width"],
+        "height": entry["height"],
+    }
+
+
+def _rewrite_bundles(html: str) -> str:
+    """Primer <script>/<link> de cada bundle -> bundle; el resto se quita."""
+    emitted = set()
+
+    def _tag(m, template):
+        hit = _bundles.get(m.group(1))
+        if not hit:
+            return m.group(0)
+        name, url = hit
+        if name in emitted:
+            return ""
+        emitted.add(name)
+        indent = m.group(0)[: len(m.group(0)) - len(m.group(0).lstrip())]
+        return indent + template.format(url=url) + "\n"
+
+    html = _RE_SCRIPT.sub(lambda m: _tag(m, '<script src="{url}" defer></script>'), html)
+    return _RE_STYLESHEET.sub(lambda m: _tag(m, '<link rel="stylesheet" href="{url}">'), html)
+
+
+def render_html(html: str, accept: str | None) -> str:
+    """
+    Reemplaza los <script>/<link> de los bundles, apunta los
+    <link rel="preload" as="image"> a las variantes y expone
+    window.ASTRA_IMG (mismo formato) para el JS.
+    """
+    if _bundles:
+        html = _rewrite_bundles(html)
+    # Solo páginas que usan las imágenes (login no)
+    if not any(url in html for url in _images):
+        return html
+
+    fmt = pick_image_format(accept)
+    table = {url: image_variant(url, fmt) for url in _images}
+
+    def _preload(m):
+        v = table.get(m.group(1))
+        if not v:
+            return m.group(0)
+        return (
+            f'<link rel="preload" as="image" href="{v["src"]}" '
+            f'imagesrcset="{escape(v["srcset"])}" imagesizes="{v["sizes"]}">'
+        )
+
+    html = _RE_PRELOAD_IMG.sub(_preload, html)
+
+    script = f"<script>window.ASTRA_IMG = {json.dumps(table, separators=(',', ':'))};</script>\n"
+    return html.replace("</head>", script + "</head>", 1)
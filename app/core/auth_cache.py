@@ -0,0 +1,118 @@
+# app/core/auth_cache.py
+import os
+import threading
+import time
+
+# ============================================================
+# Cache de principal (usuario autenticado) en memoria del proceso
+#
+# get_current_user consultaba "usuarios" en cada request. Aquí se guarda,
+# por user_id, una copia plana de las columnas + ies_slug durante un TTL
+# corto. Con cache caliente la autorización no toca la DB.
+#
+# Invalidación:
+#   - invalidate_principal(user_id) al desactivar/borrar/cambiar clave.
+#   - invalidate_principal() (sin id) para cambios masivos (borrar IES).
+#   - Cada invalidación sube un contador de generación: una carga que
+#     empezó antes de la invalidación NO se guarda (evita reinsertar datos
+#     viejos leídos en paralelo).
+#
+# Con varios workers cada proceso tiene su propia cache: un cambio hecho
+# en otro worker se ve como máximo tras AUTH_CACHE_TTL segundos.
+# AUTH_STRICT=1 desactiva la cache (siempre DB).
+# ============================================================
+
+AUTH_STRICT = (os.getenv("AUTH_STRICT", "") or "").strip().lower() in ("1", "true", "yes", "on")
+
+try:
+    AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))
+except ValueError:
+    raise RuntimeError("AUTH_CACHE_TTL debe ser numérico (segundos)")
+
+try:
+    AUTH_CACHE_MAX = int(os.getenv("AUTH_CACHE_MAX", "10000"))
+except ValueError:
+    raise RuntimeError("AUTH_CACHE_MAX debe ser entero")
+
+
+class _PrincipalCache:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data = {}  # user_id -> (expira_en, dict)
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return not AUTH_STRICT and self.ttl > 0
+
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, user_id: int):
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(user_id)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    self._data.pop(user_id, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return item[1]
+
+    def put(self, user_id: int, fields: dict, generation: int) -> None:
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            # Hubo invalidación mientras se leía de DB -> no guardar
+            if generation != self._generation:
+                return
+            if len(self._data) >= self.max_entries:
+                self._evict(now)
+            self._data[user_id] = (now + self.ttl, fields)
+
+    def _evict(self, now: float) -> None:
+        for k in [k for k, (exp, _) in self._data.items() if exp <= now]:
+            del self._data[k]
+        # Si sigue lleno, se descartan los más antiguos (orden de inserción)
+        extra = len(self._data) - self.max_entries + 1
+        if extra > 0:
+            for k in list(self._data.keys())[:extra]:
+                del self._data[k]
+
+    def invalidate(self, user_id: int | None = None) -> None:
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if user_id is None:
+                self._data.clear()
+            else:
+                self._data.pop(int(user_id), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "strict": AUTH_STRICT,
+                "ttl_s": self.ttl,
+                "entries": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "generation": self._generation,
+            }
+
+
+principal_cache = _PrincipalCache(AUTH_CACHE_TTL, AUTH_CACHE_MAX)
+
+
+def invalidate_principal(user_id: int | None = None) -> None:
+    """Descarta el principal cacheado (un usuario o todos)."""
+    principal_cache.invalidate(user_id)
@@ -1,19 +1,49 @@
 # app/core/deps.py
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 from app.models.ies import IES 
-from app.db.session import get_db
+from app.db.session import AsyncSessionLocal, get_async_db
 from app.core.security import decode_token
+from app.core.auth_cache import AUTH_STRICT, principal_cache
 from app.models.usuarios import Usuario
 
 security = HTTPBearer(auto_error=False)
 
 
-def get_current_user(
-    creds: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> Usuario:
+_USUARIO_COLS = ("id", "ies_id", "username", "email", "password_hash", "rol", "is_active", "created_at")
+
+
+def _usuario_from_fields(fields: dict) -> Usuario:
+    """
+    Arma un Usuario nuevo (detached) por request a partir del dict cacheado:
+    así nadie comparte la instancia y los routers sync pueden hacer db.add(user).
+    """
+    user = Usuario(**{c: fields[c] for c in _USUARIO_COLS})
+    make_transient_to_detached(user)
+    user.ies_slug = fields.get("ies_slug")
+    return user
+
+
+async def _load_principal(user_id: int, db: AsyncSession) -> dict | None:
+    # Una sola consulta: usuario + slug de su IES (para require_admin_or_same_ies)
+    res = await db.execute(
+        select(Usuario, IES.slug)
+        .outerjoin(IES, IES.id == Usuario.ies_id)
+        .where(Usuario.id == user_id)
+    )
+    row = res.first()
+    if not row:
+        return None
+    user, ies_slug = row
+    fields = {c: getattr(user, c) for c in _USUARIO_COLS}
+    fields["ies_slug"] = ies_slug
+    return fields
+
+
+async def _resolve_user(creds: HTTPAuthorizationCredentials, db: AsyncSession, strict: bool) -> Usuario:
     if not creds or not creds.credentials:
         raise HTTPException(status_code=401, detail="No autenticado")
 
@@ -26,12 +56,53 @@ def get_current_user(
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(status_code=401, detail="Token sin 'sub'")
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=401, detail="Token inválido")
+
+    fields = None if strict else principal_cache.get(user_id)
+    if fields is None:
+        generation = principal_cache.generation()
+        fields = await _load_principal(user_id, db)
+        if fields is not None and not strict:
+            principal_cache.put(user_id, fields, generation)
 
-    user = db.query(Usuario).filter(Usuario.id == int(user_id)).first()
-    if not user or not user.is_active:
+    if not fields or not fields["is_active"]:
         raise HTTPException(status_code=401, detail="Usuario no válido/inactivo")
 
-    return user
+    return _usuario_from_fields(fields)
+
+
+async def get_current_user(
+    creds: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+) -> Usuario:
+    """
+    Usuario autenticado. Usa la cache de principal (TTL corto) salvo
+    AUTH_STRICT=1, en cuyo caso siempre consulta la DB.
+    """
+    return await _resolve_user(creds, db, strict=AUTH_STRICT)
+
+
+async def get_current_user_strict(
+    creds: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+) -> Usuario:
+    """Igual que get_current_user pero siempre contra la DB (ej: cambio de clave)."""
+    return await _resolve_user(creds, db, strict=True)
+
+
+async def get_current_user_stream(
+    creds: HTTPAuthorizationCredentials = Depends(security),
+) -> Usuario:
+    """
+    Para respuestas largas (SSE): sesión propia que se cierra antes de
+    empezar a streamear. Con Depends(get_async_db) la sesión (y su conexión
+    del pool) viviría lo que dure el stream.
+    """
+    async with AsyncSessionLocal() as db:
+        return await _resolve_user(creds, db, strict=AUTH_STRICT)
 
 
 def require_admin(user: Usuario = Depends(get_current_user)) -> Usuario:
@@ -55,7 +126,6 @@ def require_ies_user(user: Usuario = Depends(get_current_user)) -> Usuario:
     return user
 def require_admin_or_same_ies(
     ies_slug: str,
-    db: Session = Depends(get_db),
     user: Usuario = Depends(get_current_user),
 ) -> Usuario:
     rol = (user.rol or "").lower().strip()
@@ -72,8 +142,8 @@ def require_admin_or_same_ies(
         raise HTTPException(status_code=403, detail="Usuario no tiene IES asignada")
 
     # Validar que el slug del path sea el mismo de su IES real
-    ies = db.query(IES).filter(IES.id == user.ies_id).first()
-    if not ies or (ies.slug or "").strip() != (ies_slug or "").strip():
+    # (ies_slug viene con el principal: sin consulta extra a "ies")
+    if (user.ies_slug or "").strip() != (ies_slug or "").strip():
         raise HTTPException(status_code=403, detail="No autorizado para esa IES")
 
-    return user
\ No newline at end of file
+    return user
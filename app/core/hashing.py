@@ -0,0 +1,111 @@
+# app/core/hashing.py
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from app.core import security
+
+# ============================================================
+# Hash de claves fuera del threadpool de requests
+#
+# pbkdf2 es CPU puro: corriendo en los hilos de FastAPI, una ola de logins
+# acapara el threadpool (y el GIL) y frena el resto de la API. Aquí se
+# manda a un ProcessPoolExecutor acotado:
+#   - PASSWORD_HASH_WORKERS: procesos (0 = hilos dedicados, sin procesos)
+#   - PASSWORD_HASH_MAX_PENDING: trabajos en cola + en curso; al superarlo
+#     se responde 503 con Retry-After en lugar de encolar sin límite.
+# ============================================================
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        raise RuntimeError(f"{name} debe ser entero (valor: {raw!r})")
+
+
+HASH_WORKERS = _env_int("PASSWORD_HASH_WORKERS", max(1, (os.cpu_count() or 2) // 2))
+HASH_MAX_PENDING = _env_int("PASSWORD_HASH_MAX_PENDING", max(1, HASH_WORKERS) * 16)
+HASH_RETRY_AFTER_S = _env_int("PASSWORD_HASH_RETRY_AFTER", 2)
+
+_lock = threading.Lock()
+_executor = None
+_pending = 0
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            if HASH_WORKERS > 0:
+                # spawn: no hereda hilos/loop/conexiones del proceso web
+                _executor = ProcessPoolExecutor(
+                    max_workers=HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pwd-hash")
+        return _executor
+
+
+def _release(_future=None) -> None:
+    global _pending
+    with _lock:
+        _pending -= 1
+
+
+def _submit(fn, *args):
+    global _pending
+    executor = _get_executor()
+    with _lock:
+        if _pending >= HASH_MAX_PENDING:
+            raise HTTPException(
+                status_code=503,
+                detail="Servidor ocupado procesando accesos. Reintenta en unos segundos.",
+                headers={"Retry-After": str(HASH_RETRY_AFTER_S)},
+            )
+        _pending += 1
+    try:
+        future = executor.submit(fn, *args)
+    except Exception:
+        _release()
+        raise
+    future.add_done_callback(_release)
+    return future
+
+
+# =========================
+# API async (routers async)
+# =========================
+async def hash_password_async(password: str) -> str:
+    return await asyncio.wrap_future(_submit(security.hash_password, password))
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    return await asyncio.wrap_future(_submit(security.verify_password, password, password_hash))
+
+
+async def verify_and_update_async(password: str, password_hash: str) -> tuple[bool, str | None]:
+    return await asyncio.wrap_future(_submit(security.verify_and_update, password, password_hash))
+
+
+# =========================
+# API sync (routers sync poco frecuentes: crear_ies, seeds)
+# El hilo espera sin CPU ni GIL; el cálculo corre en el pool.
+# =========================
+def hash_password_pooled(password: str) -> str:
+    return _submit(security.hash_password, password).result()
+
+
+def shutdown_hashing() -> None:
+    global _executor
+    with _lock:
+        ex, _executor = _executor, None
+    if ex is not None:
+        ex.shutdown(wait=False, cancel_futures=True)
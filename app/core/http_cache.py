@@ -0,0 +1,36 @@
+# app/core/http_cache.py
+import hashlib
+
+from fastapi import Request, Response
+
+
+def make_etag(data: bytes | str) -> str:
+    """ETag fuerte: sha256 (32 hex) del contenido o de una huella de versión."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+
+
+def etag_match(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match usa comparación débil: se ignora el prefijo W/."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+# Respuestas por usuario que deben revalidarse siempre (304 si no cambió)
+PRIVATE_REVALIDATE = {"Cache-Control": "private, no-cache"}
+
+
+def not_modified(request: Request, etag: str, headers: dict | None = None) -> Response | None:
+    """304 si el cliente ya tiene esa versión; None si hay que responder el cuerpo."""
+    if etag_match(request.headers.get("if-none-match"), etag):
+        h = {"ETag": etag}
+        h.update(headers or {})
+        return Response(status_code=304, headers=h)
+    return None
+
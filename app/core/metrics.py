@@ -0,0 +1,182 @@
+# app/core/metrics.py
+import threading
+import time
+from bisect import bisect_left
+
+from app.core import sql_log
+
+# ============================================================
+# Métricas por ruta (formato texto de Prometheus, GET /metrics)
+#
+# - MetricsMiddleware: middleware ASGI puro (sin BaseHTTPMiddleware:
+#   no re-envuelve el body ni crea tareas). Cuenta requests, latencia,
+#   en curso, y queries / tiempo de DB por request.
+# - La ruta es la plantilla ("/api/resumen/ies/{ies_id}"), no la URL:
+#   cardinalidad acotada. Mounts -> su prefijo; sin ruta (404) -> "<sin_ruta>".
+# - Queries por request: app/core/sql_log.py (también N+1, SQL lenta y
+#   headers de dev con SQL_DEBUG=1).
+# Sin dependencias: el registro es un dict + lock.
+# ============================================================
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+DB_SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        # labels -> [conteo por bucket (+Inf al final), suma, total]
+        self.series = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        s = self.series.get(labels)
+        if s is None:
+            s = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        s[0][bisect_left(self.buckets, value)] += 1
+        s[1] += value
+        s[2] += 1
+
+
+class _Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.requests = {}  # (method, route, status) -> n
+        self.sql_slow = {}  # (method, route) -> n
+        self.sql_n_plus_one = {}  # (method, route) -> n
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.db_queries = _Histogram(DB_QUERIES_BUCKETS)
+        self.db_seconds = _Histogram(DB_SECONDS_BUCKETS)
+
+    def observe(self, method: str, route: str, status: int, seconds: float,
+                db: sql_log.RequestQueries, n_plus_one: int) -> None:
+        key = (method, route)
+        with self.lock:
+            self.in_flight -= 1
+            rk = (method, route, str(status))
+            self.requests[rk] = self.requests.get(rk, 0) + 1
+            self.latency.observe(key, seconds)
+            self.db_queries.observe(key, db.queries)
+            self.db_seconds.observe(key, db.seconds)
+            if db.slow:
+                self.sql_slow[key] = self.sql_slow.get(key, 0) + db.slow
+            if n_plus_one:
+                self.sql_n_plus_one[key] = self.sql_n_plus_one.get(key, 0) + n_plus_one
+
+
+registry = _Registry()
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        db, token = sql_log.start_request(scope)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if sql_log.DEBUG:
+                    message = {**message, "headers": [*message.get("headers", ()), *sql_log.debug_headers(db)]}
+            await send(message)
+
+        with registry.lock:
+            registry.in_flight += 1
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            sql_log.end_request(token)
+            method, route = scope["method"], sql_log.route_label(scope)
+            n1 = sql_log.report(db, method, route)
+            registry.observe(method, route, status, elapsed, db, n1)
+
+
+# ============================================================
+# Exposición (text/plain; version=0.0.4)
+# ============================================================
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _esc(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_esc(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(v) -> str:
+    return repr(v) if isinstance(v, float) else str(v)
+
+
+def _header(out: list, name: str, kind: str, help_: str) -> None:
+    out.append(f"# HELP {name} {help_}")
+    out.append(f"# TYPE {name} {kind}")
+
+
+def _render_histogram(out: list, name: str, help_: str, hist: _Histogram, names) -> None:
+    _header(out, name, "histogram", help_)
+    for labels, (counts, total, n) in sorted(hist.series.items()):
+        acc = 0
+        for le, c in zip(hist.buckets, counts):
+            acc += c
+            le_label = f'le="{le}"'
+            out.append(f"{name}_bucket{_labels(names, labels, le_label)} {acc}")
+        inf_label = 'le="+Inf"'
+        out.append(f"{name}_bucket{_labels(names, labels, inf_label)} {n}")
+        out.append(f"{name}_sum{_labels(names, labels)} {_fmt(total)}")
+        out.append(f"{name}_count{_labels(names, labels)} {n}")
+
+
+def gauge(out: list, name: str, help_: str, samples, names=(), kind: str = "gauge") -> None:
+    """Agrega una métrica simple: samples = [(valores de labels, valor), ...]."""
+    _header(out, name, kind, help_)
+    for labels, value in samples:
+        out.append(f"{name}{_labels(names, labels)} {_fmt(value)}")
+
+
+def render_http() -> list:
+    """Líneas de las métricas HTTP (copia bajo lock, formatea fuera)."""
+    with registry.lock:
+        in_flight = registry.in_flight
+        requests = dict(registry.requests)
+        sql_slow = dict(registry.sql_slow)
+        sql_n_plus_one = dict(registry.sql_n_plus_one)
+        snap = {}
+        for attr in ("latency", "db_queries", "db_seconds"):
+            h = getattr(registry, attr)
+            copy = _Histogram(h.buckets)
+            copy.series = {k: [list(v[0]), v[1], v[2]] for k, v in h.series.items()}
+            snap[attr] = copy
+
+    out = []
+    gauge(out, "astra_http_requests_in_flight", "Requests HTTP en curso.", [((), in_flight)])
+    gauge(
+        out, "astra_http_requests_total", "Requests HTTP terminados por ruta y status.",
+        sorted(requests.items()), names=("method", "route", "status"), kind="counter",
+    )
+    names = ("method", "route")
+    _render_histogram(out, "astra_http_request_duration_seconds",
+                      "Latencia de la respuesta completa por ruta.", snap["latency"], names)
+    _render_histogram(out, "astra_http_request_db_queries",
+                      "Queries SQL ejecutadas por request.", snap["db_queries"], names)
+    _render_histogram(out, "astra_http_request_db_seconds",
+                      "Tiempo en la DB (suma de queries) por request.", snap["db_seconds"], names)
+    gauge(out, "astra_sql_slow_queries_total", f"Queries sobre SQL_SLOW_MS ({sql_log.SLOW_MS} ms).",
+          sorted(sql_slow.items()), names, kind="counter")
+    gauge(out, "astra_sql_n_plus_one_total",
+          f"Requests con una sentencia repetida SQL_N_PLUS_ONE+ ({sql_log.N_PLUS_ONE}) veces.",
+          sorted(sql_n_plus_one.items()), names, kind="counter")
+    return out
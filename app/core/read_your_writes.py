@@ -0,0 +1,55 @@
+# app/core/read_your_writes.py
+import os
+import time
+
+# ============================================================
+# Read-your-writes con réplica de lectura (DATABASE_REPLICA_URL)
+#
+# Tras una escritura exitosa (POST/PUT/PATCH/DELETE con status < 400) la
+# respuesta lleva la cookie astra_rw=<hasta (epoch)>. Mientras siga
+# vigente, get_read_db / get_async_read_db (app/db/session.py) mandan las
+# lecturas de ese cliente al primario: ve lo que acaba de guardar aunque
+# la réplica vaya atrasada o el GET caiga en otro worker.
+# Solo se instala si hay réplica configurada (app/main.py).
+# ============================================================
+
+try:
+    STICKY_S = int(os.getenv("DB_REPLICA_STICKY_S", "10"))
+except ValueError:
+    raise RuntimeError("DB_REPLICA_STICKY_S debe ser entero (segundos)")
+
+COOKIE = "astra_rw"
+_SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def read_your_writes(request) -> bool:
+    """True si el cliente escribió hace menos de DB_REPLICA_STICKY_S."""
+    raw = request.cookies.get(COOKIE)
+    if not raw:
+        return False
+    try:
+        return float(raw) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadYourWritesMiddleware:
+    """ASGI puro: agrega la cookie en las respuestas de escrituras exitosas."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in _SAFE_METHODS:
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = (
+                    f"{COOKIE}={int(time.time()) + STICKY_S}; Max-Age={STICKY_S}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {**message, "headers": [*message.get("headers", ()), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,59 @@
+# app/core/responses.py
+from decimal import Decimal
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from fastapi.utils import is_body_allowed_for_status_code
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+
+# ============================================================
+# JSON con orjson (default_response_class de la app)
+# - Content-Type con charset=utf-8 de origen (sin middleware).
+# - date/datetime -> ISO 8601, Decimal (NUMERIC) -> float: las
+#   filas de la DB se devuelven tal cual, sin str()/isoformat().
+# - Los endpoints calientes devuelven JSONUTF8Response(data) directo:
+#   así FastAPI no pasa el dict por jsonable_encoder.
+# ============================================================
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Tipo no serializable a JSON: {type(obj).__name__}")
+
+
+def dumps(data) -> bytes:
+    """JSON compacto en UTF-8 (bytes)."""
+    return orjson.dumps(data, default=_default, option=_OPTIONS)
+
+
+class JSONUTF8Response(JSONResponse):
+    media_type = "application/json; charset=utf-8"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+# Mismos handlers que FastAPI, pero con JSONUTF8Response (charset en errores también)
+async def http_exception_handler(request: Request, exc: StarletteHTTPException) -> Response:
+    headers = getattr(exc, "headers", None)
+    if not is_body_allowed_for_status_code(exc.status_code):
+        return Response(status_code=exc.status_code, headers=headers)
+    return JSONUTF8Response({"detail": exc.detail}, status_code=exc.status_code, headers=headers)
+
+
+async def request_validation_exception_handler(request: Request, exc: RequestValidationError) -> Response:
+    return JSONUTF8Response({"detail": jsonable_encoder(exc.errors())}, status_code=422)
+
+
+EXCEPTION_HANDLERS = {
+    StarletteHTTPException: http_exception_handler,
+    RequestValidationError: request_validation_exception_handler,
+}
@@ -0,0 +1,169 @@
+# app/core/resumen_cache.py
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Response
+
+from app.core.responses import JSONUTF8Response, dumps
+
+# ============================================================
+# Cache de resultados del resumen y de las evidencias (por proceso)
+#
+# Varios admins abriendo el mismo submódulo, o varias pestañas de la
+# misma IES, recalculaban lo mismo. Aquí se guarda el JSON ya serializado
+# (bytes) por clave (tipo, ies_id, submodulo_id, variante...):
+#   - La entrada vale solo para el ETag con que se calculó: el ETag sale
+#     del validador del rollup (cambia con cada escritura del par), así
+#     que una entrada vieja nunca se sirve aunque la invalidación llegue
+#     tarde. Se sigue pagando la query del validador (1 lookup por PK).
+#   - LRU acotado (RESUMEN_CACHE_MAX entradas) + TTL (RESUMEN_CACHE_TTL s).
+#   - Single-flight: misses concurrentes de la misma clave+ETag esperan
+#     el cálculo del primero ("coalesced") en vez de repetirlo.
+#   - Invalidación: las escrituras de operacion.py limpian la IES en el
+#     worker que escribe; el NOTIFY resumen_rollup del trigger (ver
+#     app/services/resumen_eventos.py) limpia los pares en todos los
+#     workers (también imports y escrituras fuera de la API).
+# Contadores por tipo en GET /metrics. RESUMEN_CACHE_MAX=0 la apaga.
+# ============================================================
+
+try:
+    RESUMEN_CACHE_TTL = float(os.getenv("RESUMEN_CACHE_TTL", "60"))
+except ValueError:
+    raise RuntimeError("RESUMEN_CACHE_TTL debe ser numérico (segundos)")
+
+try:
+    RESUMEN_CACHE_MAX = int(os.getenv("RESUMEN_CACHE_MAX", "2000"))
+except ValueError:
+    raise RuntimeError("RESUMEN_CACHE_MAX debe ser entero")
+
+CONTADORES = ("hits", "misses", "coalesced", "evictions", "invalidations")
+
+
+class _ResumenCache:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # clave -> (etag, body, expira)
+        self._por_ies = {}  # ies_id -> {claves}
+        self._inflight = {}  # (clave, etag) -> Future (solo en el event loop)
+        self._stats = {}  # tipo -> {contador: n}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def _count(self, tipo: str, contador: str, n: int = 1) -> None:
+        st = self._stats.get(tipo)
+        if st is None:
+            st = self._stats[tipo] = dict.fromkeys(CONTADORES, 0)
+        st[contador] += n
+
+    def _get(self, key: tuple, etag: str):
+        now = time.monotonic()
+        with self._lock:
+            e = self._data.get(key)
+            if e is None or e[0] != etag or e[2] <= now:
+                return None
+            self._data.move_to_end(key)
+            self._count(key[0], "hits")
+            return e[1]
+
+    def _put(self, key: tuple, etag: str, body: bytes) -> None:
+        with self._lock:
+            self._data[key] = (etag, body, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            self._por_ies.setdefault(key[1], set()).add(key)
+            while len(self._data) > self.max_entries:
+                old, _ = self._data.popitem(last=False)
+                self._unindex(old)
+                self._count(old[0], "evictions")
+
+    def _unindex(self, key: tuple) -> None:
+        keys = self._por_ies.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._por_ies[key[1]]
+
+    async def get_or_build(self, key: tuple, etag: str, build) -> bytes:
+        """
+        key = (tipo, ies_id, submodulo_id | None, *variante).
+        build: corrutina sin argumentos -> dict/list. Devuelve el JSON (bytes).
+        """
+        if not self.enabled:
+            return dumps(await build())
+
+        while True:
+            body = self._get(key, etag)
+            if body is not None:
+                return body
+
+            fk = (key, etag)
+            fut = self._inflight.get(fk)
+            if fut is None:
+                break
+            with self._lock:
+                self._count(key[0], "coalesced")
+            try:
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                # Se canceló el request que calculaba (no este): reintentar
+                if not fut.cancelled():
+                    raise
+
+        with self._lock:
+            self._count(key[0], "misses")
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[fk] = fut
+        try:
+            body = dumps(await build())
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # los que esperan la re-lanzan; sin warning si no hay nadie
+            raise
+        finally:
+            self._inflight.pop(fk, None)
+
+        fut.set_result(body)
+        self._put(key, etag, body)
+        return body
+
+    def invalidar(self, ies_id: int, submodulos=None) -> int:
+        """Borra las entradas de la IES (o solo de esos submódulos + las de IES completa)."""
+        if submodulos is not None:
+            submodulos = set(submodulos)
+        n = 0
+        with self._lock:
+            for key in list(self._por_ies.get(ies_id, ())):
+                if submodulos is not None and key[2] is not None and key[2] not in submodulos:
+                    continue
+                del self._data[key]
+                self._unindex(key)
+                self._count(key[0], "invalidations")
+                n += 1
+        return n
+
+    def stats(self) -> dict:
+        with self._lock:
+            entradas = {}
+            for key in self._data:
+                entradas[key[0]] = entradas.get(key[0], 0) + 1
+            return {
+                tipo: {"entries": entradas.get(tipo, 0), **self._stats.get(tipo, dict.fromkeys(CONTADORES, 0))}
+                for tipo in sorted(set(entradas) | set(self._stats))
+            }
+
+
+resumen_cache = _ResumenCache(RESUMEN_CACHE_TTL, RESUMEN_CACHE_MAX)
+
+
+def cached_json(body: bytes, headers: dict) -> Response:
+    """Respuesta con el JSON ya serializado (mismo Content-Type que JSONUTF8Response)."""
+    return Response(body, media_type=JSONUTF8Response.media_type, headers=headers)
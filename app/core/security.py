@@ -8,7 +8,16 @@ JWT_SECRET = os.getenv("JWT_SECRET", "change_me_now")
 JWT_ALG = "HS256"
 JWT_EXPIRES_MIN = 60 * 24  # 1 día
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# Costo del hash (iteraciones pbkdf2). Hashes con menos rondas se
+# re-hashean en el login (needs_update) -> subir el costo es transparente.
+PASSWORD_ROUNDS = int(os.getenv("PASSWORD_PBKDF2_ROUNDS", "29000"))
+
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=PASSWORD_ROUNDS,
+    pbkdf2_sha256__min_rounds=PASSWORD_ROUNDS,
+)
 
 
 def hash_password(password: str) -> str:
@@ -19,6 +28,11 @@ def verify_password(password: str, password_hash: str) -> bool:
     return pwd_context.verify(password, password_hash)
 
 
+def verify_and_update(password: str, password_hash: str) -> tuple[bool, str | None]:
+    """(ok, nuevo_hash): nuevo_hash != None si el hash guardado quedó con costo viejo."""
+    return pwd_context.verify_and_update(password, password_hash)
+
+
 def create_token(payload: dict, minutes: int = JWT_EXPIRES_MIN) -> str:
     to_encode = dict(payload)
     exp = datetime.utcnow() + timedelta(minutes=minutes)
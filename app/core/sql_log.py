@@ -0,0 +1,145 @@
+# app/core/sql_log.py
+import logging
+import os
+from contextvars import ContextVar
+
+# ============================================================
+# Instrumentación de SQL por request
+# (listeners before/after_cursor_execute en app/db/session.py)
+#
+# - Cada query suma conteo + tiempo al request en curso (ContextVar;
+#   llega al threadpool de los endpoints sync y al greenlet de asyncpg).
+# - SQL_SLOW_MS: query más lenta que esto -> log con ruta y parámetros
+#   (0 = apagado). Si la query toca password*, los parámetros se omiten.
+# - SQL_N_PLUS_ONE: misma sentencia repetida N+ veces en un request ->
+#   aviso de N+1 (0 = apagado).
+# - SQL_DEBUG=1 (solo dev): headers X-DB-Queries / X-DB-Time-Ms /
+#   Server-Timing en cada respuesta + log de las sentencias del request.
+# - Logger app.core.sql_log: lentas y N+1 en WARNING, detalle de
+#   SQL_DEBUG en DEBUG (SQL_DEBUG baja el nivel de este logger).
+# ============================================================
+
+logger = logging.getLogger(__name__)
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        raise RuntimeError(f"{name} debe ser entero (valor: {raw!r})")
+
+
+SLOW_MS = _env_int("SQL_SLOW_MS", 500)
+N_PLUS_ONE = _env_int("SQL_N_PLUS_ONE", 10)
+DEBUG = (os.getenv("SQL_DEBUG") or "").strip().lower() in ("1", "true", "yes", "si", "on")
+if DEBUG:
+    logger.setLevel(logging.DEBUG)
+
+NO_ROUTE = "<sin_ruta>"
+
+_MAX_SQL_CHARS = 300
+_MAX_PARAMS_CHARS = 500
+
+
+class RequestQueries:
+    """Queries del request en curso: total, tiempo y repeticiones por sentencia."""
+
+    __slots__ = ("scope", "queries", "seconds", "statements", "slow")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+        self.seconds = 0.0
+        self.statements = {}  # sql -> [veces, segundos]
+        self.slow = 0
+
+
+_current: ContextVar[RequestQueries | None] = ContextVar("astra_request_queries", default=None)
+
+
+def start_request(scope) -> tuple:
+    st = RequestQueries(scope)
+    return st, _current.set(st)
+
+
+def end_request(token) -> None:
+    _current.reset(token)
+
+
+def route_label(scope) -> str:
+    """Plantilla de la ruta ("/api/resumen/ies/{ies_id}"), no la URL."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path:
+        return path
+    # Mount (/static, /static/dist): el router deja el prefijo en root_path
+    if "endpoint" in scope and scope.get("root_path"):
+        return scope["root_path"]
+    return NO_ROUTE
+
+
+def _short(sql: str, n: int = _MAX_SQL_CHARS) -> str:
+    sql = " ".join(sql.split())
+    return sql if len(sql) <= n else sql[: n - 3] + "..."
+
+
+def _params(statement: str, parameters) -> str:
+    if "password" in statement.lower():
+        return "<omitidos>"
+    return _short(repr(parameters), _MAX_PARAMS_CHARS)
+
+
+def record_query(statement: str, parameters, seconds: float) -> None:
+    st = _current.get()
+    if st is not None:
+        st.queries += 1
+        st.seconds += seconds
+        if N_PLUS_ONE or DEBUG:
+            s = st.statements.get(statement)
+            if s is None:
+                st.statements[statement] = [1, seconds]
+            else:
+                s[0] += 1
+                s[1] += seconds
+
+    if SLOW_MS and seconds * 1000 >= SLOW_MS:
+        where = "-"
+        if st is not None:
+            st.slow += 1
+            where = f"{st.scope.get('method')} {route_label(st.scope)}"
+        logger.warning(
+            "SQL lenta %.0f ms [%s] %s | params=%s",
+            seconds * 1000, where, _short(statement), _params(statement, parameters),
+        )
+
+
+def n_plus_one(st: RequestQueries) -> list:
+    """Sentencias repetidas SQL_N_PLUS_ONE+ veces en el request: [(sql, veces, segundos)]."""
+    if not N_PLUS_ONE:
+        return []
+    return [(sql, n, s) for sql, (n, s) in st.statements.items() if n >= N_PLUS_ONE]
+
+
+def report(st: RequestQueries, method: str, route: str) -> int:
+    """Log de fin de request (N+1 y, con SQL_DEBUG, el detalle). Devuelve nº de avisos N+1."""
+    repetidas = n_plus_one(st)
+    for sql, n, s in repetidas:
+        logger.warning("posible N+1 [%s %s] %dx (%.1f ms) %s", method, route, n, s * 1000, _short(sql))
+
+    if DEBUG and st.queries and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[%s %s] %d queries, %.1f ms", method, route, st.queries, st.seconds * 1000)
+        for sql, (n, s) in sorted(st.statements.items(), key=lambda kv: -kv[1][1]):
+            logger.debug("  %dx %7.1f ms  %s", n, s * 1000, _short(sql))
+    return len(repetidas)
+
+
+def debug_headers(st: RequestQueries) -> list:
+    """Headers de dev (SQL_DEBUG): conteo hasta el inicio de la respuesta."""
+    ms = st.seconds * 1000
+    return [
+        (b"x-db-queries", str(st.queries).encode()),
+        (b"x-db-time-ms", f"{ms:.1f}".encode()),
+        (b"server-timing", f'db;dur={ms:.1f};desc="{st.queries} queries"'.encode()),
+    ]
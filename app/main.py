@@ -1,7 +1,10 @@
 # app/main.py
-from fastapi import FastAPI, Request
+import logging
+import os
+
+from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse
 
 from app.routes.db import router as db_router
 from app.routes.catalogo import router as catalogo_router
@@ -18,26 +21,89 @@ from app.routes.admin_usuarios import router as admin_usuarios_router
 from app.routes.admin_delete import router as admin_delete_router
 from app.routes.admin_ies import router as admin_ies_router
 from app.routes.auth_password import router as auth_password_router
+from app.routes.admin_export import router as admin_export_router
+from app.routes.admin_import import router as admin_import_router
+from app.routes.metrics import router as metrics_router
+from app.routes.buscar import router as buscar_router
+from app.core.hashing import shutdown_hashing
+from app.core.assets import DIST_DIR, ImmutableStaticFiles
+from app.core.metrics import MetricsMiddleware
+from app.core.read_your_writes import ReadYourWritesMiddleware
+from app.db.session import REPLICA_URL, replica_monitor
+from app.core.responses import EXCEPTION_HANDLERS, JSONUTF8Response
+from app.routes.catalogo import cargar_arbol
+from app.routes.resumen import eventos as resumen_eventos
+from app.core.resumen_cache import resumen_cache
+
+# Logs de la app (loggers app.*) a stderr, salvo que el despliegue ya
+# configure logging (p. ej. uvicorn --log-config). Nivel: LOG_LEVEL.
+_app_log = logging.getLogger("app")
+if not _app_log.handlers and not logging.getLogger().handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    _app_log.addHandler(_handler)
+    _app_log.setLevel((os.getenv("LOG_LEVEL") or "INFO").strip().upper())
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Astra by CEDEPRO",
     version="0.1.0",
-    default_response_class=JSONResponse
+    # JSON con orjson y charset=utf-8 (también en errores)
+    default_response_class=JSONUTF8Response,
+    exception_handlers=EXCEPTION_HANDLERS,
 )
 
-# =========================
-# 🔒 FUERZA UTF-8 EN JSON
-# =========================
-@app.middleware("http")
-async def force_utf8_json(request: Request, call_next):
-    response = await call_next(request)
-    content_type = response.headers.get("content-type", "")
-    if "application/json" in content_type:
-        response.headers["Content-Type"] = "application/json; charset=utf-8"
-    return response
+# Réplica de lectura: cookie de read-your-writes tras cada escritura
+if REPLICA_URL:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# Métricas por ruta (ASGI puro; se exponen en GET /metrics)
+app.add_middleware(MetricsMiddleware)
+
+
+@app.on_event("startup")
+async def _cargar_catalogo():
+    # Árbol del catálogo en memoria (si falla, /catalogo/arbol lo carga on-demand)
+    try:
+        await cargar_arbol()
+    except Exception as e:
+        logger.warning("no se pudo precargar /catalogo/arbol: %r", e)
+
+
+@app.on_event("startup")
+async def _iniciar_resumen_eventos():
+    # LISTEN resumen_rollup desde el arranque: invalida la cache de
+    # resultados con las escrituras de otros workers
+    if resumen_cache.enabled:
+        resumen_eventos.iniciar()
+
+
+@app.on_event("startup")
+async def _iniciar_replica_monitor():
+    # Chequeo periódico del lag de la réplica (no-op sin DATABASE_REPLICA_URL)
+    replica_monitor.iniciar()
+
+
+@app.on_event("shutdown")
+def _shutdown_hashing():
+    # Cierra el pool de procesos de hashing de claves
+    shutdown_hashing()
+
+
+@app.on_event("shutdown")
+async def _cerrar_resumen_eventos():
+    # Cierra la conexión LISTEN del stream del resumen
+    await resumen_eventos.cerrar()
+
+
+@app.on_event("shutdown")
+async def _cerrar_replica_monitor():
+    await replica_monitor.cerrar()
 
 
-# Static
+# Static (dist primero: /static lo taparía)
+app.mount("/static/dist", ImmutableStaticFiles(directory=DIST_DIR, check_dir=False), name="static_dist")
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
 # Routers
@@ -56,6 +122,10 @@ app.include_router(admin_usuarios_router)
 app.include_router(admin_ies_router)
 app.include_router(admin_delete_router)
 app.include_router(auth_password_router)
+app.include_router(admin_export_router)
+app.include_router(admin_import_router)
+app.include_router(metrics_router)
+app.include_router(buscar_router)
 
 # Root
 @app.get("/", include_in_schema=False)
@@ -1,5 +1,5 @@
 # app/models/adjuntos.py
-from sqlalchemy import BigInteger, Text, DateTime, ForeignKey, func
+from sqlalchemy import BigInteger, Integer, Text, DateTime, ForeignKeyConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
@@ -7,9 +7,18 @@ from app.db.base import Base
 
 class EvidenciaAdjunto(Base):
     __tablename__ = "evidencia_adjunto"
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["ies_id", "registro_id"],
+            ["evidencia_registro.ies_id", "evidencia_registro.id"],
+            ondelete="CASCADE",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
-    registro_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("evidencia_registro.id", ondelete="CASCADE"), nullable=False)
+    # evidencia_registro está particionada por ies_id: la FK lleva la clave completa
+    ies_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    registro_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
 
     url: Mapped[str] = mapped_column(Text, nullable=False)
     nombre: Mapped[str | None] = mapped_column(Text, nullable=True)
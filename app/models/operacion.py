@@ -1,5 +1,5 @@
 # app/models/operacion.py
-from sqlalchemy import Column, BigInteger, Integer, Boolean, Date, String, ForeignKey, DateTime
+from sqlalchemy import Column, BigInteger, Integer, Boolean, Date, String, ForeignKey, ForeignKeyConstraint, DateTime
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import JSONB
@@ -10,9 +10,10 @@ from app.db.base import Base
 class EvidenciaRegistro(Base):
     __tablename__ = "evidencia_registro"
 
+    # PK (ies_id, id): tabla particionada por HASH(ies_id) (migración 004)
+    ies_id = Column(Integer, ForeignKey("ies.id", ondelete="CASCADE"), primary_key=True)
     id = Column(BigInteger, primary_key=True, autoincrement=True)
 
-    ies_id = Column(Integer, ForeignKey("ies.id", ondelete="CASCADE"), nullable=False)
     evidencia_id = Column(BigInteger, ForeignKey("evidencia_item.id", ondelete="CASCADE"), nullable=False)
 
     presenta = Column(Boolean, nullable=False, server_default="false")
@@ -35,9 +36,18 @@ class EvidenciaRegistro(Base):
 
 class EvidenciaAdjunto(Base):
     __tablename__ = "evidencia_adjunto"
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["ies_id", "registro_id"],
+            ["evidencia_registro.ies_id", "evidencia_registro.id"],
+            ondelete="CASCADE",
+        ),
+    )
 
     id = Column(BigInteger, primary_key=True, autoincrement=True)
-    registro_id = Column(BigInteger, ForeignKey("evidencia_registro.id", ondelete="CASCADE"), nullable=False)
+    # evidencia_registro está particionada por ies_id: la FK lleva la clave completa
+    ies_id = Column(Integer, nullable=False)
+    registro_id = Column(BigInteger, nullable=False)
 
     url = Column(String, nullable=False)
     nombre = Column(String, nullable=True)
@@ -30,6 +30,7 @@ def add_adjunto(registro_id: int, payload: AdjuntoCreate, db: Session = Depends(
         raise HTTPException(status_code=404, detail="registro_id no existe")
 
     obj = EvidenciaAdjunto(
+        ies_id=reg.ies_id,
         registro_id=registro_id,
         url=payload.url,
         nombre=payload.nombre,
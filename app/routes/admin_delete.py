@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from app.core.deps import get_db, require_admin
+from app.core.deps import require_admin
+from app.db.session import get_db
+from app.core.auth_cache import invalidate_principal
 from app.models.usuarios import Usuario
 from app.models.ies import IES
 
@@ -23,5 +25,6 @@ def admin_delete_ies(
     # 2) borrar la IES
     db.delete(ies)
     db.commit()
+    invalidate_principal()
 
     return {"ok": True, "deleted_ies_id": ies_id}
@@ -0,0 +1,227 @@
+# app/routes/admin_export.py
+import csv
+import io
+import os
+import tempfile
+from datetime import date, datetime
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+
+from app.core.deps import require_admin
+from app.db.session import SessionLocal
+from app.models.usuarios import Usuario
+
+router = APIRouter(prefix="/admin/export", tags=["Admin Export"])
+
+# ============================================================
+# Export cross-IES de evidencia_registro (CSV / XLSX) en streaming
+#
+# - Cursor del lado del servidor (stream_results + yield_per): Postgres
+#   entrega filas por bloques; memoria plana con 1k o 5M filas.
+# - La sesión la abre/cierra el propio generador (vive lo que dura la
+#   descarga, no lo que dura el endpoint).
+# - XLSX es un zip: se escribe en modo write_only a un archivo temporal
+#   (tampoco acumula filas en memoria) y luego se transmite por bloques.
+# ============================================================
+
+_CHUNK_ROWS = 2000
+_CHUNK_BYTES = 64 * 1024
+_XLSX_MAX_ROWS = 1_000_000  # Excel: 1.048.576 filas por hoja
+
+# Texto libre (responsable, títulos) que Excel interpretaría como fórmula
+_FORMULA_PREFIX = ("=", "+", "-", "@", "\t", "\r")
+
+_COLUMNS = (
+    "ies_id", "ies_slug", "ies_nombre",
+    "subprograma_id", "subprograma",
+    "submodulo_id", "submodulo",
+    "evidencia_id", "evidencia_orden", "evidencia_titulo",
+    "registro_id", "presenta", "valoracion", "responsable",
+    "fecha_inicio", "fecha_fin", "avance_pct", "categoria_si_no",
+    "created_at", "updated_at",
+)
+
+_EXPORT_SQL = """
+SELECT
+  i.id       AS ies_id,
+  i.slug     AS ies_slug,
+  i.nombre   AS ies_nombre,
+  sp.id      AS subprograma_id,
+  sp.nombre  AS subprograma,
+  sm.id      AS submodulo_id,
+  sm.nombre  AS submodulo,
+  ei.id      AS evidencia_id,
+  ei.orden   AS evidencia_orden,
+  ei.titulo  AS evidencia_titulo,
+  er.id      AS registro_id,
+  er.presenta,
+  er.valoracion,
+  er.responsable,
+  er.fecha_inicio,
+  er.fecha_fin,
+  er.avance_pct,
+  er.categoria_si_no,
+  er.created_at,
+  er.updated_at
+FROM evidencia_registro er
+JOIN ies i             ON i.id = er.ies_id
+JOIN evidencia_item ei ON ei.id = er.evidencia_id
+JOIN submodulos sm     ON sm.id = er.submodulo_id
+JOIN subprogramas sp   ON sp.id = sm.subprograma_id
+{where}
+ORDER BY i.id, sp.orden, sm.orden, ei.orden
+"""
+
+
+def _export_query(ies_id, subprograma_id, updated_desde, updated_hasta):
+    conds, params = [], {}
+    if ies_id is not None:
+        conds.append("er.ies_id = :ies_id")
+        params["ies_id"] = ies_id
+    if subprograma_id is not None:
+        conds.append("sm.subprograma_id = :subprograma_id")
+        params["subprograma_id"] = subprograma_id
+    if updated_desde is not None:
+        conds.append("er.updated_at >= :desde")
+        params["desde"] = updated_desde
+    if updated_hasta is not None:
+        conds.append("er.updated_at < :hasta")
+        params["hasta"] = updated_hasta
+
+    where = ("WHERE " + " AND ".join(conds)) if conds else ""
+    return text(_EXPORT_SQL.format(where=where)), params
+
+
+def _iter_partitions(stmt, params):
+    """Bloques de filas desde un cursor del lado del servidor."""
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            stmt.execution_options(stream_results=True, yield_per=_CHUNK_ROWS),
+            params,
+        )
+        for part in result.partitions(_CHUNK_ROWS):
+            yield part
+    finally:
+        db.close()
+
+
+def _csv_value(v):
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "SI" if v else "NO"
+    if isinstance(v, (date, datetime)):
+        return v.isoformat()
+    if isinstance(v, str) and v.lstrip("'").startswith(_FORMULA_PREFIX):
+        # el import quita esta ' (importar_registros._to_text); si el texto ya
+        # empezaba con ' + fórmula se agrega otra para no perder la original
+        return "'" + v
+    return v
+
+
+def _stream_csv(stmt, params, sep: str):
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=sep, lineterminator="\r\n")
+
+    # BOM: Excel abre el UTF-8 con tildes correctamente
+    buf.write("\ufeff")
+    writer.writerow(_COLUMNS)
+
+    for part in _iter_partitions(stmt, params):
+        writer.writerows([_csv_value(v) for v in row] for row in part)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate(0)
+
+    tail = buf.getvalue()
+    if tail:
+        yield tail.encode("utf-8")
+
+
+def _xlsx_value(ws, v):
+    if v is True:
+        return "SI"
+    if v is False:
+        return "NO"
+    if isinstance(v, str) and v.startswith(_FORMULA_PREFIX):
+        # openpyxl guarda como fórmula todo texto que empieza con "="
+        from openpyxl.cell import WriteOnlyCell
+
+        cell = WriteOnlyCell(ws, value=v)
+        cell.data_type = "s"
+        return cell
+    return v
+
+
+def _stream_xlsx(stmt, params):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws, n_sheet, n_rows = None, 0, _XLSX_MAX_ROWS
+
+    for part in _iter_partitions(stmt, params):
+        for row in part:
+            if n_rows >= _XLSX_MAX_ROWS:
+                n_sheet += 1
+                ws = wb.create_sheet("registros" if n_sheet == 1 else f"registros_{n_sheet}")
+                ws.append(_COLUMNS)
+                n_rows = 0
+            ws.append([_xlsx_value(ws, v) for v in row])
+            n_rows += 1
+
+    if ws is None:
+        ws = wb.create_sheet("registros")
+        ws.append(_COLUMNS)
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        wb.save(path)
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(_CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def _filename(ext: str) -> str:
+    return f'attachment; filename="registros_{date.today():%Y%m%d}.{ext}"'
+
+
+@router.get("/registros.csv")
+def export_registros_csv(
+    ies_id: int | None = Query(default=None),
+    subprograma_id: int | None = Query(default=None),
+    updated_desde: datetime | None = Query(default=None, description="updated_at >= (ISO)"),
+    updated_hasta: datetime | None = Query(default=None, description="updated_at < (ISO)"),
+    sep: str = Query(default=",", pattern="^[,;]$", description="Separador: , o ;"),
+    _admin: Usuario = Depends(require_admin),
+):
+    stmt, params = _export_query(ies_id, subprograma_id, updated_desde, updated_hasta)
+    return StreamingResponse(
+        _stream_csv(stmt, params, sep),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": _filename("csv")},
+    )
+
+
+@router.get("/registros.xlsx")
+def export_registros_xlsx(
+    ies_id: int | None = Query(default=None),
+    subprograma_id: int | None = Query(default=None),
+    updated_desde: datetime | None = Query(default=None, description="updated_at >= (ISO)"),
+    updated_hasta: datetime | None = Query(default=None, description="updated_at < (ISO)"),
+    _admin: Usuario = Depends(require_admin),
+):
+    stmt, params = _export_query(ies_id, subprograma_id, updated_desde, updated_hasta)
+    return StreamingResponse(
+        _stream_xlsx(stmt, params),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": _filename("xlsx")},
+    )
@@ -0,0 +1,25 @@
+# app/routes/admin_import.py
+from fastapi import APIRouter, Depends, File, Query, UploadFile
+from sqlalchemy.orm import Session
+
+from app.core.deps import require_admin
+from app.db.session import get_db
+from app.models.usuarios import Usuario
+from app.services.importar_registros import importar_upload
+
+router = APIRouter(prefix="/admin/import", tags=["Admin Import"])
+
+
+# ============================================================
+# Import cross-IES (contraparte de /admin/export/registros.*):
+# cada fila trae ies_id o ies_slug. Ver app/services/importar_registros.py
+# ============================================================
+@router.post("/registros")
+def import_registros(
+    archivo: UploadFile = File(..., description="CSV (UTF-8, , o ;) o XLSX con ies_id o ies_slug"),
+    dry_run: bool = Query(default=False, description="Solo validar, no guarda"),
+    parcial: bool = Query(default=False, description="Guardar filas válidas aunque haya errores"),
+    db: Session = Depends(get_db),
+    _admin: Usuario = Depends(require_admin),
+):
+    return importar_upload(db, archivo, None, None, dry_run, parcial)
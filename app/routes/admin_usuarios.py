@@ -3,10 +3,11 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app.core.deps import require_admin
+from app.core.auth_cache import invalidate_principal
 from app.models.usuarios import Usuario
 
 # OJO: si tu get_db NO está aquí, cambia el import al que uses en otros routes.
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 
 router = APIRouter(prefix="/admin", tags=["Admin Users"])
 
@@ -15,7 +16,7 @@ router = APIRouter(prefix="/admin", tags=["Admin Users"])
 def admin_listar_usuarios_por_ies(
     ies_id: int,
     _admin: Usuario = Depends(require_admin),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     users = db.query(Usuario).filter(Usuario.ies_id == ies_id).order_by(Usuario.id.asc()).all()
     return [
@@ -48,6 +49,7 @@ def admin_eliminar_usuario(
 
     db.delete(u)
     db.commit()
+    invalidate_principal(user_id)
     return {"ok": True, "deleted_user_id": int(user_id)}
 
 
@@ -62,4 +64,5 @@ def admin_eliminar_usuarios_de_ies(
     count = q.count()
     q.delete(synchronize_session=False)
     db.commit()
+    invalidate_principal()
     return {"ok": True, "deleted_count": int(count), "ies_id": int(ies_id)}
@@ -1,12 +1,15 @@
 # app/routes/auth.py
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.models.usuarios import Usuario
 from app.models.ies import IES  # ✅ AJUSTA ESTA RUTA SI TU MODELO SE LLAMA DISTINTO
-from app.core.security import verify_password, create_access_token
+from app.core.security import create_access_token
+from app.core.hashing import verify_and_update_async
+from app.core.auth_cache import invalidate_principal
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -17,24 +20,31 @@ class LoginIn(BaseModel):
 
 
 @router.post("/login")
-def login(payload: LoginIn, db: Session = Depends(get_db)):
+async def login(payload: LoginIn, db: AsyncSession = Depends(get_async_db)):
     email = payload.email.strip().lower()
 
-    user = db.query(Usuario).filter(Usuario.email == email).first()
+    # 1 query: usuario + slug/nombre de su IES
+    row = (await db.execute(
+        select(Usuario, IES.slug, IES.nombre)
+        .outerjoin(IES, IES.id == Usuario.ies_id)
+        .where(Usuario.email == email)
+    )).first()
+    user, ies_slug, ies_nombre = row if row else (None, None, None)
     if not user or not user.is_active:
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
 
-    if not verify_password(payload.password, user.password_hash):
+    # pbkdf2 corre en el pool de hashing (503 si está saturado)
+    ok, new_hash = await verify_and_update_async(payload.password, user.password_hash)
+    if not ok:
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
 
-    # ✅ Resolver ies_slug/ies_nombre desde DB
-    ies_slug = None
-    ies_nombre = None
-    if user.ies_id:
-        ies = db.query(IES).filter(IES.id == user.ies_id).first()
-        if ies:
-            ies_slug = ies.slug
-            ies_nombre = ies.nombre
+    # ✅ Hash con costo viejo -> se re-hashea con el costo actual
+    if new_hash:
+        await db.execute(
+            update(Usuario).where(Usuario.id == user.id).values(password_hash=new_hash)
+        )
+        await db.commit()
+        invalidate_principal(user.id)
 
     token = create_access_token(
         data={
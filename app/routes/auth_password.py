@@ -1,9 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.deps import get_current_user, get_db
-from app.core.security import verify_password, hash_password
+from app.core.deps import get_current_user_strict
+from app.core.auth_cache import invalidate_principal
+from app.core.hashing import verify_password_async, hash_password_async
+from app.db.session import get_async_db
+from app.models.usuarios import Usuario
 
 router = APIRouter(tags=["auth"])
 
@@ -12,23 +16,25 @@ class ChangePasswordIn(BaseModel):
     new_password: str
 
 @router.patch("/auth/me/password")
-def change_my_password(
+async def change_my_password(
     payload: ChangePasswordIn,
-    db: Session = Depends(get_db),
-    user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user = Depends(get_current_user_strict),
 ):
-    if not verify_password(payload.current_password, user.password_hash):
+    if not await verify_password_async(payload.current_password, user.password_hash):
         raise HTTPException(status_code=400, detail="Clave actual incorrecta.")
 
     if not payload.new_password or len(payload.new_password) < 8:
         raise HTTPException(status_code=400, detail="La nueva clave debe tener al menos 8 caracteres.")
 
-    if verify_password(payload.new_password, user.password_hash):
+    if await verify_password_async(payload.new_password, user.password_hash):
         raise HTTPException(status_code=400, detail="La nueva clave no puede ser igual a la actual.")
 
-    user.password_hash = hash_password(payload.new_password)
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    new_hash = await hash_password_async(payload.new_password)
+    await db.execute(
+        update(Usuario).where(Usuario.id == user.id).values(password_hash=new_hash)
+    )
+    await db.commit()
+    invalidate_principal(user.id)
 
     return {"ok": True}
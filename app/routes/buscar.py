@@ -0,0 +1,257 @@
+# app/routes/buscar.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+from app.db.session import get_async_read_db
+from app.core.deps import get_current_user
+from app.models.usuarios import Usuario
+from app.core.responses import JSONUTF8Response
+
+router = APIRouter(prefix="/buscar", tags=["Búsqueda"])
+
+# ============================================================
+# BÚSQUEDA (migrations/005_busqueda.sql)
+# GET /buscar?q=&tipo=todo|evidencias|responsables&ies_id=&limit=
+#
+# - evidencias: full-text sobre evidencia_item.titulo_tsv (config
+#   es_unaccent: stemming español, sin tildes). q admite la sintaxis de
+#   websearch_to_tsquery ("frase exacta", OR, -excluir). Orden: ts_rank_cd.
+# - responsables: trigramas (pg_trgm) sobre f_unaccent(lower(responsable)),
+#   tolera errores de tipeo y tildes. Orden: word_similarity.
+# - Alcance: admin busca en todas las IES o en ?ies_id=; usuario IES solo
+#   en la suya (otra ies_id -> 403). Con IES, cada evidencia trae el estado
+#   de su registro; sin IES (admin) trae el agregado entre todas las IES
+#   (con registro, presentan, avance promedio) y las _IES_POR_EVIDENCIA
+#   actualizadas más recientemente.
+# - Las queries filtran con el índice GIN y cortan en LIMIT; el agregado por
+#   IES va por idx_registro_evidencia_id solo para las evidencias halladas:
+#   el costo depende de los hits, no del total de registros.
+# ============================================================
+
+_TIPOS = ("todo", "evidencias", "responsables")
+_IES_POR_EVIDENCIA = 5
+
+
+def _scope_ies(user: Usuario, ies_id: int | None) -> int | None:
+    rol = (user.rol or "").lower()
+    if rol == "admin":
+        return ies_id
+    if rol in ("ies", "cliente") and user.ies_id is not None:
+        if ies_id is not None and ies_id != int(user.ies_id):
+            raise HTTPException(status_code=403, detail="No autorizado para esa IES")
+        return int(user.ies_id)
+    raise HTTPException(status_code=403, detail="Requiere rol admin o IES")
+
+
+async def _buscar_evidencias(db: AsyncSession, q: str, ies_id: int | None, limit: int) -> list:
+    registro_cols = ""
+    registro_join = ""
+    if ies_id is not None:
+        registro_cols = """,
+            er.id           AS registro_id,
+            er.presenta,
+            er.avance_pct,
+            er.valoracion,
+            er.responsable,
+            er.updated_at"""
+        registro_join = """
+        LEFT JOIN evidencia_registro er
+          ON er.ies_id = :ies_id
+         AND er.evidencia_id = ei.id"""
+
+    sql = text(f"""
+        WITH consulta AS (
+            SELECT websearch_to_tsquery('public.es_unaccent', :q) AS tsq
+        )
+        SELECT
+            ei.id        AS evidencia_id,
+            ei.titulo,
+            ei.orden,
+            ts_rank_cd(ei.titulo_tsv, c.tsq) AS rank,
+            sm.id        AS submodulo_id,
+            sm.nombre    AS submodulo_nombre,
+            sp.id        AS subprograma_id,
+            sp.nombre    AS subprograma_nombre{registro_cols}
+        FROM consulta c
+        JOIN evidencia_item ei ON ei.titulo_tsv @@ c.tsq
+        JOIN submodulos sm     ON sm.id = ei.submodulo_id
+        JOIN subprogramas sp   ON sp.id = sm.subprograma_id{registro_join}
+        ORDER BY rank DESC, sp.orden ASC, sm.orden ASC, ei.orden ASC
+        LIMIT :limit
+    """)
+    params = {"q": q, "limit": limit}
+    if ies_id is not None:
+        params["ies_id"] = ies_id
+    rows = (await db.execute(sql, params)).mappings().all()
+
+    out = []
+    for r in rows:
+        hit = {
+            "evidencia_id": r.get("evidencia_id"),
+            "titulo": r.get("titulo"),
+            "orden": r.get("orden"),
+            "rank": r.get("rank"),
+            "submodulo": {"id": r.get("submodulo_id"), "nombre": r.get("submodulo_nombre")},
+            "subprograma": {"id": r.get("subprograma_id"), "nombre": r.get("subprograma_nombre")},
+        }
+        if ies_id is not None:
+            hit["registro"] = {
+                "registro_id": r.get("registro_id"),
+                "presenta": r.get("presenta"),
+                "avance_pct": r.get("avance_pct"),
+                "valoracion": r.get("valoracion"),
+                "responsable": r.get("responsable"),
+                "updated_at": r.get("updated_at"),
+            } if r.get("registro_id") is not None else None
+        out.append(hit)
+
+    if ies_id is None and out:
+        ies_por_evidencia = await _ies_por_evidencia(db, [h["evidencia_id"] for h in out])
+        for hit in out:
+            hit["ies"] = ies_por_evidencia.get(hit["evidencia_id"])
+    return out
+
+
+async def _ies_por_evidencia(db: AsyncSession, evidencia_ids: list[int]) -> dict:
+    # Admin sin ies_id: por evidencia, agregado entre IES + las más recientes
+    sql = text("""
+        SELECT
+            e.evidencia_id,
+            agg.ies_total,
+            agg.ies_presenta,
+            agg.avance_promedio,
+            top.ies_id,
+            top.ies_slug,
+            top.ies_nombre,
+            top.presenta,
+            top.avance_pct,
+            top.updated_at
+        FROM unnest(CAST(:ids AS bigint[])) AS e(evidencia_id)
+        CROSS JOIN LATERAL (
+            SELECT
+                COUNT(*)                               AS ies_total,
+                COUNT(*) FILTER (WHERE er.presenta)    AS ies_presenta,
+                AVG(er.avance_pct)::float              AS avance_promedio
+            FROM evidencia_registro er
+            WHERE er.evidencia_id = e.evidencia_id
+        ) agg
+        LEFT JOIN LATERAL (
+            SELECT
+                i.id     AS ies_id,
+                i.slug   AS ies_slug,
+                i.nombre AS ies_nombre,
+                er.presenta,
+                er.avance_pct,
+                er.updated_at
+            FROM evidencia_registro er
+            JOIN ies i ON i.id = er.ies_id
+            WHERE er.evidencia_id = e.evidencia_id
+            ORDER BY er.updated_at DESC NULLS LAST, er.ies_id ASC
+            LIMIT :n
+        ) top ON TRUE
+        ORDER BY e.evidencia_id, top.updated_at DESC NULLS LAST, top.ies_id ASC
+    """)
+    rows = (await db.execute(sql, {"ids": evidencia_ids, "n": _IES_POR_EVIDENCIA})).mappings().all()
+
+    out = {}
+    for r in rows:
+        item = out.setdefault(r.get("evidencia_id"), {
+            "total": r.get("ies_total"),
+            "presentan": r.get("ies_presenta"),
+            "avance_promedio": r.get("avance_promedio"),
+            "recientes": [],
+        })
+        if r.get("ies_id") is not None:
+            item["recientes"].append({
+                "id": r.get("ies_id"),
+                "slug": r.get("ies_slug"),
+                "nombre": r.get("ies_nombre"),
+                "presenta": r.get("presenta"),
+                "avance_pct": r.get("avance_pct"),
+                "updated_at": r.get("updated_at"),
+            })
+    return out
+
+
+async def _buscar_responsables(db: AsyncSession, q: str, ies_id: int | None, limit: int) -> list:
+    # f_unaccent(lower(:q)) <% <expr. indexada>: usa idx_registro_responsable_trgm
+    # (umbral pg_trgm.word_similarity_threshold, 0.6 por defecto)
+    filtro_ies = "AND er.ies_id = :ies_id" if ies_id is not None else ""
+    sql = text(f"""
+        SELECT
+            er.id          AS registro_id,
+            er.responsable,
+            word_similarity(f_unaccent(lower(:q)), f_unaccent(lower(er.responsable))) AS similitud,
+            er.presenta,
+            er.avance_pct,
+            er.updated_at,
+            i.id           AS ies_id,
+            i.slug         AS ies_slug,
+            i.nombre       AS ies_nombre,
+            ei.id          AS evidencia_id,
+            ei.titulo,
+            sm.id          AS submodulo_id,
+            sm.nombre      AS submodulo_nombre,
+            sp.id          AS subprograma_id,
+            sp.nombre      AS subprograma_nombre
+        FROM evidencia_registro er
+        JOIN ies i             ON i.id = er.ies_id
+        JOIN evidencia_item ei ON ei.id = er.evidencia_id
+        JOIN submodulos sm     ON sm.id = er.submodulo_id
+        JOIN subprogramas sp   ON sp.id = sm.subprograma_id
+        WHERE f_unaccent(lower(:q)) <% f_unaccent(lower(er.responsable))
+          {filtro_ies}
+        ORDER BY similitud DESC, er.updated_at DESC, er.id ASC
+        LIMIT :limit
+    """)
+    params = {"q": q, "limit": limit}
+    if ies_id is not None:
+        params["ies_id"] = ies_id
+    rows = (await db.execute(sql, params)).mappings().all()
+
+    return [
+        {
+            "registro_id": r.get("registro_id"),
+            "responsable": r.get("responsable"),
+            "similitud": r.get("similitud"),
+            "presenta": r.get("presenta"),
+            "avance_pct": r.get("avance_pct"),
+            "updated_at": r.get("updated_at"),
+            "ies": {"id": r.get("ies_id"), "slug": r.get("ies_slug"), "nombre": r.get("ies_nombre")},
+            "evidencia": {"id": r.get("evidencia_id"), "titulo": r.get("titulo")},
+            "submodulo": {"id": r.get("submodulo_id"), "nombre": r.get("submodulo_nombre")},
+            "subprograma": {"id": r.get("subprograma_id"), "nombre": r.get("subprograma_nombre")},
+        }
+        for r in rows
+    ]
+
+
+@router.get("")
+async def buscar(
+    q: str = Query(..., min_length=3, max_length=200),
+    tipo: str = Query(default="todo"),
+    ies_id: int | None = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_read_db),
+    user: Usuario = Depends(get_current_user),
+):
+    q = " ".join(q.split())
+    if len(q) < 3:
+        raise HTTPException(status_code=400, detail="La búsqueda requiere al menos 3 caracteres.")
+    tipo = (tipo or "").lower()
+    if tipo not in _TIPOS:
+        raise HTTPException(status_code=400, detail=f"tipo inválido: {tipo} (usar {', '.join(_TIPOS)})")
+
+    ies_id = _scope_ies(user, ies_id)
+
+    out = {"q": q, "tipo": tipo, "ies_id": ies_id, "evidencias": [], "responsables": []}
+    try:
+        if tipo in ("todo", "evidencias"):
+            out["evidencias"] = await _buscar_evidencias(db, q, ies_id, limit)
+        if tipo in ("todo", "responsables"):
+            out["responsables"] = await _buscar_responsables(db, q, ies_id, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en la búsqueda: {str(e)}")
+
+    return JSONUTF8Response(out)
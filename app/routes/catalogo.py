@@ -1,24 +1,29 @@
 # -*- coding: utf-8 -*-
 
 # app/routes/catalogo.py
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+import asyncio
+
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
-from app.db.session import get_db
+from app.db.session import get_async_db, AsyncSessionLocal
+from app.core.deps import require_admin
+from app.core.http_cache import make_etag, not_modified
+from app.core.responses import dumps
 
 router = APIRouter(prefix="/catalogo", tags=["Catálogo"])
 
 @router.get("/subprogramas")
-def subprogramas(db: Session = Depends(get_db)):
-    rows = db.execute(
+async def subprogramas(db: AsyncSession = Depends(get_async_db)):
+    rows = (await db.execute(
         text("SELECT id, nombre, slug, orden FROM subprogramas ORDER BY orden")
-    ).mappings().all()
+    )).mappings().all()
     return rows
 
 @router.get("/subprogramas/{subprograma_id}/submodulos")
-def submodulos_por_subprograma(subprograma_id: int, db: Session = Depends(get_db)):
-    rows = db.execute(
+async def submodulos_por_subprograma(subprograma_id: int, db: AsyncSession = Depends(get_async_db)):
+    rows = (await db.execute(
         text("""
         SELECT id, subprograma_id, nombre, slug, orden
         FROM submodulos
@@ -26,5 +31,154 @@ def submodulos_por_subprograma(subprograma_id: int, db: Session = Depends(get_db
         ORDER BY orden
         """),
         {"sid": subprograma_id},
-    ).mappings().all()
+    )).mappings().all()
     return rows
+
+
+# ============================================================
+# Árbol completo del catálogo (subprogramas -> submódulos + conteo de
+# evidencias) servido desde memoria.
+#
+# Se carga una vez al arrancar (main.py) y queda serializado con su ETag
+# fuerte (sha256 del JSON). Un If-None-Match que coincide responde 304 sin
+# tocar la DB. Tras editar el catálogo: POST /catalogo/arbol/reload
+# (por worker; con varios workers, reiniciar o llamar en cada uno).
+# Cache-Control: no-cache (URL sin versión): el navegador revalida siempre
+# y no se queda con un árbol viejo tras un reload; el 304 es barato.
+# ============================================================
+
+_arbol = {"body": None, "etag": None, "subprogramas": 0, "submodulos": 0}
+_arbol_lock = asyncio.Lock()
+
+
+async def _build_arbol(db: AsyncSession) -> dict:
+    rows = (await db.execute(
+        text("""
+        SELECT
+          sp.id    AS sp_id,
+          sp.nombre AS sp_nombre,
+          sp.slug  AS sp_slug,
+          sp.orden AS sp_orden,
+          sm.id    AS sm_id,
+          sm.nombre AS sm_nombre,
+          sm.slug  AS sm_slug,
+          sm.orden AS sm_orden,
+          COALESCE(ev.total, 0)::int AS evidencias_total
+        FROM subprogramas sp
+        LEFT JOIN submodulos sm ON sm.subprograma_id = sp.id
+        LEFT JOIN (
+          SELECT submodulo_id, COUNT(*) AS total
+          FROM evidencia_item
+          GROUP BY submodulo_id
+        ) ev ON ev.submodulo_id = sm.id
+        ORDER BY sp.orden, sp.id, sm.orden, sm.id
+        """)
+    )).mappings().all()
+
+    subprogramas = []
+    by_id = {}
+    for r in rows:
+        sp = by_id.get(r["sp_id"])
+        if sp is None:
+            sp = {
+                "id": r["sp_id"],
+                "nombre": r["sp_nombre"],
+                "slug": r["sp_slug"],
+                "orden": r["sp_orden"],
+                "evidencias_total": 0,
+                "submodulos": [],
+            }
+            by_id[r["sp_id"]] = sp
+            subprogramas.append(sp)
+
+        if r["sm_id"] is None:
+            continue
+
+        sp["submodulos"].append({
+            "id": r["sm_id"],
+            "subprograma_id": r["sp_id"],
+            "nombre": r["sm_nombre"],
+            "slug": r["sm_slug"],
+            "orden": r["sm_orden"],
+            "evidencias_total": r["evidencias_total"],
+        })
+        sp["evidencias_total"] += r["evidencias_total"]
+
+    return {"subprogramas": subprogramas}
+
+
+async def cargar_arbol() -> dict:
+    """(Re)carga el árbol desde la DB y lo deja serializado en memoria."""
+    async with _arbol_lock:
+        async with AsyncSessionLocal() as db:
+            data = await _build_arbol(db)
+
+        body = dumps(data)
+        _arbol["body"] = body
+        _arbol["etag"] = make_etag(body)
+        _arbol["subprogramas"] = len(data["subprogramas"])
+        _arbol["submodulos"] = sum(len(sp["submodulos"]) for sp in data["subprogramas"])
+        return _arbol
+
+
+async def catalogo_validator(db: AsyncSession, submodulo_id: int | None = None) -> str:
+    """
+    Huella del catálogo para ETags de respuestas que lo incluyen, leída de la
+    DB (igual en todos los workers; cambia al renombrar o reordenar):
+    - submodulo_id: ítems del submódulo (id, orden, título). Pocas filas
+      (idx_evidencia_item_submodulo_id).
+    - None: subprogramas y submódulos (id, nombre, orden), lo que muestra
+      el resumen de la IES.
+    """
+    if submodulo_id is not None:
+        sql = text("""
+        SELECT COUNT(*),
+               md5(string_agg(id::text || ':' || orden::text || ':' || titulo, '|' ORDER BY id))
+        FROM evidencia_item
+        WHERE submodulo_id = :submodulo_id
+        """)
+        row = (await db.execute(sql, {"submodulo_id": submodulo_id})).first()
+    else:
+        sql = text("""
+        SELECT COUNT(*),
+               md5(string_agg(
+                 sp.id::text || ':' || sp.orden::text || ':' || sp.nombre || '/' ||
+                 sm.id::text || ':' || sm.orden::text || ':' || sm.nombre,
+                 '|' ORDER BY sm.id))
+        FROM submodulos sm
+        JOIN subprogramas sp ON sp.id = sm.subprograma_id
+        """)
+        row = (await db.execute(sql)).first()
+    return f"{row[0]}:{row[1] or ''}"
+
+
+@router.get("/arbol")
+async def arbol(request: Request):
+    if _arbol["body"] is None:
+        # Si el arranque no pudo cargarlo (DB caída), se carga en la 1ra visita
+        await cargar_arbol()
+
+    headers = {
+        "ETag": _arbol["etag"],
+        "Cache-Control": "no-cache",
+    }
+    cached = not_modified(request, _arbol["etag"], headers)
+    if cached is not None:
+        return cached
+
+    return Response(
+        content=_arbol["body"],
+        media_type="application/json; charset=utf-8",
+        headers=headers,
+    )
+
+
+@router.post("/arbol/reload")
+async def arbol_reload(_admin=Depends(require_admin)):
+    a = await cargar_arbol()
+    return {
+        "ok": True,
+        "etag": a["etag"],
+        "subprogramas": a["subprogramas"],
+        "submodulos": a["submodulos"],
+    }
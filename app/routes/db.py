@@ -1,6 +1,7 @@
 # app/routes/db.py
-from fastapi import APIRouter
-from app.db.session import test_db_connection
+from fastapi import APIRouter, Depends
+from app.db.session import test_db_connection, pool_status
+from app.core.deps import require_admin
 
 router = APIRouter(prefix="/db", tags=["DB"])
 
@@ -8,3 +9,8 @@ router = APIRouter(prefix="/db", tags=["DB"])
 def ping():
     ok = test_db_connection()
     return {"ok": ok}
+
+
+@router.get("/pool")
+def pool(_admin=Depends(require_admin)):
+    return pool_status()
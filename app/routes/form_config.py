@@ -1,10 +1,13 @@
 # app/routes/form_config.py
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
 
-from app.db.session import get_db
-from app.models.form_config import SubmoduloFormConfig
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_async_db
+from app.core.http_cache import PRIVATE_REVALIDATE, make_etag, not_modified
+from app.core.responses import dumps
 
 router = APIRouter(prefix="/form-config", tags=["Form Config"])
 
@@ -24,37 +27,144 @@ def _normalize_columns_json(value):
     return []
 
 
-@router.get("/submodulos/{submodulo_id}")
-def get_form_config(
-    submodulo_id: int,
-    db: Session = Depends(get_db),
-):
-    # Traer config activa más reciente
-    cfg = (
-        db.query(SubmoduloFormConfig)
-        .filter(SubmoduloFormConfig.submodulo_id == submodulo_id)
-        .filter(SubmoduloFormConfig.is_active == True)  # noqa: E712
-        .order_by(SubmoduloFormConfig.version.desc())
-        .first()
-    )
+# ============================================================
+# Cache de config activa normalizada por submódulo
+#
+# Clave: submodulo_id -> (id, version, updated_at, config normalizada).
+# Cada request hace solo un "probe" liviano de la versión activa (sin
+# columns_json). columns_json se lee y normaliza solo si apareció una
+# versión nueva o la fila cambió (updated_at lo mantiene un trigger).
+# El ETag sale de esa huella: si coincide -> 304 sin serializar nada.
+# ============================================================
+
+_FORM_CONFIG_CACHE_HEADERS = PRIVATE_REVALIDATE
+_MAX_IDS = 500
+
+_cache = {}  # submodulo_id -> (fingerprint, payload)
+
 
+def _default_config(submodulo_id: int) -> dict:
     # Si no existe, NO es error: devolvemos default
-    if not cfg:
-        return {
-            "id": None,
-            "submodulo_id": submodulo_id,
-            "version": 1,
-            "is_active": True,
-            "columns_json": [],
-        }
-
-    # Normalizar columns_json (evita 500 por tu seed {"columns":[]})
-    normalized = _normalize_columns_json(cfg.columns_json)
+    return {
+        "id": None,
+        "submodulo_id": submodulo_id,
+        "version": 1,
+        "is_active": True,
+        "columns_json": [],
+    }
 
+
+async def _probe_versions(ids: list[int] | None, db: AsyncSession) -> dict:
+    """Versión activa más reciente por submódulo: {submodulo_id: (id, version, updated_at)}."""
+    where = "AND submodulo_id = ANY(:ids)" if ids is not None else ""
+    rows = (await db.execute(
+        text(f"""
+        SELECT DISTINCT ON (submodulo_id) submodulo_id, id, version, updated_at
+        FROM submodulo_form_config
+        WHERE is_active = TRUE {where}
+        ORDER BY submodulo_id, version DESC
+        """),
+        {"ids": ids} if ids is not None else {},
+    )).mappings().all()
     return {
-        "id": cfg.id,
-        "submodulo_id": cfg.submodulo_id,
-        "version": cfg.version,
-        "is_active": cfg.is_active,
-        "columns_json": normalized,
+        int(r["submodulo_id"]): (int(r["id"]), int(r["version"]), r["updated_at"].isoformat() if r["updated_at"] else None)
+        for r in rows
     }
+
+
+async def _get_configs(ids: list[int], heads: dict, db: AsyncSession) -> list[dict]:
+    """Configs normalizadas para ids (cache + carga de las que cambiaron)."""
+    stale = [
+        heads[sm][0] for sm in ids
+        if sm in heads and (sm not in _cache or _cache[sm][0] != heads[sm])
+    ]
+    if stale:
+        rows = (await db.execute(
+            text("""
+            SELECT id, submodulo_id, version, is_active, columns_json
+            FROM submodulo_form_config
+            WHERE id = ANY(:cfg_ids)
+            """),
+            {"cfg_ids": stale},
+        )).mappings().all()
+        for r in rows:
+            sm = int(r["submodulo_id"])
+            _cache[sm] = (heads[sm], {
+                "id": r["id"],
+                "submodulo_id": sm,
+                "version": r["version"],
+                "is_active": r["is_active"],
+                # Normalizar columns_json (evita 500 por tu seed {"columns":[]})
+                "columns_json": _normalize_columns_json(r["columns_json"]),
+            })
+
+    out = []
+    for sm in ids:
+        if sm in heads and sm in _cache and _cache[sm][0] == heads[sm]:
+            out.append(_cache[sm][1])
+        else:
+            out.append(_default_config(sm))
+    return out
+
+
+def _fingerprint_etag(ids: list[int], heads: dict) -> str:
+    parts = [f"{sm}:{heads.get(sm)}" for sm in ids]
+    return make_etag("|".join(parts))
+
+
+def _json_response(data, etag: str) -> Response:
+    headers = {"ETag": etag}
+    headers.update(_FORM_CONFIG_CACHE_HEADERS)
+    return Response(
+        content=dumps(data),
+        media_type="application/json; charset=utf-8",
+        headers=headers,
+    )
+
+
+@router.get("/submodulos")
+async def get_form_configs_bulk(
+    request: Request,
+    ids: str | None = Query(default=None, description="CSV de submodulo_id; vacío = todos"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Configs activas de varios submódulos en 1 respuesta (con ETag)."""
+    if ids:
+        try:
+            sm_ids = sorted({int(x) for x in ids.split(",") if x.strip()})
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids debe ser una lista de enteros separada por comas")
+        if len(sm_ids) > _MAX_IDS:
+            raise HTTPException(status_code=400, detail=f"Máximo {_MAX_IDS} ids por request")
+        heads = await _probe_versions(sm_ids, db)
+    else:
+        sm_ids = [
+            int(x) for x in (await db.execute(text("SELECT id FROM submodulos ORDER BY id"))).scalars().all()
+        ]
+        heads = await _probe_versions(None, db)
+
+    etag = _fingerprint_etag(sm_ids, heads)
+    cached = not_modified(request, etag, _FORM_CONFIG_CACHE_HEADERS)
+    if cached is not None:
+        return cached
+
+    configs = await _get_configs(sm_ids, heads, db)
+    return _json_response({"configs": configs}, etag)
+
+
+@router.get("/submodulos/{submodulo_id}")
+async def get_form_config(
+    submodulo_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Versión activa más reciente (probe liviano) -> cache / 304
+    heads = await _probe_versions([submodulo_id], db)
+
+    etag = _fingerprint_etag([submodulo_id], heads)
+    cached = not_modified(request, etag, _FORM_CONFIG_CACHE_HEADERS)
+    if cached is not None:
+        return cached
+
+    configs = await _get_configs([submodulo_id], heads, db)
+    return _json_response(configs[0], etag)
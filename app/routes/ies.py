@@ -4,16 +4,17 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 import secrets
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.core.deps import require_admin
+from app.core.auth_cache import invalidate_principal
 from app.schemas.ies import IESCreate
-from app.core.security import hash_password
+from app.core.hashing import hash_password_pooled
 
 router = APIRouter(prefix="/ies", tags=["IES"])
 
 
 @router.get("/")
-def listar_ies(db: Session = Depends(get_db), _=Depends(require_admin)):
+def listar_ies(db: Session = Depends(get_read_db), _=Depends(require_admin)):
     rows = db.execute(
         text("SELECT id, nombre, slug, created_at FROM ies ORDER BY id")
     ).mappings().all()
@@ -67,29 +68,29 @@ def crear_ies(body: IESCreate, db: Session = Depends(get_db), _=Depends(require_
 
         # Si no mandan password, generamos una provisional
         temp_password = (body.password or "").strip() or secrets.token_urlsafe(10)
-        pwd_hash = hash_password(temp_password)
+        pwd_hash = hash_password_pooled(temp_password)
+
+        # 1 query: usernames que empiezan con el slug + dueño actual del email
+        probe = db.execute(
+            text("""
+            SELECT
+                ARRAY(SELECT username FROM usuarios WHERE starts_with(username, :u)) AS usernames,
+                EXISTS(SELECT 1 FROM usuarios WHERE lower(email) = :e)                AS email_existe,
+                (SELECT ies_id FROM usuarios WHERE lower(email) = :e LIMIT 1)        AS email_ies_id
+            """),
+            {"u": slug, "e": email}
+        ).mappings().first()
 
         # Username base: slug (si choca, slug2, slug3, ...)
-        base_username = slug
-        username = base_username
+        tomados = set(probe["usernames"] or [])
+        username = slug
         i = 1
-        while True:
-            exists = db.execute(
-                text("SELECT 1 FROM usuarios WHERE username = :u LIMIT 1"),
-                {"u": username}
-            ).first()
-            if not exists:
-                break
+        while username in tomados:
             i += 1
-            username = f"{base_username}{i}"
+            username = f"{slug}{i}"
 
         # Si el email ya existe PERO apunta a otra ies -> conflicto
-        email_exists = db.execute(
-            text("SELECT id, ies_id FROM usuarios WHERE lower(email)=:e LIMIT 1"),
-            {"e": email}
-        ).mappings().first()
-
-        if email_exists and int(email_exists["ies_id"] or 0) != ies_id:
+        if probe["email_existe"] and int(probe["email_ies_id"] or 0) != ies_id:
             raise HTTPException(status_code=409, detail="Ese email ya está usado por otra IES")
 
         # Insert/update por email (email es UNIQUE)
@@ -124,6 +125,10 @@ def crear_ies(body: IESCreate, db: Session = Depends(get_db), _=Depends(require_
 
     db.commit()
 
+    # El upsert por email puede reactivar/mover un usuario existente
+    if created_user:
+        invalidate_principal(int(created_user["id"]))
+
     # -----------------------------
     # Respuesta para el modal
     # -----------------------------
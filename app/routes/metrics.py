@@ -0,0 +1,119 @@
+# app/routes/metrics.py
+from anyio import to_thread
+from fastapi import APIRouter, Depends
+from fastapi.responses import Response
+from sqlalchemy.pool import QueuePool
+
+from app.core.deps import require_admin
+from app.core.metrics import CONTENT_TYPE, gauge, render_http
+from app.core.resumen_cache import CONTADORES, resumen_cache
+from app.db.session import (
+    POOL_MODE,
+    REPLICA_URL,
+    async_engine,
+    async_pool_stats,
+    async_replica_engine,
+    async_replica_pool_stats,
+    engine,
+    pool_stats,
+    replica_engine,
+    replica_monitor,
+    replica_pool_stats,
+)
+from app.routes.resumen import eventos as resumen_eventos
+
+router = APIRouter(tags=["Métricas"])
+
+
+def _pools() -> list:
+    pools = [("sync", engine.pool, pool_stats), ("async", async_engine.pool, async_pool_stats)]
+    if REPLICA_URL:
+        pools += [
+            ("replica_sync", replica_engine.pool, replica_pool_stats),
+            ("replica_async", async_replica_engine.pool, async_replica_pool_stats),
+        ]
+    return pools
+
+
+def _render_replica(out: list) -> None:
+    if not REPLICA_URL:
+        return
+    m = replica_monitor
+    gauge(out, "astra_db_replica_healthy", "1 si la réplica de lectura está al día (lag <= máximo).",
+          [((), int(m.healthy))])
+    if m.lag_s is not None and m.lag_s != float("inf"):
+        gauge(out, "astra_db_replica_lag_seconds", "Lag de la réplica en el último chequeo.", [((), m.lag_s)])
+    gauge(out, "astra_db_replica_check_failures_total", "Chequeos con réplica caída o atrasada.",
+          [((), m.failures)], kind="counter")
+    gauge(out, "astra_db_read_routing_total", "Sesiones de solo lectura por destino y motivo.",
+          m.reads_snapshot(), ("destino", "motivo"), kind="counter")
+
+
+def _render_pools(out: list) -> None:
+    pools = _pools()
+    queue = [(name, p, st) for name, p, st in pools if isinstance(p, QueuePool)]
+    names = ("pool", "mode")
+
+    gauge(out, "astra_db_pool_connects_total", "Conexiones nuevas abiertas a Postgres.",
+          [((name, POOL_MODE), st.connects) for name, _, st in pools], names, kind="counter")
+    if not queue:
+        return
+
+    gauge(out, "astra_db_pool_size", "Conexiones fijas del pool.",
+          [((name, POOL_MODE), p.size()) for name, p, _ in queue], names)
+    gauge(out, "astra_db_pool_max_overflow", "Conexiones extra permitidas sobre pool_size.",
+          [((name, POOL_MODE), p._max_overflow) for name, p, _ in queue], names)
+    gauge(out, "astra_db_pool_checked_out", "Conexiones en uso (saturado = size + max_overflow).",
+          [((name, POOL_MODE), p.checkedout()) for name, p, _ in queue], names)
+    gauge(out, "astra_db_pool_overflow", "Conexiones de overflow abiertas.",
+          [((name, POOL_MODE), max(p.overflow(), 0)) for name, p, _ in queue], names)
+    gauge(out, "astra_db_pool_checkouts_total", "Checkouts del pool.",
+          [((name, POOL_MODE), st.checkouts) for name, _, st in queue], names, kind="counter")
+    gauge(out, "astra_db_pool_timeouts_total", "Checkouts que agotaron pool_timeout.",
+          [((name, POOL_MODE), st.timeouts) for name, _, st in queue], names, kind="counter")
+    gauge(out, "astra_db_pool_wait_seconds_total", "Tiempo total esperando conexión del pool.",
+          [((name, POOL_MODE), st.wait_total_s) for name, _, st in queue], names, kind="counter")
+    gauge(out, "astra_db_pool_wait_max_seconds", "Mayor espera por una conexión desde el arranque.",
+          [((name, POOL_MODE), st.wait_max_s) for name, _, st in queue], names)
+
+
+def _render_threadpool(out: list) -> None:
+    # Hilos de los endpoints sync (anyio, default 40)
+    st = to_thread.current_default_thread_limiter().statistics()
+    gauge(out, "astra_threadpool_size", "Hilos máximos para endpoints sync.", [((), st.total_tokens)])
+    gauge(out, "astra_threadpool_busy", "Hilos ocupados por endpoints sync.", [((), st.borrowed_tokens)])
+    gauge(out, "astra_threadpool_waiting", "Tareas esperando un hilo libre.", [((), st.tasks_waiting)])
+
+
+_CACHE_HELP = {
+    "hits": "Respuestas servidas desde la cache de resultados.",
+    "misses": "Resultados calculados (no estaban en la cache).",
+    "coalesced": "Misses que esperaron un cálculo en curso (single-flight).",
+    "evictions": "Entradas desalojadas por RESUMEN_CACHE_MAX (LRU).",
+    "invalidations": "Entradas borradas por escrituras (locales o NOTIFY).",
+}
+
+
+def _render_resumen_cache(out: list) -> None:
+    st = resumen_cache.stats()
+    names = ("tipo",)
+    gauge(out, "astra_resumen_cache_entries", "Entradas en la cache de resultados.",
+          [((tipo,), s["entries"]) for tipo, s in st.items()], names)
+    for c in CONTADORES:
+        gauge(out, f"astra_resumen_cache_{c}_total", _CACHE_HELP[c],
+              [((tipo,), s[c]) for tipo, s in st.items()], names, kind="counter")
+
+
+# ============================================================
+# ADMIN: GET /metrics (formato texto de Prometheus)
+# ============================================================
+@router.get("/metrics", include_in_schema=False)
+async def metrics(_admin=Depends(require_admin)):
+    out = render_http()
+    _render_pools(out)
+    _render_replica(out)
+    _render_threadpool(out)
+    _render_resumen_cache(out)
+    gauge(out, "astra_resumen_stream_subscribers", "Streams SSE del resumen abiertos en este worker.",
+          [((), resumen_eventos.suscriptores())])
+    return Response("\n".join(out) + "\n", media_type=CONTENT_TYPE)
@@ -1,26 +1,236 @@
 # app/routes/operacion.py
-from fastapi import APIRouter, Depends, HTTPException
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.db.session import get_db, get_async_read_db
 from app.models.ies import IES
 from app.models.catalogo import EvidenciaItem
 from app.models.operacion import EvidenciaRegistro
-from app.schemas.operacion import EvidenciaUpdate as EvidenciaPatch
+from app.schemas.operacion import EvidenciaUpdate as EvidenciaPatch, EvidenciaBatchIn
 
 from app.core.deps import require_admin, require_ies_user
+from app.core.http_cache import make_etag, not_modified, PRIVATE_REVALIDATE
+from app.core.responses import dumps
+from app.core.resumen_cache import cached_json, resumen_cache
+from app.routes.catalogo import catalogo_validator
+from app.routes.resumen import rollup_validator
+from app.services.importar_registros import importar_upload
 from app.models.usuarios import Usuario
 
 router = APIRouter(prefix="/operacion", tags=["Operación"])
 
 
-def _build_evidencias_out(ies_id: int, ies_slug: str, submodulo_id: int, db: Session):
-    evidencias = (
-        db.query(EvidenciaItem)
-        .filter(EvidenciaItem.submodulo_id == submodulo_id)
-        .order_by(EvidenciaItem.orden.asc())
-        .all()
+# ============================================================
+# Upsert set-based de evidencia_registro
+#
+# Un INSERT ... ON CONFLICT (ies_id, evidencia_id) DO UPDATE ... RETURNING
+# por "forma" de payload (conjunto de campos enviados): el DO UPDATE solo
+# pisa los campos que vinieron. El front manda siempre los mismos campos,
+# así que un lote típico = 1 sentencia. Todo en una transacción y sin la
+# carrera SELECT-then-INSERT de dos primeras escrituras concurrentes.
+# "creado": created_at = inicio de esta transacción (xmax no se puede
+# leer en RETURNING de una tabla particionada, ver migración 004).
+# ============================================================
+
+# campo -> tipo SQL (para jsonb_to_recordset)
+_REGISTRO_COLS = {
+    "presenta": "boolean",
+    "valoracion": "integer",
+    "responsable": "text",
+    "fecha_inicio": "date",
+    "fecha_fin": "date",
+    "avance_pct": "integer",
+    "categoria_si_no": "boolean",
+}
+
+# NOT NULL en evidencia_registro: null explícito = error del ítem
+_REGISTRO_NOT_NULL = ("presenta", "valoracion", "avance_pct")
+
+_ERR_NO_EXISTE = "Evidencia no existe en el catálogo"
+_ERR_FECHAS = "fecha_inicio posterior a fecha_fin (ck_fechas_ok)"
+
+_RESPONSABLE_MAX = 255  # VARCHAR(255)
+
+
+def _fechas_invalidas(db: Session, ies_id: int, items: list[dict]) -> set[int]:
+    """
+    evidencia_id de los ítems que dejarían fecha_inicio > fecha_fin.
+    La fecha que no viene en el payload se toma del registro guardado
+    (null explícito = null), igual que en importar_registros.
+    """
+    rows = [
+        {
+            "evidencia_id": int(it["evidencia_id"]),
+            "fi_set": "fecha_inicio" in it,
+            "fecha_inicio": it.get("fecha_inicio"),
+            "ff_set": "fecha_fin" in it,
+            "fecha_fin": it.get("fecha_fin"),
+        }
+        for it in items
+        if "fecha_inicio" in it or "fecha_fin" in it
+    ]
+    if not rows:
+        return set()
+
+    res = db.execute(
+        text("""
+        SELECT v.evidencia_id
+        FROM jsonb_to_recordset(CAST(:items AS jsonb))
+             AS v(evidencia_id bigint, fi_set boolean, fecha_inicio date, ff_set boolean, fecha_fin date)
+        LEFT JOIN evidencia_registro er
+          ON er.ies_id = :ies_id
+         AND er.evidencia_id = v.evidencia_id
+        WHERE CASE WHEN v.fi_set THEN v.fecha_inicio ELSE er.fecha_inicio END
+            > CASE WHEN v.ff_set THEN v.fecha_fin ELSE er.fecha_fin END
+        """),
+        {"ies_id": ies_id, "items": dumps(rows).decode("utf-8")},
+    ).scalars().all()
+    return {int(x) for x in res}
+
+
+def _upsert_registros(db: Session, ies_id: int, items: list[dict]) -> dict:
+    """
+    items: [{"evidencia_id": int, <campos enviados>...}] (sin duplicados).
+    Devuelve {evidencia_id: resultado}. No hace commit.
+    """
+    results = {}
+    shapes = {}
+    fechas_mal = _fechas_invalidas(db, ies_id, items)
+    for it in items:
+        ev_id = int(it["evidencia_id"])
+        fields = {k: v for k, v in it.items() if k in _REGISTRO_COLS}
+
+        nulos = [k for k in _REGISTRO_NOT_NULL if k in fields and fields[k] is None]
+        if nulos:
+            results[ev_id] = {"evidencia_id": ev_id, "ok": False, "error": f"Campos no pueden ser null: {', '.join(nulos)}"}
+            continue
+        if len(fields.get("responsable") or "") > _RESPONSABLE_MAX:
+            results[ev_id] = {"evidencia_id": ev_id, "ok": False, "error": f"responsable supera {_RESPONSABLE_MAX} caracteres"}
+            continue
+        if ev_id in fechas_mal:
+            results[ev_id] = {"evidencia_id": ev_id, "ok": False, "error": _ERR_FECHAS}
+            continue
+
+        shapes.setdefault(tuple(sorted(fields)), []).append({"evidencia_id": ev_id, **fields})
+
+    for cols, rows in shapes.items():
+        recordset = ", ".join(["evidencia_id bigint"] + [f"{c} {_REGISTRO_COLS[c]}" for c in cols])
+        insert_cols = ", ".join(["ies_id", "submodulo_id", "evidencia_id", *cols])
+        select_cols = ", ".join([":ies_id", "ei.submodulo_id", "v.evidencia_id", *[f"v.{c}" for c in cols]])
+        # Sin campos: no-op que igual devuelve el registro (y lo crea si falta)
+        set_cols = ", ".join(f"{c} = EXCLUDED.{c}" for c in cols) or "evidencia_id = er.evidencia_id"
+
+        res = db.execute(
+            text(f"""
+            INSERT INTO evidencia_registro AS er ({insert_cols})
+            SELECT {select_cols}
+            FROM jsonb_to_recordset(CAST(:items AS jsonb)) AS v({recordset})
+            JOIN evidencia_item ei ON ei.id = v.evidencia_id
+            ON CONFLICT (ies_id, evidencia_id) DO UPDATE SET {set_cols}
+            RETURNING er.id, er.evidencia_id, er.updated_at, (er.created_at = LOCALTIMESTAMP) AS creado
+            """),
+            {"ies_id": ies_id, "items": dumps(rows).decode("utf-8")},
+        ).mappings().all()
+
+        for r in res:
+            ev_id = int(r["evidencia_id"])
+            results[ev_id] = {
+                "evidencia_id": ev_id,
+                "ok": True,
+                "registro_id": int(r["id"]),
+                "creado": bool(r["creado"]),
+                "updated_at": r["updated_at"],
+            }
+
+        # Lo que no volvió en RETURNING no existe en el catálogo
+        for row in rows:
+            ev_id = row["evidencia_id"]
+            if ev_id not in results:
+                results[ev_id] = {"evidencia_id": ev_id, "ok": False, "error": _ERR_NO_EXISTE}
+
+    return results
+
+
+def _save_one(db: Session, ies_id: int, evidencia_id: int, payload: EvidenciaPatch) -> dict:
+    data = payload.model_dump(exclude_unset=True, mode="json")
+    try:
+        out = _upsert_registros(db, ies_id, [{"evidencia_id": evidencia_id, **data}])[evidencia_id]
+        if not out["ok"]:
+            db.rollback()
+            status = 404 if out["error"] == _ERR_NO_EXISTE else 400
+            raise HTTPException(status_code=status, detail=out["error"])
+        db.commit()
+        resumen_cache.invalidar(ies_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error guardando evidencia: {str(e)}")
+
+    return {"ok": True, "registro_id": out["registro_id"], "updated_at": out["updated_at"]}
+
+
+def _save_batch(db: Session, ies_id: int, payload: EvidenciaBatchIn) -> dict:
+    items = [it.model_dump(exclude_unset=True, mode="json") for it in payload.items]
+
+    ids = [it["evidencia_id"] for it in items]
+    dup = sorted({x for x in ids if ids.count(x) > 1})
+    if dup:
+        raise HTTPException(status_code=400, detail=f"evidencia_id repetido en el lote: {dup}")
+
+    try:
+        results = _upsert_registros(db, ies_id, items)
+        db.commit()
+        resumen_cache.invalidar(ies_id)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error guardando evidencias: {str(e)}")
+
+    out = [results[i] for i in ids]
+    guardados = sum(1 for r in out if r["ok"])
+    return {
+        "ok": guardados == len(out),
+        "total": len(out),
+        "guardados": guardados,
+        "errores": len(out) - guardados,
+        "items": out,
+    }
+
+
+async def _evidencias_conditional(
+    ies_id: int, ies_slug: str, submodulo_id: int,
+    request: Request, db: AsyncSession,
+):
+    """
+    GET condicional: el ETag sale del validador del par (resumen_rollup) +
+    huella de los ítems del catálogo. Si coincide -> 304 sin leer
+    evidencia_registro.
+    """
+    validator = await rollup_validator(db, ies_id, submodulo_id)
+    catalogo = await catalogo_validator(db, submodulo_id)
+    etag = make_etag(f"ev|{ies_id}|{ies_slug}|{submodulo_id}|{validator}|{catalogo}")
+    cached = not_modified(request, etag, PRIVATE_REVALIDATE)
+    if cached is not None:
+        return cached
+
+    body = await resumen_cache.get_or_build(
+        ("evidencias", ies_id, submodulo_id), etag,
+        lambda: _build_evidencias_out(ies_id, ies_slug, submodulo_id, db),
     )
+    return cached_json(body, {"ETag": etag, **PRIVATE_REVALIDATE})
+
+
+async def _build_evidencias_out(ies_id: int, ies_slug: str, submodulo_id: int, db: AsyncSession):
+    evidencias = (
+        await db.execute(
+            select(EvidenciaItem)
+            .where(EvidenciaItem.submodulo_id == submodulo_id)
+            .order_by(EvidenciaItem.orden.asc())
+        )
+    ).scalars().all()
     if not evidencias:
         raise HTTPException(
             status_code=404,
@@ -29,11 +239,12 @@ def _build_evidencias_out(ies_id: int, ies_slug: str, submodulo_id: int, db: Ses
 
     evidencia_ids = [e.id for e in evidencias]
     registros = (
-        db.query(EvidenciaRegistro)
-        .filter(EvidenciaRegistro.ies_id == ies_id)
-        .filter(EvidenciaRegistro.evidencia_id.in_(evidencia_ids))
-        .all()
-    )
+        await db.execute(
+            select(EvidenciaRegistro)
+            .where(EvidenciaRegistro.ies_id == ies_id)
+            .where(EvidenciaRegistro.evidencia_id.in_(evidencia_ids))
+        )
+    ).scalars().all()
     reg_by_evid = {r.evidencia_id: r for r in registros}
 
     out = []
@@ -51,12 +262,12 @@ def _build_evidencias_out(ies_id: int, ies_slug: str, submodulo_id: int, db: Ses
                 "presenta": bool(r.presenta) if r else False,
                 "valoracion": int(r.valoracion) if (r and r.valoracion is not None) else 0,
                 "responsable": r.responsable if r else None,
-                "fecha_inicio": r.fecha_inicio.isoformat() if (r and r.fecha_inicio) else None,
-                "fecha_fin": r.fecha_fin.isoformat() if (r and r.fecha_fin) else None,
+                "fecha_inicio": r.fecha_inicio if r else None,
+                "fecha_fin": r.fecha_fin if r else None,
                 "avance_pct": int(r.avance_pct) if (r and r.avance_pct is not None) else 0,
                 "categoria_si_no": r.categoria_si_no if r else None,
                 "extra_data": r.extra_data if (r and r.extra_data) else {},
-                "updated_at": r.updated_at.isoformat() if (r and r.updated_at) else None,
+                "updated_at": r.updated_at if r else None,
             }
         )
     return out
@@ -66,17 +277,18 @@ def _build_evidencias_out(ies_id: int, ies_slug: str, submodulo_id: int, db: Ses
 # (A) ADMIN: usa ies_slug
 # -------------------------
 @router.get("/ies/{ies_slug}/submodulos/{submodulo_id}/evidencias")
-def evidencias_por_submodulo_admin(
+async def evidencias_por_submodulo_admin(
     ies_slug: str,
     submodulo_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
     _admin: Usuario = Depends(require_admin),
 ):
-    ies = db.query(IES).filter(IES.slug == ies_slug).first()
+    ies = (await db.execute(select(IES).where(IES.slug == ies_slug))).scalars().first()
     if not ies:
         raise HTTPException(status_code=404, detail=f"IES no encontrada: {ies_slug}")
 
-    return _build_evidencias_out(ies.id, ies.slug, submodulo_id, db)
+    return await _evidencias_conditional(ies.id, ies.slug, submodulo_id, request, db)
 
 
 @router.patch("/ies/{ies_slug}/evidencias/{evidencia_id}")
@@ -91,45 +303,54 @@ def patch_evidencia_admin(
     if not ies:
         raise HTTPException(status_code=404, detail=f"IES no encontrada: {ies_slug}")
 
-    reg = (
-        db.query(EvidenciaRegistro)
-        .filter(EvidenciaRegistro.ies_id == ies.id)
-        .filter(EvidenciaRegistro.evidencia_id == evidencia_id)
-        .first()
-    )
+    return _save_one(db, ies.id, evidencia_id, payload)
 
-    if not reg:
-        reg = EvidenciaRegistro(ies_id=ies.id, evidencia_id=evidencia_id)
-        db.add(reg)
 
-    data = payload.model_dump(exclude_unset=True)
-    for k, v in data.items():
-        setattr(reg, k, v)
+@router.patch("/ies/{ies_slug}/evidencias")
+def patch_evidencias_batch_admin(
+    ies_slug: str,
+    payload: EvidenciaBatchIn,
+    db: Session = Depends(get_db),
+    _admin: Usuario = Depends(require_admin),
+):
+    ies = db.query(IES).filter(IES.slug == ies_slug).first()
+    if not ies:
+        raise HTTPException(status_code=404, detail=f"IES no encontrada: {ies_slug}")
 
-    try:
-        db.commit()
-        db.refresh(reg)
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error guardando evidencia: {str(e)}")
+    return _save_batch(db, ies.id, payload)
+
+
+@router.post("/ies/{ies_slug}/evidencias/importar")
+def importar_evidencias_admin(
+    ies_slug: str,
+    archivo: UploadFile = File(..., description="CSV (UTF-8, , o ;) o XLSX"),
+    dry_run: bool = Query(default=False, description="Solo validar, no guarda"),
+    parcial: bool = Query(default=False, description="Guardar filas válidas aunque haya errores"),
+    db: Session = Depends(get_db),
+    _admin: Usuario = Depends(require_admin),
+):
+    ies = db.query(IES).filter(IES.slug == ies_slug).first()
+    if not ies:
+        raise HTTPException(status_code=404, detail=f"IES no encontrada: {ies_slug}")
 
-    return {"ok": True, "registro_id": reg.id, "updated_at": reg.updated_at.isoformat() if reg.updated_at else None}
+    return importar_upload(db, archivo, ies.id, ies.slug, dry_run, parcial)
 
 
 # -------------------------
 # (B) IES USER: NO usa selector, ies sale del token
 # -------------------------
 @router.get("/submodulos/{submodulo_id}/evidencias")
-def evidencias_por_submodulo_ies(
+async def evidencias_por_submodulo_ies(
     submodulo_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
     user: Usuario = Depends(require_ies_user),
 ):
-    ies = db.query(IES).filter(IES.id == user.ies_id).first()
+    ies = (await db.execute(select(IES).where(IES.id == user.ies_id))).scalars().first()
     if not ies:
         raise HTTPException(status_code=404, detail="IES no encontrada para el usuario")
 
-    return _build_evidencias_out(ies.id, ies.slug, submodulo_id, db)
+    return await _evidencias_conditional(ies.id, ies.slug, submodulo_id, request, db)
 
 
 @router.patch("/evidencias/{evidencia_id}")
@@ -139,28 +360,24 @@ def patch_evidencia_ies(
     db: Session = Depends(get_db),
     user: Usuario = Depends(require_ies_user),
 ):
-    ies_id = user.ies_id
+    return _save_one(db, user.ies_id, evidencia_id, payload)
 
-    reg = (
-        db.query(EvidenciaRegistro)
-        .filter(EvidenciaRegistro.ies_id == ies_id)
-        .filter(EvidenciaRegistro.evidencia_id == evidencia_id)
-        .first()
-    )
 
-    if not reg:
-        reg = EvidenciaRegistro(ies_id=ies_id, evidencia_id=evidencia_id)
-        db.add(reg)
-
-    data = payload.model_dump(exclude_unset=True)
-    for k, v in data.items():
-        setattr(reg, k, v)
+@router.patch("/evidencias")
+def patch_evidencias_batch_ies(
+    payload: EvidenciaBatchIn,
+    db: Session = Depends(get_db),
+    user: Usuario = Depends(require_ies_user),
+):
+    return _save_batch(db, user.ies_id, payload)
 
-    try:
-        db.commit()
-        db.refresh(reg)
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error guardando evidencia: {str(e)}")
 
-    return {"ok": True, "registro_id": reg.id, "updated_at": reg.updated_at.isoformat() if reg.updated_at else None}
+@router.post("/evidencias/importar")
+def importar_evidencias_ies(
+    archivo: UploadFile = File(..., description="CSV (UTF-8, , o ;) o XLSX"),
+    dry_run: bool = Query(default=False, description="Solo validar, no guarda"),
+    parcial: bool = Query(default=False, description="Guardar filas válidas aunque haya errores"),
+    db: Session = Depends(get_db),
+    user: Usuario = Depends(require_ies_user),
+):
+    return importar_upload(db, archivo, user.ies_id, user.ies_slug, dry_run, parcial)
@@ -1,12 +1,21 @@
 # app/routes/resumen.py
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from datetime import date, datetime
+from datetime import date
 
-from app.db.session import get_db
-from app.core.deps import require_admin, require_ies_user
+from app.db.session import AsyncSessionLocal, get_db, get_async_read_db
+from app.core.deps import get_current_user_stream, require_admin, require_ies_user
 from app.models.usuarios import Usuario
+from app.core.http_cache import make_etag, not_modified, PRIVATE_REVALIDATE
+from app.core.responses import JSONUTF8Response, dumps
+from app.core.resumen_cache import cached_json, resumen_cache
+from app.routes.catalogo import catalogo_validator
+from app.services.resumen_eventos import ResumenEventos
 
 router = APIRouter(prefix="/api/resumen", tags=["Resumen"])
 
@@ -18,20 +27,6 @@ def _to_float(x):
         return None
 
 
-def _bucket_avance(av):
-    if av is None:
-        return "sin_dato"
-    if av < 25:
-        return "0_24"
-    if av < 50:
-        return "25_49"
-    if av < 75:
-        return "50_74"
-    if av <= 100:
-        return "75_100"
-    return "mas_100"
-
-
 def _bool_or_none(x):
     if x is True:
         return True
@@ -40,63 +35,67 @@ def _bool_or_none(x):
     return None
 
 
-# ============================
-# UPDATED_AT robust parser
-# ============================
-def _parse_dt(u):
-    """
-    Soporta:
-    - datetime (ideal)
-    - string ISO (ej: '2026-01-29T12:34:56', '2026-01-29 12:34:56', con/ sin Z)
-    """
-    if u is None:
+def _meses_para_finalizar(f_fin_max):
+    if f_fin_max is None:
         return None
+    hoy = date.today()
+    fin = f_fin_max.date() if hasattr(f_fin_max, "date") else f_fin_max
+    return (fin.year - hoy.year) * 12 + (fin.month - hoy.month)
 
-    # ya es datetime
-    if hasattr(u, "timestamp"):
-        return u
 
-    # string
-    if isinstance(u, str):
-        s = u.strip()
-        if not s:
-            return None
-        try:
-            # 'Z' -> UTC offset
-            s = s.replace("Z", "+00:00")
-            return datetime.fromisoformat(s)
-        except Exception:
-            # intento extra: si viene con microsegundos raros o formato no ISO,
-            # aquí preferimos fallar silenciosamente para no romper
-            return None
+def _registro_out(r) -> dict:
+    av = _to_float(r.get("avance_pct"))
+    val = _to_float(r.get("valoracion"))
 
-    return None
+    p = _bool_or_none(r.get("presenta"))
+    c = _bool_or_none(r.get("categoria_si_no"))
+    if c is None and p is not None:
+        c = p
 
+    responsable = r.get("responsable")
+    responsable = str(responsable).strip() if responsable is not None else ""
 
-def _pick_responsable_mas_reciente(rows):
-    """
-    Escoge el responsable del registro con updated_at más reciente.
-    Si no puede parsear updated_at, cae al último responsable no vacío.
-    """
-    best = None  # (datetime, responsable)
-    last_non_empty = None
+    return {
+        "registro_id": r.get("registro_id"),
+        "evidencia_id": r.get("evidencia_id"),
+        "titulo": r.get("titulo"),
+        "orden": r.get("orden"),
+        "avance_pct": av,
+        "valoracion": val,
+        "presenta": p,
+        "categoria_si_no": c,
+        "responsable": responsable if responsable else None,
+        "fecha_inicio": r.get("fecha_inicio"),
+        "fecha_fin": r.get("fecha_fin"),
+        "updated_at": r.get("updated_at"),
+    }
 
-    for r in rows:
-        resp = (r.get("responsable") or "").strip() if r.get("responsable") is not None else ""
-        if resp:
-            last_non_empty = resp
 
-        u = _parse_dt(r.get("updated_at"))
-        if not u or not resp:
-            continue
+def _parse_csv(value: str | None) -> set:
+    if not value:
+        return set()
+    return {x.strip() for x in value.split(",") if x.strip()}
 
-        if best is None or u > best[0]:
-            best = (u, resp)
 
-    return best[1] if best else last_non_empty
+async def _live_kpis(ies_id: int, submodulo_id: int, db: AsyncSession):
+    """KPIs del par calculados por Postgres en 1 query (sin traer filas a Python)."""
+    res = await db.execute(
+        text(f"""
+        SELECT {_AGG_COLUMNS}
+        FROM evidencia_registro er
+        JOIN evidencia_item ei ON ei.id = er.evidencia_id
+        WHERE er.ies_id = :ies_id
+          AND er.submodulo_id = :submodulo_id
+        """),
+        {"ies_id": ies_id, "submodulo_id": submodulo_id},
+    )
+    row = res.mappings().first()
+    if not row or not row.get("evidencias_total"):
+        return None
+    return _kpis_from_agg_row(row)
 
 
-def _run_resumen(ies_id: int, submodulo_id: int, db: Session):
+async def _fetch_registros(ies_id: int, submodulo_id: int, db: AsyncSession):
     sql = text("""
         SELECT
             er.id              AS registro_id,
@@ -110,146 +109,721 @@ def _run_resumen(ies_id: int, submodulo_id: int, db: Session):
             er.updated_at      AS updated_at,
             ei.id              AS evidencia_id,
             ei.titulo          AS titulo,
-            ei.orden           AS orden,
-            ei.submodulo_id    AS submodulo_id
+            ei.orden           AS orden
         FROM evidencia_registro er
         JOIN evidencia_item ei ON ei.id = er.evidencia_id
         WHERE er.ies_id = :ies_id
-          AND ei.submodulo_id = :submodulo_id
+          AND er.submodulo_id = :submodulo_id
         ORDER BY ei.orden ASC, er.id ASC
     """)
+    res = await db.execute(sql, {"ies_id": ies_id, "submodulo_id": submodulo_id})
+    return [_registro_out(r) for r in res.mappings().all()]
 
+
+async def _run_resumen(
+    ies_id: int,
+    submodulo_id: int,
+    db: AsyncSession,
+    include_registros: bool = False,
+    fields: set | None = None,
+):
+    """
+    KPIs del par (IES, submódulo):
+    - lookup O(1) en resumen_rollup
+    - si el par aún no está en el rollup, 1 query de agregación en SQL
+    El detalle por registro ("registros") solo se arma si se pide.
+    """
     try:
-        rows = db.execute(sql, {"ies_id": ies_id, "submodulo_id": submodulo_id}).mappings().all()
+        kpis = await _read_rollup(ies_id, submodulo_id, db)
+        if kpis is None:
+            kpis = await _live_kpis(ies_id, submodulo_id, db)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error consultando resumen (JOIN evidencia_registro/evidencia_item): {str(e)}"
         )
 
-    if not rows:
+    if not kpis:
         raise HTTPException(
             status_code=404,
             detail="No hay evidencias registradas para esa IES y ese Submódulo."
         )
 
-    avances = []
-    valoraciones = []
-    fechas_inicio = []
-    fechas_fin = []
+    if fields:
+        kpis = {k: v for k, v in kpis.items() if k in fields}
+
+    out = {"ies_id": ies_id, "submodulo_id": submodulo_id}
+    out.update(kpis)
+
+    if include_registros:
+        try:
+            out["registros"] = await _fetch_registros(ies_id, submodulo_id, db)
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error consultando registros del resumen: {str(e)}"
+            )
+
+    return out
+
+
+# ============================================================
+# AGREGADOS EN SQL (cálculo "en vivo")
+# Mismas reglas que vw_resumen_rollup_live (ASTRA.sql):
+# - categoria_si_no usa presenta como proxy si viene NULL
+# - buckets de avance: 0_24 / 25_49 / 50_74 / 75_100 (+ mas_100 / sin_dato)
+# - responsable_mas_reciente = responsable no vacío con updated_at más reciente
+# ============================================================
+# Buckets de avance (una sola definición: _AGG_COLUMNS y la matriz)
+_AVANCE_BUCKETS = (
+    ("av_0_24", "er.avance_pct < 25"),
+    ("av_25_49", "er.avance_pct >= 25 AND er.avance_pct < 50"),
+    ("av_50_74", "er.avance_pct >= 50 AND er.avance_pct < 75"),
+    ("av_75_100", "er.avance_pct >= 75 AND er.avance_pct <= 100"),
+    ("av_mas_100", "er.avance_pct > 100"),
+    ("av_sin_dato", "er.avance_pct IS NULL"),
+)
+_AVANCE_BUCKETS_SQL = ",\n    ".join(
+    f"COUNT(er.id) FILTER (WHERE {pred}) AS {name}" for name, pred in _AVANCE_BUCKETS
+)
+
+_AGG_COLUMNS = f"""
+    COUNT(er.id)                                               AS evidencias_total,
+    AVG(er.avance_pct)::float                                  AS avance_promedio,
+    AVG(er.valoracion)::float                                  AS valoracion_promedio,
+    MIN(er.fecha_inicio)                                       AS fecha_inicio_min,
+    MAX(er.fecha_fin)                                          AS fecha_fin_max,
+    MAX(er.updated_at)                                         AS ultima_actualizacion,
+
+    COUNT(er.id) FILTER (WHERE er.presenta IS TRUE)            AS presenta_si,
+    COUNT(er.id) FILTER (WHERE er.presenta IS FALSE)           AS presenta_no,
+    COUNT(er.id) FILTER (WHERE er.presenta IS NULL)            AS presenta_sin_dato,
+
+    COUNT(er.id) FILTER (WHERE COALESCE(er.categoria_si_no, er.presenta) IS TRUE)  AS cat_si,
+    COUNT(er.id) FILTER (WHERE COALESCE(er.categoria_si_no, er.presenta) IS FALSE) AS cat_no,
+    COUNT(er.id) FILTER (WHERE COALESCE(er.categoria_si_no, er.presenta) IS NULL)  AS cat_sin_dato,
+
+    {_AVANCE_BUCKETS_SQL},
+
+    (ARRAY_AGG(btrim(er.responsable) ORDER BY er.updated_at DESC, ei.orden ASC, er.id ASC)
+        FILTER (WHERE btrim(er.responsable) <> ''))[1]        AS responsable_mas_reciente
+"""
+
+
+def _kpis_from_agg_row(r) -> dict:
+    """Convierte una fila de _AGG_COLUMNS al mismo shape de KPIs que _run_resumen."""
+    f_fin_max = r.get("fecha_fin_max")
+
+    return {
+        "evidencias_total": int(r.get("evidencias_total") or 0),
+        "avance_promedio": _to_float(r.get("avance_promedio")),
+        "valoracion_promedio": _to_float(r.get("valoracion_promedio")),
+        "fecha_inicio_min": r.get("fecha_inicio_min"),
+        "fecha_fin_max": f_fin_max,
+        "meses_para_finalizar": _meses_para_finalizar(f_fin_max),
+        "ultima_actualizacion": r.get("ultima_actualizacion"),
+        "presenta": {
+            "si": int(r.get("presenta_si") or 0),
+            "no": int(r.get("presenta_no") or 0),
+            "sin_dato": int(r.get("presenta_sin_dato") or 0),
+        },
+        "categoria_si_no": {
+            "si": int(r.get("cat_si") or 0),
+            "no": int(r.get("cat_no") or 0),
+            "sin_dato": int(r.get("cat_sin_dato") or 0),
+        },
+        "avance_rangos": {
+            "0_24": int(r.get("av_0_24") or 0),
+            "25_49": int(r.get("av_25_49") or 0),
+            "50_74": int(r.get("av_50_74") or 0),
+            "75_100": int(r.get("av_75_100") or 0),
+            "sin_dato": int(r.get("av_sin_dato") or 0),
+            "mas_100": int(r.get("av_mas_100") or 0),
+        },
+        "responsable_mas_reciente": r.get("responsable_mas_reciente"),
+    }
+
 
-    presenta_si = 0
-    presenta_no = 0
-    presenta_sin_dato = 0
+# ============================================================
+# ROLLUP (tabla resumen_rollup, mantenida por trigger en ASTRA.sql)
+# ============================================================
+_ROLLUP_FIELDS = (
+    "evidencias_total",
+    "avance_promedio",
+    "valoracion_promedio",
+    "fecha_inicio_min",
+    "fecha_fin_max",
+    "ultima_actualizacion",
+    "presenta_si",
+    "presenta_no",
+    "presenta_sin_dato",
+    "cat_si",
+    "cat_no",
+    "cat_sin_dato",
+    "av_0_24",
+    "av_25_49",
+    "av_50_74",
+    "av_75_100",
+    "av_mas_100",
+    "av_sin_dato",
+    "responsable_mas_reciente",
+)
+
+_ROLLUP_SELECT = ", ".join(f"rr.{c}" for c in _ROLLUP_FIELDS)
+
+
+async def _read_rollup(ies_id: int, submodulo_id: int, db: AsyncSession):
+    res = await db.execute(
+        text(f"""
+        SELECT {_ROLLUP_SELECT}
+        FROM resumen_rollup rr
+        WHERE rr.ies_id = :ies_id AND rr.submodulo_id = :submodulo_id
+        """),
+        {"ies_id": ies_id, "submodulo_id": submodulo_id},
+    )
+    row = res.mappings().first()
+    return _kpis_from_agg_row(row) if row else None
+
+
+async def rollup_validator(db: AsyncSession, ies_id: int, submodulo_id: int | None = None) -> str:
+    """
+    Huella barata de los registros de un par (ies, submódulo) o de toda la
+    IES, para ETag. resumen_rollup la mantienen los triggers y refreshed_at
+    cambia en cada escritura del par: es el contador de escrituras del scope.
+    Par = 1 lookup por PK; IES = rango por prefijo de PK (~33 filas).
+    Par sin fila en el rollup: _run_resumen responde con _live_kpis, así que
+    el validador sale de los mismos registros (conteo + último updated_at +
+    id máximo, por idx_registro_ies_submodulo).
+    """
+    if submodulo_id is not None:
+        params = {"ies_id": ies_id, "submodulo_id": submodulo_id}
+        row = (await db.execute(
+            text("""
+            SELECT evidencias_total, refreshed_at
+            FROM resumen_rollup
+            WHERE ies_id = :ies_id AND submodulo_id = :submodulo_id
+            """),
+            params,
+        )).first()
+        if row:
+            return f"{row[0]}@{row[1].isoformat()}"
+
+        row = (await db.execute(
+            text("""
+            SELECT COUNT(*), MAX(updated_at), MAX(id)
+            FROM evidencia_registro
+            WHERE ies_id = :ies_id AND submodulo_id = :submodulo_id
+            """),
+            params,
+        )).first()
+        return f"vivo:{row[0]}@{row[1].isoformat() if row[1] else ''}:{row[2] or ''}"
+
+    row = (await db.execute(
+        text("""
+        SELECT COUNT(*),
+               string_agg(submodulo_id::text || '@' || refreshed_at::text, ',' ORDER BY submodulo_id)
+        FROM resumen_rollup
+        WHERE ies_id = :ies_id
+        """),
+        {"ies_id": ies_id},
+    )).first()
+    return f"{row[0]}|{row[1] or ''}"
+
+
+def _resumen_etag(*parts) -> str:
+    # date.today(): meses_para_finalizar cambia con el día aunque no haya escrituras
+    return make_etag("|".join(str(p) for p in (*parts, date.today().isoformat())))
+
+
+def rebuild_rollup(db: Session) -> int:
+    """Recalcula resumen_rollup completo desde evidencia_registro."""
+    n = db.execute(text("SELECT resumen_rollup_rebuild()")).scalar()
+    db.commit()
+    return int(n or 0)
+
+
+def _same_value(a, b) -> bool:
+    if isinstance(a, float) or isinstance(b, float):
+        if a is None or b is None:
+            return a is b
+        return abs(float(a) - float(b)) < 1e-9
+    return a == b
+
+
+def check_rollup(db: Session, ies_id: int | None = None, max_detalle: int = 100) -> dict:
+    """
+    Compara resumen_rollup contra un recálculo en vivo (_AGG_COLUMNS).
+    Devuelve los pares faltantes/sobrantes y los campos que no cuadran.
+    """
+    where_live = "WHERE er.ies_id = :ies_id" if ies_id is not None else ""
+    where_rr = "WHERE rr.ies_id = :ies_id" if ies_id is not None else ""
+    params = {"ies_id": ies_id}
 
-    cat_si = 0
-    cat_no = 0
-    cat_sin_dato = 0
+    live = db.execute(
+        text(f"""
+        SELECT er.ies_id, ei.submodulo_id, {_AGG_COLUMNS}
+        FROM evidencia_registro er
+        JOIN evidencia_item ei ON ei.id = er.evidencia_id
+        {where_live}
+        GROUP BY er.ies_id, ei.submodulo_id
+        """),
+        params,
+    ).mappings().all()
+
+    rollup = db.execute(
+        text(f"SELECT rr.ies_id, rr.submodulo_id, {_ROLLUP_SELECT} FROM resumen_rollup rr {where_rr}"),
+        params,
+    ).mappings().all()
+
+    live_by_key = {(int(r["ies_id"]), int(r["submodulo_id"])): r for r in live}
+    rr_by_key = {(int(r["ies_id"]), int(r["submodulo_id"])): r for r in rollup}
+
+    faltantes = sorted(set(live_by_key) - set(rr_by_key))
+    sobrantes = sorted(set(rr_by_key) - set(live_by_key))
+
+    diferencias = []
+    for key in sorted(set(live_by_key) & set(rr_by_key)):
+        lv = live_by_key[key]
+        rv = rr_by_key[key]
+        campos = [c for c in _ROLLUP_FIELDS if not _same_value(lv[c], rv[c])]
+        if campos:
+            diferencias.append({"ies_id": key[0], "submodulo_id": key[1], "campos": campos})
+
+    return {
+        "ok": not faltantes and not sobrantes and not diferencias,
+        "pares_live": len(live_by_key),
+        "pares_rollup": len(rr_by_key),
+        "faltantes": [{"ies_id": i, "submodulo_id": s} for i, s in faltantes[:max_detalle]],
+        "sobrantes": [{"ies_id": i, "submodulo_id": s} for i, s in sobrantes[:max_detalle]],
+        "diferencias": diferencias[:max_detalle],
+        "total_faltantes": len(faltantes),
+        "total_sobrantes": len(sobrantes),
+        "total_diferencias": len(diferencias),
+    }
 
-    buckets = {"0_24": 0, "25_49": 0, "50_74": 0, "75_100": 0, "sin_dato": 0, "mas_100": 0}
-    registros_out = []
 
+# ============================================================
+# RESUMEN GENERAL (todas las celdas de una IES en 1 query)
+# ============================================================
+def _weighted_avg(items, key):
+    num = 0.0
+    den = 0
+    for it in items:
+        v = it.get(key)
+        n = it.get("evidencias_total") or 0
+        if v is None or not n:
+            continue
+        num += v * n
+        den += n
+    return (num / den) if den else None
+
+
+async def _run_resumen_ies(ies_id: int, db: AsyncSession):
+    sql = text(f"""
+        SELECT
+            sp.id     AS subprograma_id,
+            sp.nombre AS subprograma_nombre,
+            sp.orden  AS subprograma_orden,
+            sm.id     AS submodulo_id,
+            sm.nombre AS submodulo_nombre,
+            sm.orden  AS submodulo_orden,
+            {_ROLLUP_SELECT}
+        FROM submodulos sm
+        JOIN subprogramas sp ON sp.id = sm.subprograma_id
+        LEFT JOIN resumen_rollup rr ON rr.submodulo_id = sm.id AND rr.ies_id = :ies_id
+        ORDER BY sp.orden ASC, sm.orden ASC
+    """)
+
+    try:
+        rows = (await db.execute(sql, {"ies_id": ies_id})).mappings().all()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error consultando resumen general (resumen_rollup): {str(e)}"
+        )
+
+    subprogramas = []
+    by_sp = {}
     for r in rows:
-        av = _to_float(r.get("avance_pct"))
-        val = _to_float(r.get("valoracion"))
-
-        if av is not None:
-            avances.append(av)
-        if val is not None:
-            valoraciones.append(val)
-
-        fi = r.get("fecha_inicio")
-        ff = r.get("fecha_fin")
-        if fi is not None:
-            fechas_inicio.append(fi)
-        if ff is not None:
-            fechas_fin.append(ff)
-
-        p = _bool_or_none(r.get("presenta"))
-        c = _bool_or_none(r.get("categoria_si_no"))
-
-        # Compat: si categoria_si_no no existe, usa presenta como proxy
-        if c is None and p is not None:
-            c = p
-
-        if p is True:
-            presenta_si += 1
-        elif p is False:
-            presenta_no += 1
-        else:
-            presenta_sin_dato += 1
-
-        if c is True:
-            cat_si += 1
-        elif c is False:
-            cat_no += 1
-        else:
-            cat_sin_dato += 1
-
-        buckets[_bucket_avance(av)] += 1
-
-        responsable = r.get("responsable")
-        responsable = str(responsable).strip() if responsable is not None else ""
-
-        registros_out.append({
-            "registro_id": r.get("registro_id"),
-            "evidencia_id": r.get("evidencia_id"),
-            "titulo": r.get("titulo"),
-            "orden": r.get("orden"),
-            "avance_pct": av,
-            "valoracion": val,
-            "presenta": p,
-            "categoria_si_no": c,
-            "responsable": responsable if responsable else None,
-            "fecha_inicio": str(fi) if fi is not None else None,
-            "fecha_fin": str(ff) if ff is not None else None,
-            "updated_at": str(r.get("updated_at")) if r.get("updated_at") is not None else None,
-        })
-
-    total = len(rows)
-    avg_avance = (sum(avances) / len(avances)) if avances else None
-    avg_val = (sum(valoraciones) / len(valoraciones)) if valoraciones else None
-
-    f_inicio_min = min(fechas_inicio) if fechas_inicio else None
-    f_fin_max = max(fechas_fin) if fechas_fin else None
-
-    meses_para_finalizar = None
-    if f_fin_max is not None:
-        hoy = date.today()
-        fin = f_fin_max.date() if hasattr(f_fin_max, "date") else f_fin_max
-        meses_para_finalizar = (fin.year - hoy.year) * 12 + (fin.month - hoy.month)
-
-    responsable_mas_reciente = _pick_responsable_mas_reciente(rows)
+        sp_id = r.get("subprograma_id")
+        sp = by_sp.get(sp_id)
+        if sp is None:
+            sp = {
+                "subprograma_id": sp_id,
+                "nombre": r.get("subprograma_nombre"),
+                "orden": r.get("subprograma_orden"),
+                "submodulos": [],
+            }
+            by_sp[sp_id] = sp
+            subprogramas.append(sp)
+
+        item = {
+            "submodulo_id": r.get("submodulo_id"),
+            "nombre": r.get("submodulo_nombre"),
+            "orden": r.get("submodulo_orden"),
+        }
+        item.update(_kpis_from_agg_row(r))
+        sp["submodulos"].append(item)
+
+    # Agregado por subprograma (ponderado por nº de evidencias)
+    for sp in subprogramas:
+        subs = sp["submodulos"]
+        fechas_ult = [s["ultima_actualizacion"] for s in subs if s["ultima_actualizacion"]]
+        sp["evidencias_total"] = sum(s["evidencias_total"] for s in subs)
+        sp["avance_promedio"] = _weighted_avg(subs, "avance_promedio")
+        sp["valoracion_promedio"] = _weighted_avg(subs, "valoracion_promedio")
+        sp["ultima_actualizacion"] = max(fechas_ult) if fechas_ult else None
 
     return {
         "ies_id": ies_id,
-        "submodulo_id": submodulo_id,
-        "evidencias_total": total,
-        "avance_promedio": avg_avance,
-        "valoracion_promedio": avg_val,
-        "fecha_inicio_min": str(f_inicio_min) if f_inicio_min is not None else None,
-        "fecha_fin_max": str(f_fin_max) if f_fin_max is not None else None,
-        "meses_para_finalizar": meses_para_finalizar,
-        "presenta": {"si": presenta_si, "no": presenta_no, "sin_dato": presenta_sin_dato},
-        "categoria_si_no": {"si": cat_si, "no": cat_no, "sin_dato": cat_sin_dato},
-        "avance_rangos": buckets,
-        "responsable_mas_reciente": responsable_mas_reciente,
-        "registros": registros_out,
+        "evidencias_total": sum(sp["evidencias_total"] for sp in subprogramas),
+        "avance_promedio": _weighted_avg(subprogramas, "avance_promedio"),
+        "valoracion_promedio": _weighted_avg(subprogramas, "valoracion_promedio"),
+        "subprogramas": subprogramas,
     }
 
 
+async def _run_resumen_pares(pares: list) -> dict:
+    """
+    Celdas de varios pares (ies_id, submodulo_id) en 1 query, agrupadas por
+    IES, con el mismo shape que los submódulos de _run_resumen_ies (stream).
+    """
+    sql = text(f"""
+        SELECT
+            k.ies_id,
+            sm.subprograma_id AS subprograma_id,
+            sm.id             AS submodulo_id,
+            sm.nombre         AS submodulo_nombre,
+            sm.orden          AS submodulo_orden,
+            {_ROLLUP_SELECT}
+        FROM unnest(CAST(:ies AS integer[]), CAST(:sms AS integer[])) AS k(ies_id, submodulo_id)
+        JOIN submodulos sm ON sm.id = k.submodulo_id
+        LEFT JOIN resumen_rollup rr ON rr.ies_id = k.ies_id AND rr.submodulo_id = k.submodulo_id
+        ORDER BY k.ies_id, sm.id
+    """)
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            sql, {"ies": [p[0] for p in pares], "sms": [p[1] for p in pares]}
+        )).mappings().all()
+
+    out = {}
+    for r in rows:
+        item = {
+            "subprograma_id": r.get("subprograma_id"),
+            "submodulo_id": r.get("submodulo_id"),
+            "nombre": r.get("submodulo_nombre"),
+            "orden": r.get("submodulo_orden"),
+        }
+        item.update(_kpis_from_agg_row(r))
+        out.setdefault(int(r["ies_id"]), []).append(item)
+    return out
+
+
+# Una conexión LISTEN por worker, compartida por todos los streams
+# (y por la invalidación de la cache de resultados entre workers)
+eventos = ResumenEventos(_run_resumen_pares)
+eventos.al_cambiar(resumen_cache.invalidar)
+
+
+# ============================================================
+# GET condicional (ETag / If-None-Match): si el validador del scope no
+# cambió -> 304 sin armar la respuesta. Si no, el cuerpo sale de la
+# cache de resultados por (clave, ETag) (app/core/resumen_cache.py).
+# ============================================================
+async def _resumen_ies_conditional(ies_id: int, request: Request, db: AsyncSession):
+    etag = _resumen_etag(
+        "ies", ies_id, await rollup_validator(db, ies_id), await catalogo_validator(db),
+    )
+    cached = not_modified(request, etag, PRIVATE_REVALIDATE)
+    if cached is not None:
+        return cached
+    body = await resumen_cache.get_or_build(
+        ("resumen_ies", ies_id, None), etag, lambda: _run_resumen_ies(ies_id, db),
+    )
+    return cached_json(body, {"ETag": etag, **PRIVATE_REVALIDATE})
+
+
+async def _resumen_submodulo_conditional(
+    ies_id: int, submodulo_id: int, include: str | None, fields: str | None,
+    request: Request, db: AsyncSession,
+):
+    inc = _parse_csv(include)
+    flds = _parse_csv(fields)
+    etag = _resumen_etag(
+        "sm", ies_id, submodulo_id,
+        await rollup_validator(db, ies_id, submodulo_id),
+        await catalogo_validator(db, submodulo_id),
+        ",".join(sorted(inc)), ",".join(sorted(flds)),
+    )
+    cached = not_modified(request, etag, PRIVATE_REVALIDATE)
+    if cached is not None:
+        return cached
+    body = await resumen_cache.get_or_build(
+        ("resumen_sm", ies_id, submodulo_id, ",".join(sorted(inc)), ",".join(sorted(flds))),
+        etag,
+        lambda: _run_resumen(
+            ies_id, submodulo_id, db,
+            include_registros="registros" in inc or "registros" in flds,
+            fields=flds,
+        ),
+    )
+    return cached_json(body, {"ETag": etag, **PRIVATE_REVALIDATE})
+
+
+# ============================================================
+# ADMIN: resumen general de cualquier IES
+# GET /api/resumen/ies/{ies_id}
+# ============================================================
+@router.get("/ies/{ies_id}")
+async def resumen_ies_admin(
+    ies_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    _admin=Depends(require_admin),
+):
+    return await _resumen_ies_conditional(ies_id, request, db)
+
+
+# ============================================================
+# IES: resumen general de SU propia IES
+# GET /api/resumen/mio
+# ============================================================
+@router.get("/mio")
+async def resumen_ies_mio(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    user: Usuario = Depends(require_ies_user),
+):
+    if not user or not getattr(user, "ies_id", None):
+        raise HTTPException(status_code=401, detail="Usuario IES sin ies_id válido.")
+    return await _resumen_ies_conditional(int(user.ies_id), request, db)
+
+
+# ============================================================
+# STREAM (SSE): celdas del resumen general que cambian
+# GET /api/resumen/stream?ies_id=
+# - admin: cualquier IES (ies_id obligatorio); IES: solo la suya
+# - event: resumen -> {"ies_id", "submodulos": [celdas como en /ies/{id}]}
+# - event: resync  -> se perdieron avisos: recargar /api/resumen/ies/{id}
+# - ": ping" cada SSE_HEARTBEAT_S (proxies + detectar clientes idos)
+# ============================================================
+SSE_HEARTBEAT_S = 15
+
+
+async def _sse(request: Request, ies_id: int):
+    q = eventos.suscribir(ies_id)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                tipo, data = await asyncio.wait_for(q.get(), SSE_HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            yield f"event: {tipo}\ndata: {dumps(data).decode('utf-8')}\n\n"
+    finally:
+        eventos.desuscribir(ies_id, q)
+
+
+@router.get("/stream")
+async def resumen_stream(
+    request: Request,
+    ies_id: int | None = Query(default=None),
+    user: Usuario = Depends(get_current_user_stream),
+):
+    rol = (user.rol or "").lower()
+    if rol == "admin":
+        if ies_id is None:
+            raise HTTPException(status_code=400, detail="Falta ies_id.")
+    elif rol in ("ies", "cliente") and user.ies_id is not None:
+        if ies_id is not None and ies_id != int(user.ies_id):
+            raise HTTPException(status_code=403, detail="No autorizado para esa IES")
+        ies_id = int(user.ies_id)
+    else:
+        raise HTTPException(status_code=403, detail="Requiere rol admin o IES")
+
+    return StreamingResponse(
+        _sse(request, ies_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ============================================================
+# MATRIZ IES × SUBMÓDULO (comparativo CEDEPRO)
+# Formato columnar: por cada métrica una lista por IES, alineada con
+# "submodulos.id" (celda sin registros => None / 0).
+# ============================================================
+_MATRIZ_METRICAS = (
+    "evidencias_total",
+    "avance_promedio",
+    "valoracion_promedio",
+    "presenta_si",
+    "presenta_no",
+    "av_0_24",
+    "av_25_49",
+    "av_50_74",
+    "av_75_100",
+    "av_mas_100",
+    "av_sin_dato",
+)
+
+_MATRIZ_PROMEDIOS = ("avance_promedio", "valoracion_promedio")
+
+
+async def _run_matriz(db: AsyncSession, subprograma_id: int | None, after_ies_id: int, limit: int):
+    sm_where = "WHERE sm.subprograma_id = :sp" if subprograma_id is not None else ""
+    params = {"sp": subprograma_id, "after": after_ies_id, "lim": limit + 1}
+
+    submodulos = (await db.execute(
+        text(f"""
+        SELECT sm.id, sm.nombre, sm.subprograma_id
+        FROM submodulos sm
+        JOIN subprogramas sp ON sp.id = sm.subprograma_id
+        {sm_where}
+        ORDER BY sp.orden ASC, sm.orden ASC
+        """),
+        params,
+    )).mappings().all()
+
+    # Keyset sobre ies.id (pedimos limit+1 para saber si hay siguiente página)
+    ies_rows = (await db.execute(
+        text("SELECT id, slug, nombre FROM ies WHERE id > :after ORDER BY id ASC LIMIT :lim"),
+        params,
+    )).mappings().all()
+
+    has_more = len(ies_rows) > limit
+    ies_rows = ies_rows[:limit]
+
+    sm_ids = [int(r["id"]) for r in submodulos]
+    ies_ids = [int(r["id"]) for r in ies_rows]
+
+    matriz = {
+        m: [[(None if m in _MATRIZ_PROMEDIOS else 0)] * len(sm_ids) for _ in ies_ids]
+        for m in _MATRIZ_METRICAS
+    }
+
+    if sm_ids and ies_ids:
+        er_where = "AND er.submodulo_id IN (SELECT id FROM submodulos WHERE subprograma_id = :sp)" \
+            if subprograma_id is not None else ""
+        params["ies_min"] = ies_ids[0]
+        params["ies_max"] = ies_ids[-1]
+
+        try:
+            cells = (await db.execute(
+                text(f"""
+                SELECT
+                    er.ies_id,
+                    er.submodulo_id,
+                    COUNT(*)                                         AS evidencias_total,
+                    ROUND(AVG(er.avance_pct), 2)::float              AS avance_promedio,
+                    ROUND(AVG(er.valoracion), 2)::float              AS valoracion_promedio,
+                    COUNT(*) FILTER (WHERE er.presenta IS TRUE)      AS presenta_si,
+                    COUNT(*) FILTER (WHERE er.presenta IS FALSE)     AS presenta_no,
+                    {_AVANCE_BUCKETS_SQL}
+                FROM evidencia_registro er
+                WHERE er.ies_id BETWEEN :ies_min AND :ies_max
+                  {er_where}
+                GROUP BY er.ies_id, er.submodulo_id
+                """),
+                params,
+            )).mappings().all()
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error consultando matriz IES × submódulo: {str(e)}"
+            )
+
+        ies_idx = {v: i for i, v in enumerate(ies_ids)}
+        sm_idx = {v: j for j, v in enumerate(sm_ids)}
+
+        for c in cells:
+            i = ies_idx.get(int(c["ies_id"]))
+            j = sm_idx.get(int(c["submodulo_id"]))
+            if i is None or j is None:
+                continue
+            for m in _MATRIZ_METRICAS:
+                matriz[m][i][j] = c[m]
+
+    return {
+        "subprograma_id": subprograma_id,
+        "submodulos": {
+            "id": sm_ids,
+            "nombre": [r["nombre"] for r in submodulos],
+            "subprograma_id": [int(r["subprograma_id"]) for r in submodulos],
+        },
+        "ies": {
+            "id": ies_ids,
+            "slug": [r["slug"] for r in ies_rows],
+            "nombre": [r["nombre"] for r in ies_rows],
+        },
+        "metricas": list(_MATRIZ_METRICAS),
+        "matriz": matriz,
+        "next_after_ies_id": ies_ids[-1] if (has_more and ies_ids) else None,
+    }
+
+
+# ============================================================
+# ADMIN: matriz comparativa IES × submódulo (paginada por IES)
+# GET /api/resumen/matriz?subprograma_id=&after_ies_id=&limit=
+# ============================================================
+@router.get("/matriz")
+async def resumen_matriz_admin(
+    subprograma_id: int | None = Query(default=None),
+    after_ies_id: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_read_db),
+    _admin=Depends(require_admin),
+):
+    return JSONUTF8Response(await _run_matriz(db, subprograma_id, after_ies_id, limit))
+
+
+# ============================================================
+# ADMIN: mantenimiento del rollup
+# POST /api/resumen/rollup/rebuild
+# GET  /api/resumen/rollup/check?ies_id=
+# ============================================================
+@router.post("/rollup/rebuild")
+def resumen_rollup_rebuild(
+    db: Session = Depends(get_db),
+    _admin=Depends(require_admin),
+):
+    try:
+        n = rebuild_rollup(db)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error reconstruyendo resumen_rollup: {str(e)}")
+    return {"ok": True, "pares": n}
+
+
+@router.get("/rollup/check")
+def resumen_rollup_check(
+    ies_id: int | None = Query(default=None),
+    db: Session = Depends(get_db),
+    _admin=Depends(require_admin),
+):
+    return check_rollup(db, ies_id=ies_id)
+
+
 # ============================================================
 # ADMIN: puede ver cualquier IES (seleccionada)
 # GET /api/resumen/submodulo/{ies_id}/{submodulo_id}
 # ============================================================
 @router.get("/submodulo/{ies_id}/{submodulo_id}")
-def resumen_submodulo_admin(
+async def resumen_submodulo_admin(
     ies_id: int,
     submodulo_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    include: str | None = Query(default=None, description="registros"),
+    fields: str | None = Query(default=None, description="KPIs a devolver, separados por coma"),
+    db: AsyncSession = Depends(get_async_read_db),
     _admin=Depends(require_admin),
 ):
-    return _run_resumen(ies_id, submodulo_id, db)
+    return await _resumen_submodulo_conditional(
+        ies_id, submodulo_id, include, fields, request, db
+    )
 
 
 # ============================================================
@@ -257,11 +831,16 @@ def resumen_submodulo_admin(
 # GET /api/resumen/mio/submodulo/{submodulo_id}
 # ============================================================
 @router.get("/mio/submodulo/{submodulo_id}")
-def resumen_submodulo_mio(
+async def resumen_submodulo_mio(
     submodulo_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    include: str | None = Query(default=None, description="registros"),
+    fields: str | None = Query(default=None, description="KPIs a devolver, separados por coma"),
+    db: AsyncSession = Depends(get_async_read_db),
     user: Usuario = Depends(require_ies_user),
 ):
     if not user or not getattr(user, "ies_id", None):
         raise HTTPException(status_code=401, detail="Usuario IES sin ies_id válido.")
-    return _run_resumen(int(user.ies_id), submodulo_id, db)
+    return await _resumen_submodulo_conditional(
+        int(user.ies_id), submodulo_id, include, fields, request, db
+    )
@@ -60,18 +60,18 @@ SUBMODULOS = [
 
 @router.post("/catalogo")
 def seed_catalogo(db: Session = Depends(get_db)):
-    # subprogramas
+    # subprogramas (ids existentes en 1 query, no 1 por fila)
+    existentes = set(db.execute(select(Subprograma.id)).scalars())
     for (id_, nombre, slug, orden) in SUBPROGRAMAS:
-        exists = db.execute(select(Subprograma).where(Subprograma.id == id_)).scalar_one_or_none()
-        if not exists:
+        if id_ not in existentes:
             db.add(Subprograma(id=id_, nombre=nombre, slug=slug, orden=orden))
 
     db.commit()
 
     # submodulos
+    existentes = set(db.execute(select(Submodulo.id)).scalars())
     for (id_, subprograma_id, nombre, slug, orden) in SUBMODULOS:
-        exists = db.execute(select(Submodulo).where(Submodulo.id == id_)).scalar_one_or_none()
-        if not exists:
+        if id_ not in existentes:
             db.add(Submodulo(id=id_, subprograma_id=subprograma_id, nombre=nombre, slug=slug, orden=orden))
 
     db.commit()
@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
 from app.db.session import get_db
-from app.core.security import hash_password
+from app.core.hashing import hash_password_pooled
 from app.models.usuarios import Usuario
 
 router = APIRouter(prefix="/seed", tags=["seed"])
@@ -27,7 +27,7 @@ def seed_admin(db: Session = Depends(get_db)):
     u = Usuario(
         email=email,
         username=username,
-        password_hash=hash_password(password),
+        password_hash=hash_password_pooled(password),
         rol="admin",       # ✅ correcto
         ies_id=None,
         is_active=True,
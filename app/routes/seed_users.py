@@ -4,7 +4,7 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.db.session import get_db
-from app.core.security import hash_password
+from app.core.hashing import hash_password_pooled
 from app.models.usuarios import Usuario
 from app.models.ies import IES  # ajusta si tu modelo se llama distinto
 
@@ -34,7 +34,7 @@ def seed_ies_user(payload: SeedIesUserIn, db: Session = Depends(get_db)):
     u = Usuario(
         email=email,
         username=(payload.username or email.split("@")[0]),
-        password_hash=hash_password(payload.password),
+        password_hash=hash_password_pooled(payload.password),
         rol=payload.rol,
         ies_id=ies.id,
         is_active=True,
@@ -1,30 +1,79 @@
 # routes/ui.py
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+import gzip
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import RedirectResponse
 from pathlib import Path
 
+from app.core.assets import manifest_version, pick_image_format, render_html
+from app.core.http_cache import make_etag, not_modified
+
 router = APIRouter()
 
 BASE_DIR = Path(__file__).resolve().parents[1]  # .../app
 HTML_DIR = BASE_DIR / "static" / "html"
 
-def _read_html(name: str) -> str:
+# ============================================================
+# HTML shell en memoria (render_html: bundles + imágenes optimizadas)
+# (archivo, formato de imagen) -> ((mtime, mtime manifest), html, html.gz, etag)
+# Se re-renderiza solo si cambió el archivo o el manifest de assets
+# (build_assets.py de nuevo -> otros nombres con hash). Revalidación
+# siempre (no-cache): una visita repetida = un 304 chico; los assets
+# con hash se sirven inmutables desde /static/dist.
+# ============================================================
+_SHELL_HEADERS = {"Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+
+_shells = {}
+
+
+def _read_html(name: str, accept: str | None) -> tuple:
     p = HTML_DIR / name
-    if not p.exists():
+    try:
+        mtime = p.stat().st_mtime_ns
+    except FileNotFoundError:
         raise HTTPException(
             status_code=404,
             detail=f"Archivo HTML no encontrado: {p}"
         )
-    return p.read_text(encoding="utf-8")
+
+    version = (mtime, manifest_version())
+    key = (name, pick_image_format(accept))
+    hit = _shells.get(key)
+    if hit and hit[0] == version:
+        return hit
+
+    body = render_html(p.read_text(encoding="utf-8"), accept).encode("utf-8")
+    hit = (version, body, gzip.compress(body, compresslevel=6, mtime=0), make_etag(body))
+    _shells[key] = hit
+    return hit
+
+
+def _html_page(request: Request, name: str) -> Response:
+    _, body, body_gz, etag = _read_html(name, request.headers.get("accept"))
+
+    headers = dict(_SHELL_HEADERS)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        # ETag fuerte distinto por representación
+        etag = etag[:-1] + '-gz"'
+        headers["Content-Encoding"] = "gzip"
+        body = body_gz
+
+    cached = not_modified(request, etag, _SHELL_HEADERS)
+    if cached is not None:
+        return cached
+
+    headers["ETag"] = etag
+    return Response(body, media_type="text/html; charset=utf-8", headers=headers)
+
 
 @router.get("/", include_in_schema=False)
 def root():
     return RedirectResponse(url="/login")
 
-@router.get("/login", response_class=HTMLResponse, include_in_schema=False)
-def login_page():
-    return HTMLResponse(_read_html("login.html"))
+@router.get("/login", include_in_schema=False)
+def login_page(request: Request):
+    return _html_page(request, "login.html")
 
-@router.get("/app", response_class=HTMLResponse, include_in_schema=False)
-def app_page():
-    return HTMLResponse(_read_html("index.html"))
+@router.get("/app", include_in_schema=False)
+def app_page(request: Request):
+    return _html_page(request, "index.html")
@@ -1,6 +1,6 @@
 # app/schemas/operacion.py
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import date
 
 class EvidenciaUpdate(BaseModel):
@@ -11,3 +11,11 @@ class EvidenciaUpdate(BaseModel):
     fecha_fin: Optional[date] = None
     avance_pct: Optional[int] = Field(default=None, ge=0, le=100)
     categoria_si_no: Optional[bool] = None
+
+
+class EvidenciaBatchItem(EvidenciaUpdate):
+    evidencia_id: int
+
+
+class EvidenciaBatchIn(BaseModel):
+    items: List[EvidenciaBatchItem] = Field(min_length=1, max_length=500)
@@ -0,0 +1,508 @@
+# app/services/importar_registros.py
+import codecs
+import csv
+import io
+import re
+from datetime import date, datetime
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.resumen_cache import resumen_cache
+
+# ============================================================
+# Import masivo de evidencia_registro (CSV / XLSX)
+#
+# 1) El archivo se lee por filas (CSV en streaming, XLSX read_only) y se
+#    normaliza en Python SOLO el formato (enteros, fechas, SI/NO).
+# 2) COPY a una tabla temporal (_import_registros, ON COMMIT DROP).
+# 3) Validación en SQL contra las mismas reglas de la tabla:
+#    ck_avance_0_100, ck_valoracion_0_100, ck_fechas_ok, evidencia del
+#    catálogo, IES existente y filas repetidas -> reporte por fila.
+# 4) Un solo INSERT ... ON CONFLICT (ies_id, evidencia_id) DO UPDATE.
+#    El trigger del rollup recalcula todos los pares en un refresh.
+#
+# Columnas: las del export (/admin/export/registros.*) sirven tal cual.
+# - evidencia_id obligatoria; ies_id / ies_slug si el import es cross-IES.
+# - Solo se actualizan los campos cuya columna viene en el archivo.
+# - Celda vacía: NULL en campos opcionales; en presenta / valoracion /
+#   avance_pct (NOT NULL) se conserva el valor actual (o el default).
+# ============================================================
+
+MAX_ERRORES_REPORTE = 1000
+
+# campo -> tipo SQL en la tabla temporal
+_CAMPOS = {
+    "presenta": "boolean",
+    "valoracion": "integer",
+    "responsable": "text",
+    "fecha_inicio": "date",
+    "fecha_fin": "date",
+    "avance_pct": "integer",
+    "categoria_si_no": "boolean",
+}
+
+# NOT NULL en evidencia_registro -> default si la fila es nueva
+_DEFAULTS_NOT_NULL = {"presenta": "FALSE", "valoracion": "0", "avance_pct": "0"}
+
+_RESPONSABLE_MAX = 255  # VARCHAR(255)
+
+_SI = {"si", "sí", "s", "true", "t", "verdadero", "1", "x", "yes", "y"}
+_NO = {"no", "n", "false", "f", "falso", "0"}
+
+_RE_FECHA_DMY = re.compile(r"^(\d{1,2})[/-](\d{1,2})[/-](\d{4})$")
+
+
+class ArchivoInvalido(ValueError):
+    """Archivo ilegible o sin las columnas mínimas (error de todo el import)."""
+
+
+# -------------------------
+# Normalización de formato (por celda)
+# -------------------------
+def _vacio(v) -> bool:
+    return v is None or (isinstance(v, str) and not v.strip())
+
+
+def _to_int(v) -> int:
+    if isinstance(v, bool):
+        raise ValueError
+    if isinstance(v, float):
+        if not v.is_integer():
+            raise ValueError
+        v = int(v)
+    if isinstance(v, int):
+        if abs(v) >= 2**31:
+            raise ValueError
+        return v
+    s = str(v).strip().rstrip("%").strip().replace(",", ".")
+    f = float(s)
+    if not f.is_integer() or abs(f) >= 2**31:
+        raise ValueError
+    return int(f)
+
+
+def _to_bool(v) -> bool:
+    if isinstance(v, bool):
+        return v
+    if isinstance(v, (int, float)) and v in (0, 1):
+        return bool(v)
+    s = str(v).strip().lower()
+    if s in _SI:
+        return True
+    if s in _NO:
+        return False
+    raise ValueError
+
+
+def _to_date(v) -> date:
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    s = str(v).strip()
+    m = _RE_FECHA_DMY.match(s)
+    if m:
+        return date(int(m.group(3)), int(m.group(2)), int(m.group(1)))
+    # ISO (también el datetime ISO que escribe el export)
+    return date.fromisoformat(s[:10])
+
+
+# El export CSV (admin_export._csv_value) antepone ' al texto que Excel
+# tomaría como fórmula; se quita al importar un CSV para que el ida y
+# vuelta export -> import no altere el valor. El XLSX no lleva la marca.
+_FORMULA_PREFIX = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _to_text(v, guarda_formula: bool = False) -> str:
+    s = str(v).strip()
+    if guarda_formula and s.startswith("'") and s[1:].lstrip("'").startswith(_FORMULA_PREFIX):
+        return s[1:]
+    return s
+
+
+_PARSERS = {"integer": _to_int, "boolean": _to_bool, "date": _to_date}
+_FORMATO = {"integer": "no es un entero", "boolean": "no es SI/NO", "date": "no es una fecha válida"}
+
+
+def _copy_value(v):
+    if v is None:
+        return None
+    if isinstance(v, bool):
+        return "t" if v else "f"
+    if isinstance(v, date):
+        return v.isoformat()
+    return v
+
+
+# -------------------------
+# Lectura del archivo
+# -------------------------
+def _header_key(v) -> str:
+    return re.sub(r"\s+", "_", str(v or "").strip().lower())
+
+
+def _rows_csv(fileobj):
+    # UTF-8 con o sin BOM (el export escribe BOM para Excel)
+    stream = codecs.getreader("utf-8-sig")(fileobj)
+
+    try:
+        first = stream.readline()
+    except UnicodeDecodeError:
+        raise ArchivoInvalido("El CSV debe estar en UTF-8 (Excel: 'CSV UTF-8')")
+    if not first:
+        raise ArchivoInvalido("Archivo vacío")
+    # Separador: el que más aparece en el encabezado (Excel en español usa ;)
+    sep = ";" if first.count(";") > first.count(",") else ","
+
+    yield next(csv.reader([first], delimiter=sep))
+    try:
+        yield from csv.reader(stream, delimiter=sep)
+    except UnicodeDecodeError:
+        raise ArchivoInvalido("El CSV debe estar en UTF-8 (Excel: 'CSV UTF-8')")
+
+
+def _rows_xlsx(fileobj):
+    from openpyxl import load_workbook
+
+    try:
+        wb = load_workbook(fileobj, read_only=True, data_only=True)
+    except Exception as e:
+        raise ArchivoInvalido(f"XLSX inválido: {e}")
+    try:
+        # Solo la primera hoja: fila del reporte = fila de Excel
+        yield from wb.worksheets[0].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _iter_rows(fileobj, filename: str):
+    name = (filename or "").lower()
+    if name.endswith(".xlsx"):
+        return _rows_xlsx(fileobj)
+    if name.endswith(".csv") or name.endswith(".txt"):
+        return _rows_csv(fileobj)
+    raise ArchivoInvalido("Formato no soportado (usa .csv o .xlsx)")
+
+
+class _CopySource:
+    """Adaptador iterador -> archivo (read) para cursor.copy_expert."""
+
+    def __init__(self, lines):
+        self._lines = lines
+        self._buf = ""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buf) < size:
+            chunk = next(self._lines, None)
+            if chunk is None:
+                break
+            self._buf += chunk
+        if size < 0:
+            out, self._buf = self._buf, ""
+        else:
+            out, self._buf = self._buf[:size], self._buf[size:]
+        return out
+
+
+def _copy_lines(rows, idx: dict, campos: list[str], stats: dict, guarda_formula: bool = False):
+    """Filas del archivo -> líneas CSV para COPY (fila, ies_id, ies_slug, evidencia_id, campos..., error_formato)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    n = 0
+
+    for fila, row in enumerate(rows, start=2):  # fila 1 = encabezado
+        cell = lambda k: row[idx[k]] if (k in idx and idx[k] < len(row)) else None  # noqa: E731
+
+        valores = [cell(k) for k in ("ies_id", "ies_slug", "evidencia_id", *campos)]
+        if all(_vacio(v) for v in valores):
+            continue  # filas en blanco (típicas al final de un Excel)
+
+        errores = []
+        out = [fila]
+
+        for k, tipo in (("ies_id", "integer"), ("ies_slug", "text"), ("evidencia_id", "integer"),
+                        *((c, _CAMPOS[c]) for c in campos)):
+            v = cell(k)
+            if _vacio(v):
+                out.append(None)
+                continue
+            if tipo == "text":
+                out.append(_to_text(v, guarda_formula))
+                continue
+            try:
+                out.append(_copy_value(_PARSERS[tipo](v)))
+            except (ValueError, TypeError, OverflowError):
+                errores.append(f"{k}: '{v}' {_FORMATO[tipo]}")
+                out.append(None)
+
+        out.append("; ".join(errores) or None)
+        writer.writerow(out)
+        n += 1
+
+        if n % 1000 == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
+
+    stats["filas"] = n
+    tail = buf.getvalue()
+    if tail:
+        yield tail
+
+
+# -------------------------
+# Validación + merge en SQL
+# -------------------------
+def _validar(db: Session, ies_id: int | None, ies_slug: str | None, campos: list[str]):
+    q = lambda sql, **p: db.execute(text(sql), p)  # noqa: E731
+
+    if ies_id is not None:
+        # Import de una IES: filas de otra IES son error (no se reasignan)
+        q("""
+        UPDATE _import_registros SET
+          ies_real = :ies_id,
+          errores = CASE
+            WHEN (ies_id IS NOT NULL AND ies_id <> :ies_id)
+              OR (ies_slug IS NOT NULL AND ies_slug <> :ies_slug)
+            THEN errores || 'Fila de otra IES'::text
+            ELSE errores END
+        """, ies_id=ies_id, ies_slug=ies_slug)
+    else:
+        q("UPDATE _import_registros s SET ies_real = i.id FROM ies i WHERE i.id = s.ies_id")
+        q("""
+        UPDATE _import_registros s SET ies_real = i.id
+        FROM ies i
+        WHERE s.ies_id IS NULL AND i.slug = s.ies_slug
+        """)
+        q("""
+        UPDATE _import_registros s SET errores = errores || 'ies_id no coincide con ies_slug'::text
+        FROM ies i
+        WHERE i.id = s.ies_real AND s.ies_slug IS NOT NULL AND i.slug <> s.ies_slug
+        """)
+        q("""
+        UPDATE _import_registros SET errores = errores || (
+          CASE WHEN ies_id IS NULL AND ies_slug IS NULL THEN 'Falta ies_id / ies_slug'
+               ELSE 'IES no existe' END
+        )
+        WHERE ies_real IS NULL
+        """)
+
+    # Catálogo
+    q("""
+    UPDATE _import_registros s SET submodulo_id = ei.submodulo_id
+    FROM evidencia_item ei
+    WHERE ei.id = s.evidencia_id
+    """)
+    q("""
+    UPDATE _import_registros SET errores = errores || (
+      CASE WHEN evidencia_id IS NULL THEN 'Falta evidencia_id'
+           ELSE 'Evidencia no existe en el catálogo' END
+    )
+    WHERE submodulo_id IS NULL
+      AND NOT (evidencia_id IS NULL AND COALESCE(error_formato, '') LIKE '%evidencia_id:%')
+    """)
+
+    # Valores actuales: completan NOT NULL vacíos y las fechas que no vienen
+    # en el archivo (ck_fechas_ok se evalúa sobre el registro resultante)
+    completar = [f"{c} = COALESCE(s.{c}, er.{c})" for c in campos if c in _DEFAULTS_NOT_NULL]
+    completar += [f"{c} = er.{c}" for c in ("fecha_inicio", "fecha_fin") if c not in campos]
+    if completar:
+        q(f"""
+        UPDATE _import_registros s SET {", ".join(completar)}
+        FROM evidencia_registro er
+        WHERE er.ies_id = s.ies_real AND er.evidencia_id = s.evidencia_id
+        """)
+    defaults = [f"{c} = COALESCE({c}, {d})" for c, d in _DEFAULTS_NOT_NULL.items() if c in campos]
+    if defaults:
+        q(f"UPDATE _import_registros SET {', '.join(defaults)}")
+
+    # Repetidas (misma IES + evidencia): ninguna gana, todas son error
+    q("""
+    UPDATE _import_registros s SET errores = s.errores || ('Evidencia repetida en filas ' || d.filas)
+    FROM (
+      SELECT ies_real, evidencia_id, string_agg(fila::text, ', ' ORDER BY fila) AS filas
+      FROM _import_registros
+      WHERE ies_real IS NOT NULL AND evidencia_id IS NOT NULL
+      GROUP BY ies_real, evidencia_id
+      HAVING COUNT(*) > 1
+    ) d
+    WHERE d.ies_real = s.ies_real AND d.evidencia_id = s.evidencia_id
+    """)
+
+    # Formato + constraints de evidencia_registro
+    q("""
+    UPDATE _import_registros SET errores =
+      CASE WHEN error_formato IS NULL THEN '{}'::text[] ELSE ARRAY[error_formato] END
+      || errores
+      || array_remove(ARRAY[
+        CASE WHEN valoracion NOT BETWEEN 0 AND 100
+             THEN 'valoracion fuera de 0..100 (ck_valoracion_0_100)' END,
+        CASE WHEN avance_pct NOT BETWEEN 0 AND 100
+             THEN 'avance_pct fuera de 0..100 (ck_avance_0_100)' END,
+        CASE WHEN fecha_inicio > fecha_fin
+             THEN 'fecha_inicio posterior a fecha_fin (ck_fechas_ok)' END,
+        CASE WHEN length(responsable) > :resp_max
+             THEN 'responsable supera ' || :resp_max || ' caracteres' END
+      ], NULL)
+    WHERE error_formato IS NOT NULL
+       OR cardinality(errores) > 0
+       OR valoracion NOT BETWEEN 0 AND 100
+       OR avance_pct NOT BETWEEN 0 AND 100
+       OR fecha_inicio > fecha_fin
+       OR length(responsable) > :resp_max
+    """, resp_max=_RESPONSABLE_MAX)
+
+
+def _merge(db: Session, campos: list[str]) -> dict:
+    insert_cols = ", ".join(["ies_id", "submodulo_id", "evidencia_id", *campos])
+    select_cols = ", ".join(["s.ies_real", "s.submodulo_id", "s.evidencia_id", *[f"s.{c}" for c in campos]])
+    set_cols = ", ".join(f"{c} = EXCLUDED.{c}" for c in campos)
+
+    r = db.execute(text(f"""
+    WITH up AS (
+      INSERT INTO evidencia_registro AS er ({insert_cols})
+      SELECT {select_cols}
+      FROM _import_registros s
+      WHERE cardinality(s.errores) = 0
+      ORDER BY s.ies_real, s.evidencia_id
+      ON CONFLICT (ies_id, evidencia_id) DO UPDATE SET {set_cols}
+      RETURNING (er.created_at = LOCALTIMESTAMP) AS creado  -- como en operacion.py
+    )
+    SELECT COUNT(*) FILTER (WHERE creado) AS creados,
+           COUNT(*) FILTER (WHERE NOT creado) AS actualizados
+    FROM up
+    """)).mappings().one()
+    return {"creados": int(r["creados"]), "actualizados": int(r["actualizados"])}
+
+
+def importar_registros(
+    db: Session,
+    fileobj,
+    filename: str,
+    ies_id: int | None = None,
+    ies_slug: str | None = None,
+    dry_run: bool = False,
+    parcial: bool = False,
+) -> dict:
+    """
+    Importa un CSV/XLSX a evidencia_registro.
+    - ies_id/ies_slug: fija la IES (usuario IES o admin por slug);
+      None = cross-IES, cada fila trae ies_id o ies_slug.
+    - dry_run: solo valida (rollback).
+    - parcial: aplica las filas válidas aunque otras tengan error
+      (default: todo o nada).
+    Hace commit/rollback. Lanza ArchivoInvalido si el archivo no sirve.
+    """
+    rows = _iter_rows(fileobj, filename)
+    header = next(rows, None)
+    if not header:
+        raise ArchivoInvalido("Archivo vacío")
+
+    idx = {}
+    for i, h in enumerate(header):
+        idx.setdefault(_header_key(h), i)
+
+    if "evidencia_id" not in idx:
+        raise ArchivoInvalido("Falta la columna evidencia_id")
+    if ies_id is None and "ies_id" not in idx and "ies_slug" not in idx:
+        raise ArchivoInvalido("Falta la columna ies_id o ies_slug (import cross-IES)")
+
+    campos = [c for c in _CAMPOS if c in idx]
+    if not campos:
+        raise ArchivoInvalido(f"No hay columnas para actualizar (usa: {', '.join(_CAMPOS)})")
+
+    staging_cols = ", ".join(f"{c} {t}" for c, t in _CAMPOS.items())
+    copy_cols = ", ".join(["fila", "ies_id", "ies_slug", "evidencia_id", *campos, "error_formato"])
+
+    try:
+        db.execute(text(f"""
+        CREATE TEMP TABLE _import_registros (
+          fila          INTEGER NOT NULL,
+          ies_id        INTEGER,
+          ies_slug      TEXT,
+          evidencia_id  BIGINT,
+          {staging_cols},
+          error_formato TEXT,
+          ies_real      INTEGER,
+          submodulo_id  INTEGER,
+          errores       TEXT[] NOT NULL DEFAULT '{{}}'
+        ) ON COMMIT DROP
+        """))
+
+        stats = {"filas": 0}
+        cur = db.connection().connection.cursor()
+        try:
+            cur.copy_expert(
+                f"COPY _import_registros ({copy_cols}) FROM STDIN WITH (FORMAT csv)",
+                _CopySource(_copy_lines(rows, idx, campos, stats,
+                                        guarda_formula=not filename.lower().endswith(".xlsx"))),
+            )
+        finally:
+            cur.close()
+
+        db.execute(text("ANALYZE _import_registros"))
+        _validar(db, ies_id, ies_slug, campos)
+
+        n_err = db.execute(text(
+            "SELECT COUNT(*) FROM _import_registros WHERE cardinality(errores) > 0"
+        )).scalar_one()
+        errores = db.execute(text("""
+        SELECT fila, evidencia_id, errores
+        FROM _import_registros
+        WHERE cardinality(errores) > 0
+        ORDER BY fila
+        LIMIT :lim
+        """), {"lim": MAX_ERRORES_REPORTE}).mappings().all()
+
+        aplicar = not dry_run and (n_err == 0 or parcial)
+        res = _merge(db, campos) if aplicar else {"creados": 0, "actualizados": 0}
+
+        if aplicar:
+            db.commit()
+        else:
+            db.rollback()
+    except Exception:
+        db.rollback()
+        raise
+
+    filas = stats["filas"]
+    return {
+        "ok": n_err == 0,
+        "dry_run": dry_run,
+        "aplicado": aplicar,
+        "columnas": campos,
+        "filas": filas,
+        "validas": filas - n_err,
+        "con_error": n_err,
+        **res,
+        "errores": [
+            {"fila": e["fila"], "evidencia_id": e["evidencia_id"], "errores": list(e["errores"])}
+            for e in errores
+        ],
+        "errores_truncados": n_err > len(errores),
+    }
+
+
+def importar_upload(
+    db: Session, archivo: UploadFile, ies_id: int | None, ies_slug: str | None,
+    dry_run: bool, parcial: bool,
+) -> dict:
+    """
+    importar_registros para un UploadFile de un endpoint: errores como
+    HTTPException (400 archivo inválido, 500 el resto) e invalida la cache
+    del resumen de la IES.
+    """
+    try:
+        out = importar_registros(
+            db, archivo.file, archivo.filename,
+            ies_id=ies_id, ies_slug=ies_slug, dry_run=dry_run, parcial=parcial,
+        )
+    except ArchivoInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importando evidencias: {str(e)}")
+    if not dry_run and ies_id is not None:
+        resumen_cache.invalidar(ies_id)
+    return out
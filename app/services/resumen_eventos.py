@@ -0,0 +1,176 @@
+# app/services/resumen_eventos.py
+import asyncio
+import json
+import logging
+import os
+
+import asyncpg
+
+from app.db.session import listen_dsn
+
+# ============================================================
+# Eventos del resumen (GET /api/resumen/stream, SSE)
+#
+# - El trigger del rollup hace NOTIFY resumen_rollup con
+#   {"ies_id": .., "submodulos": [..]} al COMMIT (ASTRA.sql / migración 003).
+# - Una sola conexión LISTEN por worker (asyncpg, fuera del pool), abierta
+#   con el primer suscriptor. Si se cae, reconecta con backoff y manda
+#   "resync" a todos: los avisos de ese intervalo se perdieron.
+# - Los avisos se juntan RESUMEN_STREAM_DEBOUNCE_MS y se leen UNA vez del
+#   rollup (1 query para todos los pares), luego se reparten a las colas
+#   de los suscriptores de cada IES.
+# - Cola llena (cliente lento) -> se vacía y se manda "resync": el cliente
+#   recarga el resumen completo en vez de acumular eventos.
+# - al_cambiar(fn): fn(ies_id, submodulos) en cada aviso, haya o no
+#   suscriptores (invalidación de app/core/resumen_cache.py). En ese caso
+#   el LISTEN se abre al arrancar (iniciar()).
+# ============================================================
+
+logger = logging.getLogger(__name__)
+
+CANAL = "resumen_rollup"
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+DEBOUNCE_S = _env_int("RESUMEN_STREAM_DEBOUNCE_MS", 200) / 1000
+COLA_MAX = _env_int("RESUMEN_STREAM_COLA", 100)
+KEEPALIVE_S = 30
+BACKOFF_MAX_S = 30
+
+
+class ResumenEventos:
+    """
+    fetch(pares) -> {ies_id: [item, ...]}: agregados actuales de los pares
+    (ies_id, submodulo_id), con el mismo shape que /api/resumen/ies.
+    """
+
+    def __init__(self, fetch):
+        self._fetch = fetch
+        self._subs = {}  # ies_id -> set[asyncio.Queue]
+        self._pendientes = {}  # ies_id -> set[submodulo_id]
+        self._flush_task = None
+        self._task = None
+        self._hooks = []
+
+    def iniciar(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._escuchar())
+
+    def al_cambiar(self, fn) -> None:
+        self._hooks.append(fn)
+
+    # ---------- suscriptores ----------
+    def suscribir(self, ies_id: int) -> asyncio.Queue:
+        q = asyncio.Queue(maxsize=COLA_MAX)
+        self._subs.setdefault(ies_id, set()).add(q)
+        self.iniciar()
+        return q
+
+    def desuscribir(self, ies_id: int, q: asyncio.Queue) -> None:
+        subs = self._subs.get(ies_id)
+        if subs is None:
+            return
+        subs.discard(q)
+        if not subs:
+            del self._subs[ies_id]
+
+    def suscriptores(self) -> int:
+        return sum(len(s) for s in self._subs.values())
+
+    @staticmethod
+    def _put(q: asyncio.Queue, evento: tuple) -> None:
+        try:
+            q.put_nowait(evento)
+        except asyncio.QueueFull:
+            while not q.empty():
+                q.get_nowait()
+            q.put_nowait(("resync", {}))
+
+    def _resync(self, ies_ids) -> None:
+        for ies_id in ies_ids:
+            for q in self._subs.get(ies_id, ()):
+                self._put(q, ("resync", {"ies_id": ies_id}))
+
+    # ---------- LISTEN ----------
+    async def _escuchar(self) -> None:
+        espera = 1
+        reconexion = False
+        while True:
+            try:
+                conn = await asyncpg.connect(listen_dsn())
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.warning("LISTEN %s: sin conexión (%r); reintento en %ss", CANAL, e, espera)
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, BACKOFF_MAX_S)
+                continue
+
+            perdida = asyncio.Event()
+            conn.add_termination_listener(lambda _c: perdida.set())
+            try:
+                await conn.add_listener(CANAL, self._on_notify)
+                espera = 1
+                if reconexion:
+                    self._resync(list(self._subs))
+                reconexion = True
+                while not perdida.is_set():
+                    try:
+                        await asyncio.wait_for(perdida.wait(), KEEPALIVE_S)
+                    except asyncio.TimeoutError:
+                        # Detecta conexiones medio cerradas (sin FIN del servidor)
+                        await conn.execute("SELECT 1")
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                logger.warning("LISTEN %s: conexión perdida (%r)", CANAL, e)
+            finally:
+                if not conn.is_closed():
+                    conn.terminate()
+            if perdida.is_set():
+                logger.warning("LISTEN %s: conexión cerrada por el servidor; reconectando", CANAL)
+            await asyncio.sleep(espera)
+
+    def _on_notify(self, _conn, _pid, _channel, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+            ies_id = int(data["ies_id"])
+            submodulos = [int(s) for s in data["submodulos"]]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("NOTIFY %s inválido: %r", CANAL, payload[:200])
+            return
+        for fn in self._hooks:
+            fn(ies_id, submodulos)
+        if ies_id not in self._subs:
+            return
+        self._pendientes.setdefault(ies_id, set()).update(submodulos)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self) -> None:
+        await asyncio.sleep(DEBOUNCE_S)
+        pendientes, self._pendientes = self._pendientes, {}
+        self._flush_task = None  # avisos que lleguen durante el fetch -> otro flush
+
+        pares = [(i, s) for i, sms in pendientes.items() if i in self._subs for s in sorted(sms)]
+        if not pares:
+            return
+        try:
+            por_ies = await self._fetch(pares)
+        except Exception as e:
+            logger.warning("resumen stream: no se pudieron leer %d pares del rollup: %r", len(pares), e)
+            self._resync(pendientes)
+            return
+
+        for ies_id, items in por_ies.items():
+            evento = ("resumen", {"ies_id": ies_id, "submodulos": items})
+            for q in self._subs.get(ies_id, ()):
+                self._put(q, evento)
+
+    async def cerrar(self) -> None:
+        for t in (self._flush_task, self._task):
+            if t is not None and not t.done():
+                t.cancel()
+        self._flush_task = self._task = None
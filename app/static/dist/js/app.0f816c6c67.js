@@ -0,0 +1,723 @@
+(function(){const A=(window.ASTRA=window.ASTRA||{});A.state=A.state||{};A.qs=(sel,root=document)=>root.querySelector(sel);A.imgAsset=(url)=>(window.ASTRA_IMG||{})[url]||null;A.imgAttrs=(url,sizes)=>{const v=A.imgAsset(url);if(!v)return`src="${url}"`;return`src="${v.src}" srcset="${v.srcset}" sizes="${sizes || v.sizes}"`;};A.auth={get(){try{return(localStorage.getItem("access_token")||sessionStorage.getItem("access_token")||null);}catch{return null;}},set(token,persist=true){try{if(persist)localStorage.setItem("access_token",token);else sessionStorage.setItem("access_token",token);}catch{}},clear(){try{localStorage.removeItem("access_token");sessionStorage.removeItem("access_token");}catch{}},};function b64UrlToJson(b64url){const b64=String(b64url).replace(/-/g,"+").replace(/_/g,"/");const pad=b64.length%4;const padded=pad?b64+"=".repeat(4-pad):b64;const json=atob(padded);try{return decodeURIComponent(Array.prototype.map.call(json,(c)=>"%"+("00"+c.charCodeAt(0).toString(16)).slice(-2)).join(""));}catch{return json;}}
+A.parseJwt=function(token){try{const t=token||A.auth.get();if(!t)return null;const parts=String(t).split(".");if(parts.length!==3)return null;const payloadStr=b64UrlToJson(parts[1]);return JSON.parse(payloadStr);}catch{return null;}};A.getRoleRaw=function(){const p=A.parseJwt();return(p?.rol||p?.role||"").toString().trim();};A.getRole=function(){const r=(A.getRoleRaw()||"").toLowerCase();if(r==="admin")return"admin";if(r==="cliente"||r==="ies"||r==="institucion"||r==="institution")
+return"ies";return r||"";};A.isAdmin=()=>A.getRole()==="admin";A.isIES=()=>A.getRole()==="ies";function pickIesSlugFromPayload(p){const slug=p?.ies_slug||p?.iesSlug||p?.ies||p?.ies_code||p?.iesCode||p?.institucion_slug||p?.institution_slug||p?.org_slug||p?.orgSlug||"";return(slug||"").toString().trim();}
+function pickIesIdFromPayload(p){const v=p?.ies_id??p?.iesId??p?.iesID??null;const n=v===null||v===undefined?null:Number(v);return Number.isFinite(n)?n:null;}
+function persistSessionContext({rol="",ies_slug="",ies_id=null}={}){try{localStorage.setItem("rol",String(rol||""));localStorage.setItem("ies_slug",String(ies_slug||""));localStorage.setItem("ies_id",ies_id===null?"":String(ies_id));}catch{}
+A.state.rol=String(rol||"");A.state.ies_slug=String(ies_slug||"");A.state.ies_id=ies_id===null?null:Number(ies_id);}
+A.refreshSession=async function(){const token=A.auth.get();if(!token)return null;const p=A.parseJwt(token)||null;const rol=A.getRole();const ies_slug=rol==="ies"?pickIesSlugFromPayload(p||{}):"";const ies_id=rol==="ies"?pickIesIdFromPayload(p||{}):null;persistSessionContext({rol,ies_slug,ies_id});return{rol,ies_slug,ies_id,from:"jwt"};};A.getIesSlug=function(){if(A.state?.ies_slug)return A.state.ies_slug;try{return localStorage.getItem("ies_slug")||"";}catch{return"";}};A.getIesId=function(){if(A.state?.ies_id)return A.state.ies_id;try{const v=localStorage.getItem("ies_id")||"";const n=Number(v);return Number.isFinite(n)?n:null;}catch{return null;}};A.clearSessionContext=function(){try{localStorage.removeItem("ies_slug");localStorage.removeItem("rol");localStorage.removeItem("ies_id");}catch{}
+try{delete A.state.ies_slug;delete A.state.rol;delete A.state.ies_id;}catch{}};A.requireAuth=function(){const t=A.auth.get();if(!t||String(t).split(".").length!==3){const next=encodeURIComponent(location.pathname+location.search);location.replace("/login?next="+next);return false;}
+return true;};A.logout=function(){A.auth.clear();A.clearSessionContext();try{A.state={};}catch{}
+window.location.replace("/login");};function wireLogout(){const btn=document.getElementById("btnLogout");if(!btn)return;if(btn.dataset.wired==="1")return;btn.dataset.wired="1";btn.addEventListener("click",(ev)=>{ev.preventDefault();A.logout();});}
+document.addEventListener("DOMContentLoaded",wireLogout);document.addEventListener("click",(ev)=>{const el=ev.target?.closest?.("[data-logout='1']");if(!el)return;ev.preventDefault();A.logout();});const ASTRA_IMG="/static/img/astra.png";const HOST_ID="astraToasts";function ensureToastHost(){let host=document.getElementById(HOST_ID);if(!host){host=document.createElement("div");host.id=HOST_ID;host.className="astra-toasts";host.setAttribute("aria-live","polite");host.setAttribute("aria-atomic","true");document.body.appendChild(host);}
+return host;}
+function safeHtml(s){return String(s??"").replaceAll("&","&amp;").replaceAll("<","&lt;").replaceAll(">","&gt;").replaceAll('"',"&quot;").replaceAll("'","&#039;");}
+async function copyToClipboard(text){const t=String(text??"");try{await navigator.clipboard.writeText(t);return true;}catch{try{const ta=document.createElement("textarea");ta.value=t;ta.style.position="fixed";ta.style.opacity="0";document.body.appendChild(ta);ta.focus();ta.select();const ok=document.execCommand("copy");document.body.removeChild(ta);return!!ok;}catch{return false;}}}
+A.toast=function({type="info",title="ASTRA",message="",timeout=5200,sticky=false,actions=[],}={}){const host=ensureToastHost();const el=document.createElement("div");el.className=`astra-toast astra-toast--${type}`;const close=()=>{el.style.opacity="0";el.style.transform="translateY(8px)";setTimeout(()=>el.remove(),160);};el.innerHTML=`
+      <div class="astra-toast__row">
+        <img class="astra-toast__img" ${A.imgAttrs(ASTRA_IMG)} alt="Astra" />
+        <div>
+          <div class="astra-toast__title">${safeHtml(title)}</div>
+          <div class="astra-toast__msg">${safeHtml(message)}</div>
+        </div>
+        <button class="astra-toast__close" aria-label="Cerrar">✕</button>
+      </div>
+      <div class="astra-toast__actions" style="display:${actions?.length ? "flex" : "none"}"></div>
+    `;el.querySelector(".astra-toast__close")?.addEventListener("click",close);const actionsBox=el.querySelector(".astra-toast__actions");(actions||[]).forEach((a)=>{const b=document.createElement("button");b.className="astra-toast__btn";b.type="button";b.textContent=a.label||"Acción";b.addEventListener("click",async()=>{try{await a.onClick?.();}catch{}});actionsBox.appendChild(b);});host.appendChild(el);if(!sticky)setTimeout(close,Math.max(1500,Number(timeout)||5200));return{close};};A.toastCreds=function({email,password,title="Credenciales provisionales"}={}){const msg=`${email ? "Email: " + email : ""}${email && password ? "\n" : ""}${
+      password ? "Clave: " + password : ""
+    }`.trim();return A.toast({type:"success",title,message:msg||"Listo ✓",sticky:true,actions:[email?{label:"Copiar email",onClick:async()=>{const ok=await copyToClipboard(email);A.toast({type:ok?"success":"warn",title:"Copiar",message:ok?"Email copiado ✓":"No pude copiar",});},}:null,password?{label:"Copiar clave",onClick:async()=>{const ok=await copyToClipboard(password);A.toast({type:ok?"success":"warn",title:"Copiar",message:ok?"Clave copiada ✓":"No pude copiar",});},}:null,{label:"Cerrar",onClick:async()=>{}},].filter(Boolean),});};function welcomeOnce(){const key="astra_welcome_once";try{if(sessionStorage.getItem(key)==="1")return;sessionStorage.setItem(key,"1");}catch{}
+const role=A.getRole();if(role==="admin"){A.toast({type:"info",title:"Modo Admin",message:"Selecciona una IES desde la barra superior para ver su información. Cada institución es independiente.",timeout:6500,});}else if(role==="ies"){A.toast({type:"info",title:"Modo IES",message:"Aquí registras evidencias y revisas tu avance. Elige un subprograma y luego un submódulo.",timeout:6500,});}}
+document.addEventListener("DOMContentLoaded",async()=>{if(!location.pathname.includes("/login")){const t=A.auth.get();if(t&&String(t).split(".").length===3){await A.refreshSession();welcomeOnce();}}});A.api=async function(path,a=undefined,b=undefined){const token=A.auth.get();const looksLikeFetchOpts=(obj)=>{if(!obj||typeof obj!=="object")return false;const keys=Object.keys(obj);const hintKeys=new Set(["method","headers","body","mode","cache","credentials","redirect","referrer","referrerPolicy","integrity","keepalive","signal",]);return keys.some((k)=>hintKeys.has(k));};let data=null;let opts={};if(b!==undefined){data=a??null;opts=b??{};}else if(looksLikeFetchOpts(a)){data=null;opts=a??{};}else{data=a??null;opts={};}
+const method=(opts.method||(data?"POST":"GET")).toString().toUpperCase();const isFormData=typeof FormData!=="undefined"&&(data instanceof FormData||opts.body instanceof FormData);const headers=Object.assign(isFormData?{}:{"Content-Type":"application/json"},opts.headers||{},token?{Authorization:`Bearer ${token}`}:{});let body=opts.body;if(body===undefined&&data!==null&&method!=="GET"&&method!=="HEAD"){body=isFormData?data:JSON.stringify(data);}
+const res=await fetch(path,{...opts,method,headers,body:method==="GET"||method==="HEAD"?undefined:body,});const ct=res.headers.get("content-type")||"";const readBody=async()=>{try{if(ct.includes("application/json"))return await res.json();return await res.text();}catch{return"";}};const out=await readBody();if(!res.ok){const msg=(typeof out==="string"&&out)||(out?.detail?typeof out.detail==="string"?out.detail:JSON.stringify(out.detail):"")||`HTTP ${res.status} ${res.statusText}`;const err=new Error(msg);err.status=res.status;err.body=out;throw err;}
+return out;};})();;
+(function(){const A=window.ASTRA;if(!A)return;const clamp=(n,a,b)=>Math.max(a,Math.min(b,n));function toNum(x){const n=Number(x);return Number.isFinite(n)?n:null;}
+function fmtPct(x,digits=2){const n=toNum(x);if(n===null)return"—";return`${n.toFixed(digits)}%`;}
+function fmtDate(s){if(!s)return"—";const d=String(s).slice(0,10);const[y,m,day]=d.split("-");if(!y||!m||!day)return d;return`${day}/${m}/${y}`;}
+function pickLastUpdated(registros=[]){let best=null;for(const r of registros){const u=r?.updated_at;if(!u)continue;const t=new Date(u).getTime();if(!Number.isFinite(t))continue;if(best===null||t>best.t)best={t,raw:u};}
+return best?.raw||null;}
+function computeValoracionBuckets(registros=[]){const buckets={def:0,poco:0,cuasi:0,satis:0,sin:0};for(const r of registros){const v=toNum(r?.valoracion);if(v===null){buckets.sin+=1;continue;}
+if(v<=0)buckets.def+=1;else if(v<=35)buckets.poco+=1;else if(v<=70)buckets.cuasi+=1;else buckets.satis+=1;}
+return buckets;}
+function escapeHtml(str){return(str||"").replace(/[&<>"']/g,(m)=>({"&":"&amp;","<":"&lt;",">":"&gt;",'"':"&quot;","'":"&#039;"}[m]));}
+function ensureResumenPanelVisible(){const resumenPanel=document.getElementById("resumenPanel");const operativaPanel=document.getElementById("operativaPanel");const constellation=document.querySelector(".constellation");if(operativaPanel)operativaPanel.classList.add("hidden");if(constellation)constellation.classList.add("hidden");if(resumenPanel)resumenPanel.classList.remove("hidden");return resumenPanel;}
+function backToMap(){const resumenPanel=document.getElementById("resumenPanel");const operativaPanel=document.getElementById("operativaPanel");const constellation=document.querySelector(".constellation");if(resumenPanel)resumenPanel.classList.add("hidden");if(operativaPanel)operativaPanel.classList.add("hidden");if(constellation)constellation.classList.remove("hidden");}
+async function apiGET(url){return await A.api(url);}
+let rgStream=null;function stopResumenStream(){if(rgStream)rgStream.abort();rgStream=null;}
+function startResumenStream(iesId,onEvent){stopResumenStream();const ctrl=new AbortController();rgStream=ctrl;(async()=>{let retry=3000;let reconexion=false;while(!ctrl.signal.aborted){try{const token=A.auth.get();const res=await fetch(`/api/resumen/stream?ies_id=${encodeURIComponent(iesId)}`,{headers:Object.assign({Accept:"text/event-stream"},token?{Authorization:`Bearer ${token}`}:{}),signal:ctrl.signal,});if(res.status===401||res.status===403)return;if(!res.ok||!res.body)throw new Error(`HTTP ${res.status}`);if(reconexion)await onEvent("resync",{ies_id:iesId});reconexion=true;const reader=res.body.pipeThrough(new TextDecoderStream()).getReader();let buf="";for(;;){const{value,done}=await reader.read();if(done)break;buf+=value;let i;while((i=buf.indexOf("\n\n"))>=0){const block=buf.slice(0,i);buf=buf.slice(i+2);let tipo="message";const data=[];for(const line of block.split("\n")){if(line.startsWith("event:"))tipo=line.slice(6).trim();else if(line.startsWith("data:"))data.push(line.slice(5).trimStart());else if(line.startsWith("retry:"))retry=Number(line.slice(6))||retry;}
+if(data.length)await onEvent(tipo,JSON.parse(data.join("\n")));}}}catch(e){if(ctrl.signal.aborted)return;console.warn("Stream del resumen:",e?.message||e);}
+await new Promise((r)=>setTimeout(r,retry));}})();}
+A.openResumenSubmodulo=function openResumenSubmodulo(rootEl,data,ctx={}){const{iesNombre="—",submoduloNombre="Submódulo",submoduloId="—",onBack=null}=ctx;const total=toNum(data?.evidencias_total)??0;const avanceProm=clamp(toNum(data?.avance_promedio)??0,0,100);const donutDeg=Math.round((avanceProm/100)*360);const fechaInicio=fmtDate(data?.fecha_inicio_min);const fechaFin=fmtDate(data?.fecha_fin_max);const hoy=fmtDate(new Date().toISOString().slice(0,10));const registros=Array.isArray(data?.registros)?data.registros:[];const lastUpd=fmtDate(pickLastUpdated(registros));const val=computeValoracionBuckets(registros);const valItems=[{key:"def",label:"Deficiente",n:val.def,tone:"def"},{key:"poco",label:"Poco satisfac",n:val.poco,tone:"poco"},{key:"cuasi",label:"Cuasi satisfac",n:val.cuasi,tone:"cuasi"},{key:"satis",label:"Satisfactorio",n:val.satis,tone:"satis"},];const ar=data?.avance_rangos||{};const avanceItems=[{key:"0_24",label:"0% - 24%",n:toNum(ar["0_24"])??0,tone:"def"},{key:"25_49",label:"25% - 49%",n:toNum(ar["25_49"])??0,tone:"poco"},{key:"50_74",label:"50% - 74%",n:toNum(ar["50_74"])??0,tone:"cuasi"},{key:"75_100",label:"75% - 100%",n:toNum(ar["75_100"])??0,tone:"satis"},{key:"sin_dato",label:"Sin dato",n:toNum(ar["sin_dato"])??0,tone:"sin"},];function barHeight(n,maxN){if(!maxN)return 0;return Math.round((n/maxN)*100);}
+const maxVal=Math.max(1,...valItems.map(x=>x.n));const maxAv=Math.max(1,...avanceItems.map(x=>x.n));rootEl.innerHTML=`
+      <div class="container-fluid mt-3 resumen-wrap">
+        <div class="d-flex align-items-start justify-content-between gap-3 flex-wrap">
+          <div>
+            <div class="text-secondary small">RESUMEN</div>
+            <h3 class="mb-1 text-light fw-bold">${escapeHtml(submoduloNombre)}</h3>
+            <div class="text-secondary small">IES: ${escapeHtml(iesNombre)} · Submódulo #${escapeHtml(String(submoduloId))}</div>
+          </div>
+          <div class="d-flex gap-2">
+            <button id="btnBackResumen" class="btn btn-outline-light btn-sm">Volver</button>
+          </div>
+        </div>
+
+        <div class="row g-3 mt-2">
+          <div class="col-12 col-md-3">
+            <div class="card bg-transparent border-secondary-subtle resumen-card">
+              <div class="card-body">
+                <div class="text-secondary small">Fecha actual</div>
+                <div class="fs-5 fw-bold text-light">${hoy}</div>
+              </div>
+            </div>
+          </div>
+
+          <div class="col-12 col-md-3">
+            <div class="card bg-transparent border-secondary-subtle resumen-card">
+              <div class="card-body">
+                <div class="text-secondary small">Fecha de inicio</div>
+                <div class="fs-5 fw-bold text-light">${fechaInicio}</div>
+              </div>
+            </div>
+          </div>
+
+          <div class="col-12 col-md-3">
+            <div class="card bg-transparent border-secondary-subtle resumen-card">
+              <div class="card-body">
+                <div class="text-secondary small">Fecha de finalización</div>
+                <div class="fs-5 fw-bold text-light">${fechaFin}</div>
+              </div>
+            </div>
+          </div>
+
+          <div class="col-12 col-md-3">
+            <div class="card bg-transparent border-secondary-subtle resumen-card">
+              <div class="card-body">
+                <div class="text-secondary small">Total evidencias</div>
+                <div class="fs-5 fw-bold text-light">${total}</div>
+              </div>
+            </div>
+          </div>
+        </div>
+
+        <div class="row g-3 mt-2">
+          <div class="col-12 col-lg-7">
+            <div class="card bg-transparent border-secondary-subtle resumen-card">
+              <div class="card-body d-flex align-items-center justify-content-between gap-3 flex-wrap">
+                <div>
+                  <div class="text-secondary small">Finalización del proyecto</div>
+                  <div class="display-6 fw-bold text-light">${fmtPct(avanceProm, 2)}</div>
+                  <div class="text-secondary small">Promedio de avance de evidencias.</div>
+                </div>
+
+                <div class="res-donut" style="--deg:${donutDeg}deg;">
+                  <div class="res-donut-inner">
+                    <div class="res-donut-big">${Math.round(avanceProm)}%</div>
+                    <div class="res-donut-sub">avance</div>
+                  </div>
+                </div>
+              </div>
+            </div>
+          </div>
+
+          <div class="col-12 col-lg-5">
+            <div class="card bg-transparent border-secondary-subtle resumen-card">
+              <div class="card-body">
+                <div class="text-secondary small">Última actualización</div>
+                <div class="fs-4 fw-bold text-light">${lastUpd}</div>
+                <div class="text-secondary small">Toma la más reciente del submódulo.</div>
+              </div>
+            </div>
+          </div>
+        </div>
+
+        <div class="mt-4">
+          <div class="text-secondary small fw-bold mb-2">VALORACIÓN</div>
+          <div class="card bg-transparent border-secondary-subtle resumen-card">
+            <div class="card-body">
+              <div class="res-bars">
+                ${valItems.map(item => `<div class="res-barcol"><div class="res-barhead"><div class="res-barlabel">${item.label}</div><div class="res-barnum text-light fw-bold">${item.n}</div></div><div class="res-barbox"><div class="res-bar res-tone-${item.tone}"style="height:${barHeight(item.n, maxVal)}%"></div></div><div class="text-secondary small mt-1">${total?Math.round((item.n/total)*100):0}%del total</div></div>`).join("")}
+              </div>
+            </div>
+          </div>
+        </div>
+
+        <div class="mt-4">
+          <div class="text-secondary small fw-bold mb-2">FINALIZACIÓN DE LA TAREA</div>
+          <div class="card bg-transparent border-secondary-subtle resumen-card">
+            <div class="card-body">
+              <div class="res-bars">
+                ${avanceItems.map(item => `<div class="res-barcol"><div class="res-barhead"><div class="res-barlabel">${item.label}</div><div class="res-barnum text-light fw-bold">${item.n}</div></div><div class="res-barbox"><div class="res-bar res-tone-${item.tone}"style="height:${barHeight(item.n, maxAv)}%"></div></div><div class="text-secondary small mt-1">${total?Math.round((item.n/total)*100):0}%del total</div></div>`).join("")}
+              </div>
+            </div>
+          </div>
+        </div>
+
+        <div class="mt-4">
+          <div class="text-secondary small fw-bold mb-2">CONFIGURACIÓN DE LA CATEGORÍA</div>
+          <div class="card bg-transparent border-secondary-subtle resumen-card">
+            <div class="card-body">
+              <div class="table-responsive">
+                <table class="table table-dark table-sm align-middle mb-0">
+                  <thead>
+                    <tr>
+                      <th>Categoría</th>
+                      <th class="text-end">Total</th>
+                    </tr>
+                  </thead>
+                  <tbody>
+                    <tr>
+                      <td>SI</td>
+                      <td class="text-end">${toNum(data?.categoria_si_no?.si) ?? 0}</td>
+                    </tr>
+                    <tr>
+                      <td>No</td>
+                      <td class="text-end">${toNum(data?.categoria_si_no?.no) ?? 0}</td>
+                    </tr>
+                  </tbody>
+                </table>
+              </div>
+              <div class="text-secondary small mt-2">
+                (Si no hay categoria_si_no, el backend lo aproxima con "presenta".)
+              </div>
+            </div>
+          </div>
+        </div>
+      </div>
+    `;const btn=rootEl.querySelector("#btnBackResumen");btn?.addEventListener("click",()=>{if(typeof onBack==="function")onBack();else backToMap();});};A.openResumen=async function openResumen(ctx={}){const resumenPanel=ensureResumenPanelVisible();if(!resumenPanel)return;const{submoduloId,submoduloNombre="Submódulo",iesId,iesNombre="—",onBack=null}=ctx;if(!submoduloId||!iesId){resumenPanel.innerHTML=`
+        <div class="p-3">
+          <div class="alert alert-warning bg-transparent text-light border border-warning">
+            Falta <b>iesId</b> o <b>submoduloId</b> para abrir el resumen.
+          </div>
+          <button class="btn btn-outline-light btn-sm" id="btnBackFail">Volver</button>
+        </div>
+      `;document.getElementById("btnBackFail")?.addEventListener("click",()=>(onBack?onBack():backToMap()));return;}
+resumenPanel.innerHTML=`
+      <div class="p-3">
+        <div class="text-secondary small">Cargando resumen…</div>
+      </div>
+    `;try{const data=await apiGET(`/api/resumen/submodulo/${iesId}/${submoduloId}?include=registros`);resumenPanel.innerHTML=`<div id="resumenRoot"></div>`;const rootEl=document.getElementById("resumenRoot");A.openResumenSubmodulo(rootEl,data,{iesNombre,submoduloNombre,submoduloId,onBack:typeof onBack==="function"?onBack:backToMap});}catch(e){console.error(e);resumenPanel.innerHTML=`
+        <div class="p-3">
+          <div class="alert alert-danger bg-transparent text-light border border-danger">
+            No se pudo cargar el resumen del submódulo.<br/>
+            <span class="small text-secondary">${escapeHtml(String(e?.message || e))}</span>
+          </div>
+          <button class="btn btn-outline-light btn-sm" id="btnBackErr">Volver</button>
+        </div>
+      `;document.getElementById("btnBackErr")?.addEventListener("click",()=>(onBack?onBack():backToMap()));}};A.openResumenGeneral=async function openResumenGeneral(ctx={}){stopResumenStream();const resumenPanel=ensureResumenPanelVisible();if(!resumenPanel)return;const{iesId,iesNombre="—",onBack=null}=ctx;if(!iesId){resumenPanel.innerHTML=`
+        <div class="p-3">
+          <div class="alert alert-warning bg-transparent text-light border border-warning">
+            Falta <b>iesId</b> para construir el resumen general.
+          </div>
+          <button class="btn btn-outline-light btn-sm" id="btnBackRGFail">Volver</button>
+        </div>
+      `;document.getElementById("btnBackRGFail")?.addEventListener("click",()=>(onBack?onBack():backToMap()));return;}
+resumenPanel.innerHTML=`
+      <div class="container-fluid mt-3">
+        <div class="d-flex align-items-start justify-content-between gap-3 flex-wrap">
+          <div>
+            <div class="text-secondary small">RESUMEN GENERAL</div>
+            <h3 class="mb-1 text-light fw-bold">Subprogramas · Submódulos</h3>
+            <div class="text-secondary small">IES: ${escapeHtml(iesNombre)} · IES ID: ${escapeHtml(String(iesId))}</div>
+          </div>
+          <div class="d-flex gap-2">
+            <button id="btnBackRG" class="btn btn-outline-light btn-sm">Volver</button>
+          </div>
+        </div>
+
+        <div class="mt-3 text-secondary small" id="rgProgress">
+          Cargando catálogo…
+        </div>
+
+        <div class="mt-3 table-responsive">
+          <table class="table table-dark table-sm align-middle">
+            <thead>
+              <tr>
+                <th style="min-width:260px;">Subprograma</th>
+                <th style="min-width:280px;">Submódulo</th>
+                <th class="text-end" style="min-width:120px;">Evidencias</th>
+                <th class="text-end" style="min-width:120px;">Avance</th>
+                <th style="min-width:160px;">Últ. actualización</th>
+                <th style="min-width:110px;"></th>
+              </tr>
+            </thead>
+            <tbody id="rgTbody">
+              <tr><td colspan="6" class="text-secondary">Cargando…</td></tr>
+            </tbody>
+          </table>
+        </div>
+
+        <div class="text-secondary small mt-2">
+          Tip: clic en <b>Ver</b> para abrir el resumen bonito del submódulo.
+        </div>
+      </div>
+    `;document.getElementById("btnBackRG")?.addEventListener("click",()=>{stopResumenStream();onBack?onBack():backToMap();});const rgProgress=document.getElementById("rgProgress");const rgTbody=document.getElementById("rgTbody");const pintar=(general)=>{const subprogramas=Array.isArray(general?.subprogramas)?general.subprogramas:[];if(subprogramas.length===0){rgTbody.innerHTML=`<tr><td colspan="6" class="text-secondary">No hay subprogramas.</td></tr>`;return false;}
+const results=[];for(const sp of subprogramas){const spId=sp?.subprograma_id;const spName=sp?.nombre||`Subprograma ${spId}`;const subs=Array.isArray(sp?.submodulos)?sp.submodulos:[];for(const sm of subs){const smId=sm?.submodulo_id;if(!smId)continue;results.push({ok:true,row:{spId,spName,smId,smName:sm?.nombre||`Submódulo ${smId}`},data:sm});}}
+if(results.length===0){rgTbody.innerHTML=`<tr><td colspan="6" class="text-secondary">No hay submódulos.</td></tr>`;return false;}
+const total=results.length;rgProgress.textContent=`Listo ✓ (${total} submódulos)`;rgTbody.innerHTML=results.map(r=>{const sp=escapeHtml(r.row.spName);const sm=escapeHtml(r.row.smName);if(!r.ok){return`
+            <tr>
+              <td style="opacity:.85;">${sp}</td>
+              <td>${sm}</td>
+              <td class="text-end text-secondary">—</td>
+              <td class="text-end text-secondary">—</td>
+              <td class="text-secondary small">Error</td>
+              <td class="text-end">
+                <button class="btn btn-outline-light btn-sm rg-open" data-smid="${r.row.smId}" data-smname="${sm}">Ver</button>
+              </td>
+            </tr>
+          `;}
+const data=r.data||{};const evid=toNum(data?.evidencias_total)??0;const av=clamp(toNum(data?.avance_promedio)??0,0,100);const registros=Array.isArray(data?.registros)?data.registros:[];const lastUpd=fmtDate(data?.ultima_actualizacion||pickLastUpdated(registros));return`
+          <tr data-smid="${r.row.smId}">
+            <td style="opacity:.85;">${sp}</td>
+            <td style="font-weight:700;">${sm}</td>
+            <td class="text-end rg-evid">${evid}</td>
+            <td class="text-end rg-av">${Math.round(av)}%</td>
+            <td class="text-secondary small rg-upd">${lastUpd}</td>
+            <td class="text-end">
+              <button class="btn btn-outline-light btn-sm rg-open"
+                      data-smid="${r.row.smId}"
+                      data-smname="${escapeHtml(r.row.smName)}">Ver</button>
+            </td>
+          </tr>
+        `;}).join("");return true;};const aplicar=(data)=>{for(const sm of(Array.isArray(data?.submodulos)?data.submodulos:[])){const tr=rgTbody.querySelector(`tr[data-smid="${Number(sm?.submodulo_id)}"]`);if(!tr)continue;const av=clamp(toNum(sm?.avance_promedio)??0,0,100);tr.querySelector(".rg-evid").textContent=String(toNum(sm?.evidencias_total)??0);tr.querySelector(".rg-av").textContent=`${Math.round(av)}%`;tr.querySelector(".rg-upd").textContent=fmtDate(sm?.ultima_actualizacion);}};try{rgProgress.textContent="Cargando resumen general…";if(!pintar(await apiGET(`/api/resumen/ies/${iesId}`)))return;startResumenStream(iesId,async(tipo,data)=>{if(!document.body.contains(rgTbody))return stopResumenStream();if(tipo==="resumen")aplicar(data);else if(tipo==="resync")pintar(await apiGET(`/api/resumen/ies/${iesId}`));});rgTbody.addEventListener("click",async(ev)=>{const btn=ev.target.closest(".rg-open");if(!btn)return;const smId=Number(btn.dataset.smid);const smName=btn.dataset.smname||"Submódulo";stopResumenStream();await A.openResumen({submoduloId:smId,submoduloNombre:smName,iesId,iesNombre,onBack:()=>A.openResumenGeneral({iesId,iesNombre,onBack:typeof onBack==="function"?onBack:backToMap})});});}catch(e){console.error(e);rgTbody.innerHTML=`
+        <tr>
+          <td colspan="6" class="text-danger small">
+            No se pudo construir el resumen general.
+            <span class="text-secondary">${escapeHtml(String(e?.message || e))}</span>
+          </td>
+        </tr>
+      `;if(rgProgress)rgProgress.textContent="Error.";}};})();;
+document.addEventListener("DOMContentLoaded",async()=>{const A=(window.ASTRA=window.ASTRA||{});A.state=A.state||{};const qs=A.qs?(sel,root=document)=>A.qs(sel,root):(sel,root=document)=>root.querySelector(sel);function normalize(s){return(s||"").toString().normalize("NFD").replace(/[\u0300-\u036f]/g,"").toLowerCase().trim();}
+function escapeHtml(str){return(str||"").toString().replace(/[&<>"']/g,(m)=>({"&":"&amp;","<":"&lt;",">":"&gt;",'"':"&quot;","'":"&#039;",}[m]));}
+function safeJsonParse(s){try{return JSON.parse(s);}catch{return null;}}
+function getToken(){try{return(localStorage.getItem("access_token")||sessionStorage.getItem("access_token")||"");}catch{return"";}}
+function isJwtLike(t){return!!(t&&String(t).split(".").length===3);}
+if(A?.requireAuth&&!A.requireAuth())return;if(typeof A.parseJwt!=="function"){A.parseJwt=function(){const t=getToken();if(!isJwtLike(t))return null;try{const payload=t.split(".")[1];const json=atob(payload.replace(/-/g,"+").replace(/_/g,"/"));return safeJsonParse(json);}catch{return null;}};}
+if(typeof A.getRoleRaw!=="function"){A.getRoleRaw=function(){const p=A.parseJwt?.();return p?.role||p?.rol||p?.tipo||p?.perfil||"";};}
+if(typeof A.getRole!=="function"){A.getRole=function(){const r0=A.getRoleRaw?.()||"";const r=String(r0).toLowerCase().trim();if(r==="admin")return"admin";if(r==="cliente"||r==="ies")return"ies";return r;};}
+if(typeof A.api!=="function"){A.api=async function(path,opts={}){const url=path.startsWith("http")?path:`${path}`;const headers=new Headers(opts.headers||{});if(!headers.has("Content-Type")&&opts.method&&opts.method!=="GET"){headers.set("Content-Type","application/json");}
+const t=getToken();if(t&&!headers.has("Authorization"))headers.set("Authorization",`Bearer ${t}`);const res=await fetch(url,{...opts,headers});const ct=res.headers.get("content-type")||"";const body=ct.includes("application/json")?await res.json().catch(()=>null):await res.text().catch(()=>"");if(!res.ok){const msg=(body&&typeof body==="object"&&(body.detail||body.message))||(typeof body==="string"&&body)||`HTTP ${res.status}`;const err=new Error(msg);err.status=res.status;err.body=body;throw err;}
+return body;};}
+try{if(typeof A.refreshSession==="function"){await A.refreshSession();}}catch(e){console.warn("refreshSession fallo:",e);}
+function toastCompat({title="ASTRA",msg="",message="",type="info",ms=5200,timeout=null,sticky=false,actions=[],}={}){const map={info:"info",success:"success",warning:"warn",danger:"error"};const finalMessage=(message||msg||"").toString();const finalTimeout=timeout??ms;if(typeof A.toast==="function"){return A.toast({type:map[type]||"info",title,message:finalMessage,timeout:finalTimeout,sticky,actions,});}
+console.log(`[${type}] ${title}: ${finalMessage}`);}
+const field=qs("#subprogramasField");const searchSubp=qs("#searchSubp");const btnReset=qs("#btnReset");const adminIesBar=qs("#adminIesBar");const iesSearch=qs("#iesSearch");const iesSelect=qs("#iesSelect");const userActive=qs("#userActive");const btnResumenGlobal=qs("#btnResumenGlobal");const btnLogout=qs("#btnLogout");const operativaPanel=qs("#operativaPanel");const resumenPanel=qs("#resumenPanel");const canvasEl=document.getElementById("submodsCanvas");const canvas=canvasEl&&window.bootstrap?.Offcanvas?window.bootstrap.Offcanvas.getOrCreateInstance(canvasEl):null;const submodsMeta=qs("#submodsMeta");const submodsTitle=qs("#submodsCanvasLabel");const submodulosList=qs("#submodulosList");const searchSubm=qs("#searchSubm");const btnVerResumen=qs("#btnVerResumen");const constellation=document.querySelector(".constellation");(function AstraCoachV43(){if(window.__astraCoachV4)return;window.__astraCoachV4=true;const A=(window.ASTRA=window.ASTRA||{});const COACH_KEY="astra_onboarding_v2_done";try{document.querySelectorAll(".astra-coach").forEach((n)=>n.remove());document.querySelectorAll(".astra-virtual-target").forEach((n)=>n.remove());document.querySelectorAll(".astra-target-ring").forEach((n)=>n.remove());}catch{}
+let coach=null;let coachTimer=null;let coachStep=0;let coachLastTarget=null;function qsLocal(sel){return document.querySelector(sel);}
+function isVisible(el){if(!el)return false;if(el.classList&&el.classList.contains("astra-virtual-target")){const r=el.getBoundingClientRect();return r.width>0&&r.height>0;}
+const cs=getComputedStyle(el);if(cs.display==="none"||cs.visibility==="hidden")return false;if(cs.opacity==="0")return false;const rects=el.getClientRects();return rects&&rects.length>0;}
+function pickTarget(candidates=[]){for(const c of candidates){const el=typeof c==="string"?qsLocal(c):c;if(el&&isVisible(el))return el;}
+return null;}
+function clamp(v,min,max){return Math.max(min,Math.min(max,v));}
+function scrollIntoViewSmart(el){try{el.scrollIntoView({behavior:"smooth",block:"center",inline:"center"});}catch{}}
+function getRoleSafe(){try{if(typeof A.getRole==="function"){const r=String(A.getRole()||"").toLowerCase().trim();if(r)return r;}}catch{}
+const role=String(A?.state?.user?.role||A?.state?.role||"").toLowerCase().trim();return role||"ies";}
+function ensureVirtualTarget(id,rect){let el=document.getElementById(id);if(!el){el=document.createElement("div");el.id=id;el.className="astra-virtual-target";el.style.position="fixed";el.style.zIndex="9997";el.style.pointerEvents="none";el.style.opacity="0.001";el.style.borderRadius="14px";document.body.appendChild(el);}
+const vw=window.innerWidth||1200;const vh=window.innerHeight||800;const px=(val,total)=>{if(typeof val==="string"&&val.trim().endsWith("%")){const p=parseFloat(val);return(total*(Number.isFinite(p)?p:0))/100;}
+const n=Number(val);return Number.isFinite(n)?n:0;};const left=px(rect.left,vw);const top=px(rect.top,vh);const width=px(rect.width,vw);const height=px(rect.height,vh);el.style.left=`${left}px`;el.style.top=`${top}px`;el.style.width=`${Math.max(60, width)}px`;el.style.height=`${Math.max(60, height)}px`;return el;}
+function getRing(){let ring=document.querySelector(".astra-target-ring");if(!ring){ring=document.createElement("div");ring.className="astra-target-ring";ring.style.position="fixed";ring.style.zIndex="999998";ring.style.pointerEvents="none";ring.style.borderRadius="16px";ring.style.boxShadow="0 0 0 2px rgba(140,160,255,.65), 0 0 0 10px rgba(140,160,255,.14)";ring.style.opacity="0";ring.style.transition="opacity 120ms ease";document.body.appendChild(ring);}
+return ring;}
+function applyCoachTargetHighlight(target){try{document.querySelectorAll(".astra-coach--target").forEach((n)=>n.classList.remove("astra-coach--target"));}catch{}
+if(!target)return;try{target.classList.add("astra-coach--target");}catch{}
+const ring=getRing();try{const r=target.getBoundingClientRect();const pad=6;ring.style.left=`${Math.max(0, r.left - pad)}px`;ring.style.top=`${Math.max(0, r.top - pad)}px`;ring.style.width=`${Math.max(24, r.width + pad * 2)}px`;ring.style.height=`${Math.max(24, r.height + pad * 2)}px`;ring.style.opacity="1";}catch{ring.style.opacity="0";}}
+function clearCoachTargetHighlight(){try{document.querySelectorAll(".astra-coach--target").forEach((n)=>n.classList.remove("astra-coach--target"));}catch{}
+try{const ring=document.querySelector(".astra-target-ring");if(ring)ring.style.opacity="0";}catch{}}
+function ensureCoach(){if(coach)return coach;const root=document.createElement("div");root.className="astra-coach";root.style.display="none";const dim=document.createElement("div");dim.className="astra-coach__dim";dim.addEventListener("click",()=>hideCoach(false));const line=document.createElement("div");line.className="astra-coach__line";const dot=document.createElement("div");dot.className="astra-coach__dot";const img=document.createElement("img");img.className="astra-coach__img";img.alt="Astra";const bubble=document.createElement("div");bubble.className="astra-coach__bubble";bubble.innerHTML=`
+        <div class="astra-coach__title">
+          <span>Astra</span>
+          <button class="astra-coach__close" title="Cerrar">×</button>
+        </div>
+
+        <div class="astra-coach__msg">…</div>
+
+        <div class="astra-coach__footer">
+          <button type="button" class="astra-coach__btn astra-coach__back">Atras</button>
+          <div class="astra-coach__dots">1/4</div>
+          <button type="button" class="astra-coach__btn astra-coach__btn--primary astra-coach__next">Siguiente</button>
+        </div>
+      `;bubble.querySelector(".astra-coach__close")?.addEventListener("click",()=>hideCoach(true));bubble.querySelector(".astra-coach__back")?.addEventListener("click",()=>tourPrev());bubble.querySelector(".astra-coach__next")?.addEventListener("click",()=>tourNext());root.appendChild(dim);root.appendChild(line);root.appendChild(dot);root.appendChild(img);root.appendChild(bubble);document.body.appendChild(root);coach={root,dim,line,dot,img,bubble,msg:bubble.querySelector(".astra-coach__msg"),dots:bubble.querySelector(".astra-coach__dots"),btnBack:bubble.querySelector(".astra-coach__back"),btnNext:bubble.querySelector(".astra-coach__next"),_cleanup:null,currentPose:"point",};return coach;}
+const POSE_OVERRIDE_MIN_VW=980;const POSE_OVERRIDES={exit:{width:260,left:700,top:78},checklist:{width:200,left:520,top:441.284},point:{width:260,left:80,top:390.37},};function getPoseOverride(pose){const vw=window.innerWidth||1200;if(vw<POSE_OVERRIDE_MIN_VW)return null;return POSE_OVERRIDES[pose]||null;}
+function setCoachPose(pose="point"){const c=ensureCoach();c.currentPose=pose;const poseCandidates={saludo:["/static/img/astra_saludo.png","/static/img/astra_saludo.PNG","/static/img/astra_saludo.webp","/static/img/astra_saludo.jpg","/static/img/astra_saludo.jpeg","/static/img/astra_hello.png",],point:["/static/img/astra_point.png","/static/img/astra_point.PNG","/static/img/astra_point.webp","/static/img/astra_point.jpg","/static/img/astra_point.jpeg","/static/img/astra_pointer.png",],checklist:["/static/img/astra_checklist.png","/static/img/astra_checklist.PNG","/static/img/astra_checklist.webp","/static/img/astra_checklist.jpg","/static/img/astra_checklist.jpeg","/static/img/astra_lista.png",],exit:["/static/img/astra_exit.png","/static/img/astra_exit.PNG","/static/img/astra_exit.webp","/static/img/astra_exit.jpg","/static/img/astra_exit.jpeg","/static/img/astra_salida.png","/static/img/astra_out.png","/static/img/astra_bye.png",],};const fallbacks=["/static/img/astra.png","/static/img/astra.webp","/static/img/astra.jpg","/static/img/astra_point.png",];const ov=getPoseOverride(pose);const vw=Math.max(320,window.innerWidth||1200);let size=vw<520?190:vw<900?230:260;if(ov?.width)size=ov.width;const list=[...(poseCandidates[pose]||poseCandidates.point),...fallbacks];let i=0;const opt=A.imgAsset?.(list[0]);if(opt)list.unshift(opt.src,opt.fallback);c.img.onerror=null;c.img.onload=null;c.img.removeAttribute("srcset");const tryNext=()=>{i+=1;if(i>=list.length)return;c.img.removeAttribute("srcset");c.img.src=list[i];};c.img.onload=()=>{try{if(coachLastTarget&&c?.root?.style?.display==="block"){requestAnimationFrame(()=>positionCoachToTarget(coachLastTarget));}}catch{}};c.img.onerror=()=>tryNext();if(opt){c.img.sizes=`${size}px`;c.img.srcset=opt.srcset;}
+c.img.src=list[i];c.img.style.width=`${size}px`;c.img.style.maxWidth=`260px`;c.img.style.maxHeight="46vh";c.img.style.height="auto";c.img.style.objectFit="contain";c.img.style.display="block";c.img.style.opacity="1";}
+function positionCoachToTarget(targetEl){const c=ensureCoach();const pad=12;if(!targetEl||!isVisible(targetEl))return;coachLastTarget=targetEl;const r=targetEl.getBoundingClientRect();const cx=r.left+r.width/2;const cy=r.top+r.height/2;c.bubble.style.visibility="hidden";c.bubble.style.left=`${pad}px`;c.bubble.style.top=`${pad}px`;const bw=c.bubble.offsetWidth||320;const bh=c.bubble.offsetHeight||150;c.bubble.style.visibility="visible";const preferLeft=cx>(window.innerWidth||1200)*0.58;const candidates=preferLeft?[{name:"left",x:r.left-bw-14,y:cy-bh/2},{name:"right",x:r.right+14,y:cy-bh/2},{name:"bottom",x:cx-bw/2,y:r.bottom+14},{name:"top",x:cx-bw/2,y:r.top-bh-14},]:[{name:"right",x:r.right+14,y:cy-bh/2},{name:"left",x:r.left-bw-14,y:cy-bh/2},{name:"bottom",x:cx-bw/2,y:r.bottom+14},{name:"top",x:cx-bw/2,y:r.top-bh-14},];const fits=(x,y)=>x>=pad&&y>=pad&&x+bw<=(window.innerWidth||1200)-pad&&y+bh<=(window.innerHeight||800)-pad;const chosen=candidates.find((o)=>fits(o.x,o.y))||candidates[0];const bx=clamp(chosen.x,pad,(window.innerWidth||1200)-bw-pad);const by=clamp(chosen.y,pad,(window.innerHeight||800)-bh-pad);c.bubble.style.left=`${bx}px`;c.bubble.style.top=`${by}px`;const bubbleCenterX=bx+bw/2;const bubbleCenterY=by+bh/2;const dxB=bubbleCenterX-cx;const dyB=bubbleCenterY-cy;let bubbleSide="right";if(Math.abs(dxB)>=Math.abs(dyB))bubbleSide=dxB<0?"left":"right";else bubbleSide=dyB<0?"top":"bottom";c.dot.style.left=`${cx - 5}px`;c.dot.style.top=`${cy - 5}px`;const bcx=bx+bw/2;const bcy=by+bh/2;const dx=cx-bcx;const dy=cy-bcy;const ang=Math.atan2(dy,dx);const len=Math.max(45,Math.hypot(dx,dy)-18);c.line.style.left=`${bcx}px`;c.line.style.top=`${bcy}px`;c.line.style.width=`${len}px`;c.line.style.transform=`rotate(${ang}rad)`;const imgW=parseFloat(getComputedStyle(c.img).width)||260;const imgH=imgW*1.05;let ax=cx;let ay=cy;const ov=getPoseOverride(c.currentPose);if(ov&&Number.isFinite(ov.left)&&Number.isFinite(ov.top)){ax=ov.left;ay=ov.top;}else{if(c.currentPose==="point"){ax=cx-(imgW*0.95);ay=cy+(imgH*0.10);}else if(c.currentPose==="checklist"){const cons=document.querySelector(".constellation")||document.getElementById("subprogramasField");if(cons&&isVisible(cons)){const cr=cons.getBoundingClientRect();const ccx=cr.left+cr.width*0.52;const ccy=cr.top+cr.height*0.58;ax=ccx-(imgW*0.88);ay=ccy-(imgH*0.25);}else{ax=cx-(imgW*0.95);ay=cy-(imgH*0.10);}}else if(c.currentPose==="saludo"){ax=cx-(imgW*0.90);ay=cy+(imgH*0.08);}else if(c.currentPose==="exit"){const offX=imgW*1.10;const offY=imgH*0.10;if(bubbleSide==="left"){ax=cx+offX;ay=cy+offY;}else if(bubbleSide==="right"){ax=cx-offX;ay=cy+offY;}else if(bubbleSide==="top"){ax=cx-imgW*0.15;ay=cy+imgH*0.85;}else{ax=cx-imgW*0.15;ay=cy-imgH*0.55;}}else{const offX=imgW*1.05;const offY=imgH*0.20;if(chosen.name==="left"){ax=cx+offX;ay=cy+offY;}
+if(chosen.name==="right"){ax=cx-offX;ay=cy+offY;}
+if(chosen.name==="top"){ax=cx-imgW*0.20;ay=cy+imgH*0.70;}
+if(chosen.name==="bottom"){ax=cx-imgW*0.20;ay=cy-imgH*0.40;}}}
+ax=clamp(ax,10,(window.innerWidth||1200)-imgW-10);ay=clamp(ay,10,(window.innerHeight||800)-imgH-10);c.img.style.left=`${ax}px`;c.img.style.top=`${ay}px`;applyCoachTargetHighlight(targetEl);}
+function showCoach({target,text,pose="point",step=1,total=4,autoCloseMs=0}={}){const c=ensureCoach();c._cleanup?.();c._cleanup=null;clearTimeout(coachTimer);if(!target||!isVisible(target))return;setCoachPose(pose);c.msg.textContent=text||"";c.dots.textContent=`${step}/${total}`;c.btnBack.disabled=step<=1;c.btnNext.textContent=step>=total?"Finalizar":"Siguiente";c.root.style.display="block";if(!target.classList?.contains("astra-virtual-target")){scrollIntoViewSmart(target);}
+requestAnimationFrame(()=>positionCoachToTarget(target));const onMove=()=>{if(c.root.style.display!=="block")return;if(!coachLastTarget)return;positionCoachToTarget(coachLastTarget);};window.addEventListener("resize",onMove,{passive:true});window.addEventListener("scroll",onMove,{passive:true});c._cleanup=()=>{window.removeEventListener("resize",onMove);window.removeEventListener("scroll",onMove);};if(autoCloseMs&&autoCloseMs>0){coachTimer=setTimeout(()=>hideCoach(false),autoCloseMs);}}
+function hideCoach(markDone=false){if(!coach)return;clearTimeout(coachTimer);coach.root.style.display="none";coach._cleanup?.();coach._cleanup=null;clearCoachTargetHighlight();if(markDone){try{localStorage.setItem(COACH_KEY,"1");}catch{}}}
+function shouldAutoCoach(){try{return localStorage.getItem(COACH_KEY)!=="1";}catch{return true;}}
+A.showCoach=showCoach;A.hideCoach=hideCoach;A.shouldAutoCoach=shouldAutoCoach;window.showCoach=showCoach;window.hideCoach=hideCoach;window.shouldAutoCoach=shouldAutoCoach;function getTourSteps(){const role=getRoleSafe();const field=document.getElementById("subprogramasField");const firstSubp=field?field.querySelector(".subp-node"):null;const adminBar=document.getElementById("adminIesBar");const iesSelect=document.getElementById("iesSelect");const btnResumenGlobal=document.getElementById("btnResumenGlobal");const btnReset=document.getElementById("btnReset");const btnGuide=document.getElementById("btnGuide");const btnVerResumen=document.getElementById("btnVerResumen");const safeHomeTarget=()=>pickTarget([firstSubp,"#subprogramasField",".constellation",".astra-brand"])||document.querySelector(".astra-brand")||document.body;const safeBtnTarget=()=>pickTarget([btnReset,"#btnReset",btnGuide,"#btnGuide",".astra-brand"])||document.querySelector(".astra-brand")||document.body;const rightPanelAnchor=()=>ensureVirtualTarget("astraVirtualRightPanel",{left:"76%",top:"42%",width:"20%",height:"30%",});if(role==="admin"){return[{pose:"saludo",text:"Hola 👋 Soy Astra. Guia rapida en 4 pasos.",target:()=>pickTarget([iesSelect,"#iesSelect",adminBar,"#adminIesBar",".astra-brand"])||safeBtnTarget(),},{pose:"point",text:"Paso 1: selecciona una IES (arriba) para ver su informacion.",target:()=>pickTarget([iesSelect,"#iesSelect",adminBar,"#adminIesBar"])||safeBtnTarget(),},{pose:"checklist",text:"Paso 2: entra a Resumen general para ver avances y evidencias.",target:()=>pickTarget([btnResumenGlobal,"#btnResumenGlobal"])||safeBtnTarget(),},{pose:"exit",text:"Listo. Si quieres ver esta guia otra vez, usa el boton Guia.",target:()=>pickTarget([btnGuide,"#btnGuide",btnResumenGlobal,".astra-brand"])||safeBtnTarget(),},];}
+return[{pose:"saludo",text:"Hola 👋 Soy Astra. Te muestro como usar ASTRA rapido.",target:()=>safeHomeTarget(),},{pose:"point",text:"Paso 1: haz clic en un subprograma para ver sus submodulos.",target:()=>pickTarget([firstSubp,"#subprogramasField .subp-node",field])||safeHomeTarget(),},{pose:"checklist",text:"Paso 2: cuando se abra el panel derecho, elige un submodulo para registrar evidencias.",target:()=>pickTarget(["#submodsCanvas.show","#submodulosList"])||rightPanelAnchor(),},{pose:"exit",text:"Paso 3: luego usa 'Ver resumen' para revisar el avance cuando quieras.",target:()=>pickTarget([btnVerResumen,"#btnVerResumen",btnReset,"#btnReset",btnGuide,"#btnGuide"])||safeBtnTarget(),},];}
+function renderTourStep(){const steps=getTourSteps();const total=steps.length;const idx=Math.max(0,Math.min(coachStep,total-1));const s=steps[idx];setTimeout(()=>{const target=(typeof s.target==="function")?s.target():s.target;const fallback=document.querySelector(".astra-brand")||document.body;showCoach({target:target||fallback,pose:s.pose,text:s.text,step:idx+1,total,});},60);}
+function tourStart(){coachStep=0;renderTourStep();}
+function tourNext(){const steps=getTourSteps();if(coachStep>=steps.length-1){hideCoach(true);return;}
+coachStep+=1;renderTourStep();}
+function tourPrev(){if(coachStep<=0)return;coachStep-=1;renderTourStep();}
+A.openGuide=function(){tourStart();};const btnGuideEl=document.getElementById("btnGuide");if(btnGuideEl&&!btnGuideEl.dataset.wiredGuide){btnGuideEl.dataset.wiredGuide="1";btnGuideEl.addEventListener("click",(ev)=>{ev.preventDefault();tourStart();});}
+function autoStartIfNeeded(){if(!shouldAutoCoach())return;setTimeout(()=>{try{tourStart();}catch{}},350);}
+autoStartIfNeeded();})();if(btnLogout&&!btnLogout.dataset.wired){btnLogout.dataset.wired="1";btnLogout.addEventListener("click",(ev)=>{ev.preventDefault();if(typeof A.logout==="function")A.logout();else{try{localStorage.removeItem("access_token");}catch{}
+try{sessionStorage.removeItem("access_token");}catch{}
+window.location.replace("/login");}});}
+A.state.subprogramas=Array.isArray(A.state.subprogramas)?A.state.subprogramas:[];A.state.submodulos=Array.isArray(A.state.submodulos)?A.state.submodulos:[];A.state.activeSubp=A.state.activeSubp||null;A.state.activeSubm=A.state.activeSubm||null;A.state.ies=A.state.ies||null;A.state.iesList=Array.isArray(A.state.iesList)?A.state.iesList:[];function role(){const r0=(typeof A.getRole==="function"?A.getRole():A.getRoleRaw?.()||"")||"";const r=String(r0).toLowerCase().trim();if(r==="admin")return"admin";if(r==="cliente"||r==="ies")return"ies";return r;}
+const isAdmin=()=>role()==="admin";const isIES=()=>role()==="ies";function getDisplayName(){const p=A.parseJwt?.()||{};const raw=p?.nombre||p?.name||p?.usuario||p?.email||"";if(!raw)return"👋";const s=String(raw);if(s.includes("@"))return s.split("@")[0];return s;}
+function setUserActive(text,show=true){if(!userActive)return;userActive.textContent=text||"";userActive.classList.toggle("hidden",!show);}
+function setAdminBarVisible(showAdminBar){if(!adminIesBar)return;adminIesBar.classList.toggle("hidden",!showAdminBar);}
+function enforceRoleUI(){if(isIES()){setAdminBarVisible(false);iesSearch?.classList.add("hidden");iesSelect?.classList.add("hidden");}else{setAdminBarVisible(true);iesSearch?.classList.remove("hidden");iesSelect?.classList.remove("hidden");}}
+const isAdminLocked=()=>isAdmin()&&!A.state?.ies?.id;function setHidden(el,hidden){if(!el)return;el.classList.toggle("hidden",!!hidden);el.style.display=hidden?"none":"";}
+function cleanupBackdrops(){document.querySelectorAll(".offcanvas-backdrop").forEach((b)=>b.remove());document.body.classList.remove("modal-open");document.body.style.overflow="";}
+function forceCloseSubmodsDrawer(){try{canvas?.hide();}catch{}
+if(canvasEl){canvasEl.classList.remove("show");canvasEl.style.visibility="hidden";canvasEl.setAttribute("aria-hidden","true");}
+cleanupBackdrops();}
+if(canvasEl&&!canvasEl.dataset.cleanupBound){canvasEl.dataset.cleanupBound="1";canvasEl.addEventListener("hidden.bs.offcanvas",()=>cleanupBackdrops());}
+function resetLockedAdminUI(){A.state.activeSubp=null;A.state.activeSubm=null;A.state.submodulos=[];forceCloseSubmodsDrawer();if(submodulosList)submodulosList.innerHTML="";if(searchSubm)searchSubm.value="";if(btnVerResumen)btnVerResumen.disabled=true;if(operativaPanel)operativaPanel.innerHTML="";if(resumenPanel)resumenPanel.innerHTML="";setHidden(operativaPanel,true);setHidden(resumenPanel,true);if(constellation)setHidden(constellation,true);if(field)field.innerHTML="";}
+function safeHideCoach(){try{window.hideCoach?.(false);}catch{}}
+function showOnly(panel){safeHideCoach();if(isAdminLocked()){resetLockedAdminUI();return;}
+if(isAdmin()){if(constellation)setHidden(constellation,true);if(field)field.innerHTML="";if(searchSubp)searchSubp.value="";setHidden(operativaPanel,true);const resumenIsVisible=panel==="resumen";setHidden(resumenPanel,!resumenIsVisible);forceCloseSubmodsDrawer();return;}
+const operativaIsVisible=panel==="operativa";const resumenIsVisible=panel==="resumen";const homeIsVisible=panel==="home";setHidden(operativaPanel,!operativaIsVisible);setHidden(resumenPanel,!resumenIsVisible);if(constellation)setHidden(constellation,!homeIsVisible);if(homeIsVisible){renderSubprogramas();forceCloseSubmodsDrawer();}}
+function getHttpStatus(e){return(e?.status??e?.response?.status??e?.cause?.status??e?.data?.status??e?.statusCode??null);}
+function getHttpDetail(e){return(e?.data?.detail||e?.data?.message||e?.message||e?.toString?.()||"");}
+function toastHttpError(e,context=""){const status=getHttpStatus(e);const detail=getHttpDetail(e)||"Fallo la operacion.";if(status===401){toastCompat({type:"warning",title:"Sesion",msg:"Tu sesion expiro o no es valida. Vuelve a iniciar sesion.",ms:6500,});return;}
+if(status===403){toastCompat({type:"danger",title:"Permisos",msg:(context?`${context}. `:"")+(detail||"Acceso denegado."),ms:8500,});return;}
+toastCompat({type:"danger",title:"Error",msg:(context?`${context}. `:"")+detail,ms:7000,});}
+function toDateInput(v){if(!v)return"";return String(v).slice(0,10);}
+function clamp01_100(n){const x=Number(n);if(!Number.isFinite(x))return 0;return Math.max(0,Math.min(100,x));}
+function evidenciaIdOf(e){return e?.evidencia_id??e?.id??e?.evidenciaId??null;}
+const VALORACION_LEVELS=[{key:"deficiente",label:"Deficiente",score:25},{key:"poco_satisfactorio",label:"Poco satisfactorio",score:50},{key:"cuasi_satisfactorio",label:"Cuasi satisfactorio",score:75},{key:"satisfactorio",label:"Satisfactorio",score:100},];function labelFromNivel(key){const it=VALORACION_LEVELS.find((x)=>x.key===key);return it?it.label:"Deficiente";}
+function scoreFromNivel(key){const it=VALORACION_LEVELS.find((x)=>x.key===key);return it?it.score:25;}
+function nivelFromValoracion(score0_100){const v=clamp01_100(score0_100);if(v>=88)return"satisfactorio";if(v>=63)return"cuasi_satisfactorio";if(v>=38)return"poco_satisfactorio";return"deficiente";}
+async function apiTry(paths=[],opts={}){let lastErr=null;for(const p of paths){try{return await A.api(p,opts);}catch(e){lastErr=e;const st=getHttpStatus(e);if(st!==404&&st!==405)throw e;}}
+throw lastErr||new Error("No se pudo completar la solicitud.");}
+function buildOperativaTableHTML(evidencias,submoduloNombre,iesNombre){const rows=(Array.isArray(evidencias)?evidencias:[]).map((e,idx)=>{const evidId=evidenciaIdOf(e);const titulo=e?.titulo??`Evidencia ${idx + 1}`;const responsable=e?.responsable??"";const valoracionNum=clamp01_100(e?.valoracion??0);const nivelSavedRaw=e?.extra_data?.valoracion_nivel??e?.extra_data?.valoracionNivel??e?.extra_data?.valoracion_level??"";const nivelSaved=(nivelSavedRaw||"").toString().trim();const nivelKey=nivelSaved?nivelSaved:nivelFromValoracion(valoracionNum);const avance=clamp01_100(e?.avance_pct??0);const fechaIni=toDateInput(e?.fecha_inicio);const fechaFin=toDateInput(e?.fecha_fin);const presenta=!!e?.presenta;const catVal=(()=>{const v=e?.categoria_si_no;if(v===true)return"SI";if(v===false)return"NO";const s=(v??"").toString().trim().toUpperCase();return(s==="SI"||s==="NO")?s:"";})();const canSave=!!evidId;return`
+        <tr data-evid="${escapeHtml(String(evidId ?? ""))}">
+          <td style="width:40px;" class="text-secondary">${idx + 1}</td>
+
+          <td style="min-width:340px;">
+            <div class="fw-semibold">${escapeHtml(titulo)}</div>
+            <div class="text-secondary small">
+              Evidencia #${escapeHtml(String(evidId ?? "—"))}
+              · Submodulo #${escapeHtml(String(e?.submodulo_id ?? ""))}
+            </div>
+          </td>
+
+          <td style="min-width:180px;">
+            <input class="form-control form-control-sm bg-dark text-light border-secondary js-responsable"
+                   value="${escapeHtml(responsable)}" placeholder="Responsable" />
+          </td>
+
+          <td style="min-width:130px;">
+            <div class="d-flex align-items-center gap-2">
+              <input type="checkbox" class="form-check-input js-presenta" ${presenta ? "checked" : ""} />
+              <span class="small text-secondary">Presenta</span>
+            </div>
+          </td>
+
+          <td style="min-width:210px;">
+            <select class="form-select form-select-sm bg-dark text-light border-secondary js-valoracion-nivel">
+              ${VALORACION_LEVELS.map((l) => {
+                const selected = l.key === nivelKey ? "selected" : "";
+                return `<option value="${escapeHtml(l.key)}"${selected}>${escapeHtml(l.label)}</option>`;
+              }).join("")}
+            </select>
+            <div class="text-secondary small mt-1">Valoracion</div>
+          </td>
+
+          <td style="min-width:120px;">
+            <input type="number" min="0" max="100"
+                   class="form-control form-control-sm bg-dark text-light border-secondary js-avance"
+                   value="${escapeHtml(String(avance))}" />
+            <div class="text-secondary small mt-1">Avance %</div>
+          </td>
+
+          <td style="min-width:150px;">
+            <input type="date"
+                   class="form-control form-control-sm bg-dark text-light border-secondary js-fecha-inicio"
+                   value="${escapeHtml(fechaIni)}" />
+            <div class="text-secondary small mt-1">Inicio</div>
+          </td>
+
+          <td style="min-width:150px;">
+            <input type="date"
+                   class="form-control form-control-sm bg-dark text-light border-secondary js-fecha-fin"
+                   value="${escapeHtml(fechaFin)}" />
+            <div class="text-secondary small mt-1">Fin</div>
+          </td>
+
+          <td style="min-width:150px;">
+            <select class="form-select form-select-sm bg-dark text-light border-secondary js-categoria">
+              <option value="" ${catVal === "" ? "selected" : ""}>—</option>
+              <option value="SI" ${catVal === "SI" ? "selected" : ""}>SI</option>
+              <option value="NO" ${catVal === "NO" ? "selected" : ""}>NO</option>
+            </select>
+            <div class="text-secondary small mt-1">Categoria</div>
+          </td>
+
+          <td style="min-width:140px;" class="text-end">
+            <button class="btn btn-outline-light btn-sm js-guardar" ${canSave ? "" : "disabled"}>Guardar</button>
+            <div class="text-secondary small mt-1 js-status" style="min-height:18px;"></div>
+          </td>
+        </tr>
+      `;});return`
+      <div class="container-fluid mt-3">
+        <div class="d-flex align-items-start justify-content-between gap-3 flex-wrap">
+          <div>
+            <div class="text-secondary small">OPERATIVA</div>
+            <h4 class="mb-1">${escapeHtml(submoduloNombre || "Submodulo")}</h4>
+            <div class="text-secondary small">IES: ${escapeHtml(iesNombre || "—")}</div>
+          </div>
+          <div class="d-flex align-items-center gap-2">
+            <div class="text-secondary small">
+              Tip: <b>Guardar</b> por fila o <b>Guardar todo</b>.
+            </div>
+            <button id="btnGuardarTodo" class="btn btn-light btn-sm">Guardar todo</button>
+          </div>
+        </div>
+
+        <hr class="my-2" />
+
+        <div class="table-responsive mt-3">
+          <table class="table table-dark table-sm align-middle">
+            <thead>
+              <tr>
+                <th>#</th>
+                <th>Evidencia</th>
+                <th>Responsable</th>
+                <th>Presenta</th>
+                <th class="text-end">Valoracion</th>
+                <th class="text-end">Avance</th>
+                <th>Fecha inicio</th>
+                <th>Fecha fin</th>
+                <th>Categoria</th>
+                <th class="text-end">Accion</th>
+              </tr>
+            </thead>
+            <tbody id="opTbody">
+              ${rows.join("") || `<tr><td colspan="10"class="text-secondary">No hay evidencias.</td></tr>`}
+            </tbody>
+          </table>
+        </div>
+      </div>
+    `;}
+function rowStatusSetter(tr){const statusEl=tr.querySelector(".js-status");return(txt,kind="muted")=>{if(!statusEl)return;statusEl.className=`text-${kind} small mt-1 js-status`;statusEl.textContent=txt||"";};}
+function operativaRowPayload(tr){const nivelKey=tr.querySelector(".js-valoracion-nivel")?.value||"deficiente";const catRaw=(tr.querySelector(".js-categoria")?.value||"").toString().trim().toUpperCase();const catBool=catRaw==="SI"?true:catRaw==="NO"?false:null;return{responsable:tr.querySelector(".js-responsable")?.value?.trim()||"",presenta:!!tr.querySelector(".js-presenta")?.checked,valoracion:scoreFromNivel(nivelKey),extra_data:{valoracion_nivel:nivelKey,valoracion_label:labelFromNivel(nivelKey),},avance_pct:clamp01_100(tr.querySelector(".js-avance")?.value),fecha_inicio:tr.querySelector(".js-fecha-inicio")?.value||null,fecha_fin:tr.querySelector(".js-fecha-fin")?.value||null,categoria_si_no:catBool,};}
+async function wireOperativaTableHandlers(rootEl,saveFn,saveBatchFn){const tbody=rootEl.querySelector("#opTbody");if(!tbody)return;const btnAll=rootEl.querySelector("#btnGuardarTodo");if(btnAll&&typeof saveBatchFn==="function"){btnAll.onclick=async()=>{const rows=Array.from(tbody.querySelectorAll("tr[data-evid]")).filter((tr)=>Number(tr.dataset.evid));if(!rows.length)return;const byId=new Map(rows.map((tr)=>[Number(tr.dataset.evid),tr]));const items=rows.map((tr)=>({evidencia_id:Number(tr.dataset.evid),...operativaRowPayload(tr)}));try{btnAll.disabled=true;rows.forEach((tr)=>rowStatusSetter(tr)("Guardando…","secondary"));const res=await saveBatchFn(items);for(const it of(res?.items||[])){const tr=byId.get(Number(it.evidencia_id));if(!tr)continue;const setStatus=rowStatusSetter(tr);if(it.ok)setStatus("Guardado ✓","success");else setStatus(it.error||"Error al guardar","danger");}
+toastCompat({type:res?.ok?"success":"warning",title:"Operativa",msg:`Guardadas ${res?.guardados ?? 0} de ${res?.total ?? items.length} filas.`,ms:2200,});}catch(e){console.error(e);toastHttpError(e,"No se pudo guardar");rows.forEach((tr)=>rowStatusSetter(tr)("Error al guardar","danger"));}finally{btnAll.disabled=false;setTimeout(()=>rows.forEach((tr)=>rowStatusSetter(tr)("")),2500);}};}
+tbody.onclick=async(ev)=>{const btn=ev.target.closest(".js-guardar");if(!btn)return;const tr=ev.target.closest("tr[data-evid]");if(!tr)return;const evidId=Number(tr.dataset.evid);if(!evidId)return;const setStatus=rowStatusSetter(tr);const payload=operativaRowPayload(tr);try{btn.disabled=true;setStatus("Guardando…","secondary");await saveFn(evidId,payload);setStatus("Guardado ✓","success");toastCompat({type:"success",title:"Operativa",msg:"Fila guardada.",ms:1800});}catch(e){console.error(e);toastHttpError(e,"No se pudo guardar");setStatus("Error al guardar","danger");}finally{btn.disabled=false;setTimeout(()=>setStatus(""),2500);}};}
+let adminGateShown=false;function showAdminGateIfNeeded(){if(isAdmin()&&!A.state.ies?.id){resetLockedAdminUI();if(!adminGateShown){adminGateShown=true;toastCompat({type:"info",title:`Hola ${getDisplayName()} 👋`,msg:"Primero selecciona una IES para ver su Resumen general.",ms:5200,});}
+return true;}
+return false;}
+function resolveIESContextFromCoreAndJwt(){const p=A.parseJwt?.()||{};let slug="";let id=null;try{slug=(typeof A.getIesSlug==="function"?A.getIesSlug():"")||localStorage.getItem("ies_slug")||"";}catch{}
+try{const v=(typeof A.getIesId==="function"?A.getIesId():null)??(localStorage.getItem("ies_id")||"");const n=Number(v);id=Number.isFinite(n)?n:null;}catch{id=null;}
+const jwtSlug=p?.ies_slug||p?.iesSlug||p?.institucion_slug||p?.institution_slug||p?.org_slug||p?.orgSlug||p?.ies?.slug||p?.institucion?.slug||"";const jwtId=p?.ies_id??p?.iesId??p?.iesID??p?.ies?.id??p?.institucion?.id??null;const finalSlug=(jwtSlug||slug||"").toString().trim();const finalId=(()=>{const n=Number(jwtId??id);return Number.isFinite(n)?n:null;})();return{id:finalId,slug:finalSlug||null,nombre:p?.ies_nombre||p?.iesNombre||finalSlug||null,_source:jwtSlug?"jwt":(slug?"storage":"none"),_trusted:!!jwtSlug||!!slug,};}
+async function ensureIESResolved(){if(A.state?.ies?.slug)return A.state.ies;const ctx=resolveIESContextFromCoreAndJwt();A.state.ies=ctx;if(isIES())return A.state.ies;if(!A.state.ies.slug&&A.state.ies.id){try{const list=await A.api("/ies/");const found=Array.isArray(list)?list.find((x)=>Number(x.id)===Number(A.state.ies.id)):null;if(found?.slug){A.state.ies={...A.state.ies,slug:found.slug,nombre:found.nombre||A.state.ies.nombre,_source:"ies-list-by-id",_trusted:true,};try{localStorage.setItem("ies_slug",found.slug);localStorage.setItem("ies_id",String(found.id));}catch{}}}catch(e){console.warn("No se pudo resolver ies_slug usando /ies/:",e);}}
+return A.state.ies;}
+async function loadIESContext(){enforceRoleUI();if(isIES()){const ctx=resolveIESContextFromCoreAndJwt();A.state.ies=ctx.slug?ctx:{...ctx,slug:null};if(!ctx.slug){setUserActive("Institucion activa: (sin slug)",true);toastCompat({type:"warning",title:"Falta IES (slug)",msg:"No tengo ies_slug en sesion. Igual cargo el catalogo. "+"Al abrir Operativa usare endpoints sin slug o intentare fallback.",ms:8000,});return;}
+setUserActive(`Institucion activa: ${ctx.nombre || ctx.slug}`,true);return;}
+setUserActive("",false);let list=A.state.iesList;if(!Array.isArray(list)||!list.length){list=await A.api("/ies/");A.state.iesList=Array.isArray(list)?list:[];}
+if(iesSelect&&!iesSelect.dataset.plannerBound){iesSelect.dataset.plannerBound="1";const buildOptions=(arr)=>[`<option value="">-- Selecciona una IES --</option>`,...arr.map((i)=>`<option value="${i.id}">${escapeHtml(i.nombre)} (${escapeHtml(i.slug)})</option>`),].join("");iesSelect.innerHTML=buildOptions(A.state.iesList);iesSelect.addEventListener("change",async()=>{const id=Number(iesSelect.value);const found=A.state.iesList.find((x)=>Number(x.id)===id)||null;A.state.ies=found?{...found,_source:"admin-select",_trusted:true}:null;if(found){setUserActive(`IES activa: ${found.nombre} (${found.slug})`,true);toastCompat({type:"success",title:"IES activa",msg:`${found.nombre} (${found.slug}). Abriendo Resumen general…`,ms:3200,});try{await openResumenGeneral();}catch(e){toastHttpError(e,"No se pudo abrir Resumen general");}}else{A.state.ies=null;setUserActive("",false);resetLockedAdminUI();showAdminGateIfNeeded();}});if(A.state.ies?.id){const exists=A.state.iesList.some((x)=>Number(x.id)===Number(A.state.ies.id));if(exists)iesSelect.value=String(A.state.ies.id);}}
+if(iesSearch&&!iesSearch.dataset.plannerBound&&iesSelect){iesSearch.dataset.plannerBound="1";iesSearch.addEventListener("input",()=>{const q=normalize(iesSearch.value);const filtered=A.state.iesList.filter((i)=>{const t=normalize(`${i.nombre} ${i.slug}`);return!q||t.includes(q);});const current=iesSelect.value||"";iesSelect.innerHTML=[`<option value="">-- Selecciona una IES --</option>`,...filtered.map((i)=>`<option value="${i.id}">${escapeHtml(i.nombre)} (${escapeHtml(i.slug)})</option>`),].join("");iesSelect.value=filtered.some((x)=>String(x.id)===current)?current:"";});}
+showAdminGateIfNeeded();}
+const POS=[{left:"10%",top:"18%"},{left:"38%",top:"16%"},{left:"68%",top:"28%"},{left:"18%",top:"58%"},{left:"46%",top:"66%"},{left:"76%",top:"72%"},];function subpNodeHTML(sp,idx){const pos=POS[idx%POS.length];const float=(idx%3)+1;return`
+      <div class="subp-node" data-id="${sp.id}" data-float="${float}"
+           style="left:${pos.left}; top:${pos.top};">
+        <div class="subp-top">
+          <div>
+            <h3 class="subp-title">${escapeHtml(sp.nombre)}</h3>
+            <p class="subp-desc">Entra para ver submodulos y registrar evidencias.</p>
+          </div>
+          <div class="subp-chip">#${idx + 1}</div>
+        </div>
+      </div>
+    `;}
+function submItemHTML(sm){return`
+      <div class="subm-item" data-id="${sm.id}">
+        <h4 class="subm-name">${escapeHtml(sm.nombre)}</h4>
+        <p class="subm-hint">Abrir operativa · revisar resumen</p>
+      </div>
+    `;}
+async function loadSubprogramas(){if(!isIES()){A.state.subprogramas=[];if(constellation)setHidden(constellation,true);if(field){field.innerHTML=`<div class="text-secondary small">
+          <b>Modo Admin:</b> selecciona una IES y usa <b>Resumen general</b>.
+        </div>`;}
+return;}
+await ensureIESResolved();A.state.submodulosPorSubp={};try{const arbol=await A.api("/catalogo/arbol",{method:"GET",cache:"no-cache"});const sps=Array.isArray(arbol?.subprogramas)?arbol.subprogramas:[];A.state.subprogramas=sps;for(const sp of sps)A.state.submodulosPorSubp[sp.id]=Array.isArray(sp.submodulos)?sp.submodulos:[];}catch(e){console.warn("catalogo/arbol no disponible, uso /catalogo/subprogramas",e);const data=await A.api("/catalogo/subprogramas");A.state.subprogramas=Array.isArray(data)?data:[];}
+renderSubprogramas();}
+function renderSubprogramas(){if(!field)return;if(!isIES()){if(constellation)setHidden(constellation,true);field.innerHTML=`<div class="text-secondary small">
+        <b>Modo Admin:</b> usa el selector de IES y <b>Resumen general</b>.
+      </div>`;return;}
+const q=normalize(searchSubp?.value);const list=A.state.subprogramas.filter((sp)=>!q||normalize(sp.nombre).includes(q));field.innerHTML=list.map((sp,idx)=>subpNodeHTML(sp,idx)).join("");if(A.state.activeSubp){const el=field.querySelector(`.subp-node[data-id="${A.state.activeSubp.id}"]`);if(el)el.classList.add("active");}
+if(constellation)setHidden(constellation,false);}
+async function loadSubmodulos(subprogramaId){const cached=A.state.submodulosPorSubp?.[subprogramaId];const data=cached||await A.api(`/catalogo/subprogramas/${subprogramaId}/submodulos`);A.state.submodulos=Array.isArray(data)?data:[];renderSubmodulos();}
+function renderSubmodulos(){if(!submodulosList)return;const q=normalize(searchSubm?.value);const list=A.state.submodulos.filter((sm)=>!q||normalize(sm.nombre).includes(q));submodulosList.innerHTML=list.map(submItemHTML).join("");}
+function setActiveSubp(subprogramaId){const sp=A.state.subprogramas.find((x)=>x.id===subprogramaId);if(!sp)return;A.state.activeSubp=sp;field?.querySelectorAll(".subp-node").forEach((n)=>n.classList.remove("active"));field?.querySelector(`.subp-node[data-id="${subprogramaId}"]`)?.classList.add("active");if(submodsTitle)submodsTitle.textContent=sp.nombre;if(submodsMeta)submodsMeta.textContent=`Subprograma #${sp.id} · elige un submodulo`;if(btnVerResumen)btnVerResumen.disabled=true;}
+function openSubmodsDrawer(){safeHideCoach();try{if(canvasEl){canvasEl.style.visibility="visible";canvasEl.removeAttribute("aria-hidden");}
+canvas?.show();}catch{}}
+function evidenciasPathsForSubmodulo(submoduloId){const slug=A.state.ies?.slug;if(isIES()){const arr=[`/operacion/submodulos/${submoduloId}/evidencias`,];if(slug)arr.push(`/operacion/ies/${slug}/submodulos/${submoduloId}/evidencias`);return arr;}
+if(!slug)throw new Error("Falta ies.slug para cargar evidencias (Admin).");return[`/operacion/ies/${slug}/submodulos/${submoduloId}/evidencias`];}
+function resumenPathsForSubmodulo(submoduloId){if(isIES()){const iesId=A.state.ies?.id;const arr=[`/api/resumen/mio/submodulo/${submoduloId}?include=registros`,];if(iesId)arr.push(`/api/resumen/submodulo/${iesId}/${submoduloId}?include=registros`);return arr;}
+const iesId=A.state.ies?.id||(typeof A.getIesId==="function"?A.getIesId():null);if(!iesId)throw new Error("Falta ies_id para cargar resumen (Admin).");return[`/api/resumen/submodulo/${iesId}/${submoduloId}?include=registros`];}
+function resumenGeneralPaths(){const iesId=A.state.ies?.id||(typeof A.getIesId==="function"?A.getIesId():null);if(isIES()){const arr=[`/api/resumen/mio`];if(iesId)arr.push(`/api/resumen/ies/${iesId}`);return arr;}
+if(!iesId)throw new Error("Falta ies_id para cargar resumen general (Admin).");return[`/api/resumen/ies/${iesId}`];}
+async function fetchResumenGeneral(){return await apiTry(resumenGeneralPaths());}
+async function fetchEvidencias(submoduloId){return await apiTry(evidenciasPathsForSubmodulo(submoduloId));}
+async function fetchResumenSubmodulo(submoduloId){return await apiTry(resumenPathsForSubmodulo(submoduloId));}
+async function saveEvidenciaPatch(evidenciaId,payload){const slug=A.state.ies?.slug;if(isIES()){const paths=[`/operacion/evidencias/${evidenciaId}`,];if(slug)paths.push(`/operacion/ies/${slug}/evidencias/${evidenciaId}`);return await apiTry(paths,{method:"PATCH",body:JSON.stringify(payload)});}
+if(!slug)throw new Error("Falta ies.slug para guardar evidencia (Admin).");return await A.api(`/operacion/ies/${slug}/evidencias/${evidenciaId}`,{method:"PATCH",body:JSON.stringify(payload),});}
+async function saveEvidenciasBatch(items){const slug=A.state.ies?.slug;const body=JSON.stringify({items});if(isIES()){const paths=[`/operacion/evidencias`];if(slug)paths.push(`/operacion/ies/${slug}/evidencias`);return await apiTry(paths,{method:"PATCH",body});}
+if(!slug)throw new Error("Falta ies.slug para guardar evidencias (Admin).");return await A.api(`/operacion/ies/${slug}/evidencias`,{method:"PATCH",body});}
+async function openOperativa(submodulo){safeHideCoach();if(!isIES()){toastCompat({type:"warning",title:"Modo Admin",msg:"El Admin no llena operativa. Usa Resumen general.",ms:4200,});return;}
+A.state.activeSubm=submodulo;showOnly("operativa");forceCloseSubmodsDrawer();if(!operativaPanel)return;const iesName=A.state.ies?.nombre||A.state.ies?.slug||"—";operativaPanel.innerHTML=`
+      <div class="container-fluid mt-3">
+        <div class="text-secondary small">OPERATIVA</div>
+        <h4 class="mb-1">${escapeHtml(submodulo?.nombre || "Submodulo")}</h4>
+        <div class="text-secondary small">IES: ${escapeHtml(iesName)}</div>
+        <hr class="my-2" />
+        <div class="text-secondary small">Cargando evidencias…</div>
+      </div>
+    `;try{const evidencias=await fetchEvidencias(submodulo.id);const arr=Array.isArray(evidencias)?evidencias:(evidencias?.items||[]);operativaPanel.innerHTML=buildOperativaTableHTML(arr,submodulo?.nombre||"Submodulo",iesName);await wireOperativaTableHandlers(operativaPanel,saveEvidenciaPatch,saveEvidenciasBatch);}catch(e){console.error(e);toastHttpError(e,"No se pudieron cargar evidencias");operativaPanel.innerHTML=`
+        <div class="container-fluid mt-3">
+          <div class="text-danger small">No se pudieron cargar evidencias.</div>
+          <button id="btnBackOperativaErr" class="btn btn-outline-light btn-sm mt-2">Volver</button>
+        </div>
+      `;document.getElementById("btnBackOperativaErr")?.addEventListener("click",()=>{showOnly("home");});}}
+async function openResumenFromPlanner(submodulo){safeHideCoach();if(isAdminLocked()){showAdminGateIfNeeded();return;}
+if(!resumenPanel)return;showOnly("resumen");forceCloseSubmodsDrawer();setHidden(resumenPanel,false);resumenPanel.innerHTML=`
+      <div class="container-fluid mt-3">
+        <div class="text-secondary small">Resumen</div>
+        <h4 class="mb-1">${escapeHtml(submodulo?.nombre || "Submodulo")}</h4>
+        <div class="text-secondary small">Cargando…</div>
+      </div>
+    `;try{const data=await fetchResumenSubmodulo(submodulo.id);const renderer=A.openResumenSubmodulo;if(typeof renderer==="function"){const iesNombre=A.state.ies?.nombre||A.state.ies?.slug||"—";renderer(resumenPanel,data,{iesNombre,submoduloNombre:submodulo.nombre,submoduloId:submodulo.id,onBack:()=>(isIES()?showOnly("operativa"):openResumenGeneral()),});return;}
+resumenPanel.innerHTML=`
+        <div class="container-fluid mt-3">
+          <div class="d-flex justify-content-between align-items-start gap-2 flex-wrap">
+            <div>
+              <div class="text-secondary small">Resumen</div>
+              <h4 class="mb-1">${escapeHtml(submodulo?.nombre || "Submodulo")}</h4>
+              <div class="text-secondary small">
+                IES: ${escapeHtml(A.state.ies?.nombre || A.state.ies?.slug || "—")}
+                · Submodulo #${escapeHtml(String(submodulo?.id || "—"))}
+              </div>
+            </div>
+            <button id="btnBackFallback" class="btn btn-outline-light btn-sm">Volver</button>
+          </div>
+          <pre class="mt-3 small text-light" style="white-space:pre-wrap;">${escapeHtml(JSON.stringify(data, null, 2))}</pre>
+        </div>
+      `;document.getElementById("btnBackFallback")?.addEventListener("click",()=>{if(isIES())showOnly("operativa");else openResumenGeneral();});}catch(e){console.error(e);toastHttpError(e,"No se pudo cargar el resumen");resumenPanel.innerHTML=`
+        <div class="container-fluid mt-3">
+          <div class="text-danger small">No se pudo cargar el resumen.</div>
+          <button id="btnBackErr" class="btn btn-outline-light btn-sm mt-2">Volver</button>
+        </div>
+      `;document.getElementById("btnBackErr")?.addEventListener("click",()=>{if(isIES())showOnly("operativa");else openResumenGeneral();});}}
+function fmtDate(s){if(!s)return"—";const d=String(s).slice(0,10);const[y,m,day]=d.split("-");if(!y||!m||!day)return d;return`${day}/${m}/${y}`;}
+function pickLastUpdated(registros=[]){let best=null;for(const r of registros){const u=r?.updated_at;if(!u)continue;const t=new Date(u).getTime();if(!Number.isFinite(t))continue;if(best===null||t>best.t)best={t,raw:u};}
+return best?.raw||null;}
+function pickResponsable(registros=[]){for(const r of registros){const v=(r?.responsable??"").toString().trim();if(v)return v;}
+return"—";}
+function resumenGeneralShellHTML(iesNombre,iesId){return`
+      <div class="container-fluid mt-3">
+        <div class="d-flex align-items-start justify-content-between gap-3 flex-wrap">
+          <div>
+            <div class="text-secondary small">RESUMEN GENERAL</div>
+            <h4 class="mb-1">Subprogramas · Submodulos</h4>
+            <div class="text-secondary small">
+              IES: ${escapeHtml(iesNombre)}
+              ${iesId ? `· ID:${escapeHtml(String(iesId))}` : ""}
+            </div>
+          </div>
+          <div class="d-flex gap-2">
+            <button id="btnBackRG" class="btn btn-outline-light btn-sm">
+              ${isIES() ? "Volver al mapa" : "Volver"}
+            </button>
+          </div>
+        </div>
+
+        <div id="rgProgress" class="text-secondary small mt-3">Cargando…</div>
+
+        <div class="table-responsive mt-3">
+          <table class="table table-dark table-sm align-middle">
+            <thead>
+              <tr>
+                <th style="min-width:260px;">Subprograma</th>
+                <th style="min-width:320px;">Submodulo</th>
+                <th style="min-width:190px;">Responsable</th>
+                <th class="text-end" style="min-width:110px;">Evidencias</th>
+                <th class="text-end" style="min-width:90px;">Avance</th>
+                <th style="min-width:150px;">Ult. actualizacion</th>
+                <th style="min-width:110px;"></th>
+              </tr>
+            </thead>
+            <tbody id="rgTbody">
+              <tr><td colspan="7" class="text-secondary">Cargando…</td></tr>
+            </tbody>
+          </table>
+        </div>
+
+        <div class="text-secondary small mt-2">
+          Abre un submodulo con <b>Ver</b> para revisar su resumen completo.
+        </div>
+      </div>
+    `;}
+async function openResumenGeneral(){safeHideCoach();if(!resumenPanel)return;if(isAdminLocked()){toastCompat({type:"warning",title:"Falta IES",msg:"Selecciona una IES para abrir el Resumen general.",ms:4200,});showAdminGateIfNeeded();return;}
+const iesNombre=A.state.ies?.nombre||A.state.ies?.slug||"—";const iesId=A.state.ies?.id||null;showOnly("resumen");forceCloseSubmodsDrawer();setHidden(resumenPanel,false);resumenPanel.innerHTML=resumenGeneralShellHTML(iesNombre,iesId);document.getElementById("btnBackRG")?.addEventListener("click",()=>{showOnly("home");});const rgProgress=document.getElementById("rgProgress");const rgTbody=document.getElementById("rgTbody");try{if(rgProgress)rgProgress.textContent="Cargando resumen general…";const general=await fetchResumenGeneral();const sps=Array.isArray(general?.subprogramas)?general.subprogramas:[];if(!sps.length){if(rgTbody)rgTbody.innerHTML=`<tr><td colspan="7" class="text-secondary">No hay subprogramas.</td></tr>`;if(rgProgress)rgProgress.textContent="Listo.";return;}
+const rows=[];const results=[];for(const sp of sps){const spId=sp?.subprograma_id;const spName=sp?.nombre||`Subprograma ${spId}`;const list=Array.isArray(sp?.submodulos)?sp.submodulos:[];for(const sm of list){if(!sm?.submodulo_id)continue;const row={spId,spName,smId:sm.submodulo_id,smName:sm.nombre||`Submodulo ${sm.submodulo_id}`,};rows.push(row);results.push({ok:true,row,data:sm});}}
+if(!rows.length){if(rgTbody)rgTbody.innerHTML=`<tr><td colspan="7" class="text-secondary">No hay submodulos.</td></tr>`;if(rgProgress)rgProgress.textContent="Listo.";return;}
+if(rgProgress)rgProgress.textContent=`Listo ✓ (${rows.length} submodulos)`;if(rgTbody){rgTbody.innerHTML=results.map((r)=>{const sp=escapeHtml(r.row.spName);const sm=escapeHtml(r.row.smName);if(!r.ok){return`
+                <tr>
+                  <td style="opacity:.85;">${sp}</td>
+                  <td style="font-weight:700;">${sm}</td>
+                  <td class="text-secondary small">—</td>
+                  <td class="text-end">0</td>
+                  <td class="text-end">0%</td>
+                  <td class="text-secondary small">—</td>
+                  <td class="text-end">
+                    <button class="btn btn-outline-light btn-sm rg-open" data-smid="${r.row.smId}">Ver</button>
+                  </td>
+                </tr>
+              `;}
+const data=r.data||{};const registros=Array.isArray(data?.registros)?data.registros:[];const responsable=(data?.responsable_mas_reciente||"").toString().trim()||pickResponsable(registros);const evid=Number(data?.evidencias_total??0);const av=Math.max(0,Math.min(100,Number(data?.avance_promedio??0)));const lastUpdRaw=data?.last_updated||data?.ultima_actualizacion||pickLastUpdated(registros);const lastUpd=fmtDate(lastUpdRaw);return`
+              <tr>
+                <td style="opacity:.85;">${sp}</td>
+                <td style="font-weight:700;">${sm}</td>
+                <td class="text-secondary small">${escapeHtml(responsable || "—")}</td>
+                <td class="text-end">${Number.isFinite(evid) ? evid : 0}</td>
+                <td class="text-end">${Math.round(Number.isFinite(av) ? av : 0)}%</td>
+                <td class="text-secondary small">${escapeHtml(lastUpd)}</td>
+                <td class="text-end">
+                  <button class="btn btn-outline-light btn-sm rg-open" data-smid="${r.row.smId}">Ver</button>
+                </td>
+              </tr>
+            `;}).join("");rgTbody.onclick=async(ev)=>{const btn=ev.target.closest(".rg-open");if(!btn)return;const smId=Number(btn.dataset.smid);const sm=rows.find((x)=>x.smId===smId);if(!sm)return;await openResumenFromPlanner({id:sm.smId,nombre:sm.smName});};}}catch(e){console.error(e);toastHttpError(e,"No se pudo construir el resumen general");if(rgTbody){rgTbody.innerHTML=`
+          <tr>
+            <td colspan="7" class="text-danger small">
+              No se pudo construir el resumen general.
+            </td>
+          </tr>
+        `;}
+if(rgProgress)rgProgress.textContent="Error.";}}
+field?.addEventListener("click",async(ev)=>{if(!isIES())return;const node=ev.target.closest(".subp-node");if(!node)return;safeHideCoach();const id=Number(node.dataset.id);setActiveSubp(id);if(submodulosList)submodulosList.innerHTML=`<div class="text-secondary small">Cargando submodulos…</div>`;openSubmodsDrawer();try{await loadSubmodulos(id);}catch(e){console.error(e);toastHttpError(e,"No se pudieron cargar submodulos");if(submodulosList)submodulosList.innerHTML=`<div class="text-danger small">Error cargando submodulos.</div>`;}});searchSubp?.addEventListener("input",()=>{if(isIES())renderSubprogramas();});searchSubm?.addEventListener("input",()=>{if(isIES())renderSubmodulos();});submodulosList?.addEventListener("click",async(ev)=>{if(!isIES())return;const item=ev.target.closest(".subm-item");if(!item)return;safeHideCoach();const id=Number(item.dataset.id);const sm=A.state.submodulos.find((x)=>x.id===id)||null;A.state.activeSubm=sm;if(btnVerResumen)btnVerResumen.disabled=!sm;if(sm)await openOperativa(sm);});btnVerResumen?.addEventListener("click",async()=>{if(!isIES())return;if(!A.state.activeSubm)return;await openResumenFromPlanner(A.state.activeSubm);});let rgBusy=false;btnResumenGlobal?.addEventListener("click",async()=>{if(rgBusy)return;rgBusy=true;safeHideCoach();const oldText=btnResumenGlobal?.textContent;if(btnResumenGlobal){btnResumenGlobal.disabled=true;btnResumenGlobal.textContent="Cargando…";}
+try{await openResumenGeneral();}finally{rgBusy=false;if(btnResumenGlobal){btnResumenGlobal.disabled=false;btnResumenGlobal.textContent=oldText||"Resumen general";}}});btnReset?.addEventListener("click",()=>{safeHideCoach();A.state.activeSubp=null;A.state.activeSubm=null;forceCloseSubmodsDrawer();field?.querySelectorAll(".subp-node").forEach((n)=>n.classList.remove("active"));if(operativaPanel){operativaPanel.innerHTML="";setHidden(operativaPanel,true);}
+if(resumenPanel){resumenPanel.innerHTML="";setHidden(resumenPanel,true);}
+showOnly("home");});try{enforceRoleUI();await loadIESContext();await loadSubprogramas();if(isAdminLocked()){resetLockedAdminUI();showAdminGateIfNeeded();return;}
+if(isAdmin()){if(constellation)setHidden(constellation,true);if(field){field.innerHTML=`<div class="text-secondary small">
+          <b>Modo Admin:</b> selecciona una IES y usa <b>Resumen general</b>.
+        </div>`;}
+showOnly("home");return;}
+showOnly("home");renderSubprogramas();}catch(err){console.error(err);if(field)field.innerHTML=`<div class="text-danger small">Error cargando catalogo.</div>`;toastCompat({type:"danger",title:"Error",msg:"No se pudo cargar el catalogo. Revisa consola/endpoint.",ms:6500,});}});;
+document.addEventListener("DOMContentLoaded",async()=>{const A=window.ASTRA;if(!A?.requireAuth||!A.requireAuth())return;const role=(A.getRole?.()||"").toLowerCase();if(role!=="admin")return;const adminBar=document.getElementById("adminIesBar");const iesSelect=document.getElementById("iesSelect");const iesSearch=document.getElementById("iesSearch");const btnAddIES=document.getElementById("btnAddIES");const btnDeleteIES=document.getElementById("btnDeleteIES");const modalEl=document.getElementById("modalAddIES");const inputNombre=document.getElementById("newIesNombre");const inputSlug=document.getElementById("newIesSlug");const inputEmail=document.getElementById("newIesEmail");const inputPassword=document.getElementById("newIesPassword");const msgBox=document.getElementById("createIesMsg");const btnCreate=document.getElementById("btnCreateIES");adminBar?.classList.remove("hidden");const modal=modalEl&&window.bootstrap?new bootstrap.Modal(modalEl):null;function normalize(s){return(s||"").toString().normalize("NFD").replace(/[\u0300-\u036f]/g,"").toLowerCase().trim();}
+function slugify(s){return normalize(s).replace(/[^a-z0-9\s-]/g,"").replace(/\s+/g,"-").replace(/-+/g,"-").replace(/^-|-$/g,"");}
+function must(v,label){const ok=!!(v&&String(v).trim());if(!ok)throw new Error(`Falta: ${label}`);return String(v).trim();}
+function setMsg(text,kind="muted"){if(!msgBox)return;const colors={muted:"text-secondary",ok:"text-success",warn:"text-warning",err:"text-danger",};msgBox.className=`small mt-2 ${colors[kind] || colors.muted}`;msgBox.textContent=text||"";}
+function genTempPassword(){return"Temp123*";}
+let iesList=[];async function listIES(){const data=await A.api("/ies/");return Array.isArray(data)?data:[];}
+async function createIES({nombre,slug}){return await A.api("/ies/",{method:"POST",body:JSON.stringify({nombre,slug}),});}
+async function deleteIES(iesId){return await A.api(`/admin/ies/${encodeURIComponent(iesId)}`,{method:"DELETE"});}
+async function seedOperativo(slug){return await A.api(`/seed-operativo/ies/${encodeURIComponent(slug)}`,{method:"POST"});}
+async function seedIesUser(payload){return await A.api("/seed/ies-user",{method:"POST",body:JSON.stringify(payload),});}
+function setActiveIESById(id){const idNum=Number(id);A.state=A.state||{};A.state.iesList=iesList;A.state.ies=iesList.find((x)=>Number(x.id)===idNum)||null;}
+function renderSelect(list,selectedId=null){if(!iesSelect)return;iesSelect.innerHTML=(list||[]).map((i)=>`<option value="${i.id}">${i.nombre} (${i.slug})</option>`).join("");if(selectedId!=null&&list.some((x)=>String(x.id)===String(selectedId))){iesSelect.value=String(selectedId);}else if(list[0]?.id!=null){iesSelect.value=String(list[0].id);}
+if(iesSelect.value)setActiveIESById(iesSelect.value);}
+async function refreshIES(selectId=null){iesList=await listIES();if(!iesList.length){if(iesSelect)iesSelect.innerHTML="";A.state.iesList=[];A.state.ies=null;return;}
+renderSelect(iesList,selectId);}
+function applySearchFilter(){if(!iesSearch||!iesSelect)return;const knownSelected=A.state?.ies?.id??null;const q=normalize(iesSearch.value);const filtered=!q?iesList:iesList.filter((i)=>normalize(`${i.nombre} ${i.slug} ${i.id}`).includes(q));renderSelect(filtered,knownSelected);}
+iesSelect?.addEventListener("change",()=>{setActiveIESById(iesSelect.value);A.toast({type:"info",title:"IES activa",message:`${A.state.ies?.nombre || ""} (${A.state.ies?.slug || ""})`,timeout:3000,});});iesSearch?.addEventListener("input",applySearchFilter);btnAddIES?.addEventListener("click",()=>{if(inputNombre)inputNombre.value="";if(inputSlug)inputSlug.value="";if(inputEmail)inputEmail.value="";if(inputPassword)inputPassword.value="";setMsg("");modal?.show();});inputNombre?.addEventListener("input",()=>{if(!inputSlug)return;if(normalize(inputSlug.value))return;inputSlug.value=slugify(inputNombre.value);});btnCreate?.addEventListener("click",async()=>{if(!btnCreate)return;const old=btnCreate.textContent;btnCreate.disabled=true;btnCreate.textContent="Creando…";setMsg("Creando IES…","muted");try{const nombre=must(inputNombre?.value,"Nombre");let slug=inputSlug?.value?slugify(inputSlug.value):slugify(nombre);slug=must(slug,"Slug");const created=await createIES({nombre,slug});const newId=created?.id??created?.ies_id??null;const newSlug=created?.slug??slug;setMsg("Seed operativo…","muted");try{await seedOperativo(newSlug);}catch(e){}
+let email=normalize(inputEmail?.value||"");if(!email)email=`${newSlug}@astra.cedepro.com`;const password=(inputPassword?.value||"").trim()||genTempPassword();setMsg("Creando usuario IES…","muted");let creds=null;try{creds=await seedIesUser({ies_slug:newSlug,email,password,rol:"ies",username:email.split("@")[0],});}catch(e){A.toast({type:"warn",title:"IES creada, pero sin usuario",message:"No pude crear el usuario IES (revisa /seed/ies-user o ENV).",timeout:6000,});}
+await refreshIES(newId);modal?.hide();const outEmail=creds?.email||email;const outPass=password;A.toastCreds({email:outEmail,password:outPass,title:"IES creada ✓",});setMsg("");}catch(e){setMsg(e?.message||String(e),"err");A.toast({type:"error",title:"No se pudo crear la IES",message:e?.message||String(e),timeout:7000,});}finally{btnCreate.disabled=false;btnCreate.textContent=old||"Crear";}});btnDeleteIES?.addEventListener("click",async()=>{const active=A.state?.ies;if(!active?.id){A.toast({type:"warn",title:"Atención",message:"Selecciona una IES primero."});return;}
+const ok=confirm(`¿Eliminar la IES "${active.nombre}" (${active.slug})?`);if(!ok)return;const old=btnDeleteIES.textContent;btnDeleteIES.disabled=true;btnDeleteIES.textContent="Eliminando…";try{await deleteIES(active.id);await refreshIES(null);A.toast({type:"success",title:"Listo",message:"IES eliminada ✓"});}catch(e){A.toast({type:"error",title:"No se pudo eliminar",message:e?.message||String(e),timeout:7000,});}finally{btnDeleteIES.disabled=false;btnDeleteIES.textContent=old||"Eliminar";}});try{await refreshIES();}catch(e){A.toast({type:"error",title:"Admin",message:"No pude cargar /ies/."});}});
@@ -5,6 +5,18 @@
 
   A.qs = (sel, root = document) => root.querySelector(sel);
 
+  // --------------------------
+  // Imágenes optimizadas (window.ASTRA_IMG lo inyecta el server en /app)
+  // url original -> { src, srcset, sizes, width, height } | null
+  // --------------------------
+  A.imgAsset = (url) => (window.ASTRA_IMG || {})[url] || null;
+
+  A.imgAttrs = (url, sizes) => {
+    const v = A.imgAsset(url);
+    if (!v) return `src="${url}"`;
+    return `src="${v.src}" srcset="${v.srcset}" sizes="${sizes || v.sizes}"`;
+  };
+
   // --------------------------
   // Auth storage
   // --------------------------
@@ -289,7 +301,7 @@
 
     el.innerHTML = `
       <div class="astra-toast__row">
-        <img class="astra-toast__img" src="${ASTRA_IMG}" alt="Astra" />
+        <img class="astra-toast__img" ${A.imgAttrs(ASTRA_IMG)} alt="Astra" />
         <div>
           <div class="astra-toast__title">${safeHtml(title)}</div>
           <div class="astra-toast__msg">${safeHtml(message)}</div>
@@ -491,15 +491,28 @@ document.addEventListener("DOMContentLoaded", async () => {
         "/static/img/astra_point.png",
       ];
 
+      // Tamaño por pose (checklist 200, resto 260)
+      const ov = getPoseOverride(pose);
+      const vw = Math.max(320, window.innerWidth || 1200);
+
+      let size = vw < 520 ? 190 : vw < 900 ? 230 : 260;
+      if (ov?.width) size = ov.width;
+
       const list = [...(poseCandidates[pose] || poseCandidates.point), ...fallbacks];
       let i = 0;
 
+      // Variante optimizada (avif/webp + srcset, luego PNG liviano) si el build la generó
+      const opt = A.imgAsset?.(list[0]);
+      if (opt) list.unshift(opt.src, opt.fallback);
+
       c.img.onerror = null;
       c.img.onload = null;
+      c.img.removeAttribute("srcset");
 
       const tryNext = () => {
         i += 1;
         if (i >= list.length) return;
+        c.img.removeAttribute("srcset");
         c.img.src = list[i];
       };
 
@@ -512,15 +525,12 @@ document.addEventListener("DOMContentLoaded", async () => {
       };
 
       c.img.onerror = () => tryNext();
+      if (opt) {
+        c.img.sizes = `${size}px`;
+        c.img.srcset = opt.srcset;
+      }
       c.img.src = list[i];
 
-      // Tamaño por pose (checklist 200, resto 260)
-      const ov = getPoseOverride(pose);
-      const vw = Math.max(320, window.innerWidth || 1200);
-
-      let size = vw < 520 ? 190 : vw < 900 ? 230 : 260;
-      if (ov?.width) size = ov.width;
-
       c.img.style.width = `${size}px`;
       c.img.style.maxWidth = `260px`;   // lo que viste en tu style
       c.img.style.maxHeight = "46vh";
@@ -1287,8 +1297,11 @@ document.addEventListener("DOMContentLoaded", async () => {
             <h4 class="mb-1">${escapeHtml(submoduloNombre || "Submodulo")}</h4>
             <div class="text-secondary small">IES: ${escapeHtml(iesNombre || "—")}</div>
           </div>
-          <div class="text-secondary small">
-            Tip: edita y presiona <b>Guardar</b> por fila.
+          <div class="d-flex align-items-center gap-2">
+            <div class="text-secondary small">
+              Tip: <b>Guardar</b> por fila o <b>Guardar todo</b>.
+            </div>
+            <button id="btnGuardarTodo" class="btn btn-light btn-sm">Guardar todo</button>
           </div>
         </div>
 
@@ -1319,10 +1332,85 @@ document.addEventListener("DOMContentLoaded", async () => {
     `;
   }
 
-  async function wireOperativaTableHandlers(rootEl, saveFn) {
+  function rowStatusSetter(tr) {
+    const statusEl = tr.querySelector(".js-status");
+    return (txt, kind = "muted") => {
+      if (!statusEl) return;
+      statusEl.className = `text-${kind} small mt-1 js-status`;
+      statusEl.textContent = txt || "";
+    };
+  }
+
+  function operativaRowPayload(tr) {
+    const nivelKey = tr.querySelector(".js-valoracion-nivel")?.value || "deficiente";
+
+    const catRaw = (tr.querySelector(".js-categoria")?.value || "")
+      .toString()
+      .trim()
+      .toUpperCase();
+
+    const catBool = catRaw === "SI" ? true : catRaw === "NO" ? false : null;
+
+    return {
+      responsable: tr.querySelector(".js-responsable")?.value?.trim() || "",
+      presenta: !!tr.querySelector(".js-presenta")?.checked,
+      valoracion: scoreFromNivel(nivelKey),
+      extra_data: {
+        valoracion_nivel: nivelKey,
+        valoracion_label: labelFromNivel(nivelKey),
+      },
+      avance_pct: clamp01_100(tr.querySelector(".js-avance")?.value),
+      fecha_inicio: tr.querySelector(".js-fecha-inicio")?.value || null,
+      fecha_fin: tr.querySelector(".js-fecha-fin")?.value || null,
+      categoria_si_no: catBool,
+    };
+  }
+
+  async function wireOperativaTableHandlers(rootEl, saveFn, saveBatchFn) {
     const tbody = rootEl.querySelector("#opTbody");
     if (!tbody) return;
 
+    // Guardar todo: 1 request (upsert en lote) con todas las filas
+    const btnAll = rootEl.querySelector("#btnGuardarTodo");
+    if (btnAll && typeof saveBatchFn === "function") {
+      btnAll.onclick = async () => {
+        const rows = Array.from(tbody.querySelectorAll("tr[data-evid]"))
+          .filter((tr) => Number(tr.dataset.evid));
+        if (!rows.length) return;
+
+        const byId = new Map(rows.map((tr) => [Number(tr.dataset.evid), tr]));
+        const items = rows.map((tr) => ({ evidencia_id: Number(tr.dataset.evid), ...operativaRowPayload(tr) }));
+
+        try {
+          btnAll.disabled = true;
+          rows.forEach((tr) => rowStatusSetter(tr)("Guardando…", "secondary"));
+          const res = await saveBatchFn(items);
+
+          for (const it of (res?.items || [])) {
+            const tr = byId.get(Number(it.evidencia_id));
+            if (!tr) continue;
+            const setStatus = rowStatusSetter(tr);
+            if (it.ok) setStatus("Guardado ✓", "success");
+            else setStatus(it.error || "Error al guardar", "danger");
+          }
+
+          toastCompat({
+            type: res?.ok ? "success" : "warning",
+            title: "Operativa",
+            msg: `Guardadas ${res?.guardados ?? 0} de ${res?.total ?? items.length} filas.`,
+            ms: 2200,
+          });
+        } catch (e) {
+          console.error(e);
+          toastHttpError(e, "No se pudo guardar");
+          rows.forEach((tr) => rowStatusSetter(tr)("Error al guardar", "danger"));
+        } finally {
+          btnAll.disabled = false;
+          setTimeout(() => rows.forEach((tr) => rowStatusSetter(tr)("")), 2500);
+        }
+      };
+    }
+
     tbody.onclick = async (ev) => {
       const btn = ev.target.closest(".js-guardar");
       if (!btn) return;
@@ -1333,35 +1421,8 @@ document.addEventListener("DOMContentLoaded", async () => {
       const evidId = Number(tr.dataset.evid);
       if (!evidId) return;
 
-      const statusEl = tr.querySelector(".js-status");
-      const setStatus = (txt, kind = "muted") => {
-        if (!statusEl) return;
-        statusEl.className = `text-${kind} small mt-1 js-status`;
-        statusEl.textContent = txt || "";
-      };
-
-      const nivelKey = tr.querySelector(".js-valoracion-nivel")?.value || "deficiente";
-
-      const catRaw = (tr.querySelector(".js-categoria")?.value || "")
-        .toString()
-        .trim()
-        .toUpperCase();
-
-      const catBool = catRaw === "SI" ? true : catRaw === "NO" ? false : null;
-
-      const payload = {
-        responsable: tr.querySelector(".js-responsable")?.value?.trim() || "",
-        presenta: !!tr.querySelector(".js-presenta")?.checked,
-        valoracion: scoreFromNivel(nivelKey),
-        extra_data: {
-          valoracion_nivel: nivelKey,
-          valoracion_label: labelFromNivel(nivelKey),
-        },
-        avance_pct: clamp01_100(tr.querySelector(".js-avance")?.value),
-        fecha_inicio: tr.querySelector(".js-fecha-inicio")?.value || null,
-        fecha_fin: tr.querySelector(".js-fecha-fin")?.value || null,
-        categoria_si_no: catBool,
-      };
+      const setStatus = rowStatusSetter(tr);
+      const payload = operativaRowPayload(tr);
 
       try {
         btn.disabled = true;
@@ -1646,8 +1707,19 @@ document.addEventListener("DOMContentLoaded", async () => {
 
     await ensureIESResolved();
 
-    const data = await A.api("/catalogo/subprogramas");
-    A.state.subprogramas = Array.isArray(data) ? data : [];
+    // Árbol completo en 1 llamada; "no-cache" = revalida con ETag (304 barato)
+    // para ver al instante un reload del catálogo. Fallback al endpoint plano.
+    A.state.submodulosPorSubp = {};
+    try {
+      const arbol = await A.api("/catalogo/arbol", { method: "GET", cache: "no-cache" });
+      const sps = Array.isArray(arbol?.subprogramas) ? arbol.subprogramas : [];
+      A.state.subprogramas = sps;
+      for (const sp of sps) A.state.submodulosPorSubp[sp.id] = Array.isArray(sp.submodulos) ? sp.submodulos : [];
+    } catch (e) {
+      console.warn("catalogo/arbol no disponible, uso /catalogo/subprogramas", e);
+      const data = await A.api("/catalogo/subprogramas");
+      A.state.subprogramas = Array.isArray(data) ? data : [];
+    }
     renderSubprogramas();
   }
 
@@ -1674,7 +1746,8 @@ document.addEventListener("DOMContentLoaded", async () => {
   }
 
   async function loadSubmodulos(subprogramaId) {
-    const data = await A.api(`/catalogo/subprogramas/${subprogramaId}/submodulos`);
+    const cached = A.state.submodulosPorSubp?.[subprogramaId];
+    const data = cached || await A.api(`/catalogo/subprogramas/${subprogramaId}/submodulos`);
     A.state.submodulos = Array.isArray(data) ? data : [];
     renderSubmodulos();
   }
@@ -1734,9 +1807,9 @@ document.addEventListener("DOMContentLoaded", async () => {
       // endpoint mio (y fallback al admin si tu backend no tiene /mio)
       const iesId = A.state.ies?.id;
       const arr = [
-        `/api/resumen/mio/submodulo/${submoduloId}`,
+        `/api/resumen/mio/submodulo/${submoduloId}?include=registros`,
       ];
-      if (iesId) arr.push(`/api/resumen/submodulo/${iesId}/${submoduloId}`);
+      if (iesId) arr.push(`/api/resumen/submodulo/${iesId}/${submoduloId}?include=registros`);
       return arr;
     }
 
@@ -1745,7 +1818,26 @@ document.addEventListener("DOMContentLoaded", async () => {
       (typeof A.getIesId === "function" ? A.getIesId() : null);
 
     if (!iesId) throw new Error("Falta ies_id para cargar resumen (Admin).");
-    return [`/api/resumen/submodulo/${iesId}/${submoduloId}`];
+    return [`/api/resumen/submodulo/${iesId}/${submoduloId}?include=registros`];
+  }
+
+  function resumenGeneralPaths() {
+    const iesId =
+      A.state.ies?.id ||
+      (typeof A.getIesId === "function" ? A.getIesId() : null);
+
+    if (isIES()) {
+      const arr = [`/api/resumen/mio`];
+      if (iesId) arr.push(`/api/resumen/ies/${iesId}`);
+      return arr;
+    }
+
+    if (!iesId) throw new Error("Falta ies_id para cargar resumen general (Admin).");
+    return [`/api/resumen/ies/${iesId}`];
+  }
+
+  async function fetchResumenGeneral() {
+    return await apiTry(resumenGeneralPaths());
   }
 
   async function fetchEvidencias(submoduloId) {
@@ -1774,6 +1866,20 @@ document.addEventListener("DOMContentLoaded", async () => {
     });
   }
 
+  async function saveEvidenciasBatch(items) {
+    const slug = A.state.ies?.slug;
+    const body = JSON.stringify({ items });
+
+    if (isIES()) {
+      const paths = [`/operacion/evidencias`];
+      if (slug) paths.push(`/operacion/ies/${slug}/evidencias`);
+      return await apiTry(paths, { method: "PATCH", body });
+    }
+
+    if (!slug) throw new Error("Falta ies.slug para guardar evidencias (Admin).");
+    return await A.api(`/operacion/ies/${slug}/evidencias`, { method: "PATCH", body });
+  }
+
   // ============================================================
   // Operativa (solo IES)
   // ============================================================
@@ -1818,7 +1924,7 @@ document.addEventListener("DOMContentLoaded", async () => {
         iesName
       );
 
-      await wireOperativaTableHandlers(operativaPanel, saveEvidenciaPatch);
+      await wireOperativaTableHandlers(operativaPanel, saveEvidenciaPatch, saveEvidenciasBatch);
     } catch (e) {
       console.error(e);
       toastHttpError(e, "No se pudieron cargar evidencias");
@@ -1943,24 +2049,6 @@ document.addEventListener("DOMContentLoaded", async () => {
     return "—";
   }
 
-  async function mapLimit(items, limit, mapper) {
-    const arr = Array.isArray(items) ? items : [];
-    if (!arr.length) return [];
-    const out = new Array(arr.length);
-    let cursor = 0;
-
-    const workers = Array.from({ length: Math.min(limit, arr.length) }, async () => {
-      while (true) {
-        const idx = cursor++;
-        if (idx >= arr.length) break;
-        out[idx] = await mapper(arr[idx], idx);
-      }
-    });
-
-    await Promise.all(workers);
-    return out;
-  }
-
   function resumenGeneralShellHTML(iesNombre, iesId) {
     return `
       <div class="container-fluid mt-3">
@@ -2041,9 +2129,9 @@ document.addEventListener("DOMContentLoaded", async () => {
     const rgTbody = document.getElementById("rgTbody");
 
     try {
-      if (rgProgress) rgProgress.textContent = "Cargando catalogo de subprogramas…";
-      const subprogramas = await A.api("/catalogo/subprogramas");
-      const sps = Array.isArray(subprogramas) ? subprogramas : [];
+      if (rgProgress) rgProgress.textContent = "Cargando resumen general…";
+      const general = await fetchResumenGeneral();
+      const sps = Array.isArray(general?.subprogramas) ? general.subprogramas : [];
 
       if (!sps.length) {
         if (rgTbody) rgTbody.innerHTML = `<tr><td colspan="7" class="text-secondary">No hay subprogramas.</td></tr>`;
@@ -2051,25 +2139,24 @@ document.addEventListener("DOMContentLoaded", async () => {
         return;
       }
 
-      if (rgProgress) rgProgress.textContent = "Cargando submodulos…";
       const rows = [];
+      const results = [];
 
       for (const sp of sps) {
-        const spId = sp?.id;
+        const spId = sp?.subprograma_id;
         const spName = sp?.nombre || `Subprograma ${spId}`;
-        if (!spId) continue;
-
-        const sms = await A.api(`/catalogo/subprogramas/${spId}/submodulos`);
-        const list = Array.isArray(sms) ? sms : [];
+        const list = Array.isArray(sp?.submodulos) ? sp.submodulos : [];
 
         for (const sm of list) {
-          if (!sm?.id) continue;
-          rows.push({
+          if (!sm?.submodulo_id) continue;
+          const row = {
             spId,
             spName,
-            smId: sm.id,
-            smName: sm.nombre || `Submodulo ${sm.id}`,
-          });
+            smId: sm.submodulo_id,
+            smName: sm.nombre || `Submodulo ${sm.submodulo_id}`,
+          };
+          rows.push(row);
+          results.push({ ok: true, row, data: sm });
         }
       }
 
@@ -2079,22 +2166,6 @@ document.addEventListener("DOMContentLoaded", async () => {
         return;
       }
 
-      let done = 0;
-      if (rgProgress) rgProgress.textContent = `Cargando resumenes: 0/${rows.length}…`;
-
-      const results = await mapLimit(rows, 4, async (row) => {
-        try {
-          const data = await fetchResumenSubmodulo(row.smId);
-          return { ok: true, row, data };
-        } catch (e) {
-          console.error("Resumen submodulo fallo:", row.smId, e);
-          return { ok: false, row, err: e };
-        } finally {
-          done++;
-          if (rgProgress) rgProgress.textContent = `Cargando resumenes: ${done}/${rows.length}…`;
-        }
-      });
-
       if (rgProgress) rgProgress.textContent = `Listo ✓ (${rows.length} submodulos)`;
 
       if (rgTbody) {
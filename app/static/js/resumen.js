@@ -90,20 +90,66 @@
     return await A.api(url);
   }
 
-  // Concurrency limit para no matar el backend
-  async function mapLimit(items, limit, mapper) {
-    const out = new Array(items.length);
-    let i = 0;
-
-    const workers = new Array(Math.min(limit, items.length)).fill(0).map(async () => {
-      while (i < items.length) {
-        const idx = i++;
-        out[idx] = await mapper(items[idx], idx);
-      }
-    });
+  // =========================================================
+  // Stream del resumen general (GET /api/resumen/stream, SSE)
+  // EventSource no manda Authorization: fetch + ReadableStream y el
+  // parseo SSE a mano. Si se corta, reintenta y pide "resync" (los
+  // cambios de ese intervalo se perdieron).
+  // =========================================================
+  let rgStream = null; // AbortController del stream abierto
+
+  function stopResumenStream() {
+    if (rgStream) rgStream.abort();
+    rgStream = null;
+  }
 
-    await Promise.all(workers);
-    return out;
+  function startResumenStream(iesId, onEvent) {
+    stopResumenStream();
+    const ctrl = new AbortController();
+    rgStream = ctrl;
+
+    (async () => {
+      let retry = 3000;
+      let reconexion = false;
+      while (!ctrl.signal.aborted) {
+        try {
+          const token = A.auth.get();
+          const res = await fetch(`/api/resumen/stream?ies_id=${encodeURIComponent(iesId)}`, {
+            headers: Object.assign({ Accept: "text/event-stream" }, token ? { Authorization: `Bearer ${token}` } : {}),
+            signal: ctrl.signal,
+          });
+          if (res.status === 401 || res.status === 403) return; // sin permiso: no insistir
+          if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+          if (reconexion) await onEvent("resync", { ies_id: iesId });
+          reconexion = true;
+
+          const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+          let buf = "";
+          for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buf += value;
+            let i;
+            while ((i = buf.indexOf("\n\n")) >= 0) {
+              const block = buf.slice(0, i);
+              buf = buf.slice(i + 2);
+              let tipo = "message";
+              const data = [];
+              for (const line of block.split("\n")) {
+                if (line.startsWith("event:")) tipo = line.slice(6).trim();
+                else if (line.startsWith("data:")) data.push(line.slice(5).trimStart());
+                else if (line.startsWith("retry:")) retry = Number(line.slice(6)) || retry;
+              }
+              if (data.length) await onEvent(tipo, JSON.parse(data.join("\n")));
+            }
+          }
+        } catch (e) {
+          if (ctrl.signal.aborted) return;
+          console.warn("Stream del resumen:", e?.message || e);
+        }
+        await new Promise((r) => setTimeout(r, retry));
+      }
+    })();
   }
 
   // =========================================================
@@ -358,7 +404,7 @@
     `;
 
     try {
-      const data = await apiGET(`/api/resumen/submodulo/${iesId}/${submoduloId}`);
+      const data = await apiGET(`/api/resumen/submodulo/${iesId}/${submoduloId}?include=registros`);
       resumenPanel.innerHTML = `<div id="resumenRoot"></div>`;
       const rootEl = document.getElementById("resumenRoot");
 
@@ -387,6 +433,7 @@
   // ✅ NUEVO: A.openResumenGeneral (tabla compacta)
   // =========================================================
   A.openResumenGeneral = async function openResumenGeneral(ctx = {}) {
+    stopResumenStream();
     const resumenPanel = ensureResumenPanelVisible();
     if (!resumenPanel) return;
 
@@ -451,63 +498,46 @@
       </div>
     `;
 
-    document.getElementById("btnBackRG")?.addEventListener("click", () => (onBack ? onBack() : backToMap()));
+    document.getElementById("btnBackRG")?.addEventListener("click", () => {
+      stopResumenStream();
+      onBack ? onBack() : backToMap();
+    });
 
     const rgProgress = document.getElementById("rgProgress");
     const rgTbody = document.getElementById("rgTbody");
 
-    try {
-      // 1) subprogramas
-      const subprogramas = await apiGET("/catalogo/subprogramas");
-      if (!Array.isArray(subprogramas) || subprogramas.length === 0) {
+    // Pinta la tabla desde /api/resumen/ies/{id} (carga inicial y "resync")
+    const pintar = (general) => {
+      const subprogramas = Array.isArray(general?.subprogramas) ? general.subprogramas : [];
+      if (subprogramas.length === 0) {
         rgTbody.innerHTML = `<tr><td colspan="6" class="text-secondary">No hay subprogramas.</td></tr>`;
-        return;
+        return false;
       }
 
-      // 2) submódulos por subprograma
-      rgProgress.textContent = "Cargando submódulos…";
-      const allSubmods = [];
+      // 2) aplanar a filas (subprograma, submódulo)
+      const results = [];
       for (const sp of subprogramas) {
-        const spId = sp?.id;
+        const spId = sp?.subprograma_id;
         const spName = sp?.nombre || `Subprograma ${spId}`;
-        if (!spId) continue;
-
-        const subs = await apiGET(`/catalogo/subprogramas/${spId}/submodulos`);
-        if (!Array.isArray(subs)) continue;
+        const subs = Array.isArray(sp?.submodulos) ? sp.submodulos : [];
 
         for (const sm of subs) {
-          const smId = sm?.id;
+          const smId = sm?.submodulo_id;
           if (!smId) continue;
-          allSubmods.push({
-            spId,
-            spName,
-            smId,
-            smName: sm?.nombre || `Submódulo ${smId}`
+          results.push({
+            ok: true,
+            row: { spId, spName, smId, smName: sm?.nombre || `Submódulo ${smId}` },
+            data: sm
           });
         }
       }
 
-      if (allSubmods.length === 0) {
+      if (results.length === 0) {
         rgTbody.innerHTML = `<tr><td colspan="6" class="text-secondary">No hay submódulos.</td></tr>`;
-        return;
+        return false;
       }
 
-      // 3) resumen por submódulo (limitado)
-      let done = 0;
-      const total = allSubmods.length;
-      rgProgress.textContent = `Cargando resúmenes: 0/${total}…`;
-
-      const results = await mapLimit(allSubmods, 4, async (row) => {
-        try {
-          const data = await apiGET(`/api/resumen/submodulo/${iesId}/${row.smId}`);
-          return { ok: true, row, data };
-        } catch (e) {
-          return { ok: false, row, err: e };
-        } finally {
-          done++;
-          if (rgProgress) rgProgress.textContent = `Cargando resúmenes: ${done}/${total}…`;
-        }
-      });
+      const total = results.length;
 
       // 4) pintar tabla
       rgProgress.textContent = `Listo ✓ (${total} submódulos)`;
@@ -535,15 +565,15 @@
         const evid = toNum(data?.evidencias_total) ?? 0;
         const av = clamp(toNum(data?.avance_promedio) ?? 0, 0, 100);
         const registros = Array.isArray(data?.registros) ? data.registros : [];
-        const lastUpd = fmtDate(pickLastUpdated(registros));
+        const lastUpd = fmtDate(data?.ultima_actualizacion || pickLastUpdated(registros));
 
         return `
-          <tr>
+          <tr data-smid="${r.row.smId}">
             <td style="opacity:.85;">${sp}</td>
             <td style="font-weight:700;">${sm}</td>
-            <td class="text-end">${evid}</td>
-            <td class="text-end">${Math.round(av)}%</td>
-            <td class="text-secondary small">${lastUpd}</td>
+            <td class="text-end rg-evid">${evid}</td>
+            <td class="text-end rg-av">${Math.round(av)}%</td>
+            <td class="text-secondary small rg-upd">${lastUpd}</td>
             <td class="text-end">
               <button class="btn btn-outline-light btn-sm rg-open"
                       data-smid="${r.row.smId}"
@@ -552,6 +582,32 @@
           </tr>
         `;
       }).join("");
+      return true;
+    };
+
+    // Celdas que cambiaron (stream): solo Evidencias / Avance / Últ. actualización
+    const aplicar = (data) => {
+      for (const sm of (Array.isArray(data?.submodulos) ? data.submodulos : [])) {
+        const tr = rgTbody.querySelector(`tr[data-smid="${Number(sm?.submodulo_id)}"]`);
+        if (!tr) continue;
+        const av = clamp(toNum(sm?.avance_promedio) ?? 0, 0, 100);
+        tr.querySelector(".rg-evid").textContent = String(toNum(sm?.evidencias_total) ?? 0);
+        tr.querySelector(".rg-av").textContent = `${Math.round(av)}%`;
+        tr.querySelector(".rg-upd").textContent = fmtDate(sm?.ultima_actualizacion);
+      }
+    };
+
+    try {
+      // 1) resumen general en UNA llamada (catálogo + agregados por submódulo)
+      rgProgress.textContent = "Cargando resumen general…";
+      if (!pintar(await apiGET(`/api/resumen/ies/${iesId}`))) return;
+
+      // 4b) cambios en vivo: el server empuja solo las celdas que cambian
+      startResumenStream(iesId, async (tipo, data) => {
+        if (!document.body.contains(rgTbody)) return stopResumenStream();
+        if (tipo === "resumen") aplicar(data);
+        else if (tipo === "resync") pintar(await apiGET(`/api/resumen/ies/${iesId}`));
+      });
 
       // 5) click en "Ver" abre resumen bonito del submódulo
       rgTbody.addEventListener("click", async (ev) => {
@@ -561,6 +617,7 @@
         const smId = Number(btn.dataset.smid);
         const smName = btn.dataset.smname || "Submódulo";
 
+        stopResumenStream();
         await A.openResumen({
           submoduloId: smId,
           submoduloNombre: smName,
@@ -0,0 +1,277 @@
+"""
+Driver de carga: reproduce los patrones de llamadas del frontend con
+usuarios IES del dataset sintético (bench/generar_dataset.py).
+
+Cada usuario virtual (VU) usa una IES distinta y repite sesiones:
+  1. login                  POST /auth/login
+  2. catálogo               GET  /catalogo/arbol
+  3. resumen general        GET  /api/resumen/mio
+                            GET  /api/resumen/mio/submodulo/{id}?include=registros  (x --resumen-submodulos)
+  4. planner (x --ciclos)   GET  /form-config/submodulos?ids=...  (submódulos del subprograma)
+                            GET  /operacion/submodulos/{id}/evidencias
+                            PATCH /operacion/evidencias/{evidencia_id}
+                            PATCH /operacion/evidencias              (lote de 2-5)
+                            GET  /operacion/submodulos/{id}/evidencias  (recarga tras guardar)
+                            GET  /api/resumen/mio/submodulo/{id}?include=registros
+Como el navegador, reenvía If-None-Match (304) salvo --sin-etag.
+
+Salida: JSON con p50/p95/p99, media, máx y req/s por endpoint (plantilla
+de ruta) + total, con commit y parámetros para comparar entre versiones.
+
+Uso:
+    pip install -r bench/requirements.txt
+    python bench/generar_dataset.py --ies 100
+    uvicorn app.main:app --workers 1 --port 8000
+    python bench/bench_carga.py --vus 50 --duracion 60 --usuarios 100 --out bench/resultados/HEAD.json
+    python bench/bench_carga.py ... --comparar bench/resultados/base.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from bench_lecturas import _percentil
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+class _Stats:
+    def __init__(self):
+        self.lat = {}  # endpoint -> [segundos]
+        self.status = {}  # endpoint -> {status: n}
+        self.errores = {}  # endpoint -> n
+
+    def add(self, endpoint: str, status, seconds: float | None):
+        st = self.status.setdefault(endpoint, {})
+        st[str(status)] = st.get(str(status), 0) + 1
+        if seconds is None or (isinstance(status, int) and status >= 400):
+            self.errores[endpoint] = self.errores.get(endpoint, 0) + 1
+        else:
+            self.lat.setdefault(endpoint, []).append(seconds)
+
+
+class _VU:
+    """Un usuario virtual: token propio + cache de ETags como el navegador."""
+
+    def __init__(self, client, stats, rnd, args, email):
+        self.client = client
+        self.stats = stats
+        self.rnd = rnd
+        self.args = args
+        self.email = email
+        self.headers = {}
+        self.etags = {}
+        self.bodies = {}
+
+    async def call(self, endpoint: str, method: str, url: str, **kw):
+        headers = dict(self.headers)
+        if method == "GET" and not self.args.sin_etag and url in self.etags:
+            headers["If-None-Match"] = self.etags[url]
+        t0 = time.perf_counter()
+        try:
+            r = await self.client.request(method, url, headers=headers, **kw)
+        except httpx.HTTPError:
+            self.stats.add(endpoint, "conexion", None)
+            return None
+        self.stats.add(endpoint, r.status_code, time.perf_counter() - t0)
+        if method == "GET" and r.headers.get("etag") and r.status_code == 200:
+            self.etags[url] = r.headers["etag"]
+        return r
+
+    async def login(self) -> bool:
+        self.headers = {}
+        r = await self.call("POST /auth/login", "POST", "/auth/login",
+                            json={"email": self.email, "password": self.args.password})
+        if r is None or r.status_code != 200:
+            return False
+        self.headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        return True
+
+    async def json_get(self, endpoint: str, url: str):
+        """GET que recuerda el último cuerpo (en un 304 se reutiliza, como el navegador)."""
+        r = await self.call(endpoint, "GET", url)
+        if r is None:
+            return None
+        if r.status_code == 200:
+            self.bodies[url] = r.json()
+        return self.bodies.get(url) if r.status_code in (200, 304) else None
+
+    async def sesion(self, fin: float):
+        if not await self.login():
+            await asyncio.sleep(0.5)
+            return
+
+        arbol = await self.json_get("GET /catalogo/arbol", "/catalogo/arbol")
+        if not arbol:
+            return
+        subprogramas = [sp for sp in arbol["subprogramas"] if sp["submodulos"]]
+        todos = [sm["id"] for sp in subprogramas for sm in sp["submodulos"]]
+
+        # Resumen general
+        await self.json_get("GET /api/resumen/mio", "/api/resumen/mio")
+        for sm_id in self.rnd.sample(todos, min(self.args.resumen_submodulos, len(todos))):
+            await self.json_get(
+                "GET /api/resumen/mio/submodulo/{submodulo_id}",
+                f"/api/resumen/mio/submodulo/{sm_id}?include=registros",
+            )
+            await self.pausa()
+
+        # Planner: evidencias + guardado
+        for _ in range(self.args.ciclos):
+            if time.perf_counter() >= fin:
+                return
+            sp = self.rnd.choice(subprogramas)
+            sm_id = self.rnd.choice(sp["submodulos"])["id"]
+            ids = ",".join(str(sm["id"]) for sm in sp["submodulos"])
+
+            await self.json_get("GET /form-config/submodulos", f"/form-config/submodulos?ids={ids}")
+            ev_url = f"/operacion/submodulos/{sm_id}/evidencias"
+            evidencias = await self.json_get("GET /operacion/submodulos/{submodulo_id}/evidencias", ev_url)
+            await self.pausa()
+            if evidencias:
+                ev_ids = [e["evidencia_id"] for e in evidencias]
+                await self.call(
+                    "PATCH /operacion/evidencias/{evidencia_id}", "PATCH",
+                    f"/operacion/evidencias/{self.rnd.choice(ev_ids)}", json=self.cambio(),
+                )
+                lote = self.rnd.sample(ev_ids, min(len(ev_ids), self.rnd.randint(2, 5)))
+                await self.call(
+                    "PATCH /operacion/evidencias", "PATCH", "/operacion/evidencias",
+                    json={"items": [{"evidencia_id": e, **self.cambio()} for e in lote]},
+                )
+                await self.json_get("GET /operacion/submodulos/{submodulo_id}/evidencias", ev_url)
+            await self.json_get(
+                "GET /api/resumen/mio/submodulo/{submodulo_id}",
+                f"/api/resumen/mio/submodulo/{sm_id}?include=registros",
+            )
+            await self.pausa()
+
+    def cambio(self) -> dict:
+        rnd = self.rnd
+        out = {"avance_pct": rnd.randrange(0, 101, 5), "presenta": rnd.random() < 0.7}
+        if rnd.random() < 0.5:
+            out["valoracion"] = rnd.choice((0, 25, 50, 75, 100))
+        if rnd.random() < 0.3:
+            out["responsable"] = rnd.choice(("Ana Torres", "Luis Paredes", "María Chávez"))
+        return out
+
+    async def pausa(self):
+        if self.args.pausa_ms:
+            await asyncio.sleep(self.rnd.uniform(0.5, 1.5) * self.args.pausa_ms / 1000)
+
+
+async def _vu_loop(vu: _VU, fin: float):
+    while time.perf_counter() < fin:
+        await vu.sesion(fin)
+
+
+def _resumen(stats: _Stats, total_s: float) -> dict:
+    endpoints = {}
+    todas = []
+    for ep in sorted(stats.status):
+        lat = sorted(stats.lat.get(ep, []))
+        todas.extend(lat)
+        endpoints[ep] = _fila(lat, total_s, stats.status[ep], stats.errores.get(ep, 0))
+    todas.sort()
+    total = _fila(todas, total_s, {}, sum(stats.errores.values()))
+    total.pop("status")
+    return {"endpoints": endpoints, "total": total}
+
+
+def _fila(lat: list, total_s: float, status: dict, errores: int) -> dict:
+    return {
+        "n": len(lat),
+        "errores": errores,
+        "rps": round(len(lat) / total_s, 2) if total_s else 0.0,
+        "p50_ms": round(_percentil(lat, 50) * 1000, 2),
+        "p95_ms": round(_percentil(lat, 95) * 1000, 2),
+        "p99_ms": round(_percentil(lat, 99) * 1000, 2),
+        "media_ms": round(sum(lat) / len(lat) * 1000, 2) if lat else 0.0,
+        "max_ms": round(lat[-1] * 1000, 2) if lat else 0.0,
+        "status": status,
+    }
+
+
+def _commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=5
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _tabla(res: dict, base: dict | None, out=sys.stderr):
+    print(f"{'endpoint':<52} {'n':>7} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}", file=out)
+    filas = list(res["endpoints"].items()) + [("TOTAL", res["total"])]
+    for ep, r in filas:
+        line = (f"{ep:<52} {r['n']:>7} {r['errores']:>5} {r['rps']:>8.1f} "
+                f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+        prev = (base or {}).get("endpoints", {}).get(ep) if ep != "TOTAL" else (base or {}).get("total")
+        if prev and prev.get("p95_ms"):
+            d95 = (r["p95_ms"] - prev["p95_ms"]) / prev["p95_ms"] * 100
+            drps = (r["rps"] - prev["rps"]) / prev["rps"] * 100 if prev.get("rps") else 0.0
+            line += f"   p95 {d95:+6.1f}%  req/s {drps:+6.1f}%"
+        print(line, file=out)
+
+
+async def main():
+    ap = argparse.ArgumentParser(description="Carga con patrones reales del frontend de Astra")
+    ap.add_argument("--base", default="http://127.0.0.1:8000")
+    ap.add_argument("--vus", type=int, default=20, help="usuarios virtuales concurrentes")
+    ap.add_argument("--duracion", type=float, default=30.0, help="segundos de medición")
+    ap.add_argument("--prefijo", default="bench", help="mismo --prefijo del generador")
+    ap.add_argument("--usuarios", type=int, default=10, help="IES generadas a usar (VU k -> IES k mod N)")
+    ap.add_argument("--password", default="bench-astra-123")
+    ap.add_argument("--resumen-submodulos", type=int, default=3, help="detalles abiertos en el resumen")
+    ap.add_argument("--ciclos", type=int, default=5, help="ciclos del planner por sesión (luego re-login)")
+    ap.add_argument("--pausa-ms", type=float, default=0.0, help="think time medio entre pasos")
+    ap.add_argument("--sin-etag", action="store_true", help="no reenviar If-None-Match")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default=None, help="archivo JSON (default: stdout)")
+    ap.add_argument("--comparar", default=None, help="JSON de una corrida anterior (muestra deltas)")
+    args = ap.parse_args()
+
+    stats = _Stats()
+    limits = httpx.Limits(max_connections=args.vus, max_keepalive_connections=args.vus)
+    async with httpx.AsyncClient(base_url=args.base, limits=limits, timeout=60) as client:
+        vus = [
+            _VU(client, stats, random.Random(args.seed + k), args,
+                f"{args.prefijo}-{k % args.usuarios + 1:04d}@bench.local")
+            for k in range(args.vus)
+        ]
+        t0 = time.perf_counter()
+        fin = t0 + args.duracion
+        await asyncio.gather(*(_vu_loop(vu, fin) for vu in vus))
+        total_s = time.perf_counter() - t0
+
+    res = {
+        "commit": _commit(),
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("password", "out", "comparar")},
+        "duracion_s": round(total_s, 2),
+        **_resumen(stats, total_s),
+    }
+
+    base = json.loads(Path(args.comparar).read_text(encoding="utf-8")) if args.comparar else None
+    _tabla(res, base)
+
+    body = json.dumps(res, indent=2, ensure_ascii=False)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(body + "\n", encoding="utf-8")
+        print("OK:", args.out, file=sys.stderr)
+    else:
+        print(body)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
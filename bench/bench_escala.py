@@ -0,0 +1,221 @@
+"""
+Latencia del resumen en SQL según la cantidad de IES (p. ej. 100 vs 2000)
+y el layout de evidencia_registro (heap vs particionada por HASH(ies_id),
+migrations/004_evidencia_registro_particionada.sql).
+
+Corre directo contra Postgres las mismas queries que arman el resumen y
+el planner, para IES / submódulos al azar del dataset sintético
+(bench/generar_dataset.py). Va por SQL y no por HTTP para que el cache de
+resultados y los ETag no tapen el costo de la tabla:
+  resumen_ies            rollup de toda la IES       (/api/resumen/ies, /mio)
+  submodulo_kpis_vivo    agregación del par          (_live_kpis)
+  submodulo_registros    detalle del par             (?include=registros)
+  evidencias             registros por evidencia_id  (/operacion/.../evidencias)
+  guardar_rollup         UPDATE 1 registro + trigger del rollup (ROLLBACK)
+
+Salida: JSON con layout (particiones, tamaño de tabla/índices), p50/p95/p99
+por query y --comparar contra otra corrida.
+
+Uso:
+    python bench/generar_dataset.py --ies 100
+    python bench/bench_escala.py --out bench/resultados/escala-100.json
+    python bench/generar_dataset.py --ies 2000
+    python bench/bench_escala.py --out bench/resultados/escala-2000.json \
+        --comparar bench/resultados/escala-100.json
+    # mismo par de corridas antes / después de la migración 004
+Generar de menor a mayor (o VACUUM FULL evidencia_registro antes de medir):
+el generador borra las IES previas y las filas muertas inflan el tamaño.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import psycopg2
+
+from bench_carga import _commit
+from bench_lecturas import _percentil
+from generar_dataset import _dsn
+
+QUERIES = {
+    "resumen_ies": """
+        SELECT rr.*
+        FROM resumen_rollup rr
+        JOIN submodulos s ON s.id = rr.submodulo_id
+        WHERE rr.ies_id = %(ies)s
+        ORDER BY s.orden
+    """,
+    "submodulo_kpis_vivo": """
+        SELECT COUNT(er.id), AVG(er.avance_pct), AVG(er.valoracion),
+               MIN(er.fecha_inicio), MAX(er.fecha_fin), MAX(er.updated_at),
+               COUNT(er.id) FILTER (WHERE er.presenta IS TRUE),
+               (ARRAY_AGG(btrim(er.responsable) ORDER BY er.updated_at DESC, ei.orden ASC, er.id ASC)
+                 FILTER (WHERE btrim(er.responsable) <> ''))[1]
+        FROM evidencia_registro er
+        JOIN evidencia_item ei ON ei.id = er.evidencia_id
+        WHERE er.ies_id = %(ies)s
+          AND er.submodulo_id = %(sm)s
+    """,
+    "submodulo_registros": """
+        SELECT er.id, er.avance_pct, er.valoracion, er.presenta, er.categoria_si_no,
+               er.responsable, er.fecha_inicio, er.fecha_fin, er.updated_at,
+               ei.id, ei.titulo, ei.orden
+        FROM evidencia_registro er
+        JOIN evidencia_item ei ON ei.id = er.evidencia_id
+        WHERE er.ies_id = %(ies)s
+          AND er.submodulo_id = %(sm)s
+        ORDER BY ei.orden ASC, er.id ASC
+    """,
+    "evidencias": """
+        SELECT er.*
+        FROM evidencia_registro er
+        WHERE er.ies_id = %(ies)s
+          AND er.evidencia_id = ANY(%(evs)s)
+    """,
+    "guardar_rollup": """
+        UPDATE evidencia_registro
+        SET avance_pct = %(av)s
+        WHERE ies_id = %(ies)s AND evidencia_id = %(ev)s
+    """,
+}
+
+
+def _layout(cur) -> dict:
+    cur.execute("""
+        SELECT c.relkind = 'p',
+               (SELECT COUNT(*) FROM pg_inherits WHERE inhparent = c.oid),
+               COALESCE((SELECT SUM(pg_table_size(t.relid))::bigint
+                         FROM pg_partition_tree(c.oid) t), pg_table_size(c.oid)),
+               COALESCE((SELECT SUM(pg_indexes_size(t.relid))::bigint
+                         FROM pg_partition_tree(c.oid) t), pg_indexes_size(c.oid)),
+               (SELECT COUNT(*) FROM evidencia_registro)
+        FROM pg_class c
+        WHERE c.oid = 'evidencia_registro'::regclass
+    """)
+    particionada, particiones, tabla, indices, filas = cur.fetchone()
+    return {
+        "particionada": particionada,
+        "particiones": particiones,
+        "filas": filas,
+        "tabla_mb": round(tabla / 2**20, 1),
+        "indices_mb": round(indices / 2**20, 1),
+    }
+
+
+def _params(rnd, ies_ids: list, por_sm: dict) -> dict:
+    sm = rnd.choice(list(por_sm))
+    evs = por_sm[sm]
+    return {
+        "ies": rnd.choice(ies_ids),
+        "sm": sm,
+        "evs": evs,
+        "ev": rnd.choice(evs),
+        "av": rnd.randrange(0, 101, 5),
+    }
+
+
+def _medir(conn, sql: str, n: int, rnd, ies_ids, por_sm) -> list:
+    cur = conn.cursor()
+    lat = []
+    for _ in range(n):
+        p = _params(rnd, ies_ids, por_sm)
+        t0 = time.perf_counter()
+        cur.execute(sql, p)
+        if cur.description:
+            cur.fetchall()
+        lat.append(time.perf_counter() - t0)
+        # Lecturas: cerrar la transacción implícita; escritura: no dejar rastro
+        conn.rollback()
+    lat.sort()
+    return lat
+
+
+def _fila(lat: list) -> dict:
+    return {
+        "n": len(lat),
+        "p50_ms": round(_percentil(lat, 50) * 1000, 3),
+        "p95_ms": round(_percentil(lat, 95) * 1000, 3),
+        "p99_ms": round(_percentil(lat, 99) * 1000, 3),
+        "media_ms": round(sum(lat) / len(lat) * 1000, 3) if lat else 0.0,
+    }
+
+
+def _tabla(res: dict, base: dict | None, out=sys.stderr):
+    lay = res["layout"]
+    modo = f"HASH x{lay['particiones']}" if lay["particionada"] else "heap"
+    print(f"{res['ies']} IES ({res['ies_total']} en la base), {lay['filas']} registros, {modo}, "
+          f"tabla {lay['tabla_mb']} MB + índices {lay['indices_mb']} MB", file=out)
+    if base:
+        bl = base["layout"]
+        print(f"vs {base['ies']} IES ({base['ies_total']} en la base), {bl['filas']} registros, "
+              f"{'HASH x' + str(bl['particiones']) if bl['particionada'] else 'heap'}", file=out)
+    print(f"{'query':<22} {'p50':>8} {'p95':>8} {'p99':>8} {'media':>8}", file=out)
+    for q, r in res["queries"].items():
+        line = f"{q:<22} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['media_ms']:>8.2f}"
+        prev = (base or {}).get("queries", {}).get(q)
+        if prev and prev.get("p95_ms"):
+            d50 = (r["p50_ms"] - prev["p50_ms"]) / prev["p50_ms"] * 100 if prev["p50_ms"] else 0.0
+            d95 = (r["p95_ms"] - prev["p95_ms"]) / prev["p95_ms"] * 100
+            line += f"   p50 {d50:+6.1f}%  p95 {d95:+6.1f}%"
+        print(line, file=out)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Latencia SQL del resumen según IES y layout de evidencia_registro")
+    ap.add_argument("--dsn", default=None, help="Postgres (default: DATABASE_URL)")
+    ap.add_argument("--prefijo", default="bench", help="mismo --prefijo del generador")
+    ap.add_argument("--iteraciones", type=int, default=2000, help="ejecuciones medidas por query")
+    ap.add_argument("--calentamiento", type=int, default=200, help="ejecuciones previas (no se miden)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default=None, help="archivo JSON (default: stdout)")
+    ap.add_argument("--comparar", default=None, help="JSON de una corrida anterior (muestra deltas)")
+    args = ap.parse_args()
+
+    conn = psycopg2.connect(_dsn(args.dsn))
+    cur = conn.cursor()
+    cur.execute("SELECT id FROM ies WHERE slug LIKE %s ORDER BY id", (args.prefijo + "-%",))
+    ies_ids = [r[0] for r in cur.fetchall()]
+    if not ies_ids:
+        print(f"ERROR: no hay IES {args.prefijo}-* (corre bench/generar_dataset.py)")
+        sys.exit(2)
+    cur.execute("SELECT COUNT(*) FROM ies")
+    ies_total = cur.fetchone()[0]
+    cur.execute("SELECT submodulo_id, array_agg(id ORDER BY orden) FROM evidencia_item GROUP BY submodulo_id")
+    por_sm = dict(cur.fetchall())
+    layout = _layout(cur)
+    conn.rollback()
+
+    queries = {}
+    for nombre, sql in QUERIES.items():
+        rnd = random.Random(args.seed)
+        _medir(conn, sql, args.calentamiento, rnd, ies_ids, por_sm)
+        queries[nombre] = _fila(_medir(conn, sql, args.iteraciones, rnd, ies_ids, por_sm))
+    conn.close()
+
+    res = {
+        "commit": _commit(),
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("dsn", "out", "comparar")},
+        "ies": len(ies_ids),
+        "ies_total": ies_total,
+        "layout": layout,
+        "queries": queries,
+    }
+
+    base = json.loads(Path(args.comparar).read_text(encoding="utf-8")) if args.comparar else None
+    _tabla(res, base)
+
+    body = json.dumps(res, indent=2, ensure_ascii=False)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(body + "\n", encoding="utf-8")
+        print("OK:", args.out, file=sys.stderr)
+    else:
+        print(body)
+
+
+if __name__ == "__main__":
+    main()
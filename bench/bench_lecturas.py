@@ -0,0 +1,111 @@
+"""
+Benchmark de lecturas concurrentes (resumen / evidencias / catálogo).
+
+Lanza N clientes concurrentes contra un servidor ya levantado y reporta
+throughput (req/s) y latencias p50/p95/p99 por nivel de concurrencia.
+Sirve para comparar el camino sync (threadpool + psycopg2) contra el
+camino async (asyncpg + AsyncSession): correr una vez por cada versión
+con los mismos parámetros.
+
+Uso:
+    pip install -r bench/requirements.txt
+    uvicorn app.main:app --workers 1 --port 8000
+    python bench/bench_lecturas.py --base http://127.0.0.1:8000 \
+        --token <JWT> --ies-id 1 --submodulo-id 101 \
+        --concurrencia 50,200,500 --duracion 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def _rutas(ies_id: int, submodulo_id: int, ies_slug: str | None):
+    rutas = [
+        "/catalogo/subprogramas",
+        f"/form-config/submodulos/{submodulo_id}",
+        f"/api/resumen/ies/{ies_id}",
+        f"/api/resumen/submodulo/{ies_id}/{submodulo_id}",
+    ]
+    if ies_slug:
+        rutas.append(f"/operacion/ies/{ies_slug}/submodulos/{submodulo_id}/evidencias")
+    return rutas
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    k = max(0, min(len(valores) - 1, int(round(p / 100.0 * (len(valores) - 1)))))
+    return valores[k]
+
+
+async def _cliente(client, rutas, fin, latencias, errores, offset):
+    i = offset
+    while time.perf_counter() < fin:
+        ruta = rutas[i % len(rutas)]
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            r = await client.get(ruta)
+            if r.status_code >= 400:
+                errores.append(r.status_code)
+                continue
+        except httpx.HTTPError:
+            errores.append("conexion")
+            continue
+        latencias.append(time.perf_counter() - t0)
+
+
+async def _nivel(base, headers, rutas, concurrencia, duracion):
+    limits = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+    async with httpx.AsyncClient(base_url=base, headers=headers, limits=limits, timeout=60) as client:
+        # Calentamiento: abre conexiones y llena caches/pools
+        await asyncio.gather(*(client.get(r) for r in rutas))
+
+        latencias, errores = [], []
+        t0 = time.perf_counter()
+        fin = t0 + duracion
+        await asyncio.gather(*(
+            _cliente(client, rutas, fin, latencias, errores, k) for k in range(concurrencia)
+        ))
+        total_s = time.perf_counter() - t0
+
+    latencias.sort()
+    return {
+        "concurrencia": concurrencia,
+        "ok": len(latencias),
+        "errores": len(errores),
+        "rps": len(latencias) / total_s if total_s else 0.0,
+        "p50_ms": _percentil(latencias, 50) * 1000,
+        "p95_ms": _percentil(latencias, 95) * 1000,
+        "p99_ms": _percentil(latencias, 99) * 1000,
+        "media_ms": (statistics.fmean(latencias) * 1000) if latencias else 0.0,
+    }
+
+
+async def main():
+    ap = argparse.ArgumentParser(description="Benchmark de lecturas concurrentes de Astra")
+    ap.add_argument("--base", default="http://127.0.0.1:8000")
+    ap.add_argument("--token", required=True, help="JWT de un usuario admin")
+    ap.add_argument("--ies-id", type=int, default=1)
+    ap.add_argument("--ies-slug", default=None, help="Si se indica, incluye /operacion/.../evidencias")
+    ap.add_argument("--submodulo-id", type=int, default=101)
+    ap.add_argument("--concurrencia", default="50,200,500")
+    ap.add_argument("--duracion", type=float, default=20.0, help="Segundos por nivel")
+    args = ap.parse_args()
+
+    headers = {"Authorization": f"Bearer {args.token}"}
+    rutas = _rutas(args.ies_id, args.submodulo_id, args.ies_slug)
+    niveles = [int(x) for x in args.concurrencia.split(",") if x.strip()]
+
+    print(f"{'clientes':>8} {'ok':>8} {'err':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for n in niveles:
+        r = await _nivel(args.base, headers, rutas, n, args.duracion)
+        print(f"{r['concurrencia']:>8} {r['ok']:>8} {r['errores']:>6} {r['rps']:>9.1f} "
+              f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+Benchmark de ola de logins y su efecto sobre las lecturas concurrentes.
+
+Fase 1: solo lecturas (línea base).
+Fase 2: las mismas lecturas + N clientes haciendo /auth/login en bucle.
+Reporta logins/s (y 503 por saturación del pool de hashing) y cuánto se
+degradan las latencias de lectura p50/p95/p99.
+
+Uso:
+    pip install -r bench/requirements.txt
+    python bench/bench_login.py --base http://127.0.0.1:8000 --token <JWT> \
+        --email usuario@ies.edu --password <clave> \
+        --lectores 50 --logins 50 --duracion 20
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from bench_lecturas import _percentil, _rutas
+
+
+async def _lector(client, headers, rutas, fin, latencias, errores, offset):
+    i = offset
+    while time.perf_counter() < fin:
+        t0 = time.perf_counter()
+        try:
+            r = await client.get(rutas[i % len(rutas)], headers=headers)
+            if r.status_code >= 400:
+                errores.append(r.status_code)
+            else:
+                latencias.append(time.perf_counter() - t0)
+        except httpx.HTTPError:
+            errores.append("conexion")
+        i += 1
+
+
+async def _login(client, body, fin, conteo):
+    while time.perf_counter() < fin:
+        try:
+            r = await client.post("/auth/login", json=body)
+            key = "ok" if r.status_code == 200 else str(r.status_code)
+        except httpx.HTTPError:
+            key = "conexion"
+        conteo[key] = conteo.get(key, 0) + 1
+        if key == "503":
+            await asyncio.sleep(0.05)
+
+
+async def _fase(args, rutas, con_logins: bool):
+    n = args.lectores + (args.logins if con_logins else 0)
+    limits = httpx.Limits(max_connections=n, max_keepalive_connections=n)
+    headers = {"Authorization": f"Bearer {args.token}"}
+    async with httpx.AsyncClient(base_url=args.base, limits=limits, timeout=60) as client:
+        await asyncio.gather(*(client.get(r, headers=headers) for r in rutas))
+
+        latencias, errores, conteo = [], [], {}
+        t0 = time.perf_counter()
+        fin = t0 + args.duracion
+
+        lectores = [
+            _lector(client, headers, rutas, fin, latencias, errores, k)
+            for k in range(args.lectores)
+        ]
+        body = {"email": args.email, "password": args.password}
+        logins = [_login(client, body, fin, conteo) for _ in range(args.logins)] if con_logins else []
+        await asyncio.gather(*lectores, *logins)
+        total_s = time.perf_counter() - t0
+
+    latencias.sort()
+    return {
+        "lecturas_rps": len(latencias) / total_s,
+        "p50_ms": _percentil(latencias, 50) * 1000,
+        "p95_ms": _percentil(latencias, 95) * 1000,
+        "p99_ms": _percentil(latencias, 99) * 1000,
+        "errores_lectura": len(errores),
+        "logins_rps": conteo.get("ok", 0) / total_s,
+        "logins": conteo,
+    }
+
+
+async def main():
+    ap = argparse.ArgumentParser(description="Benchmark de login + lecturas de Astra")
+    ap.add_argument("--base", default="http://127.0.0.1:8000")
+    ap.add_argument("--token", required=True, help="JWT de un usuario admin (lecturas)")
+    ap.add_argument("--email", required=True)
+    ap.add_argument("--password", required=True)
+    ap.add_argument("--ies-id", type=int, default=1)
+    ap.add_argument("--submodulo-id", type=int, default=101)
+    ap.add_argument("--lectores", type=int, default=50)
+    ap.add_argument("--logins", type=int, default=50)
+    ap.add_argument("--duracion", type=float, default=20.0)
+    args = ap.parse_args()
+
+    rutas = _rutas(args.ies_id, args.submodulo_id, None)
+
+    base = await _fase(args, rutas, con_logins=False)
+    ola = await _fase(args, rutas, con_logins=True)
+
+    print(f"{'fase':<16} {'lect/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'logins/s':>9}  logins")
+    for nombre, r in (("solo lecturas", base), ("lecturas+login", ola)):
+        print(f"{nombre:<16} {r['lecturas_rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['logins_rps']:>9.1f}  {r['logins']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,186 @@
+"""
+Build de assets estáticos -> app/static/dist (se versiona en el repo).
+
+- Imágenes (app/static/img/*.png): variantes redimensionadas en AVIF y
+  WebP + un PNG de respaldo (astra.260w.1a2b3c4d5e.webp).
+- JS/CSS: bundles concatenados y minificados (app.1a2b3c4d5e.js) con
+  hermanos .gz / .br precomprimidos.
+
+Todo con hash de contenido en el nombre. app/static/dist/manifest.json
+mapea originales -> salidas; app/core/assets.py lo usa para reescribir
+el HTML (srcset, bundles) y servir con cache inmutable.
+
+Requiere: pip install -r requirements-build.txt
+Uso:      python build_assets.py
+"""
+import gzip
+import hashlib
+import io
+import json
+import sys
+from pathlib import Path
+
+import brotli
+import rcssmin
+import rjsmin
+from PIL import Image, features
+
+ROOT = Path(__file__).resolve().parent
+STATIC_DIR = ROOT / "app" / "static"
+IMG_DIR = STATIC_DIR / "img"
+DIST_DIR = STATIC_DIR / "dist"
+DIST_IMG_DIR = DIST_DIR / "img"
+MANIFEST_PATH = DIST_DIR / "manifest.json"
+
+# Anchos (px reales): toast 48px @2x, coach 180-260px @1x..3x
+WIDTHS = (96, 160, 260, 520, 780)
+FALLBACK_WIDTH = 780
+
+# sizes por defecto de cada imagen (el JS puede pisarlo con el ancho real)
+SIZES = {"astra.png": "48px"}
+DEFAULT_SIZES = "260px"
+
+# Bundles: nombre -> archivos (orden = orden de los <script>/<link> del HTML).
+# Los <script> de un bundle JS se reemplazan por uno solo con defer.
+BUNDLES = {
+    "app.js": ["js/core.js", "js/resumen.js", "js/planner.js", "js/admin.js"],
+    "app.css": ["css/core.css", "css/app.css", "css/planner.css", "css/operativa.css", "css/resumen.css"],
+    "auth.js": ["js/auth.js"],
+    "auth.css": ["css/auth.css"],
+}
+
+WEBP_OPTS = {"quality": 80, "method": 4}
+AVIF_OPTS = {"quality": 55, "speed": 6}
+
+
+def _sha(data: bytes, n: int = 10) -> str:
+    return hashlib.sha256(data).hexdigest()[:n]
+
+
+def _encode(im: Image.Image, fmt: str) -> bytes:
+    buf = io.BytesIO()
+    if fmt == "webp":
+        im.save(buf, "WEBP", **WEBP_OPTS)
+    elif fmt == "avif":
+        im.save(buf, "AVIF", **AVIF_OPTS)
+    else:
+        im.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+
+def _write(stem: str, width: int, fmt: str, data: bytes, outputs: set) -> str:
+    name = f"{stem}.{width}w.{_sha(data)}.{fmt}"
+    path = DIST_IMG_DIR / name
+    if not path.exists() or path.read_bytes() != data:
+        path.write_bytes(data)
+    outputs.add(name)
+    return f"/static/dist/img/{name}"
+
+
+def build_images(outputs: set) -> dict:
+    DIST_IMG_DIR.mkdir(parents=True, exist_ok=True)
+    manifest = {}
+
+    for src in sorted(IMG_DIR.glob("*.png")):
+        raw = src.read_bytes()
+        with Image.open(io.BytesIO(raw)) as im:
+            im = im.convert("RGBA")
+            w0, h0 = im.size
+
+            entry = {
+                "source_sha256": hashlib.sha256(raw).hexdigest(),
+                "width": w0,
+                "height": h0,
+                "sizes": SIZES.get(src.name, DEFAULT_SIZES),
+                "variants": {"avif": [], "webp": []},
+            }
+
+            for w in sorted({min(w, w0) for w in WIDTHS}):
+                h = round(h0 * w / w0)
+                resized = im if w == w0 else im.resize((w, h), Image.LANCZOS)
+                for fmt in ("avif", "webp"):
+                    url = _write(src.stem, w, fmt, _encode(resized, fmt), outputs)
+                    entry["variants"][fmt].append([w, url])
+
+                if w == min(FALLBACK_WIDTH, w0):
+                    entry["fallback"] = _write(src.stem, w, "png", _encode(resized, "png"), outputs)
+
+        manifest[f"img/{src.name}"] = entry
+        print(f"  {src.name}: {len(raw) // 1024} KB -> "
+              f"{', '.join(u.rsplit('/', 1)[1] for _, u in entry['variants']['webp'][-1:])} ...")
+
+    return manifest
+
+
+def _minify(kind: str, source: str) -> str:
+    return rjsmin.jsmin(source) if kind == "js" else rcssmin.cssmin(source)
+
+
+def build_bundles(outputs: set) -> dict:
+    manifest = {}
+
+    for name, files in BUNDLES.items():
+        stem, kind = name.rsplit(".", 1)
+        out_dir = DIST_DIR / kind
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        sources, parts = {}, []
+        for rel in files:
+            raw = (STATIC_DIR / rel).read_bytes()
+            sources[rel] = hashlib.sha256(raw).hexdigest()
+            parts.append(_minify(kind, raw.decode("utf-8")))
+
+        # ";" entre archivos JS: ninguno depende del ASI del siguiente
+        data = ((";\n" if kind == "js" else "\n").join(parts) + "\n").encode("utf-8")
+        out = f"{stem}.{_sha(data)}.{kind}"
+
+        for fname, blob in (
+            (out, data),
+            (out + ".gz", gzip.compress(data, compresslevel=9, mtime=0)),
+            (out + ".br", brotli.compress(data, quality=11)),
+        ):
+            path = out_dir / fname
+            if not path.exists() or path.read_bytes() != blob:
+                path.write_bytes(blob)
+            outputs.add(fname)
+
+        raw_total = sum((STATIC_DIR / rel).stat().st_size for rel in files)
+        br_size = (out_dir / (out + ".br")).stat().st_size
+        print(f"  {name}: {raw_total // 1024} KB -> {len(data) // 1024} KB min, {br_size // 1024} KB br")
+
+        manifest[name] = {
+            "url": f"/static/dist/{kind}/{out}",
+            "sources": sources,
+        }
+
+    return manifest
+
+
+def _prune(directory: Path, keep: set):
+    for p in directory.iterdir():
+        if p.is_file() and p.name not in keep:
+            p.unlink()
+
+
+def main():
+    if not (features.check("webp") and features.check("avif")):
+        print("ERROR: Pillow sin soporte WebP/AVIF (usa Pillow >= 11.3)")
+        sys.exit(2)
+
+    outputs = set()
+    print("Imágenes:")
+    images = build_images(outputs)
+    print("Bundles:")
+    bundles = build_bundles(outputs)
+    for d in (DIST_IMG_DIR, DIST_DIR / "js", DIST_DIR / "css"):
+        _prune(d, outputs)
+
+    MANIFEST_PATH.write_text(
+        json.dumps({"images": images, "bundles": bundles}, indent=2, sort_keys=True) + "\n",
+        encoding="utf-8",
+    )
+    print("OK:", MANIFEST_PATH.relative_to(ROOT))
+
+
+if __name__ == "__main__":
+    main()
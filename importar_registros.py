@@ -0,0 +1,59 @@
+import argparse
+import sys
+
+from app.db.session import SessionLocal
+from app.models.ies import IES
+from app.services.importar_registros import ArchivoInvalido, importar_registros
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Importa evidencia_registro desde CSV/XLSX (mismas columnas que el export)."
+    )
+    ap.add_argument("archivo", help="ruta .csv o .xlsx")
+    ap.add_argument("--ies", metavar="SLUG", help="fija la IES (si no, cada fila trae ies_id o ies_slug)")
+    ap.add_argument("--dry-run", action="store_true", help="solo validar, no guarda")
+    ap.add_argument("--parcial", action="store_true", help="guarda filas válidas aunque haya errores")
+    args = ap.parse_args()
+
+    db = SessionLocal()
+    try:
+        ies_id = ies_slug = None
+        if args.ies:
+            ies = db.query(IES).filter(IES.slug == args.ies).first()
+            if not ies:
+                print("ERROR: IES no encontrada:", args.ies)
+                sys.exit(2)
+            ies_id, ies_slug = ies.id, ies.slug
+
+        with open(args.archivo, "rb") as f:
+            try:
+                res = importar_registros(
+                    db, f, args.archivo,
+                    ies_id=ies_id, ies_slug=ies_slug,
+                    dry_run=args.dry_run, parcial=args.parcial,
+                )
+            except ArchivoInvalido as e:
+                print("ERROR:", e)
+                sys.exit(2)
+
+        print("columnas:", ", ".join(res["columnas"]))
+        print("filas:", res["filas"], "| válidas:", res["validas"], "| con error:", res["con_error"])
+        for e in res["errores"]:
+            print("  fila", e["fila"], "evidencia", e["evidencia_id"], "->", "; ".join(e["errores"]))
+        if res["errores_truncados"]:
+            print("  ... (", res["con_error"] - len(res["errores"]), "errores más )")
+
+        if res["aplicado"]:
+            print("OK: creados", res["creados"], "| actualizados", res["actualizados"])
+        elif res["dry_run"]:
+            print("DRY-RUN: no se guardó nada.")
+        else:
+            print("ERROR: no se guardó nada (usa --parcial para guardar las filas válidas)")
+            sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+-- migrations/001_resumen_rollup.sql
+-- Agrega resumen_rollup (KPIs por IES + submódulo) a una BD existente.
+-- Idempotente: se puede correr más de una vez.
+--   psql "$DATABASE_URL" -f migrations/001_resumen_rollup.sql
+SET client_encoding = 'UTF8';
+
+BEGIN;
+SET search_path TO public;
+
+CREATE TABLE IF NOT EXISTS resumen_rollup (
+  ies_id                   INTEGER NOT NULL REFERENCES ies(id) ON DELETE CASCADE,
+  submodulo_id             INTEGER NOT NULL REFERENCES submodulos(id) ON DELETE CASCADE,
+
+  evidencias_total         INTEGER NOT NULL DEFAULT 0,
+  avance_promedio          DOUBLE PRECISION,
+  valoracion_promedio      DOUBLE PRECISION,
+  fecha_inicio_min         DATE,
+  fecha_fin_max            DATE,
+  ultima_actualizacion     TIMESTAMP WITHOUT TIME ZONE,
+
+  presenta_si              INTEGER NOT NULL DEFAULT 0,
+  presenta_no              INTEGER NOT NULL DEFAULT 0,
+  presenta_sin_dato        INTEGER NOT NULL DEFAULT 0,
+
+  cat_si                   INTEGER NOT NULL DEFAULT 0,
+  cat_no                   INTEGER NOT NULL DEFAULT 0,
+  cat_sin_dato             INTEGER NOT NULL DEFAULT 0,
+
+  av_0_24                  INTEGER NOT NULL DEFAULT 0,
+  av_25_49                 INTEGER NOT NULL DEFAULT 0,
+  av_50_74                 INTEGER NOT NULL DEFAULT 0,
+  av_75_100                INTEGER NOT NULL DEFAULT 0,
+  av_mas_100               INTEGER NOT NULL DEFAULT 0,
+  av_sin_dato              INTEGER NOT NULL DEFAULT 0,
+
+  responsable_mas_reciente VARCHAR(255),
+
+  refreshed_at             TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+
+  PRIMARY KEY (ies_id, submodulo_id)
+);
+
+-- Cálculo "en vivo" (misma definición que usa el rebuild y el refresh)
+CREATE OR REPLACE VIEW vw_resumen_rollup_live AS
+SELECT
+  er.ies_id,
+  ei.submodulo_id,
+  COUNT(er.id)::int                                                            AS evidencias_total,
+  AVG(er.avance_pct)::float                                                    AS avance_promedio,
+  AVG(er.valoracion)::float                                                    AS valoracion_promedio,
+  MIN(er.fecha_inicio)                                                         AS fecha_inicio_min,
+  MAX(er.fecha_fin)                                                            AS fecha_fin_max,
+  MAX(er.updated_at)                                                           AS ultima_actualizacion,
+  (COUNT(er.id) FILTER (WHERE er.presenta IS TRUE))::int                       AS presenta_si,
+  (COUNT(er.id) FILTER (WHERE er.presenta IS FALSE))::int                      AS presenta_no,
+  (COUNT(er.id) FILTER (WHERE er.presenta IS NULL))::int                       AS presenta_sin_dato,
+  (COUNT(er.id) FILTER (WHERE COALESCE(er.categoria_si_no, er.presenta) IS TRUE))::int  AS cat_si,
+  (COUNT(er.id) FILTER (WHERE COALESCE(er.categoria_si_no, er.presenta) IS FALSE))::int AS cat_no,
+  (COUNT(er.id) FILTER (WHERE COALESCE(er.categoria_si_no, er.presenta) IS NULL))::int  AS cat_sin_dato,
+  (COUNT(er.id) FILTER (WHERE er.avance_pct < 25))::int                        AS av_0_24,
+  (COUNT(er.id) FILTER (WHERE er.avance_pct >= 25 AND er.avance_pct < 50))::int  AS av_25_49,
+  (COUNT(er.id) FILTER (WHERE er.avance_pct >= 50 AND er.avance_pct < 75))::int  AS av_50_74,
+  (COUNT(er.id) FILTER (WHERE er.avance_pct >= 75 AND er.avance_pct <= 100))::int AS av_75_100,
+  (COUNT(er.id) FILTER (WHERE er.avance_pct > 100))::int                       AS av_mas_100,
+  (COUNT(er.id) FILTER (WHERE er.avance_pct IS NULL))::int                     AS av_sin_dato,
+  (ARRAY_AGG(btrim(er.responsable) ORDER BY er.updated_at DESC, ei.orden ASC, er.id ASC)
+    FILTER (WHERE btrim(er.responsable) <> ''))[1]                             AS responsable_mas_reciente
+FROM evidencia_registro er
+JOIN evidencia_item ei ON ei.id = er.evidencia_id
+GROUP BY er.ies_id, ei.submodulo_id;
+
+CREATE OR REPLACE FUNCTION resumen_rollup_refresh(p_ies_id INTEGER, p_submodulo_id INTEGER)
+RETURNS VOID AS $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM evidencia_registro
+    WHERE ies_id = p_ies_id AND submodulo_id = p_submodulo_id
+  ) THEN
+    DELETE FROM resumen_rollup
+    WHERE ies_id = p_ies_id AND submodulo_id = p_submodulo_id;
+    RETURN;
+  END IF;
+
+  -- Lock de fila por par: serializa escritores concurrentes del mismo par
+  -- (el UPDATE de abajo toma su snapshot DESPUÉS del commit del otro).
+  INSERT INTO resumen_rollup (ies_id, submodulo_id)
+  VALUES (p_ies_id, p_submodulo_id)
+  ON CONFLICT (ies_id, submodulo_id) DO NOTHING;
+
+  PERFORM 1 FROM resumen_rollup
+  WHERE ies_id = p_ies_id AND submodulo_id = p_submodulo_id
+  FOR UPDATE;
+
+  UPDATE resumen_rollup rr SET
+    evidencias_total         = v.evidencias_total,
+    avance_promedio          = v.avance_promedio,
+    valoracion_promedio      = v.valoracion_promedio,
+    fecha_inicio_min         = v.fecha_inicio_min,
+    fecha_fin_max            = v.fecha_fin_max,
+    ultima_actualizacion     = v.ultima_actualizacion,
+    presenta_si              = v.presenta_si,
+    presenta_no              = v.presenta_no,
+    presenta_sin_dato        = v.presenta_sin_dato,
+    cat_si                   = v.cat_si,
+    cat_no                   = v.cat_no,
+    cat_sin_dato             = v.cat_sin_dato,
+    av_0_24                  = v.av_0_24,
+    av_25_49                 = v.av_25_49,
+    av_50_74                 = v.av_50_74,
+    av_75_100                = v.av_75_100,
+    av_mas_100               = v.av_mas_100,
+    av_sin_dato              = v.av_sin_dato,
+    responsable_mas_reciente = v.responsable_mas_reciente,
+    refreshed_at             = NOW()
+  FROM vw_resumen_rollup_live v
+  WHERE v.ies_id = p_ies_id
+    AND v.submodulo_id = p_submodulo_id
+    AND rr.ies_id = p_ies_id
+    AND rr.submodulo_id = p_submodulo_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger por SENTENCIA (transition tables): un INSERT masivo
+-- (crear_ies / seed operativo) recalcula cada par una sola vez.
+CREATE OR REPLACE FUNCTION resumen_rollup_on_registro()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM resumen_rollup_refresh(k.ies_id, k.submodulo_id)
+    FROM (SELECT DISTINCT ies_id, submodulo_id FROM new_rows) k;
+  ELSIF TG_OP = 'UPDATE' THEN
+    PERFORM resumen_rollup_refresh(k.ies_id, k.submodulo_id)
+    FROM (
+      SELECT ies_id, submodulo_id FROM new_rows
+      UNION
+      SELECT ies_id, submodulo_id FROM old_rows
+    ) k;
+  ELSE
+    PERFORM resumen_rollup_refresh(k.ies_id, k.submodulo_id)
+    FROM (SELECT DISTINCT ies_id, submodulo_id FROM old_rows) k;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_resumen_rollup_ins ON evidencia_registro;
+CREATE TRIGGER trg_resumen_rollup_ins
+AFTER INSERT ON evidencia_registro
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION resumen_rollup_on_registro();
+
+DROP TRIGGER IF EXISTS trg_resumen_rollup_upd ON evidencia_registro;
+CREATE TRIGGER trg_resumen_rollup_upd
+AFTER UPDATE ON evidencia_registro
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION resumen_rollup_on_registro();
+
+DROP TRIGGER IF EXISTS trg_resumen_rollup_del ON evidencia_registro;
+CREATE TRIGGER trg_resumen_rollup_del
+AFTER DELETE ON evidencia_registro
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION resumen_rollup_on_registro();
+
+-- Reconstrucción completa (rollup_resumen.py rebuild)
+CREATE OR REPLACE FUNCTION resumen_rollup_rebuild()
+RETURNS INTEGER AS $$
+DECLARE
+  n INTEGER := 0;
+BEGIN
+  -- Bloquea escrituras en evidencia_registro mientras se reconstruye
+  LOCK TABLE evidencia_registro IN SHARE MODE;
+
+  DELETE FROM resumen_rollup;
+
+  INSERT INTO resumen_rollup (
+    ies_id, submodulo_id,
+    evidencias_total, avance_promedio, valoracion_promedio,
+    fecha_inicio_min, fecha_fin_max, ultima_actualizacion,
+    presenta_si, presenta_no, presenta_sin_dato,
+    cat_si, cat_no, cat_sin_dato,
+    av_0_24, av_25_49, av_50_74, av_75_100, av_mas_100, av_sin_dato,
+    responsable_mas_reciente
+  )
+  SELECT
+    v.ies_id, v.submodulo_id,
+    v.evidencias_total, v.avance_promedio, v.valoracion_promedio,
+    v.fecha_inicio_min, v.fecha_fin_max, v.ultima_actualizacion,
+    v.presenta_si, v.presenta_no, v.presenta_sin_dato,
+    v.cat_si, v.cat_no, v.cat_sin_dato,
+    v.av_0_24, v.av_25_49, v.av_50_74, v.av_75_100, v.av_mas_100, v.av_sin_dato,
+    v.responsable_mas_reciente
+  FROM vw_resumen_rollup_live v;
+
+  GET DIAGNOSTICS n = ROW_COUNT;
+  RETURN n;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Carga inicial
+SELECT resumen_rollup_rebuild();
+
+COMMIT;
@@ -0,0 +1,190 @@
+-- migrations/002_resumen_rollup_set_refresh.sql
+-- Refresh set-based del rollup: el trigger por sentencia recalcula todos
+-- los pares tocados con un solo UPDATE (antes: un refresh por par).
+-- Necesario para imports masivos (miles de pares por sentencia).
+-- Idempotente: se puede correr más de una vez.
+--   psql "$DATABASE_URL" -f migrations/002_resumen_rollup_set_refresh.sql
+SET client_encoding = 'UTF8';
+
+BEGIN;
+SET search_path TO public;
+
+-- Par (IES, submódulo): el refresh lee los registros de cada par por índice
+CREATE INDEX IF NOT EXISTS idx_registro_ies_submodulo
+  ON evidencia_registro(ies_id, submodulo_id);
+
+-- Cálculo "en vivo" por pares (misma definición que usan el rebuild y el refresh)
+-- p_ies / p_submodulo: arrays paralelos de pares (ies_id, submodulo_id).
+-- NULL = todos los pares. Cada rama del UNION ALL lleva un filtro constante,
+-- así el plan solo ejecuta una: con pares va por índice, sin pares hace el
+-- agregado completo.
+CREATE OR REPLACE FUNCTION resumen_rollup_calc(p_ies INTEGER[], p_submodulo INTEGER[])
+RETURNS TABLE (
+  ies_id                   INTEGER,
+  submodulo_id             INTEGER,
+  evidencias_total         INTEGER,
+  avance_promedio          DOUBLE PRECISION,
+  valoracion_promedio      DOUBLE PRECISION,
+  fecha_inicio_min         DATE,
+  fecha_fin_max            DATE,
+  ultima_actualizacion     TIMESTAMP WITHOUT TIME ZONE,
+  presenta_si              INTEGER,
+  presenta_no              INTEGER,
+  presenta_sin_dato        INTEGER,
+  cat_si                   INTEGER,
+  cat_no                   INTEGER,
+  cat_sin_dato             INTEGER,
+  av_0_24                  INTEGER,
+  av_25_49                 INTEGER,
+  av_50_74                 INTEGER,
+  av_75_100                INTEGER,
+  av_mas_100               INTEGER,
+  av_sin_dato              INTEGER,
+  responsable_mas_reciente TEXT
+) AS $$
+  SELECT
+    er.ies_id,
+    ei.submodulo_id,
+    COUNT(er.id)::int                                                            AS evidencias_total,
+    AVG(er.avance_pct)::float                                                    AS avance_promedio,
+    AVG(er.valoracion)::float                                                    AS valoracion_promedio,
+    MIN(er.fecha_inicio)                                                         AS fecha_inicio_min,
+    MAX(er.fecha_fin)                                                            AS fecha_fin_max,
+    MAX(er.updated_at)                                                           AS ultima_actualizacion,
+    (COUNT(er.id) FILTER (WHERE er.presenta IS TRUE))::int                       AS presenta_si,
+    (COUNT(er.id) FILTER (WHERE er.presenta IS FALSE))::int                      AS presenta_no,
+    (COUNT(er.id) FILTER (WHERE er.presenta IS NULL))::int                       AS presenta_sin_dato,
+    (COUNT(er.id) FILTER (WHERE COALESCE(er.categoria_si_no, er.presenta) IS TRUE))::int  AS cat_si,
+    (COUNT(er.id) FILTER (WHERE COALESCE(er.categoria_si_no, er.presenta) IS FALSE))::int AS cat_no,
+    (COUNT(er.id) FILTER (WHERE COALESCE(er.categoria_si_no, er.presenta) IS NULL))::int  AS cat_sin_dato,
+    (COUNT(er.id) FILTER (WHERE er.avance_pct < 25))::int                        AS av_0_24,
+    (COUNT(er.id) FILTER (WHERE er.avance_pct >= 25 AND er.avance_pct < 50))::int  AS av_25_49,
+    (COUNT(er.id) FILTER (WHERE er.avance_pct >= 50 AND er.avance_pct < 75))::int  AS av_50_74,
+    (COUNT(er.id) FILTER (WHERE er.avance_pct >= 75 AND er.avance_pct <= 100))::int AS av_75_100,
+    (COUNT(er.id) FILTER (WHERE er.avance_pct > 100))::int                       AS av_mas_100,
+    (COUNT(er.id) FILTER (WHERE er.avance_pct IS NULL))::int                     AS av_sin_dato,
+    (ARRAY_AGG(btrim(er.responsable) ORDER BY er.updated_at DESC, ei.orden ASC, er.id ASC)
+      FILTER (WHERE btrim(er.responsable) <> ''))[1]                             AS responsable_mas_reciente
+  FROM (
+    SELECT r.* FROM evidencia_registro r
+    WHERE p_ies IS NULL
+    UNION ALL
+    SELECT r.*
+    FROM (SELECT DISTINCT k.ies_id, k.submodulo_id
+          FROM unnest(p_ies, p_submodulo) AS k(ies_id, submodulo_id)) k
+    JOIN evidencia_registro r ON r.ies_id = k.ies_id AND r.submodulo_id = k.submodulo_id
+    WHERE p_ies IS NOT NULL
+  ) er
+  JOIN evidencia_item ei ON ei.id = er.evidencia_id
+  GROUP BY er.ies_id, ei.submodulo_id;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE VIEW vw_resumen_rollup_live AS
+SELECT * FROM resumen_rollup_calc(NULL, NULL);
+
+-- Refresh set-based de varios pares (trigger por sentencia, import masivo)
+CREATE OR REPLACE FUNCTION resumen_rollup_refresh_pares(p_ies INTEGER[], p_submodulo INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+  -- Sin pares no hay nada que hacer (¡NULL en calc = todos los pares!)
+  IF p_ies IS NULL OR cardinality(p_ies) = 0 THEN
+    RETURN;
+  END IF;
+
+  -- Pares que quedaron sin registros
+  DELETE FROM resumen_rollup rr
+  USING unnest(p_ies, p_submodulo) AS k(ies_id, submodulo_id)
+  WHERE rr.ies_id = k.ies_id
+    AND rr.submodulo_id = k.submodulo_id
+    AND NOT EXISTS (
+      SELECT 1 FROM evidencia_registro er
+      WHERE er.ies_id = k.ies_id AND er.submodulo_id = k.submodulo_id
+    );
+
+  -- Lock de fila por par: serializa escritores concurrentes del mismo par
+  -- (el UPDATE de abajo toma su snapshot DESPUÉS del commit del otro).
+  -- Orden fijo (ies_id, submodulo_id) para no cruzar locks entre lotes.
+  INSERT INTO resumen_rollup (ies_id, submodulo_id)
+  SELECT k.ies_id, k.submodulo_id
+  FROM (SELECT DISTINCT k.ies_id, k.submodulo_id
+        FROM unnest(p_ies, p_submodulo) AS k(ies_id, submodulo_id)) k
+  WHERE EXISTS (
+    SELECT 1 FROM evidencia_registro er
+    WHERE er.ies_id = k.ies_id AND er.submodulo_id = k.submodulo_id
+  )
+  ORDER BY k.ies_id, k.submodulo_id
+  ON CONFLICT (ies_id, submodulo_id) DO NOTHING;
+
+  PERFORM 1
+  FROM resumen_rollup rr
+  JOIN (SELECT DISTINCT k.ies_id, k.submodulo_id
+        FROM unnest(p_ies, p_submodulo) AS k(ies_id, submodulo_id)) k
+    ON rr.ies_id = k.ies_id AND rr.submodulo_id = k.submodulo_id
+  ORDER BY rr.ies_id, rr.submodulo_id
+  FOR UPDATE OF rr;
+
+  UPDATE resumen_rollup rr SET
+    evidencias_total         = v.evidencias_total,
+    avance_promedio          = v.avance_promedio,
+    valoracion_promedio      = v.valoracion_promedio,
+    fecha_inicio_min         = v.fecha_inicio_min,
+    fecha_fin_max            = v.fecha_fin_max,
+    ultima_actualizacion     = v.ultima_actualizacion,
+    presenta_si              = v.presenta_si,
+    presenta_no              = v.presenta_no,
+    presenta_sin_dato        = v.presenta_sin_dato,
+    cat_si                   = v.cat_si,
+    cat_no                   = v.cat_no,
+    cat_sin_dato             = v.cat_sin_dato,
+    av_0_24                  = v.av_0_24,
+    av_25_49                 = v.av_25_49,
+    av_50_74                 = v.av_50_74,
+    av_75_100                = v.av_75_100,
+    av_mas_100               = v.av_mas_100,
+    av_sin_dato              = v.av_sin_dato,
+    responsable_mas_reciente = v.responsable_mas_reciente,
+    refreshed_at             = NOW()
+  FROM resumen_rollup_calc(p_ies, p_submodulo) v
+  WHERE rr.ies_id = v.ies_id
+    AND rr.submodulo_id = v.submodulo_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Un solo par (compatibilidad)
+CREATE OR REPLACE FUNCTION resumen_rollup_refresh(p_ies_id INTEGER, p_submodulo_id INTEGER)
+RETURNS VOID AS $$
+BEGIN
+  PERFORM resumen_rollup_refresh_pares(ARRAY[p_ies_id], ARRAY[p_submodulo_id]);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger por SENTENCIA (transition tables): un INSERT masivo
+-- (crear_ies / seed operativo / import) recalcula todos sus pares
+-- en un solo refresh set-based.
+CREATE OR REPLACE FUNCTION resumen_rollup_on_registro()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_ies INTEGER[];
+  v_sm  INTEGER[];
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    SELECT array_agg(k.ies_id), array_agg(k.submodulo_id) INTO v_ies, v_sm
+    FROM (SELECT DISTINCT ies_id, submodulo_id FROM new_rows) k;
+  ELSIF TG_OP = 'UPDATE' THEN
+    SELECT array_agg(k.ies_id), array_agg(k.submodulo_id) INTO v_ies, v_sm
+    FROM (
+      SELECT ies_id, submodulo_id FROM new_rows
+      UNION
+      SELECT ies_id, submodulo_id FROM old_rows
+    ) k;
+  ELSE
+    SELECT array_agg(k.ies_id), array_agg(k.submodulo_id) INTO v_ies, v_sm
+    FROM (SELECT DISTINCT ies_id, submodulo_id FROM old_rows) k;
+  END IF;
+
+  PERFORM resumen_rollup_refresh_pares(v_ies, v_sm);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
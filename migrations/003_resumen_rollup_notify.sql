@@ -0,0 +1,51 @@
+-- migrations/003_resumen_rollup_notify.sql
+-- El trigger por sentencia del rollup avisa qué pares cambiaron
+-- (NOTIFY resumen_rollup, un mensaje por IES) para GET /api/resumen/stream.
+-- Va en el trigger del rollup y no en trg_evidencia_registro_updated_at
+-- (por fila): un import masivo manda un aviso por IES, no uno por registro,
+-- y cuando llega el rollup ya está recalculado.
+-- Idempotente: se puede correr más de una vez.
+--   psql "$DATABASE_URL" -f migrations/003_resumen_rollup_notify.sql
+SET client_encoding = 'UTF8';
+
+BEGIN;
+SET search_path TO public;
+
+CREATE OR REPLACE FUNCTION resumen_rollup_on_registro()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_ies INTEGER[];
+  v_sm  INTEGER[];
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    SELECT array_agg(k.ies_id), array_agg(k.submodulo_id) INTO v_ies, v_sm
+    FROM (SELECT DISTINCT ies_id, submodulo_id FROM new_rows) k;
+  ELSIF TG_OP = 'UPDATE' THEN
+    SELECT array_agg(k.ies_id), array_agg(k.submodulo_id) INTO v_ies, v_sm
+    FROM (
+      SELECT ies_id, submodulo_id FROM new_rows
+      UNION
+      SELECT ies_id, submodulo_id FROM old_rows
+    ) k;
+  ELSE
+    SELECT array_agg(k.ies_id), array_agg(k.submodulo_id) INTO v_ies, v_sm
+    FROM (SELECT DISTINCT ies_id, submodulo_id FROM old_rows) k;
+  END IF;
+
+  PERFORM resumen_rollup_refresh_pares(v_ies, v_sm);
+
+  -- Aviso a GET /api/resumen/stream (LISTEN resumen_rollup): un mensaje
+  -- por IES con sus submódulos tocados. Postgres lo entrega al COMMIT y,
+  -- como va después del refresh, el rollup ya está al día al leerlo.
+  PERFORM pg_notify('resumen_rollup', json_build_object(
+            'ies_id', k.ies_id,
+            'submodulos', array_agg(DISTINCT k.submodulo_id ORDER BY k.submodulo_id)
+          )::text)
+  FROM unnest(v_ies, v_sm) AS k(ies_id, submodulo_id)
+  GROUP BY k.ies_id;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
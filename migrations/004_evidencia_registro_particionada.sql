@@ -0,0 +1,331 @@
+-- migrations/004_evidencia_registro_particionada.sql
+-- evidencia_registro pasa a tabla particionada por HASH (ies_id).
+-- Cada IES trae el catálogo completo de registros (crear_ies), así que la
+-- tabla crece lineal con las IES. Todas las lecturas y escrituras filtran
+-- por ies_id: con particiones cada query toca una sola partición, y
+-- vacuum/índices trabajan por partición.
+--
+-- - PK (ies_id, id): la clave de partición tiene que estar en la PK.
+--   id sigue saliendo de la misma secuencia (único en toda la tabla).
+-- - ux_registro_ies_evidencia (ies_id, evidencia_id) se mantiene: los
+--   ON CONFLICT (ies_id, evidencia_id) de la API / import no cambian.
+-- - Índice compuesto (ies_id, submodulo_id) en cada partición; se quita
+--   idx_registro_ies_id (prefijo del compuesto y del unique).
+-- - evidencia_adjunto: nueva columna ies_id y FK (ies_id, registro_id),
+--   porque una FK a una tabla particionada necesita la clave completa.
+-- - Triggers (updated_at, submodulo_id, rollup) se recrean iguales; el
+--   refresh del rollup filtra ies_id = ANY(p_ies) para podar particiones.
+--
+-- Requiere Postgres >= 13 (triggers BEFORE ROW en tabla particionada).
+-- Reescribe la tabla con ACCESS EXCLUSIVE: correr en ventana de mantención.
+-- Idempotente: si ya está particionada no hace nada.
+--   psql "$DATABASE_URL" -f migrations/004_evidencia_registro_particionada.sql
+--   psql "$DATABASE_URL" -v particiones=32 -f migrations/004_evidencia_registro_particionada.sql
+SET client_encoding = 'UTF8';
+\set ON_ERROR_STOP on
+
+\if :{?particiones}
+\else
+  \set particiones 16
+\endif
+
+SELECT relkind = 'p' AS ya_particionada
+FROM pg_class
+WHERE oid = 'public.evidencia_registro'::regclass \gset
+
+\if :ya_particionada
+  \echo 'evidencia_registro ya está particionada: nada que hacer'
+  \quit
+\endif
+
+BEGIN;
+SET search_path TO public;
+SET LOCAL astra.particiones = :'particiones';
+
+LOCK TABLE evidencia_registro IN ACCESS EXCLUSIVE MODE;
+
+-- 1) Lo que depende de la tabla vieja
+DROP VIEW IF EXISTS vw_resumen_submodulo_ies;
+ALTER TABLE evidencia_adjunto DROP CONSTRAINT IF EXISTS evidencia_adjunto_registro_id_fkey;
+
+-- 2) La tabla vieja se aparta (libera nombres de constraints/índices)
+ALTER TABLE evidencia_registro RENAME TO evidencia_registro_heap;
+ALTER TABLE evidencia_registro_heap RENAME CONSTRAINT evidencia_registro_pkey TO evidencia_registro_heap_pkey;
+ALTER TABLE evidencia_registro_heap RENAME CONSTRAINT ux_registro_ies_evidencia TO ux_registro_heap_ies_evidencia;
+DROP INDEX IF EXISTS idx_registro_ies_id;
+DROP INDEX IF EXISTS idx_registro_submodulo_id;
+DROP INDEX IF EXISTS idx_registro_evidencia_id;
+DROP INDEX IF EXISTS idx_registro_ies_submodulo;
+ALTER SEQUENCE evidencia_registro_id_seq OWNED BY NONE;
+
+-- 3) Tabla particionada (mismas columnas y checks)
+CREATE TABLE evidencia_registro (
+  id              BIGINT  NOT NULL DEFAULT nextval('evidencia_registro_id_seq'),
+  ies_id          INTEGER NOT NULL
+                  CONSTRAINT evidencia_registro_ies_id_fkey REFERENCES ies(id) ON DELETE CASCADE,
+  submodulo_id    INTEGER NOT NULL
+                  CONSTRAINT evidencia_registro_submodulo_id_fkey REFERENCES submodulos(id) ON DELETE CASCADE,
+  evidencia_id    BIGINT  NOT NULL
+                  CONSTRAINT evidencia_registro_evidencia_id_fkey REFERENCES evidencia_item(id) ON DELETE CASCADE,
+
+  presenta        BOOLEAN NOT NULL DEFAULT FALSE,
+  valoracion      INTEGER NOT NULL DEFAULT 0,
+  responsable     VARCHAR(255),
+
+  fecha_inicio    DATE,
+  fecha_fin       DATE,
+  avance_pct      INTEGER NOT NULL DEFAULT 0,
+
+  categoria_si_no BOOLEAN,
+
+  extra_data      JSONB NOT NULL DEFAULT '{}'::jsonb,
+
+  created_at      TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+  updated_at      TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+
+  CONSTRAINT ck_valoracion_0_100 CHECK (valoracion BETWEEN 0 AND 100),
+  CONSTRAINT ck_avance_0_100 CHECK (avance_pct BETWEEN 0 AND 100),
+  CONSTRAINT ck_fechas_ok CHECK (
+    fecha_inicio IS NULL OR fecha_fin IS NULL OR fecha_inicio <= fecha_fin
+  )
+) PARTITION BY HASH (ies_id);
+
+ALTER SEQUENCE evidencia_registro_id_seq OWNED BY evidencia_registro.id;
+
+DO $$
+DECLARE
+  n INTEGER := current_setting('astra.particiones')::int;
+  -- ancho del sufijo según n (lpad trunca: con 2 fijo, p100 chocaría con p10)
+  w INTEGER := greatest(2, length((n - 1)::text));
+BEGIN
+  IF n < 1 THEN
+    RAISE EXCEPTION 'particiones debe ser >= 1 (valor: %)', n;
+  END IF;
+  FOR i IN 0 .. n - 1 LOOP
+    EXECUTE format(
+      'CREATE TABLE %I PARTITION OF evidencia_registro FOR VALUES WITH (MODULUS %s, REMAINDER %s)',
+      'evidencia_registro_p' || lpad(i::text, w, '0'), n, i
+    );
+  END LOOP;
+END $$;
+
+-- 4) Copia (sin triggers todavía: el rollup ya refleja estas filas)
+INSERT INTO evidencia_registro (
+  id, ies_id, submodulo_id, evidencia_id,
+  presenta, valoracion, responsable, fecha_inicio, fecha_fin, avance_pct,
+  categoria_si_no, extra_data, created_at, updated_at
+)
+SELECT
+  id, ies_id, submodulo_id, evidencia_id,
+  presenta, valoracion, responsable, fecha_inicio, fecha_fin, avance_pct,
+  categoria_si_no, extra_data, created_at, updated_at
+FROM evidencia_registro_heap;
+
+-- 5) Índices después de la carga (se crean en cada partición)
+ALTER TABLE evidencia_registro ADD PRIMARY KEY (ies_id, id);
+ALTER TABLE evidencia_registro
+  ADD CONSTRAINT ux_registro_ies_evidencia UNIQUE (ies_id, evidencia_id);
+CREATE INDEX idx_registro_ies_submodulo ON evidencia_registro(ies_id, submodulo_id);
+CREATE INDEX idx_registro_submodulo_id ON evidencia_registro(submodulo_id);
+CREATE INDEX idx_registro_evidencia_id ON evidencia_registro(evidencia_id);
+
+-- 6) Triggers (mismas funciones)
+CREATE TRIGGER trg_evidencia_registro_updated_at
+BEFORE UPDATE ON evidencia_registro
+FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+CREATE TRIGGER trg_set_submodulo_id
+BEFORE INSERT OR UPDATE OF evidencia_id
+ON evidencia_registro
+FOR EACH ROW
+EXECUTE FUNCTION set_submodulo_id_from_evidencia();
+
+CREATE TRIGGER trg_resumen_rollup_ins
+AFTER INSERT ON evidencia_registro
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION resumen_rollup_on_registro();
+
+CREATE TRIGGER trg_resumen_rollup_upd
+AFTER UPDATE ON evidencia_registro
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION resumen_rollup_on_registro();
+
+CREATE TRIGGER trg_resumen_rollup_del
+AFTER DELETE ON evidencia_registro
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION resumen_rollup_on_registro();
+
+-- 6.1) Refresh del rollup: los pares vienen en arrays (unnest), así que el
+-- planner no puede podar y planificaba las N particiones en cada escritura.
+-- Filtro redundante ies_id = ANY(p_ies) -> poda al planificar (misma
+-- definición que ASTRA.sql).
+CREATE OR REPLACE FUNCTION resumen_rollup_calc(p_ies INTEGER[], p_submodulo INTEGER[])
+RETURNS TABLE (
+  ies_id                   INTEGER,
+  submodulo_id             INTEGER,
+  evidencias_total         INTEGER,
+  avance_promedio          DOUBLE PRECISION,
+  valoracion_promedio      DOUBLE PRECISION,
+  fecha_inicio_min         DATE,
+  fecha_fin_max            DATE,
+  ultima_actualizacion     TIMESTAMP WITHOUT TIME ZONE,
+  presenta_si              INTEGER,
+  presenta_no              INTEGER,
+  presenta_sin_dato        INTEGER,
+  cat_si                   INTEGER,
+  cat_no                   INTEGER,
+  cat_sin_dato             INTEGER,
+  av_0_24                  INTEGER,
+  av_25_49                 INTEGER,
+  av_50_74                 INTEGER,
+  av_75_100                INTEGER,
+  av_mas_100               INTEGER,
+  av_sin_dato              INTEGER,
+  responsable_mas_reciente TEXT
+) AS $$
+  SELECT
+    er.ies_id,
+    ei.submodulo_id,
+    COUNT(er.id)::int                                                            AS evidencias_total,
+    AVG(er.avance_pct)::float                                                    AS avance_promedio,
+    AVG(er.valoracion)::float                                                    AS valoracion_promedio,
+    MIN(er.fecha_inicio)                                                         AS fecha_inicio_min,
+    MAX(er.fecha_fin)                                                            AS fecha_fin_max,
+    MAX(er.updated_at)                                                           AS ultima_actualizacion,
+    (COUNT(er.id) FILTER (WHERE er.presenta IS TRUE))::int                       AS presenta_si,
+    (COUNT(er.id) FILTER (WHERE er.presenta IS FALSE))::int                      AS presenta_no,
+    (COUNT(er.id) FILTER (WHERE er.presenta IS NULL))::int                       AS presenta_sin_dato,
+    (COUNT(er.id) FILTER (WHERE COALESCE(er.categoria_si_no, er.presenta) IS TRUE))::int  AS cat_si,
+    (COUNT(er.id) FILTER (WHERE COALESCE(er.categoria_si_no, er.presenta) IS FALSE))::int AS cat_no,
+    (COUNT(er.id) FILTER (WHERE COALESCE(er.categoria_si_no, er.presenta) IS NULL))::int  AS cat_sin_dato,
+    (COUNT(er.id) FILTER (WHERE er.avance_pct < 25))::int                        AS av_0_24,
+    (COUNT(er.id) FILTER (WHERE er.avance_pct >= 25 AND er.avance_pct < 50))::int  AS av_25_49,
+    (COUNT(er.id) FILTER (WHERE er.avance_pct >= 50 AND er.avance_pct < 75))::int  AS av_50_74,
+    (COUNT(er.id) FILTER (WHERE er.avance_pct >= 75 AND er.avance_pct <= 100))::int AS av_75_100,
+    (COUNT(er.id) FILTER (WHERE er.avance_pct > 100))::int                       AS av_mas_100,
+    (COUNT(er.id) FILTER (WHERE er.avance_pct IS NULL))::int                     AS av_sin_dato,
+    (ARRAY_AGG(btrim(er.responsable) ORDER BY er.updated_at DESC, ei.orden ASC, er.id ASC)
+      FILTER (WHERE btrim(er.responsable) <> ''))[1]                             AS responsable_mas_reciente
+  FROM (
+    SELECT r.* FROM evidencia_registro r
+    WHERE p_ies IS NULL
+    UNION ALL
+    SELECT r.*
+    FROM (SELECT DISTINCT k.ies_id, k.submodulo_id
+          FROM unnest(p_ies, p_submodulo) AS k(ies_id, submodulo_id)) k
+    JOIN evidencia_registro r ON r.ies_id = k.ies_id AND r.submodulo_id = k.submodulo_id
+    WHERE p_ies IS NOT NULL
+      AND r.ies_id = ANY(p_ies)  -- redundante: poda de particiones al planificar
+  ) er
+  JOIN evidencia_item ei ON ei.id = er.evidencia_id
+  GROUP BY er.ies_id, ei.submodulo_id;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION resumen_rollup_refresh_pares(p_ies INTEGER[], p_submodulo INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+  -- Sin pares no hay nada que hacer (¡NULL en calc = todos los pares!)
+  IF p_ies IS NULL OR cardinality(p_ies) = 0 THEN
+    RETURN;
+  END IF;
+
+  -- Pares que quedaron sin registros
+  DELETE FROM resumen_rollup rr
+  USING unnest(p_ies, p_submodulo) AS k(ies_id, submodulo_id)
+  WHERE rr.ies_id = k.ies_id
+    AND rr.submodulo_id = k.submodulo_id
+    AND NOT EXISTS (
+      SELECT 1 FROM evidencia_registro er
+      WHERE er.ies_id = k.ies_id AND er.submodulo_id = k.submodulo_id
+        AND er.ies_id = ANY(p_ies)
+    );
+
+  -- Lock de fila por par: serializa escritores concurrentes del mismo par
+  -- (el UPDATE de abajo toma su snapshot DESPUÉS del commit del otro).
+  -- Orden fijo (ies_id, submodulo_id) para no cruzar locks entre lotes.
+  INSERT INTO resumen_rollup (ies_id, submodulo_id)
+  SELECT k.ies_id, k.submodulo_id
+  FROM (SELECT DISTINCT k.ies_id, k.submodulo_id
+        FROM unnest(p_ies, p_submodulo) AS k(ies_id, submodulo_id)) k
+  WHERE EXISTS (
+    SELECT 1 FROM evidencia_registro er
+    WHERE er.ies_id = k.ies_id AND er.submodulo_id = k.submodulo_id
+      AND er.ies_id = ANY(p_ies)
+  )
+  ORDER BY k.ies_id, k.submodulo_id
+  ON CONFLICT (ies_id, submodulo_id) DO NOTHING;
+
+  PERFORM 1
+  FROM resumen_rollup rr
+  JOIN (SELECT DISTINCT k.ies_id, k.submodulo_id
+        FROM unnest(p_ies, p_submodulo) AS k(ies_id, submodulo_id)) k
+    ON rr.ies_id = k.ies_id AND rr.submodulo_id = k.submodulo_id
+  ORDER BY rr.ies_id, rr.submodulo_id
+  FOR UPDATE OF rr;
+
+  UPDATE resumen_rollup rr SET
+    evidencias_total         = v.evidencias_total,
+    avance_promedio          = v.avance_promedio,
+    valoracion_promedio      = v.valoracion_promedio,
+    fecha_inicio_min         = v.fecha_inicio_min,
+    fecha_fin_max            = v.fecha_fin_max,
+    ultima_actualizacion     = v.ultima_actualizacion,
+    presenta_si              = v.presenta_si,
+    presenta_no              = v.presenta_no,
+    presenta_sin_dato        = v.presenta_sin_dato,
+    cat_si                   = v.cat_si,
+    cat_no                   = v.cat_no,
+    cat_sin_dato             = v.cat_sin_dato,
+    av_0_24                  = v.av_0_24,
+    av_25_49                 = v.av_25_49,
+    av_50_74                 = v.av_50_74,
+    av_75_100                = v.av_75_100,
+    av_mas_100               = v.av_mas_100,
+    av_sin_dato              = v.av_sin_dato,
+    responsable_mas_reciente = v.responsable_mas_reciente,
+    refreshed_at             = NOW()
+  FROM resumen_rollup_calc(p_ies, p_submodulo) v
+  WHERE rr.ies_id = v.ies_id
+    AND rr.submodulo_id = v.submodulo_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 7) Adjuntos: FK con la clave completa
+ALTER TABLE evidencia_adjunto ADD COLUMN IF NOT EXISTS ies_id INTEGER;
+UPDATE evidencia_adjunto a
+SET ies_id = r.ies_id
+FROM evidencia_registro r
+WHERE r.id = a.registro_id AND a.ies_id IS NULL;
+ALTER TABLE evidencia_adjunto ALTER COLUMN ies_id SET NOT NULL;
+ALTER TABLE evidencia_adjunto
+  ADD CONSTRAINT evidencia_adjunto_registro_fkey
+  FOREIGN KEY (ies_id, registro_id) REFERENCES evidencia_registro(ies_id, id) ON DELETE CASCADE;
+
+-- 8) Vista del dashboard (igual que en ASTRA.sql)
+CREATE VIEW vw_resumen_submodulo_ies AS
+SELECT
+  i.slug AS ies_slug,
+  er.submodulo_id,
+
+  COUNT(*) AS evidencias_total,
+  AVG(er.avance_pct)::numeric(10,2) AS avance_promedio,
+  AVG(er.valoracion)::numeric(10,2) AS valoracion_promedio,
+
+  MIN(er.fecha_inicio) AS fecha_inicio_min,
+  MAX(er.fecha_fin)    AS fecha_fin_max,
+
+  SUM(CASE WHEN er.presenta = TRUE THEN 1 ELSE 0 END) AS evidencias_presenta,
+  SUM(CASE WHEN er.categoria_si_no = TRUE THEN 1 ELSE 0 END) AS categoria_si,
+  SUM(CASE WHEN er.categoria_si_no = FALSE THEN 1 ELSE 0 END) AS categoria_no,
+  SUM(CASE WHEN er.categoria_si_no IS NULL THEN 1 ELSE 0 END) AS categoria_null
+
+FROM evidencia_registro er
+JOIN ies i ON i.id = er.ies_id
+GROUP BY i.slug, er.submodulo_id;
+
+DROP TABLE evidencia_registro_heap;
+
+COMMIT;
+
+ANALYZE evidencia_registro;
+ANALYZE evidencia_adjunto;
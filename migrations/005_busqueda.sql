@@ -0,0 +1,49 @@
+-- migrations/005_busqueda.sql
+-- Búsqueda (GET /buscar):
+-- - evidencia_item.titulo_tsv: tsvector generado con la config es_unaccent
+--   (stemming español + sin tildes: "bibliotecas" encuentra "Biblioteca",
+--   "gestion" encuentra "gestión") + índice GIN.
+-- - evidencia_registro.responsable: índice GIN pg_trgm sobre
+--   f_unaccent(lower(responsable)) para nombres aproximados ("maria perez"
+--   -> "María Pérez"). En tabla particionada se crea en cada partición.
+-- unaccent() es STABLE (depende del search_path): f_unaccent lo fija con el
+-- diccionario calificado y queda IMMUTABLE, usable en índices.
+-- Requiere las extensiones unaccent y pg_trgm (contrib).
+-- Idempotente: se puede correr más de una vez.
+--   psql "$DATABASE_URL" -f migrations/005_busqueda.sql
+SET client_encoding = 'UTF8';
+
+BEGIN;
+SET search_path TO public;
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE OR REPLACE FUNCTION f_unaccent(text)
+RETURNS text AS $$
+  SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'es_unaccent') THEN
+    CREATE TEXT SEARCH CONFIGURATION es_unaccent (COPY = spanish);
+    ALTER TEXT SEARCH CONFIGURATION es_unaccent
+      ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+  END IF;
+END $$;
+
+ALTER TABLE evidencia_item
+  ADD COLUMN IF NOT EXISTS titulo_tsv tsvector
+  GENERATED ALWAYS AS (to_tsvector('public.es_unaccent', titulo)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_evidencia_item_titulo_tsv
+  ON evidencia_item USING gin (titulo_tsv);
+
+-- Bloquea escrituras en evidencia_registro mientras se construye
+CREATE INDEX IF NOT EXISTS idx_registro_responsable_trgm
+  ON evidencia_registro USING gin (f_unaccent(lower(responsable)) gin_trgm_ops);
+
+COMMIT;
+
+ANALYZE evidencia_item;
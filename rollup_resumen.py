@@ -0,0 +1,39 @@
+import sys
+
+from app.db.session import SessionLocal
+from app.routes.resumen import rebuild_rollup, check_rollup
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+    if cmd not in ("rebuild", "check"):
+        print("Uso: python rollup_resumen.py rebuild | check [ies_id]")
+        sys.exit(2)
+
+    db = SessionLocal()
+    try:
+        if cmd == "rebuild":
+            n = rebuild_rollup(db)
+            print("OK: resumen_rollup reconstruido,", n, "pares (ies, submodulo)")
+            return
+
+        ies_id = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        res = check_rollup(db, ies_id=ies_id)
+        print("pares live:", res["pares_live"], "| pares rollup:", res["pares_rollup"])
+        print("faltantes:", res["total_faltantes"],
+              "| sobrantes:", res["total_sobrantes"],
+              "| diferencias:", res["total_diferencias"])
+        for d in res["diferencias"]:
+            print("  ies", d["ies_id"], "submodulo", d["submodulo_id"], "->", ", ".join(d["campos"]))
+
+        if res["ok"]:
+            print("OK: resumen_rollup consistente.")
+        else:
+            print("ERROR: resumen_rollup desfasado. Ejecuta: python rollup_resumen.py rebuild")
+            sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()